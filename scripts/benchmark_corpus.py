@@ -0,0 +1,55 @@
+"""
+Time to read records from a directory of text files (with a lookup table) compared with a packed
+    corpus (`precise_nlp.corpus`), and size of each record as sent to a worker process.
+
+Usage: benchmark_corpus.py [--records 20000]
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+from loguru import logger
+
+from precise_nlp.corpus import convert
+from precise_nlp.process import get_data
+from precise_nlp.worker import WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+def read(data, **kwargs):
+    """Read records as `process` does: :return: bytes pickled for workers"""
+    size = 0
+    for identifier, path_text, cspy_text, _ in get_data(**data, **kwargs):
+        size += len(pickle.dumps((identifier, path_text, cspy_text)))
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', default=20000, type=int)
+    args = parser.parse_args()
+    logger.remove()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, 'lookup.csv'), 'w') as lookup:
+            for i in range(args.records):
+                for name, text in ((f'cspy{i}.txt', WARMUP_CSPY_TEXT), (f'path{i}.txt', WARMUP_PATH_TEXT)):
+                    with open(os.path.join(tmpdir, name), 'w') as fh:
+                        fh.write(f'{text}\nRecord {i}.')
+                lookup.write(f'{i},cspy{i}.txt,path{i}.txt\n')
+        files = {'filetype': 'txt', 'path': tmpdir, 'lookup_table': os.path.join(tmpdir, 'lookup.csv')}
+        corpus_path = os.path.join(tmpdir, 'corpus.pnlpc')
+        start = time.perf_counter()
+        convert(corpus_path, **files)
+        print(f'{args.records} records (converted in {time.perf_counter() - start:.2f} seconds)')
+        print('Source     \tSeconds\tBytes per record')
+        corpus = {'filetype': 'corpus', 'path': corpus_path}
+        for name, data, kwargs in (('files', files, {}), ('corpus', corpus, {}),
+                                   ('corpus lazy', corpus, {'lazy_text': True})):
+            start = time.perf_counter()
+            size = read(data, **kwargs)
+            print(f'{name:11}\t{time.perf_counter() - start:7.2f}\t{size / args.records:.0f}')
+
+
+if __name__ == '__main__':
+    main()
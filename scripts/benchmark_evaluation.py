@@ -0,0 +1,45 @@
+"""
+Time to score predictions against truth with `precise_nlp.evaluation.Evaluator`
+    (including bootstrap confidence intervals) for random records.
+
+Usage: benchmark_evaluation.py [--records 200000] [--labels 40] [--groups 10] [--bootstrap 1000]
+"""
+import argparse
+import random
+import time
+
+from precise_nlp.evaluation import Evaluator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', default=200000, type=int)
+    parser.add_argument('--labels', default=40, type=int)
+    parser.add_argument('--groups', default=10, type=int)
+    parser.add_argument('--bootstrap', default=1000, type=int)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    labels = [f'label{i}' for i in range(args.labels)]
+    values = [0, 1, 2]
+    records = [
+        (i, {label: rng.choice(values) for label in labels}, {label: rng.choice(values) for label in labels})
+        for i in range(args.records)
+    ]
+    errors = {label: {'fp': rng.sample(range(args.records), 1000)} for label in labels}
+    evaluator = Evaluator(labels, errors=errors, group_by='group')
+    start = time.perf_counter()
+    for identifier, truth_values, res in records:
+        evaluator.add(identifier, truth_values, res, group=(identifier % args.groups,))
+    added = time.perf_counter()
+    outcomes = evaluator.outcomes()
+    evaluator.errors_found(outcomes)
+    results = evaluator.results(args.bootstrap, seed=0, outcomes=outcomes)
+    end = time.perf_counter()
+    print('Stage   \tSeconds')
+    print(f'collect \t{added - start:7.2f}')
+    print(f'evaluate\t{end - added:7.2f}')
+    print(f'({len(results)} rows: {args.labels} labels x {args.groups + 1} groups)')
+
+
+if __name__ == '__main__':
+    main()
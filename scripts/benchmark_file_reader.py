@@ -0,0 +1,54 @@
+"""
+Time to process records from a lookup table of (gzip-compressed) text files, reading each file when
+    its record is used compared with prefetching them on a pool of threads (`precise_nlp.file_reader`).
+
+Latency of a network filesystem is simulated by sleeping before opening each file.
+
+Usage: benchmark_file_reader.py [--records 300] [--latency 0.005]
+"""
+import argparse
+import gzip
+import os
+import tempfile
+import time
+
+from loguru import logger
+
+from precise_nlp import file_reader
+from precise_nlp.process import process
+from precise_nlp.worker import WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', default=300, type=int)
+    parser.add_argument('--latency', default=0.005, type=float, help='seconds to open each file')
+    args = parser.parse_args()
+    logger.remove()
+    read_text = file_reader.read_text
+
+    def slow_read_text(fp, encoding='utf8'):
+        time.sleep(args.latency)
+        return read_text(fp, encoding)
+
+    file_reader.read_text = slow_read_text
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, 'lookup.csv'), 'w') as lookup:
+            for i in range(args.records):
+                for name, text in ((f'cspy{i}.txt.gz', WARMUP_CSPY_TEXT), (f'path{i}.txt.gz', WARMUP_PATH_TEXT)):
+                    with gzip.open(os.path.join(tmpdir, name), 'wt') as fh:
+                        fh.write(f'{text}\nRecord {i}.')
+                lookup.write(f'{i},cspy{i}.txt,path{i}.txt\n')
+        data = {'filetype': 'txt', 'path': tmpdir, 'lookup_table': os.path.join(tmpdir, 'lookup.csv')}
+        print(f'{args.records} records ({args.latency * 1000:.0f} ms to open each file)')
+        print('Reader  \tSeconds')
+        for name, prefetch in (('serial', None), ('prefetch', True)):
+            start = time.perf_counter()
+            process(dict(data, prefetch=prefetch), outfile=os.path.join(tmpdir, f'{name}.csv'))
+            print(f'{name:8}\t{time.perf_counter() - start:7.2f}')
+        with open(os.path.join(tmpdir, 'serial.csv')) as fh, open(os.path.join(tmpdir, 'prefetch.csv')) as fh2:
+            print(f'Identical output: {fh.read() == fh2.read()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare throughput of BROAD and PRECISE finding versions on colonoscopy notes.
+
+Usage: benchmark_finding_version.py [notes.csv] [--column COLONOSCOPY] [--repeat 5]
+    Defaults to the colonoscopy column in `example/example_data.csv`
+"""
+import argparse
+import csv
+import pathlib
+import time
+
+from loguru import logger
+
+from precise_nlp.extract.cspy.cspy import CspyManager, FindingVersion
+
+EXAMPLE_DATA = pathlib.Path(__file__).parent.parent / 'example' / 'example_data.csv'
+
+
+def read_notes(path, column):
+    with open(path, encoding='utf-8-sig', newline='') as fh:
+        return [row[column] for row in csv.DictReader(fh) if row[column]]
+
+
+def benchmark(notes, version, repeat=5):
+    """
+    :return: best time (seconds) of `repeat` runs to extract findings from all notes
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for note in notes:
+            cm = CspyManager(note, version=version)
+            cm.num_polyps  # force findings to be computed
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='?', default=EXAMPLE_DATA)
+    parser.add_argument('--column', default='COLONOSCOPY')
+    parser.add_argument('--repeat', default=5, type=int)
+    args = parser.parse_args()
+    logger.remove()  # logging dominates runtime otherwise
+    notes = read_notes(args.path, args.column)
+    print(f'Notes: {len(notes)}; characters: {sum(len(n) for n in notes)}')
+    print('Version \tTotal (s)\tNotes/s')
+    for version in (FindingVersion.BROAD, FindingVersion.PRECISE):
+        elapsed = benchmark(notes, version, repeat=args.repeat)
+        print(f'{version.name:8}\t{elapsed:.4f}   \t{len(notes) / elapsed:.1f}')
+
+
+if __name__ == '__main__':
+    main()
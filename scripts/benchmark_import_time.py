@@ -0,0 +1,67 @@
+"""
+Break down the time to import `precise_nlp` (using `python -X importtime`).
+
+Usage: benchmark_import_time.py [--module precise_nlp.process] [--repeat 5] [--top 20]
+    Each run imports the module in a fresh interpreter; the fastest run is reported.
+    Patterns are compiled on first use, so the time to compile all of them is shown separately.
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+IMPORTTIME_LINE = re.compile(r'import time:\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(\S+)')
+COMPILE_ALL = ('import time; from precise_nlp.pattern_registry import compile_all; start = time.perf_counter();'
+               ' n = compile_all(); print(n, time.perf_counter() - start)')
+
+
+def import_times(module):
+    """
+    :return: list of (module, self seconds, cumulative seconds) in import order
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True, check=True)
+    times = []
+    for line in proc.stderr.splitlines():
+        if m := IMPORTTIME_LINE.match(line):
+            self_us, cumulative_us, name = m.groups()
+            times.append((name, int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return times
+
+
+def compile_all_time(module):
+    """
+    :return: (number of patterns, seconds) to compile all registered patterns after importing `module`
+    """
+    proc = subprocess.run([sys.executable, '-c', f'import {module}; {COMPILE_ALL}'],
+                          capture_output=True, text=True, check=True)
+    count, elapsed = proc.stdout.split()
+    return int(count), float(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='precise_nlp.process')
+    parser.add_argument('--repeat', default=5, type=int)
+    parser.add_argument('--top', default=20, type=int, help='number of slowest imports to show')
+    args = parser.parse_args()
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times[-1][2])  # top-level module is imported last
+    total = best[-1][2]
+    print(f'Import {args.module}: {total * 1000:.1f} ms (best of {args.repeat})')
+    print('\nCumulative (ms)\tSelf (ms)\tModule')
+    for name, self_time, cumulative in sorted(best, key=lambda x: -x[2])[:args.top]:
+        print(f'{cumulative * 1000:10.1f}\t{self_time * 1000:9.1f}\t{name}')
+    top_level = {}  # top-level package -> self time
+    for name, self_time, _ in best:
+        package = name.split('.')[0]
+        top_level[package] = top_level.get(package, 0) + self_time
+    print('\nSelf time by package (ms)')
+    for package, elapsed in sorted(top_level.items(), key=lambda x: -x[1])[:args.top]:
+        print(f'{elapsed * 1000:10.1f}\t{package}')
+    count, elapsed = compile_all_time(args.module)
+    print(f'\nDeferred: compiling {count} patterns takes {elapsed * 1000:.1f} ms (on first use)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Time and peak memory (resident, in a new process) to read records from separate pathology and
+    colonoscopy csv files: merged in pandas first compared with joined while reading (`precise_nlp.join`)
+    in memory (hash join) or on disk (sort-merge join).
+
+Usage: benchmark_join.py [--records 50000]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+
+from loguru import logger
+
+from precise_nlp.process import get_data
+from precise_nlp.worker import WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+def read_merged(path_file, cspy_file):
+    import pandas as pd
+
+    df = pd.read_csv(path_file).merge(pd.read_csv(cspy_file).rename(columns={'ENC_ID': 'ENC'}), on='ENC', how='outer')
+    df = df.fillna({'NOTE': '', 'REPORT': ''})
+    return get_data(df, None, identifier='ENC', path_text='NOTE', cspy_text='REPORT')
+
+
+def peak_memory():
+    """:return: peak resident memory (MB) of this process"""
+    try:
+        with open('/proc/self/status') as fh:  # not carried over from parent process (unlike ru_maxrss)
+            return next(int(line.split()[1]) for line in fh if line.startswith('VmHWM')) / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(method, path_file, cspy_file, max_join_rows, queue):
+    """Read all records in a new process: put (seconds, peak MB, records) on queue"""
+    logger.remove()
+    start = time.perf_counter()
+    if method == 'none':  # only imports
+        records = []
+    elif method == 'merged':
+        records = read_merged(path_file, cspy_file)
+    else:
+        records = get_data('join', path_source={'filetype': 'csv', 'path': path_file, 'key': 'ENC', 'text': 'NOTE'},
+                           cspy_source={'filetype': 'csv', 'path': cspy_file, 'key': 'ENC_ID', 'text': 'REPORT'},
+                           max_join_rows=max_join_rows)
+    count = sum(1 for _ in records)
+    queue.put((time.perf_counter() - start, peak_memory(), count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', default=50000, type=int)
+    args = parser.parse_args()
+    logger.remove()
+    import pandas as pd
+
+    keys = list(range(args.records))
+    random.Random(0).shuffle(keys)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path_file, cspy_file = os.path.join(tmpdir, 'path.csv'), os.path.join(tmpdir, 'cspy.csv')
+        pd.DataFrame({'ENC': keys[:int(args.records * 0.9)],
+                      'NOTE': [f'{WARMUP_PATH_TEXT}\nRecord {key}.' for key in keys[:int(args.records * 0.9)]]}
+                     ).to_csv(path_file, index=False)
+        pd.DataFrame({'ENC_ID': range(args.records),
+                      'REPORT': [f'{WARMUP_CSPY_TEXT}\nRecord {key}.' for key in range(args.records)]}
+                     ).to_csv(cspy_file, index=False)
+        print(f'{args.records} records')
+        print('Method    \tSeconds\tPeak MB\tRecords')
+        context = multiprocessing.get_context('spawn')
+        for name, method, max_join_rows in (('(imports)', 'none', None), ('merged', 'merged', None),
+                                            ('hash join', 'join', args.records),
+                                            ('sort-merge', 'join', args.records // 10)):
+            queue = context.Queue()
+            proc = context.Process(target=measure, args=(method, path_file, cspy_file, max_join_rows, queue))
+            proc.start()
+            elapsed, peak, count = queue.get()
+            proc.join()
+            print(f'{name:10}\t{elapsed:7.2f}\t{peak:7.0f}\t{count}')
+
+
+if __name__ == '__main__':
+    main()
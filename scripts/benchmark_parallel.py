@@ -0,0 +1,67 @@
+"""
+Compare throughput of `process_text` run sequentially, on a thread pool, and on a process pool.
+
+Usage: benchmark_parallel.py [notes.csv] [--workers 4] [--records 400]
+    Defaults to the notes in `example/example_data.csv`. Threads only scale on free-threaded
+    builds (e.g., python3.13t); on standard builds they are limited by the GIL.
+"""
+import argparse
+import csv
+import pathlib
+import sys
+import time
+
+from loguru import logger
+
+from precise_nlp.process import process_text
+from precise_nlp.worker import worker_executor, map_ordered, preload
+
+EXAMPLE_DATA = pathlib.Path(__file__).parent.parent / 'example' / 'example_data.csv'
+
+
+def read_notes(path, path_column, cspy_column):
+    with open(path, encoding='utf-8-sig', newline='') as fh:
+        return [(row[path_column], row[cspy_column]) for row in csv.DictReader(fh)]
+
+
+def quiet_process_text(path_text, cspy_text):
+    logger.remove()  # in spawned workers
+    return process_text(path_text, cspy_text)
+
+
+def benchmark(records, workers=None, mode=None):
+    """
+    :return: seconds to process all records
+    """
+    executor = worker_executor(workers, mode=mode) if workers else None
+    start = time.perf_counter()
+    for _ in map_ordered(quiet_process_text, records, executor=executor, max_pending=4 * (workers or 1)):
+        pass
+    elapsed = time.perf_counter() - start
+    if executor:
+        executor.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='?', default=EXAMPLE_DATA)
+    parser.add_argument('--path-column', default='PATH')
+    parser.add_argument('--cspy-column', default='COLONOSCOPY')
+    parser.add_argument('--workers', default=4, type=int)
+    parser.add_argument('--records', default=400, type=int)
+    args = parser.parse_args()
+    logger.remove()  # logging dominates runtime otherwise
+    notes = read_notes(args.path, args.path_column, args.cspy_column)
+    records = [notes[i % len(notes)] for i in range(args.records)]
+    gil = sys._is_gil_enabled() if hasattr(sys, '_is_gil_enabled') else True
+    print(f'Python {sys.version.split()[0]}; GIL enabled: {gil}; records: {len(records)}')
+    print('Mode      \tWorkers\tTotal (s)\tRecords/s')
+    preload(freeze=False)  # same warm state for sequential run
+    for mode, workers in [('sequential', None), ('thread', args.workers), ('process', args.workers)]:
+        elapsed = benchmark(records, workers, mode)
+        print(f'{mode:10}\t{workers or 1:7}\t{elapsed:.4f}   \t{len(records) / elapsed:.1f}')
+
+
+if __name__ == '__main__':
+    main()
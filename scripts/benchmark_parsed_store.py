@@ -0,0 +1,52 @@
+"""
+Time to derive variables from stored parsed documents (`precise_nlp.parsed_store`) compared with
+    parsing the reports again, and size of the store.
+
+Usage: benchmark_parsed_store.py [--records 1000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from loguru import logger
+
+from precise_nlp.parsed_store import ParsedStoreWriter, ParsedStoreReader
+from precise_nlp.process import process_text, extract_variables
+from precise_nlp.worker import preload, WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', default=1000, type=int)
+    args = parser.parse_args()
+    logger.remove()
+    preload(freeze=False)
+    documents = [(f'{WARMUP_PATH_TEXT}\nE) Record {i}.', f'{WARMUP_CSPY_TEXT}\nRecord {i}.')
+                 for i in range(args.records)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'parsed.pnlp')
+        start = time.perf_counter()
+        with ParsedStoreWriter(path) as writer:
+            for i, (path_text, cspy_text) in enumerate(documents):
+                parsed = []
+                process_text(path_text, cspy_text, parsed=parsed)
+                writer.add(i, *parsed[0])
+        stored = time.perf_counter()
+        for path_text, cspy_text in documents:
+            process_text(path_text, cspy_text)
+        reparsed = time.perf_counter()
+        with ParsedStoreReader(path) as reader:
+            for _, pm, cm in reader:
+                extract_variables(pm, cm)
+        loaded = time.perf_counter()
+        size = os.path.getsize(path)
+    print('Method         \tSeconds')
+    print(f'parse and store\t{stored - start:7.2f}')
+    print(f'reparse        \t{reparsed - stored:7.2f}')
+    print(f'load           \t{loaded - reparsed:7.2f}')
+    print(f'({size / args.records:.0f} bytes per record)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Makespan and tail (time some workers are idle at the end) of extracting a heavy-tailed set of records
+    (mostly short reports, with a few of many jars and findings) when records are dispatched to workers in
+    order (in chunks, as `multiprocessing.Pool.map`) compared with `precise_nlp.scheduler`.
+
+Each record is timed in this process, and the timings are used to simulate each number of workers
+    (so the comparison does not depend on the cpus available). The cost model is fit on one set
+    of records and used to schedule another.
+
+Usage: benchmark_scheduler.py [--records 400] [--workers 4 8 16]
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+
+from loguru import logger
+
+from precise_nlp.process import extract_record
+from precise_nlp.scheduler import Scheduler, simulate, document_features, MIN_CHUNK_SECONDS, DISPATCH_SECONDS
+from precise_nlp.worker import WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+def heavy_tailed_records(n, seed):
+    """Mostly short records, with a few reports of many jars and colonoscopies of many findings"""
+    rng = random.Random(seed)
+    specimens = [line[2:] for line in WARMUP_PATH_TEXT.split('\n') if line[1:2] == ')']
+    start, end = WARMUP_CSPY_TEXT.index('Findings:') + 9, WARMUP_CSPY_TEXT.index('Colon preparation')
+    findings = WARMUP_CSPY_TEXT[start:end]
+    for i in range(n):
+        size = min(100, int(rng.paretovariate(1.2)))
+        path_text = '\n'.join(f'{chr(65 + j % 26)}{j // 26 or ""}){specimens[j % len(specimens)]}'
+                              for j in range(max(size, 4)))
+        yield i, path_text, WARMUP_CSPY_TEXT[:end] + findings * (size - 1) + WARMUP_CSPY_TEXT[end:]
+
+
+def in_order(durations, workers):
+    """Contiguous chunks dispatched in order (chunk size as `multiprocessing.Pool.map`)"""
+    size = math.ceil(len(durations) / (4 * workers))
+    return simulate([sum(durations[i:i + size]) for i in range(0, len(durations), size)], workers)
+
+
+def scheduled(scheduler, records, durations, workers):
+    """Chunks in the order `Scheduler` would dispatch them"""
+    scheduler.workers = workers
+    scheduler.dispatched = []
+    chunks = []
+    waiting = [(-scheduler.model.estimate(document_features(path_text, cspy_text)), i, None)
+               for i, path_text, cspy_text in records]
+    remaining_cost = -sum(cost for cost, _, _ in waiting)
+    waiting.sort()
+    while waiting:
+        chunk, cost = scheduler._chunk(waiting, remaining_cost, True, workers)
+        remaining_cost -= cost
+        chunks.append(sum(durations[seq] for seq, _ in chunk))
+    return simulate(chunks, workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', default=400, type=int)
+    parser.add_argument('--workers', default=[4, 8, 16], nargs='+', type=int)
+    args = parser.parse_args()
+    logger.remove()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model = os.path.join(tmpdir, 'cost_model.json')
+        scheduler = Scheduler(None, model=model)  # time in this process to fit model
+        list(scheduler.map(extract_record, heavy_tailed_records(args.records, seed=0)))
+        scheduler.close()
+        records = list(heavy_tailed_records(args.records, seed=1))
+        scheduler = Scheduler(None, model=model)
+        list(scheduler.map(extract_record, records))
+        durations = scheduler.durations
+    print(f'{args.records} records: {sum(durations):.2f}s of work;'
+          f' longest record {max(durations):.2f}s, median {sorted(durations)[len(durations) // 2] * 1000:.1f} ms')
+    print(f'Chunks of at least {MIN_CHUNK_SECONDS * DISPATCH_SECONDS["process"] * 1000:.0f} ms')
+    print('Workers\tLower bound\tIn order makespan\tIn order tail\tScheduled makespan\tScheduled tail')
+    for workers in args.workers:
+        order_makespan, order_tail = in_order(durations, workers)
+        makespan, tail = scheduled(scheduler, records, durations, workers)
+        bound = max(sum(durations) / workers, max(durations))
+        print(f'{workers}\t{bound:11.2f}\t{order_makespan:17.2f}\t{order_tail:13.2f}\t{makespan:18.2f}\t{tail:14.2f}')
+
+
+if __name__ == '__main__':
+    main()
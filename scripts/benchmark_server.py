@@ -0,0 +1,88 @@
+"""
+Latency of single-note requests to the resident extraction server (`precise_nlp.server`)
+    compared with starting `python -m precise_nlp`-style processing in a new interpreter.
+
+Usage: benchmark_server.py [notes.csv] [--workers 2] [--requests 200] [--clients 1]
+    Defaults to the notes in `example/example_data.csv`.
+"""
+import argparse
+import csv
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from precise_nlp.client import Client
+from precise_nlp.server import ExtractionServer
+
+EXAMPLE_DATA = pathlib.Path(__file__).parent.parent / 'example' / 'example_data.csv'
+COLD_START = 'from loguru import logger; logger.remove(); ' \
+             'from precise_nlp.process import process_text; process_text(*__import__("sys").argv[1:])'
+
+
+def read_notes(path, path_column, cspy_column):
+    with open(path, encoding='utf-8-sig', newline='') as fh:
+        return [(row[path_column], row[cspy_column]) for row in csv.DictReader(fh)]
+
+
+def percentile(values, q):
+    return sorted(values)[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def run_client(address, notes):
+    latencies = []
+    with Client(address) as client:
+        for path_text, cspy_text in notes:
+            start = time.perf_counter()
+            client.extract(path_text, cspy_text)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='?', default=EXAMPLE_DATA)
+    parser.add_argument('--path-column', default='PATH')
+    parser.add_argument('--cspy-column', default='COLONOSCOPY')
+    parser.add_argument('--workers', default=2, type=int)
+    parser.add_argument('--requests', default=200, type=int)
+    parser.add_argument('--clients', default=1, type=int)
+    args = parser.parse_args()
+    logger.remove()  # logging dominates runtime otherwise
+    notes = read_notes(args.path, args.path_column, args.cspy_column)
+    records = [notes[i % len(notes)] for i in range(args.requests)]
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', COLD_START, *records[0]], check=True)
+    cold = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with ExtractionServer(str(pathlib.Path(tmpdir) / 'precise.sock'), workers=args.workers) as server:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            with ThreadPoolExecutor(args.clients) as executor:
+                latencies = [
+                    latency for result in executor.map(
+                        lambda i: run_client(server.address, records[i::args.clients]), range(args.clients)
+                    ) for latency in result
+                ]
+            with Client(server.address) as client:
+                server_stats = client.stats()['latency']
+            server.shutdown()
+            thread.join()
+
+    print('Method     \tMean (ms)\tp50 (ms)\tp95 (ms)\tp99 (ms)')
+    print(f'new process\t{cold * 1000:9.2f}\t{"":8}\t{"":8}\t{"":8}')
+    print(f'server     \t{statistics.mean(latencies) * 1000:9.2f}\t{percentile(latencies, 50) * 1000:8.2f}'
+          f'\t{percentile(latencies, 95) * 1000:8.2f}\t{percentile(latencies, 99) * 1000:8.2f}')
+    print(f'Server-side histogram: {server_stats["buckets"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Overhead of writing `process` output to SQLite (`precise_nlp.sqlite_writer`) vs. CSV:
+    the result of one note is repeated with distinct identifiers.
+
+Usage: benchmark_sqlite.py [--rows 1000000] [--batch-size 10000] [--rerun]
+    --rerun: write the rows a second time into the same database (replacing the first)
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from loguru import logger
+
+from precise_nlp.process import process_text, ITEMS
+from precise_nlp.sqlite_writer import SqliteWriter
+
+PATH_TEXT = 'A) Colon, cecum, polypectomy: Tubular adenoma.\nB) Rectum: Hyperplastic polyp.'
+CSPY_TEXT = 'Indications: Screening.\nFindings: A 5 mm polyp in the cecum. A 3 mm polyp in the rectum.'
+
+
+def rows(result, count):
+    for i in range(count):
+        yield dict(result, row=i, identifier=f'ID{i:09d}')
+
+
+def write_csv(path, fieldnames, result, count):
+    with open(path, 'w', newline='') as fh:
+        writer = csv.DictWriter(fh, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows(result, count))
+
+
+def write_sqlite(path, fieldnames, result, count, batch_size):
+    with SqliteWriter(path, batch_size=batch_size) as fh:
+        fh.writer(fieldnames).writerows(rows(result, count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default=1_000_000, type=int)
+    parser.add_argument('--batch-size', default=10000, type=int)
+    parser.add_argument('--rerun', action='store_true')
+    args = parser.parse_args()
+    logger.remove()
+    result = process_text(PATH_TEXT, CSPY_TEXT)
+    header = ['row', 'identifier'] + list(result)
+    fieldnames = header + [item for item in ITEMS if item not in set(header)]
+    print('Output \tSeconds\tRows/second\tMB')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, path, func in [
+            ('csv', os.path.join(tmpdir, 'out.csv'), lambda p: write_csv(p, fieldnames, result, args.rows)),
+            ('sqlite', os.path.join(tmpdir, 'out.sqlite'),
+             lambda p: write_sqlite(p, fieldnames, result, args.rows, args.batch_size)),
+        ]:
+            for run in range(2 if args.rerun and label == 'sqlite' else 1):
+                start = time.perf_counter()
+                func(path)
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(path) / 1024 / 1024
+                print(f'{label + ("" if not run else " (rerun)"):7}\t{elapsed:7.2f}\t{args.rows / elapsed:11.0f}'
+                      f'\t{size:.0f}')
+
+
+if __name__ == '__main__':
+    main()
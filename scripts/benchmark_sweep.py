@@ -0,0 +1,60 @@
+"""
+Time to extract variables under a grid of configurations (`precise_nlp.sweep`): parsing each
+    document once, compared with separately parsing the document for each configuration.
+
+Usage: benchmark_sweep.py [--records 50] [--greater-than 1 2 3] [--min-size 5 10]
+"""
+import argparse
+import time
+
+from loguru import logger
+
+from precise_nlp.extract.cspy.cspy import CspyManager, FindingVersion
+from precise_nlp.extract.path.path_manager import PathManager
+from precise_nlp.process import extract_variables
+from precise_nlp.sweep import ParsedDocument, configurations
+from precise_nlp.worker import preload, WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+def separately(documents, configs):
+    for path_text, cspy_text in documents:
+        for config in configs:
+            version = FindingVersion.PRECISE if config['cspy_precise_finding_version'] else FindingVersion.BROAD
+            cm = CspyManager(cspy_text, version=version, cspy_extent_search_all=config['cspy_extent_search_all'])
+            extract_variables(PathManager(path_text), cm, cspy_finding_version=version,
+                              greater_than=config['greater_than'], min_size=config['min_size'],
+                              allow_maybe=config['allow_maybe'], bins=config['bins'])
+
+
+def sweep(documents, configs):
+    for path_text, cspy_text in documents:
+        doc = ParsedDocument(path_text, cspy_text)
+        for config in configs:
+            doc.extract(config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', default=50, type=int)
+    parser.add_argument('--greater-than', default=[1, 2, 3], type=int, nargs='+')
+    parser.add_argument('--min-size', default=[5, 10], type=int, nargs='+')
+    args = parser.parse_args()
+    logger.remove()
+    preload(freeze=False)
+    configs = configurations({
+        'cspy_precise_finding_version': [True, False],
+        'greater_than': args.greater_than,
+        'min_size': args.min_size,
+    })
+    documents = [(f'{WARMUP_PATH_TEXT}\nE) Record {i}.', f'{WARMUP_CSPY_TEXT}\nRecord {i}.')
+                 for i in range(args.records)]
+    print(f'{args.records} records x {len(configs)} configurations')
+    print('Method    \tSeconds')
+    for name, func in (('separately', separately), ('sweep', sweep)):
+        start = time.perf_counter()
+        func(documents, configs)
+        print(f'{name:10}\t{time.perf_counter() - start:7.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Time to tokenize pathology sections (`PathSection`) with an empty (cold) and a populated (warm)
+    token cache (`precise_nlp.token_cache`), and the fraction of tokenization time saved on a warm rerun.
+
+Usage: benchmark_token_cache.py [--records 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from loguru import logger
+
+from precise_nlp.extract.path.path_manager import PathManager
+from precise_nlp.extract.path.path_section import PathSection
+from precise_nlp.process import process
+from precise_nlp.token_cache import cached_tokens, close_cache
+from precise_nlp.worker import WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+def tokenize(sections, cache_path=None):
+    """:return: seconds to create a `PathSection` of each section"""
+    start = time.perf_counter()
+    for section in sections:
+        if cache_path:
+            with cached_tokens(cache_path):
+                PathSection(section)
+        else:
+            PathSection(section)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', default=2000, type=int)
+    args = parser.parse_args()
+    logger.remove()
+    import pandas as pd
+
+    path_texts = [f'{WARMUP_PATH_TEXT}\nE) Colon, sigmoid, polypectomy: Tubular adenoma, {i % 50} mm; record {i}.'
+                  for i in range(args.records)]
+    sections = [section for text in path_texts for sections in PathManager.parse_jars(text)[2].values()
+                for section in sections[:2]]  # as read by `JarManager`
+    df = pd.DataFrame({'ID': range(args.records), 'PATH': path_texts, 'CSPY': WARMUP_CSPY_TEXT})
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    print(f'{args.records} records ({len(sections)} sections)')
+    print('Run   \tTokenize\tProcess')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_path = os.path.join(tmpdir, 'tokens')
+        timings = {}
+        for name, cache in (('none', None), ('cold', cache_path), ('warm', cache_path)):
+            timings[name] = tokenize(sections, cache)  # before `process` adds to (cold) cache
+            close_cache(cache_path)  # nothing added
+            start = time.perf_counter()
+            process(data, outfile=os.path.join(tmpdir, f'{name}.csv'), token_cache=cache)
+            print(f'{name:6}\t{timings[name]:8.3f}\t{time.perf_counter() - start:7.2f}')
+        print(f'Tokenization time saved on warm rerun: {1 - timings["warm"] / timings["none"]:.0%}')
+        with open(os.path.join(tmpdir, 'none.csv')) as fh, open(os.path.join(tmpdir, 'warm.csv')) as fh2:
+            print(f'Identical output: {fh.read() == fh2.read()}')
+
+
+if __name__ == '__main__':
+    main()
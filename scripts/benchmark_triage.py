@@ -0,0 +1,53 @@
+"""
+Time to process a DataFrame of records with and without triage (`precise_nlp.triage`) when some
+    fraction of the records are not relevant (e.g., gastric pathology, colonoscopy without polyps).
+
+Usage: benchmark_triage.py [--records 2000] [--relevant 0.3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from loguru import logger
+
+from precise_nlp.process import process
+from precise_nlp.worker import preload, WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+OTHER_PATH_TEXT = ('A) Stomach, antrum, biopsy: Chronic inactive gastritis. Negative for intestinal metaplasia.\n'
+                   'B) Duodenum, biopsy: Duodenal mucosa with no diagnostic abnormality.')
+OTHER_CSPY_TEXT = ('Indications: Screening for colon cancer\nPrep: The bowel preparation was good.\n'
+                   'Findings: The entire examined colon is normal. The terminal ileum was normal.\n'
+                   'Impression: Normal colonoscopy to the cecum.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', default=2000, type=int)
+    parser.add_argument('--relevant', default=0.3, type=float, help='fraction of records with polyps')
+    args = parser.parse_args()
+    logger.remove()
+    preload(freeze=False)
+    import pandas as pd
+
+    relevant = int(args.records * args.relevant)
+    df = pd.DataFrame([
+        {'ID': i,
+         'PATH': f'{WARMUP_PATH_TEXT if i < relevant else OTHER_PATH_TEXT}\nE) Record {i}.',
+         'CSPY': f'{WARMUP_CSPY_TEXT if i < relevant else OTHER_CSPY_TEXT}\nRecord {i}.'}
+        for i in range(args.records)
+    ])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    print(f'{args.records} records ({args.relevant:.0%} relevant)')
+    print('Method        \tSeconds')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, options in (('full', None), ('triage', True), ('triage+check', {'validate': 0.05})):
+            start = time.perf_counter()
+            process(data, outfile=os.path.join(tmpdir, f'{name}.csv'), triage=options)
+            print(f'{name:14}\t{time.perf_counter() - start:7.2f}')
+        with open(os.path.join(tmpdir, 'full.csv')) as fh, open(os.path.join(tmpdir, 'triage.csv')) as fh2:
+            print(f'Identical output: {fh.read() == fh2.read()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare cold (lazily compiled) and preloaded (`precise_nlp.worker.worker_pool`) process pools:
+    latency of each worker's first record vs. later records, and private memory per worker.
+
+Usage: benchmark_workers.py [notes.csv] [--workers 4] [--records 200]
+    Defaults to the notes in `example/example_data.csv`; requires `fork` (e.g., Linux).
+    Private memory is read from /proc/self/smaps_rollup (Linux only).
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import pathlib
+import statistics
+import time
+
+from loguru import logger
+
+from precise_nlp.process import process_text
+from precise_nlp.worker import worker_pool
+
+EXAMPLE_DATA = pathlib.Path(__file__).parent.parent / 'example' / 'example_data.csv'
+
+_first_record = True  # per worker
+
+
+def read_notes(path, path_column, cspy_column):
+    with open(path, encoding='utf-8-sig', newline='') as fh:
+        return [(row[path_column], row[cspy_column]) for row in csv.DictReader(fh)]
+
+
+def private_memory():
+    """Private (unshared) memory of this process in MB or None if unavailable"""
+    try:
+        with open('/proc/self/smaps_rollup') as fh:
+            return sum(int(line.split()[1]) for line in fh if line.startswith('Private_')) / 1024
+    except OSError:
+        return None
+
+
+def timed_process_text(path_text, cspy_text):
+    global _first_record
+    logger.remove()
+    start = time.perf_counter()
+    process_text(path_text, cspy_text)
+    elapsed = time.perf_counter() - start
+    first, _first_record = _first_record, False
+    return os.getpid(), first, elapsed, private_memory()
+
+
+def benchmark(pool_context, records):
+    with pool_context as pool:
+        results = pool.starmap(timed_process_text, records, chunksize=1)
+    first = [elapsed for _, is_first, elapsed, _ in results if is_first]
+    later = [elapsed for _, is_first, elapsed, _ in results if not is_first]
+    memory = {pid: mem for pid, _, _, mem in results}  # last reading for each worker
+    return first, later, [mem for mem in memory.values() if mem is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='?', default=EXAMPLE_DATA)
+    parser.add_argument('--path-column', default='PATH')
+    parser.add_argument('--cspy-column', default='COLONOSCOPY')
+    parser.add_argument('--workers', default=4, type=int)
+    parser.add_argument('--records', default=200, type=int)
+    args = parser.parse_args()
+    logger.remove()  # logging dominates runtime otherwise
+    notes = read_notes(args.path, args.path_column, args.cspy_column)
+    records = [notes[i % len(notes)] for i in range(args.records)]
+    print('Pool     \tFirst (ms)\tLater (ms)\tPrivate/worker (MB)')
+    for label, pool in [
+        ('cold', lambda: multiprocessing.get_context('fork').Pool(args.workers)),  # before preloading parent
+        ('preloaded', lambda: worker_pool(args.workers)),
+    ]:
+        first, later, memory = benchmark(pool(), records)
+        mem = f'{statistics.mean(memory):.1f}' if memory else 'n/a'
+        print(f'{label:9}\t{statistics.mean(first) * 1000:10.2f}\t{statistics.mean(later) * 1000:10.2f}\t{mem}')
+
+
+if __name__ == '__main__':
+    main()
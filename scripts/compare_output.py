@@ -1,45 +1,268 @@
+"""
+Compare variables across two or more `process` outputs (csv or SQLite), e.g., before and after a change.
+
+Usage: compare_output.py output.csv output2.csv [output3.csv ...] [--sample 20] [--chunk-size 100000]
+
+Outputs are joined on identifier by merging them in identifier order (records missing from any output
+    are only counted). Memory does not depend on the
+    number of records: if an output is not in order (e.g., run with an unsorted corpus), it is sorted
+    externally in chunks of `--chunk-size` records. For each variable, the report contains the
+    number of records agreeing/disagreeing across all outputs, Cohen's kappa of each output
+    with the first, and a random sample of disagreements.
+"""
+import argparse
 import csv
+import heapq
 import json
-import sys
-from collections import defaultdict
+import pickle
+import random
+import sqlite3
+import tempfile
+from collections import Counter, defaultdict
 from datetime import datetime
 
 
-def parse_files(*files):
-    file_alias = {}
-    data = defaultdict(dict)
-    for alias, file in enumerate(files):
-        file_alias[file] = alias
-        with open(file) as fh:
-            for row in csv.DictReader(fh):
-                identifier = row['identifier']
+class NotSorted(Exception):
+    pass
+
+
+def identifier_key(identifier):
+    """Order identifiers numerically if possible (as `process` outputs them), otherwise as strings"""
+    try:
+        return 0, int(identifier), identifier
+    except ValueError:
+        return 1, 0, identifier
+
+
+BOOLEANS = {'False': '0', 'True': '1'}  # as stored in SQLite
+
+
+def _value(value):
+    return '' if value is None else str(value)
+
+
+def is_sqlite(path):
+    return path.lower().endswith(('.sqlite', '.sqlite3', '.db'))
+
+
+def read_rows(path, booleans=False):
+    """
+    Yield (identifier, variables) from csv or SQLite output of `process`
+    :param booleans: convert csv booleans to integers (to compare with SQLite)
+    """
+    if is_sqlite(path):
+        conn = sqlite3.connect(path)
+        try:
+            cursor = conn.execute('SELECT * FROM results ORDER BY identifier')
+            columns = [column[0] for column in cursor.description]
+            for values in cursor:
+                row = {column: _value(value) for column, value in zip(columns, values)}
                 del row['row']
-                del row['identifier']
-                data[alias][identifier] = row
-    return data, file_alias
+                yield _value(row.pop('identifier')), row
+        finally:
+            conn.close()
+        return
+    with open(path, newline='') as fh:
+        for row in csv.DictReader(fh):
+            del row['row']
+            identifier = row.pop('identifier')
+            yield identifier, {var: BOOLEANS.get(value, value) for var, value in row.items()} if booleans else row
 
 
-def main():
-    if len(sys.argv) < 3:
-        raise ValueError('Usage: compare_output.py output.csv output2.csv')
-    data, file_alias = parse_files(*sys.argv[1:])
-    report = defaultdict(dict)
-    for identifier in data[0]:
-        base, *others = tuple(data[alias][identifier] for alias in file_alias.values())
-        for var, base_val in base.items():
-            other_vals = (base_val,) + tuple(other[var] for other in others)
-            if len(set(other_vals)) == 1:
-                report[var]['agree'] = report[var].get('agree', 0) + 1
-            else:
-                report[var]['disagree'] = report[var].get('disagree', 0) + 1
-                report[var]['disagreements'] = report[var].get('disagreements', list()) + [{
-                    **{str(i): val for i, val in enumerate(other_vals)},
+def check_sorted(rows, path):
+    """Yield rows, raising `NotSorted` if identifiers are out of order"""
+    previous = None
+    for identifier, row in rows:
+        key = identifier_key(identifier)
+        if previous is not None and key < previous:
+            raise NotSorted(path)
+        previous = key
+        yield key, identifier, row
+
+
+def external_sort(rows, chunk_size):
+    """Sort rows by identifier using temporary files of at most `chunk_size` rows (stable)"""
+    runs = []
+    try:
+        while True:
+            chunk = [(identifier_key(identifier), i, identifier, row)
+                     for i, (identifier, row) in zip(range(chunk_size), rows)]
+            if not chunk:
+                break
+            chunk.sort(key=lambda item: item[:2])
+            if not runs and len(chunk) < chunk_size:  # fits in memory
+                yield from ((key, identifier, row) for key, _, identifier, row in chunk)
+                return
+            run = tempfile.TemporaryFile()
+            for item in chunk:
+                pickle.dump(item, run, pickle.HIGHEST_PROTOCOL)
+            run.seek(0)
+            runs.append(run)
+            if len(chunk) < chunk_size:
+                break
+        for key, _, identifier, row in heapq.merge(*(_read_run(run) for run in runs), key=lambda item: item[0]):
+            yield key, identifier, row
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _read_run(run):
+    while True:
+        try:
+            yield pickle.load(run)
+        except EOFError:
+            return
+
+
+def unique(rows, duplicates, alias):
+    """Keep only the last row for each identifier (as when overwriting output)"""
+    previous = None
+    for item in rows:
+        if previous is not None and previous[0] == item[0]:
+            duplicates[alias] += 1
+        elif previous is not None:
+            yield previous
+        previous = item
+    if previous is not None:
+        yield previous
+
+
+class Reservoir:
+    """Uniform random sample of at most `size` items from a stream"""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.seen = 0
+        self.items = []
+
+    def add(self, item_func):
+        """
+        :param item_func: returns item (only called if sampled)
+        """
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item_func())
+        elif (j := self.rng.randrange(self.seen)) < self.size:
+            self.items[j] = item_func()
+
+
+def cohen_kappa(pairs):
+    """
+    :param pairs: Counter of (rating1, rating2) -> count
+    """
+    total = sum(pairs.values())
+    if not total:
+        return None
+    observed = sum(count for (a, b), count in pairs.items() if a == b) / total
+    first, second = Counter(), Counter()
+    for (a, b), count in pairs.items():
+        first[a] += count
+        second[b] += count
+    expected = sum(first[k] * second[k] for k in first) / total ** 2
+    if expected == 1:
+        return 1.0 if observed == 1 else None
+    return (observed - expected) / (1 - expected)
+
+
+def compare(files, sample_size=20, chunk_size=100000, seed=0, presorted=None):
+    """
+    :param presorted: files assumed to be in identifier order (default: all); if any is not,
+        the comparison restarts with that file sorted
+    """
+    presorted = set(files) if presorted is None else set(presorted)
+    try:
+        return _compare(files, sample_size, chunk_size, seed, presorted)
+    except NotSorted as e:
+        return compare(files, sample_size, chunk_size, seed, presorted - {e.args[0]})
+
+
+def _compare(files, sample_size, chunk_size, seed, presorted):
+    rng = random.Random(seed)
+    duplicates = Counter()  # alias -> rows replaced by later row with same identifier
+    readers = []
+    booleans = len({is_sqlite(file) for file in files}) > 1
+    for alias, file in enumerate(files):
+        if file in presorted:
+            rows = check_sorted(read_rows(file, booleans), file)
+        else:
+            rows = external_sort(read_rows(file, booleans), chunk_size)
+        readers.append(unique(rows, duplicates, alias))
+    columns = None  # variables in first output
+    compared = 0
+    disagree = Counter()
+    pairs = [Counter() for _ in files[1:]]  # for each other output: (var, base value, other value) -> count
+    samples = defaultdict(lambda: Reservoir(sample_size, rng))
+    missing = Counter()  # alias -> identifiers in another output, but not this one
+    heads = []
+    for alias, reader in enumerate(readers):
+        if (head := next(reader, None)) is not None:
+            heapq.heappush(heads, (head[0], alias, head))
+    while heads:
+        key = heads[0][0]
+        rows = [None] * len(files)
+        identifier = None
+        while heads and heads[0][0] == key:
+            _, alias, (_, identifier, row) = heapq.heappop(heads)
+            rows[alias] = row
+            if (head := next(readers[alias], None)) is not None:
+                heapq.heappush(heads, (head[0], alias, head))
+        for alias, row in enumerate(rows):
+            if row is None:
+                missing[alias] += 1
+        if None in rows:  # only compare records in every output
+            continue
+        base, *others = rows
+        if columns is None:
+            columns = tuple(base)
+        compared += 1
+        base_vals = tuple(map(base.get, columns))
+        other_vals = [tuple(map(other.get, columns)) for other in others]  # None if variable missing
+        for counter, vals in zip(pairs, other_vals):
+            counter.update(zip(columns, base_vals, vals))
+        if all(vals == base_vals for vals in other_vals):
+            continue
+        for j, var in enumerate(columns):
+            vals = (base_vals[j],) + tuple(other[j] for other in other_vals)
+            if len(set(vals)) > 1:
+                disagree[var] += 1
+                samples[var].add(lambda: {
+                    **{str(i): val for i, val in enumerate(vals)},
                     **{'identifier': identifier}
-                }]
+                })
+    kappa_pairs = defaultdict(lambda: [Counter() for _ in files[1:]])  # var -> [(base, other) -> count]
+    for i, counter in enumerate(pairs):
+        for (var, base_val, val), count in counter.items():
+            kappa_pairs[var][i][base_val, val] = count
+    report = {}
+    for var in columns or ():
+        report[var] = {
+            'agree': compared - disagree[var],
+            'disagree': disagree[var],
+            'kappa': {str(i + 1): cohen_kappa(counter) for i, counter in enumerate(kappa_pairs[var])},
+            'disagreements': samples[var].items if var in samples else [],
+        }
+    return {
+        'alias': {file: alias for alias, file in enumerate(files)},
+        'missing': {str(alias): missing[alias] for alias in range(len(files))},
+        'duplicates': {str(alias): duplicates[alias] for alias in range(len(files))},
+        'report': report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--sample', default=20, type=int, help='disagreements to keep for each variable')
+    parser.add_argument('--chunk-size', default=100000, type=int, help='records per chunk when sorting')
+    parser.add_argument('--seed', default=0, type=int)
+    args = parser.parse_args()
+    if len(args.files) < 2:
+        parser.error('Usage: compare_output.py output.csv output2.csv')
+    result = compare(args.files, sample_size=args.sample, chunk_size=args.chunk_size, seed=args.seed)
     with open(f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json", 'w') as out:
-        out.write(json.dumps(
-            {'alias': file_alias, 'report': report}, sort_keys=True, indent=4)
-        )
+        out.write(json.dumps(result, sort_keys=True, indent=4))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,105 @@
+"""
+Client for the resident extraction server (`python -m precise_nlp.server`).
+
+Messages are JSON, each preceded by its length (4-byte unsigned, big-endian). Requests:
+    {"path_text": ..., "cspy_text": ..., "options": {...}, "variables": [...]} -> variables from `process_text`
+    {"command": "stats"} -> request counts and latency histogram
+Failed requests receive {"error": ...}.
+
+Only depends on the standard library, so is quick to import:
+
+    with Client('/tmp/precise_nlp.sock') as client:
+        result = client.extract(path_text, cspy_text, variables=['adenoma_count'])
+"""
+import json
+import socket
+import struct
+
+HEADER = struct.Struct('>I')
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+
+class ServerError(Exception):
+    pass
+
+
+def write_message(fh, message):
+    data = json.dumps(message, default=str).encode('utf8')
+    fh.write(HEADER.pack(len(data)) + data)
+    fh.flush()
+
+
+def _read_exactly(fh, size):
+    data = fh.read(size)
+    if len(data) < size:
+        raise ConnectionError(f'Connection closed mid-message ({len(data)} of {size} bytes).')
+    return data
+
+
+def read_message(fh):
+    """
+    :raises EOFError: if connection closed before message
+    """
+    header = fh.read(HEADER.size)
+    if not header:
+        raise EOFError
+    if len(header) < HEADER.size:
+        raise ConnectionError('Connection closed mid-header.')
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f'Message of {size} bytes exceeds limit of {MAX_MESSAGE_SIZE}.')
+    return json.loads(_read_exactly(fh, size))
+
+
+def connect(address, timeout=None):
+    """
+    :param address: path to Unix socket or (host, port), IPv4 or IPv6 (e.g., `ExtractionServer.address`)
+    """
+    if not (isinstance(address, (str, bytes)) or hasattr(address, '__fspath__')):
+        return socket.create_connection(tuple(address[:2]), timeout=timeout)  # IPv6 address: (host, port, flow, scope)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    sock.connect(address)
+    return sock
+
+
+class Client:
+    """A single connection: send requests one at a time (use one client per thread)"""
+
+    def __init__(self, address, timeout=None):
+        self._sock = connect(address, timeout=timeout)
+        self._fh = self._sock.makefile('rwb')
+
+    def request(self, message):
+        write_message(self._fh, message)
+        try:
+            response = read_message(self._fh)
+        except EOFError:
+            raise ConnectionError('Server closed connection.') from None
+        if 'error' in response:
+            raise ServerError(response['error'])
+        return response
+
+    def extract(self, path_text='', cspy_text='', options=None, variables=None):
+        """
+        :param options: e.g., cspy_precise_finding_version, cspy_extent_search_all, time_budget
+        :param variables: only return these variables (default: all)
+        """
+        return self.request({'path_text': path_text, 'cspy_text': cspy_text,
+                             'options': options or {}, 'variables': variables})
+
+    def stats(self):
+        return self.request({'command': 'stats'})
+
+    def close(self):
+        try:
+            self._fh.close()  # flushes any unsent request
+        except OSError:  # server already closed connection
+            pass
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
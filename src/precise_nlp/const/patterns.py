@@ -1,15 +1,14 @@
 import re
 
-from regexify.pattern import Pattern
-
 from precise_nlp.extract.utils import ColonPrep
+from precise_nlp.pattern_registry import lazy_compile, lazy_pattern
 
 # POLYP PATTERNS
-NUMBER_PATTERN = re.compile(r'(\d{1,3}(?:\.\d{,2})?)', re.IGNORECASE)
-DEPTH_PATTERN = re.compile(r'(\d{1,3}(?:\.\d{,2})?)\W*[cm]m', re.IGNORECASE)
+NUMBER_PATTERN = lazy_compile(r'(\d{1,3}(?:\.\d{,2})?)', re.IGNORECASE)
+DEPTH_PATTERN = lazy_compile(r'(\d{1,3}(?:\.\d{,2})?)\W*[cm]m', re.IGNORECASE)
 # this should probably take the larger of the two options
 # instead of ignoring the second
-SIZE_PATTERN = re.compile(
+SIZE_PATTERN = lazy_compile(
     r'(?P<n1><?\d{1,3}(?:\.\d)?)'
     r'(?:\W*(?:[cm]m))?'
     r'(?:\W*(x|to|-|and)\W*'
@@ -17,27 +16,27 @@ SIZE_PATTERN = re.compile(
     r'\W*(?P<m>[cm]m)',
     re.IGNORECASE
 )
-IN_SIZE_PATTERN = re.compile(
+IN_SIZE_PATTERN = lazy_compile(
     r'(?:(?P<n1>\d{1,3}(?:\.\d)?)\W*(?:[cm]m)?\W*'
     r'(?:to|x|-|and)\W*)?'
     r'(?P<n2>[<>]?\d{1,3}(?:\.\d)?)\W*(?P<m>[cm]m)\W*in\W*size',
     re.IGNORECASE
 )
-AT_DEPTH_PATTERN = re.compile(
+AT_DEPTH_PATTERN = lazy_compile(
     r'(?<!\d\W)(?<!\d\W\W)(?<![cm]m\W)(?:at|@|to|from)'
     r'\W*(\d{1,3}(?:\.\d)?)\W*[cm]m(\W*(proximal\W*)?(from|to)\W*(the\W*)?an(al|us))?',
     re.IGNORECASE)
-CM_DEPTH_PATTERN = re.compile(r'(\d{2,3})\W*cm(\W*(proximal\W*)?(from|to)\W*(the\W*)?an(al|us))?', re.IGNORECASE)
-SSPLIT = re.compile(r'\.(?=\s)')
-NO_PERIOD_SENT = re.compile(r'\n\W*[A-Z0-9]')  # no ignorecase!
+CM_DEPTH_PATTERN = lazy_compile(r'(\d{2,3})\W*cm(\W*(proximal\W*)?(from|to)\W*(the\W*)?an(al|us))?', re.IGNORECASE)
+SSPLIT = lazy_compile(r'\.(?=\s)')
+NO_PERIOD_SENT = lazy_compile(r'\n\W*[A-Z0-9]')  # no ignorecase!
 
 # EXTENT PATTERNS
 visualized = r'(identif|reach|visuali|seen?|normal)\w*'
 
-PROCEDURE_EXTENT_INCOMPLETE_PRE = Pattern(
+PROCEDURE_EXTENT_INCOMPLETE_PRE = lazy_pattern(
     rf'(failed to|unable to|not) {visualized} (the )?(cec[ua]|(term\w* )?ileum|ile[oa]|append\w* orifice)'
 )
-PROCEDURE_EXTENT_COMPLETE = Pattern(
+PROCEDURE_EXTENT_COMPLETE = lazy_pattern(
     r'('
     r'extent of (th(e|is) )?procedure (the )?(colon )?(cecum|term\w* ileum)'
     rf'|(cecal \w+|cecum|(term\w* )?ileum|append\w* orifice) ((was|were|is|are|appeared) )?{visualized}'
@@ -46,22 +45,22 @@ PROCEDURE_EXTENT_COMPLETE = Pattern(
     rf'|{visualized} (the )?(ileo[\w-]* valve|(terminal )?ileum|append\w+ orifice)'
     r')'
 )
-PROCEDURE_EXTENT_INCOMPLETE = Pattern(
+PROCEDURE_EXTENT_INCOMPLETE = lazy_pattern(
     r'('
     r'extent of (the )?procedure'
     rf'|(cecum|term\w* ileum|ileum|ileal|ile\w+ cecal valve|append\w* orifice) ((was|were|is|are|appeared) )?not {visualized}'
     r')'
 )
-PROCEDURE_EXTENT_ALL = Pattern(
+PROCEDURE_EXTENT_ALL = lazy_pattern(
     r'\b(cecum|term\w* ileum|ile\w+ cecal valve|append\w* orifi\w+)\b'
 )
 
 # COLON PREP PATTERNS
-COLON_PREP_PRE = Pattern(
+COLON_PREP_PRE = lazy_pattern(
     r'(((colon|bowel) )?prep\w+ (visualization )?(was )?(very )?(?P<prep>{})\w*)'.format(ColonPrep.REGEX)
 )
-COLON_PREP_POST = Pattern(r'((?P<prep>{})\w*) (\w+ ){{0,2}}prepared colon'.format(ColonPrep.REGEX))
-COLON_PREPARATION = Pattern(r'(?P<prep>{}) preparation'.format(ColonPrep.REGEX))
+COLON_PREP_POST = lazy_pattern(r'((?P<prep>{})\w*) (\w+ ){{0,2}}prepared colon'.format(ColonPrep.REGEX))
+COLON_PREPARATION = lazy_pattern(r'(?P<prep>{}) preparation'.format(ColonPrep.REGEX))
 
 # INDICATION PATTERNS
 isayo = r'\Wis\W*a\W*\d{2,3}\W*year\W*old'
@@ -92,13 +91,13 @@ followup = r'follow\W*up|self\/u'
 polyps = r'polyps'  # for SURVEILLANCE with negation?
 ibd = r'(ibd|\buc\b|ulcerative|crohn|inflammatory bowl pan colitis)'
 surveil = r'(surveillance|barrett)'
-INDICATION_DIAGNOSTIC = Pattern(f'({occult}|{occult2}|{occult3}|{abnormal}|{blood}|{anemia}|{diarrhea}'
+INDICATION_DIAGNOSTIC = lazy_pattern(f'({occult}|{occult2}|{occult3}|{abnormal}|{blood}|{anemia}|{diarrhea}'
                                 f'|{constip}|{change1}|{change2}|{ibs}|{mass}'
                                 f'|{pain}|{weight}|{mets}|{suspect})',
                                 negates=[r'\bno\b'])
-INDICATION_SURVEILLANCE = Pattern(f'({ibd}|{perhx}|{genetic}|{followup}'
+INDICATION_SURVEILLANCE = lazy_pattern(f'({ibd}|{perhx}|{genetic}|{followup}'
                                   f'|{surveil}|{personal_history})',
                                   negates=[r'\bno\b'])
-INDICATION_SCREENING = Pattern(f'({screen}|{famhx})',
+INDICATION_SCREENING = lazy_pattern(f'({screen}|{famhx})',
                                negates=[r'\bno\b'])
-REMOVE_SCREENING = Pattern(fr'(({followup}|{suspect}\w*) (\w+ )?{divertic})')
+REMOVE_SCREENING = lazy_pattern(fr'(({followup}|{suspect}\w*) (\w+ )?{divertic})')
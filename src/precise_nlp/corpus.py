@@ -0,0 +1,223 @@
+"""
+Packed corpus: the pathology and colonoscopy reports of every record in a single file, read through a
+    memory map rather than opening a file for each record.
+
+    python -m precise_nlp.corpus corpus.pnlpc --filetype csv --path notes.csv --identifier ID \\
+        --path-text PATH --cspy-text CSPY --columns ADENOMA  # or a directory with --lookup-table
+
+    data:  # in config
+      filetype: corpus
+      path: corpus.pnlpc
+
+When running in parallel, `process` only sends each worker the location of the texts in the file
+    (`TextSlice`), and the worker reads them from its own (or, if forked, the shared) memory map.
+
+File format (version `FORMAT_VERSION`):
+    header: MAGIC, format version (2 bytes)
+    texts: utf8 text of each report
+    footer: zlib-compressed json of columns and records ([identifier, path offset, path length,
+        cspy offset, cspy length, column values]; offset is null if the text is missing),
+        offset of footer (8 bytes), END
+"""
+import argparse
+import json
+import mmap
+import struct
+import sys
+import zlib
+from typing import NamedTuple
+
+from loguru import logger
+
+from precise_nlp.myio import json_value, identifier_key
+
+MAGIC = b'PNLPCORPUS'
+END = b'PNLPCEND'
+FORMAT_VERSION = 1
+_VERSION = struct.Struct('>H')
+_OFFSET = struct.Struct('>Q')
+_MAPPINGS = {}  # path -> mmap (of this process)
+
+
+class CorpusFormatError(ValueError):
+    pass
+
+
+class TextSlice(NamedTuple):
+    """Location of a text in a packed corpus: sent to workers in place of the text"""
+    path: str
+    offset: int
+    length: int
+
+    def read(self):
+        if (mapping := _MAPPINGS.get(self.path)) is None:
+            with open(self.path, 'rb') as fh:
+                mapping = _MAPPINGS[self.path] = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapping[self.offset:self.offset + self.length].decode('utf8')
+
+
+def read_slice(text):
+    """:return: text (read from corpus if `TextSlice`)"""
+    return text.read() if isinstance(text, TextSlice) else text
+
+
+class CorpusWriter:
+    """
+    Append records to a new packed corpus
+    :param columns: names of additional values stored for each record (e.g., truth)
+    """
+
+    def __init__(self, path, columns=()):
+        self.path = path
+        self.columns = list(columns)
+        self._records = []
+        self._fh = open(path, 'wb')
+        self._fh.write(MAGIC + _VERSION.pack(FORMAT_VERSION))
+
+    def _write_text(self, text):
+        if text is None or not isinstance(text, str):  # e.g., nan: missing
+            return None, 0
+        data = text.encode('utf8')
+        offset = self._fh.tell()
+        self._fh.write(data)
+        return offset, len(data)
+
+    def add(self, identifier, path_text, cspy_text, values=None):
+        """
+        :param values: dict of column -> value
+        """
+        values = values or {}
+        self._records.append([json_value(identifier), *self._write_text(path_text), *self._write_text(cspy_text),
+                              [json_value(values.get(column)) for column in self.columns]])
+
+    def __len__(self):
+        return len(self._records)
+
+    def close(self):
+        if self._fh.closed:
+            return
+        offset = self._fh.tell()
+        footer = json.dumps({'columns': self.columns, 'records': self._records}, default=str).encode('utf8')
+        self._fh.write(zlib.compress(footer) + _OFFSET.pack(offset) + END)
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Corpus:
+    """
+    Records of a packed corpus, in order written
+    :raises CorpusFormatError: if not a corpus (or incomplete) or written with a different `FORMAT_VERSION`
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as fh:
+            header = fh.read(len(MAGIC) + _VERSION.size)
+            if not header.startswith(MAGIC) or len(header) < len(MAGIC) + _VERSION.size:
+                raise CorpusFormatError(f'Not a packed corpus: {path}')
+            (version,) = _VERSION.unpack(header[len(MAGIC):])
+            if version != FORMAT_VERSION:
+                raise CorpusFormatError(f'Corpus {path} has format version {version}; expected {FORMAT_VERSION}.'
+                                        f' Convert the source data again.')
+            self._mapping = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        tail = self._mapping[-_OFFSET.size - len(END):]
+        if not tail.endswith(END):
+            self._mapping.close()
+            raise CorpusFormatError(f'Corpus {path} is incomplete (conversion did not finish).')
+        (offset,) = _OFFSET.unpack(tail[:_OFFSET.size])
+        footer = json.loads(zlib.decompress(self._mapping[offset:-_OFFSET.size - len(END)]))
+        self.columns = footer['columns']
+        self._records = footer['records']
+        self._index = None
+        _MAPPINGS[self.path] = self._mapping  # shared with `TextSlice` (and forked workers)
+
+    def __len__(self):
+        return len(self._records)
+
+    def _text(self, offset, length, lazy=False):
+        if offset is None:
+            return None
+        if lazy and length:  # empty text is falsy, as in other sources
+            return TextSlice(self.path, offset, length)
+        return self._mapping[offset:offset + length].decode('utf8')
+
+    def _record(self, record, lazy=False):
+        identifier, path_offset, path_length, cspy_offset, cspy_length, values = record
+        return (identifier, self._text(path_offset, path_length, lazy), self._text(cspy_offset, cspy_length, lazy),
+                dict(zip(self.columns, values)))
+
+    def __iter__(self):
+        """Yield (identifier, path_text, cspy_text, dict of column values)"""
+        return self.records()
+
+    def records(self, lazy=False):
+        """
+        :param lazy: yield each text as a `TextSlice` rather than reading it
+        """
+        for record in self._records:
+            yield self._record(record, lazy)
+
+    def get(self, identifier):
+        """
+        :return: (identifier, path_text, cspy_text, dict of column values)
+        :raises KeyError: if identifier not in corpus
+        """
+        if self._index is None:
+            self._index = {identifier_key(record[0]): i for i, record in enumerate(self._records)}
+        return self._record(self._records[self._index[identifier_key(identifier)]])
+
+    def close(self):
+        if _MAPPINGS.get(self.path) is self._mapping:
+            del _MAPPINGS[self.path]
+        self._mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def convert(outfile, columns=(), **data):
+    """
+    Pack the records of any source read by `get_data` (csv, sas, directory, lookup table, etc.)
+    :param columns: additional columns to store with each record (e.g., truth, group)
+    :param data: arguments to `get_data` (as `data` in config)
+    :return: number of records
+    """
+    from precise_nlp.process import get_data
+
+    truth = {column: column for column in columns} or None
+    with CorpusWriter(outfile, columns) as writer:
+        for identifier, path_text, cspy_text, values in get_data(**data, truth=truth):
+            writer.add(identifier, path_text, cspy_text, values)
+    logger.info(f'Packed {len(writer)} records into {outfile}.')
+    return len(writer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('outfile', help='packed corpus to write (e.g., corpus.pnlpc)')
+    parser.add_argument('--filetype', required=True, help='csv, tab, sas, h5, or txt (for a directory)')
+    parser.add_argument('--path', required=True, help='file or directory')
+    parser.add_argument('--identifier')
+    parser.add_argument('--path-text', help='column of pathology report')
+    parser.add_argument('--cspy-text', help='column of colonoscopy report')
+    parser.add_argument('--lookup-table', help='csv of identifier,cspy_file,path_file (in directory)')
+    parser.add_argument('--encoding', default='utf8')
+    parser.add_argument('--columns', nargs='+', default=(), help='additional columns to keep (e.g., truth)')
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level='INFO')
+    convert(args.outfile, columns=args.columns, filetype=args.filetype, path=args.path, identifier=args.identifier,
+            path_text=args.path_text, cspy_text=args.cspy_text, lookup_table=args.lookup_table,
+            encoding=args.encoding)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,53 @@
 import re
 import string
 
+from precise_nlp.pattern_registry import lazy_compile
+
+# map each character to its class for counting with `str.count`
+#   U=uppercase, l=lowercase, d=digit; all other characters are unchanged
+CHARACTER_CLASSES = str.maketrans(
+    string.ascii_uppercase + string.ascii_lowercase + string.digits,
+    'U' * len(string.ascii_uppercase) + 'l' * len(string.ascii_lowercase) + 'd' * len(string.digits),
+)
+SHORT_WORDS = {
+    2: {'in', 'an', 'on', 'or', 'no', 'it', 'to', 'by', 'of'},
+    3: {'its', 'the', 'and', 'was'},
+}
+
+SKIP_PATTERN = lazy_compile(
+    r'('
+    r'(gender|sex|(procedure:\W*)?date(\W*of\W*birth)?'
+    r'|mrn|\w+\W*md|medicines?|age|(patient\W*)name'
+    r'|images?|providers|\bto|\bpcp|\bnurse\(s\)'
+    r')\W*?:'
+    r'|\d{1,3}[-/)]\W*\d{1,3}\W*[/-]\W*\d{2,4}'  # phone number/date
+    r')', re.IGNORECASE
+)
+WORD_SPLIT_PATTERN = lazy_compile(r'[^a-z]', re.I)
+HEADER_PATTERN = lazy_compile(r'([A-Z][A-Za-z]+:|Colonoscopy)')
+MD_PATTERN = lazy_compile(r'\bM\W*D\b')
+PAGE_PATTERN = lazy_compile(r'page\W*\d', re.IGNORECASE)
+NO_PAGE_PATTERN = lazy_compile(r'\W+\d{1,2}\W*')
+KEYWORDS = {'cecum', 'polyp', 'size', 'found', 'adenoma',
+            'colon', 'colonoscopy', 'indications?'}
+KEYWORD_PATTERN = lazy_compile(f'({"|".join(KEYWORDS)})', re.I)
+
 
 def remove_ocr_junk(line, remove_colon=True):
     if remove_colon:
-        line = re.sub('The Colon', '', line)
+        line = line.replace('The Colon', '')
     tokens = line.split()
-    up_letters = re.compile(f'[{string.ascii_uppercase}]')
-    lw_letters = re.compile(f'[{string.ascii_lowercase}]')
-    exp_punct = re.compile(r'[.,]')
-    numbers = re.compile(r'[0-9]')
     # number of letters/numbers with unexpected punctuation
     # length
     # language model n-grams
     scores = []  # higher score -> junk
     for token in reversed(tokens):
-        ltoken = token.lower()
         size = len(token)
-        up_let = len(up_letters.findall(token))
-        lw_let = len(lw_letters.findall(token))
+        classes = token.translate(CHARACTER_CLASSES)
+        up_let = classes.count('U')
+        lw_let = classes.count('l')
+        nums = classes.count('d')
         punct = 1 if token[-1] in '.,' else 0
-        nums = len(numbers.findall(token))
-        rest = size - up_let - lw_let - nums - punct
         if size > 4:
             if size - lw_let - up_let - punct == 0 and up_let <= 1:
                 break
@@ -49,14 +75,14 @@ def remove_ocr_junk(line, remove_colon=True):
                 scores.append(0)
             elif nums == 1 and (up_let + lw_let == 1 or punct):
                 scores.append(2)
-            elif ltoken in ['in', 'an', 'on', 'or', 'no', 'it', 'to', 'by', 'of']:
+            elif token.lower() in SHORT_WORDS[2]:
                 scores.append(1)
             else:
                 scores.append(10)
         elif size == 3:
             if nums == 3:
                 scores.append(0)
-            elif ltoken in ['its', 'the', 'and', 'was']:
+            elif token.lower() in SHORT_WORDS[3]:
                 scores.append(0)
             else:
                 scores.append(10)
@@ -82,58 +108,67 @@ def remove_ocr_junk(line, remove_colon=True):
 
 
 def parse_file(text):
-    skip_pat = re.compile(
-        r'('
-        r'(gender|sex|(procedure:\W*)?date(\W*of\W*birth)?'
-        r'|mrn|\w+\W*md|medicines?|age|(patient\W*)name'
-        r'|images?|providers|\bto|\bpcp|\bnurse\(s\)'
-        r')\W*?:'
-        r'|\d{1,3}[-/)]\W*\d{1,3}\W*[/-]\W*\d{2,4}'  # phone number/date
-        r')', re.IGNORECASE
-    )
-    word_pat = re.compile(r'[^a-z]', re.I)
-    header_pat = re.compile(r'([A-Z][A-Za-z]+:|Colonoscopy)')
-    md_pat = re.compile(r'\bM\W*D\b')
-    page_pat = re.compile(r'page\W*\d', re.IGNORECASE)
-    no_page_pat = re.compile(r'\W+\d{1,2}\W*')
-    keywords = {'cecum', 'polyp', 'size', 'found', 'adenoma',
-                'colon', 'colonoscopy', 'indications?'}
-    keyword_pat = re.compile(f'({"|".join(keywords)})', re.I)
-    lines = []
+    """
+    Clean an OCR'd page: remove junk characters, headers/footers, and
+        join lines which were broken across the page.
+    :param text:
+    :return: cleaned text with one (logical) section per line
+    """
+    lines = []  # each line is built up as a list of fragments
     found_start = False
     skip_mode = True
-    has_page = bool(page_pat.search(text))
+    has_page = bool(PAGE_PATTERN.search(text))
     for line in text.split('\n'):
         line = remove_ocr_junk(line)
         # find procedure/findings
         if not line:
             continue
-        elif md_pat.search(line):
+        elif MD_PATTERN.search(line):
             continue  # skip lines containing ref to doc
-        elif skip_pat.search(line) and not keyword_pat.search(line):
+        elif SKIP_PATTERN.search(line) and not KEYWORD_PATTERN.search(line):
             skip_mode = True
-        elif ((has_page and page_pat.search(line))
-              or (not has_page and no_page_pat.match(line))):
+        elif ((has_page and PAGE_PATTERN.search(line))
+              or (not has_page and NO_PAGE_PATTERN.match(line))):
             # page number
             found_start = False
             skip_mode = False
-        elif header_pat.search(line):
+        elif HEADER_PATTERN.search(line):
             skip_mode = False
             found_start = True
-            lines.append(line)
+            lines.append([line])
         elif not found_start and lines:
             # looking for start on subsequent page
-            words = [x.lower() for x in word_pat.split(line)]
+            words = [x.lower() for x in WORD_SPLIT_PATTERN.split(line)]
             if (len(words) > 10
-                    or set(words) & keywords):  # at least 10 words suggests a sentence
+                    or set(words) & KEYWORDS):  # at least 10 words suggests a sentence
                 found_start = True
                 skip_mode = False
-                lines[-1] += ' ' + line
+                lines[-1].append(line)
         elif skip_mode:
             continue
         else:
             if lines:
-                lines[-1] += ' ' + line
+                lines[-1].append(line)
             else:
-                lines.append(line)
-    return '\n'.join(lines)
+                lines.append([line])
+    return '\n'.join(' '.join(fragments) for fragments in lines)
+
+
+def parse_files(texts):
+    """
+    Batch version of `parse_file`
+    :param texts: iterable of OCR'd pages
+    :return: generator of cleaned texts (missing values are returned as empty strings)
+    """
+    for text in texts:
+        yield parse_file(text) if isinstance(text, str) else ''
+
+
+def parse_column(df, column):
+    """
+    Clean an entire column of a pandas DataFrame
+    :param df: DataFrame
+    :param column: name of column containing OCR'd text
+    :return: Series of cleaned texts, same index as `df`
+    """
+    return df[column].map(lambda text: parse_file(text) if isinstance(text, str) else '')
@@ -0,0 +1,186 @@
+"""
+Evaluation of extracted variables against gold standard (`truth`) labels.
+
+Values are collected as each record is processed; the confusion matrices for all labels
+    (and groups) are then computed together with NumPy. As with the previous scoring in `process`:
+    TN: prediction == truth == 0, TP: prediction == truth, FN: truth == 1, otherwise FP.
+"""
+import array
+
+import numpy as np
+
+TP, FP, FN, TN = range(4)
+OUTCOMES = ('tp', 'fp', 'fn', 'tn')
+EXCLUDED = -1  # FP/FN listed as an error in the gold standard
+MISSING = -2  # label not extracted (e.g., failed or exceeded time budget)
+METRICS = ('ppv', 'npv', 'recall', 'specificity', 'f1')
+
+
+def metrics(counts):
+    """
+    :param counts: array with last axis of (TP, FP, FN, TN)
+    :return: dict of metric -> array (nan if undefined)
+    """
+    tp, fp, fn, tn = np.moveaxis(np.asarray(counts, dtype=float), -1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'ppv': tp / (tp + fp),
+            'npv': tn / (tn + fn),
+            'recall': tp / (tp + fn),
+            'specificity': tn / (tn + fp),
+            'f1': 2 * tp / (2 * tp + fp + fn),
+        }
+
+
+def bootstrap(counts, iterations=1000, confidence=0.95, rng=None):
+    """
+    Percentile confidence intervals of each metric from a stratified (multinomial) bootstrap.
+
+    The cell counts of each label and group are drawn from a multinomial distribution of that
+        label and group's size, without materializing resampled records. This is not the same as
+        resampling records: each group's size is held fixed, EXCLUDED/MISSING records are not
+        counted, and each label is drawn independently (ignoring correlation between labels of
+        a record), so only intervals of each label's (and group's) metrics are meaningful.
+    :param counts: array with last axis of (TP, FP, FN, TN)
+    :return: dict of metric -> (lower, upper) arrays
+    """
+    rng = rng or np.random.default_rng()
+    counts = np.asarray(counts)
+    n = counts.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pvals = np.where(n[..., None] > 0, counts / n[..., None], [1, 0, 0, 0])  # n == 0: always draws 0
+    samples = metrics(rng.multinomial(n, pvals, size=(iterations,) + n.shape))
+    alpha = (1 - confidence) / 2 * 100
+    intervals = {}
+    with np.errstate(all='ignore'):
+        for metric, values in samples.items():
+            defined = ~np.isnan(values).all(axis=0)
+            values = np.where(defined, values, 0)  # avoid warnings; reset to nan below
+            lower, upper = np.nanpercentile(values, [alpha, 100 - alpha], axis=0)
+            intervals[metric] = (np.where(defined, lower, np.nan), np.where(defined, upper, np.nan))
+    return intervals
+
+
+def _array(values):
+    """Array view of `array.array`"""
+    return np.frombuffer(values, dtype=np.dtype(values.typecode)) if values else np.zeros(0, dtype=int)
+
+
+def _group_label(group_by, group):
+    if not group_by:
+        return None
+    return ', '.join(f'{column}={value}' for column, value in zip(group_by, group))
+
+
+class Evaluator:
+    """
+    :param labels: variables with truth values
+    :param errors: dict of label -> {'fp': [identifiers], 'fn': [identifiers]} to exclude (gold standard errors)
+    :param group_by: column(s) by which to also report metrics (e.g., site, year)
+    """
+
+    def __init__(self, labels, errors=None, group_by=None):
+        self.labels = list(labels)
+        self.errors = {
+            label: {kind.lower(): set(identifiers or ()) for kind, identifiers in (exclusions or {}).items()}
+            for label, exclusions in (errors or {}).items()
+        }
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        self.group_by = list(group_by or [])
+        self.identifiers = []
+        self._groups = {}  # group -> index
+        self._group_index = array.array('l')
+        self._codebooks = [{} for _ in self.labels]  # for each label, value -> code
+        self._pred = [array.array('l') for _ in self.labels]
+        self._truth = [array.array('l') for _ in self.labels]
+        self._columns = list(zip(self.labels, self._codebooks, self._pred, self._truth))
+
+    def __len__(self):
+        return len(self.identifiers)
+
+    def add(self, identifier, truth_values, res, group=()):
+        """
+        :param truth_values: dict of label -> truth value (see `clean_truth`)
+        :param res: dict of label -> extracted value
+        :param group: values of `group_by` columns
+        """
+        self.identifiers.append(identifier)
+        self._group_index.append(self._groups.setdefault(tuple(group), len(self._groups)))
+        for label, codebook, pred, truth in self._columns:
+            truth.append(codebook.setdefault(truth_values[label], len(codebook)))
+            pred.append(codebook.setdefault(res[label], len(codebook)) if label in res else MISSING)
+
+    def _positions(self):
+        """identifier -> indices of its records"""
+        positions = {}
+        for i, identifier in enumerate(self.identifiers):
+            positions.setdefault(identifier, []).append(i)
+        return positions
+
+    def outcomes(self):
+        """
+        :return: array (labels x records) of TP, FP, FN, TN, EXCLUDED, or MISSING
+        """
+        pred = np.stack([_array(values) for values in self._pred])
+        truth = np.stack([_array(values) for values in self._truth])
+        zero = np.array([[codebook.get(0, MISSING - 1)] for codebook in self._codebooks])
+        one = np.array([[codebook.get(1, MISSING - 1)] for codebook in self._codebooks])
+        outcomes = np.where(pred == truth, np.where(truth == zero, TN, TP), np.where(truth == one, FN, FP))
+        positions = self._positions() if self.errors else {}
+        for i, label in enumerate(self.labels):
+            for kind, outcome in (('fp', FP), ('fn', FN)):
+                if identifiers := self.errors.get(label, {}).get(kind):
+                    excluded = np.zeros(len(self.identifiers), dtype=bool)
+                    excluded[[j for identifier in identifiers for j in positions.get(identifier, ())]] = True
+                    outcomes[i][(outcomes[i] == outcome) & excluded] = EXCLUDED
+        outcomes[pred == MISSING] = MISSING
+        return outcomes
+
+    def confusion(self, outcomes=None):
+        """
+        :return: array (labels x groups x 4) of counts of TP, FP, FN, TN
+        """
+        outcomes = self.outcomes() if outcomes is None else outcomes
+        n_labels, n_groups = len(self.labels), max(len(self._groups), 1)
+        groups = _array(self._group_index)
+        index = (np.arange(n_labels)[:, None] * n_groups + groups[None, :]) * 4 + outcomes
+        return np.bincount(index[outcomes >= 0], minlength=n_labels * n_groups * 4).reshape(n_labels, n_groups, 4)
+
+    def errors_found(self, outcomes=None):
+        """
+        :return: dict of label -> (false positive identifiers, false negative identifiers)
+        """
+        outcomes = self.outcomes() if outcomes is None else outcomes
+        identifiers = np.empty(len(self.identifiers), dtype=object)
+        identifiers[:] = self.identifiers
+        return {label: (list(identifiers[outcomes[i] == FP]), list(identifiers[outcomes[i] == FN]))
+                for i, label in enumerate(self.labels)}
+
+    def results(self, iterations=1000, confidence=0.95, seed=None, outcomes=None):
+        """
+        :param iterations: bootstrap iterations (0: no confidence intervals)
+        :param outcomes: output of `outcomes` (if already computed)
+        :return: list of dicts with label, group (None for all records), counts, metrics, and
+            (if iterations) {metric}_low and {metric}_high
+        """
+        by_group = self.confusion(outcomes)
+        counts = by_group.sum(axis=1, keepdims=True)  # all records
+        groups = [None]
+        if self.group_by:
+            counts = np.concatenate([counts, by_group], axis=1)
+            groups += [_group_label(self.group_by, group) for group in self._groups]
+        values = metrics(counts)
+        intervals = bootstrap(counts, iterations, confidence, np.random.default_rng(seed)) if iterations else {}
+        rows = []
+        for i, label in enumerate(self.labels):
+            for j, group in enumerate(groups):
+                row = {'label': label, 'group': group}
+                row.update({outcome: int(count) for outcome, count in zip(OUTCOMES, counts[i, j])})
+                for metric in METRICS:
+                    row[metric] = float(values[metric][i, j])
+                    if metric in intervals:
+                        row[f'{metric}_low'] = float(intervals[metric][0][i, j])
+                        row[f'{metric}_high'] = float(intervals[metric][1][i, j])
+                rows.append(row)
+        return rows
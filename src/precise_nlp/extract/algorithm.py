@@ -6,13 +6,38 @@ from precise_nlp.extract.cspy import CspyManager
 from precise_nlp.extract.cspy.cspy import FindingVersion
 from precise_nlp.extract.path.path_manager import PathManager
 from precise_nlp.const.enums import AdenomaCountMethod, Histology, Location
+from precise_nlp.pattern_registry import lazy_compile
+
+NON_WORD_PATTERN = lazy_compile(r'\W+')
+TUBULAR_ADENOMA_PATTERN = lazy_compile(r'tubular\s+adenoma', re.IGNORECASE)
+ADENOMATOUS_PATTERN = lazy_compile(r'adenomatous', re.IGNORECASE)
+SERRATED_ADENOMA_PATTERN = lazy_compile(r'serrated\s+adenoma', re.IGNORECASE)
+TUBULOVILLOUS_ADENOMA_PATTERN = lazy_compile(r'tubulovillous\s+adenoma', re.IGNORECASE)
+ADENOMATOID_PATTERN = lazy_compile(r'adenomatoid', re.IGNORECASE)
+TUBULAR_PATTERN = lazy_compile(r'tubular', re.IGNORECASE)
+TUBULOVILLOUS_PATTERN = lazy_compile(r'tubulovillous', re.IGNORECASE)
+VILLOUS_PATTERN = lazy_compile(r'(?<!tubulo)villous', re.IGNORECASE)
+COLON_PATTERN = lazy_compile('colon')
+# within first 4 words; each word must be consumed whole to avoid catastrophic backtracking on long words
+NON_COLON_SPECIMEN_PATTERN = lazy_compile(r'^(?:\W*\w+(?!\w)){0,3}\W*(?:\w+(?!\w)\W*|\w*)'
+                                        r'(bowel|stomach|gastric|(duoden|ile)(al|um))', re.IGNORECASE)
+HIGHGRADE_DYSPLASIA_PATTERN = lazy_compile(r'(high(\s*|-)?grade|severe)(\W*\w+)?\W+dysplas\w*', re.IGNORECASE)
+ADENOMA_COUNT_LOOKUP = {str(x): x for x in range(1, 10)}
+ADENOMA_COUNT_LOOKUP.update({
+    'one': 1,
+    'two': 2,
+    'three': 3,
+    'four': 4,
+    'five': 5
+})
+ADENOMA_COUNT_PATTERN = lazy_compile(fr'polyps?\W*x\W*({"|".join(ADENOMA_COUNT_LOOKUP.keys())})', re.IGNORECASE)
 
 
 def has_negation(index, text, window, negset):
     if window > 0:
-        s = set(re.split(r'\W+', text[index:])[:window])
+        s = set(NON_WORD_PATTERN.split(text[index:])[:window])
     else:
-        s = set(re.split(r'\W+', text[:index + 1])[window:])
+        s = set(NON_WORD_PATTERN.split(text[:index + 1])[window:])
     return s & negset
 
 
@@ -58,14 +83,10 @@ def get_adenoma_status(specimens, window=5):
     :param window:
     :return: 1=adenoma, 2=no adenoma
     """
-    tubular_adenoma = re.compile(r'tubular\s+adenoma', re.IGNORECASE)
-    adenomatous = re.compile(r'adenomatous', re.IGNORECASE)
-    serrated_adenoma = re.compile(r'serrated\s+adenoma', re.IGNORECASE)
-    tbv_adenoma = re.compile(r'tubulovillous\s+adenoma', re.IGNORECASE)
-    adenomatoid = re.compile(r'adenomatoid', re.IGNORECASE)
     prenegation = {'no', 'hx', 'history', 'sessile'}
     return inspect(
-        [tubular_adenoma, adenomatous, serrated_adenoma, tbv_adenoma, adenomatoid],
+        [TUBULAR_ADENOMA_PATTERN, ADENOMATOUS_PATTERN, SERRATED_ADENOMA_PATTERN,
+         TUBULOVILLOUS_ADENOMA_PATTERN, ADENOMATOID_PATTERN],
         specimens,
         prenegation,
         window=window
@@ -116,17 +137,14 @@ def get_adenoma_histology_simple(specimens):
     :param specimens:
     :return:
     """
-    tubular = re.compile(r'tubular', re.IGNORECASE)
-    tubulovillous = re.compile(r'tubulovillous', re.IGNORECASE)
-    villous = re.compile(r'(?<!tubulo)villous', re.IGNORECASE)
-    exclusion = re.compile(r'^(\W*\w+){0,4}\W*(bowel|stomach|gastric|(duoden|ile)(al|um))', re.IGNORECASE)
     tb, tbv, vl = 0, 0, 0
     for specimen in specimens:
-        if not find_in_specimen(re.compile('colon'), specimen) and find_in_specimen(exclusion, specimen):
+        if (not find_in_specimen(COLON_PATTERN, specimen)
+                and find_in_specimen(NON_COLON_SPECIMEN_PATTERN, specimen)):
             continue
-        tb_ = find_in_specimen(tubular, specimen)
-        tbv_ = find_in_specimen(tubulovillous, specimen)
-        vl_ = find_in_specimen(villous, specimen, prenegation={'no'})
+        tb_ = find_in_specimen(TUBULAR_PATTERN, specimen)
+        tbv_ = find_in_specimen(TUBULOVILLOUS_PATTERN, specimen)
+        vl_ = find_in_specimen(VILLOUS_PATTERN, specimen, prenegation={'no'})
 
         tb = tb or tb_
         vl = vl or vl_
@@ -140,9 +158,8 @@ def get_highgrade_dysplasia(specimens):
     :param specimens:
     :return:
     """
-    dysplasia = re.compile(r'(high(\s*|-)?grade|severe)(\W*\w+)?\W+dysplas\w*', re.IGNORECASE)
     prenegation = {'no', 'without', 'negative'}
-    return inspect([dysplasia], specimens, prenegation=prenegation,
+    return inspect([HIGHGRADE_DYSPLASIA_PATTERN], specimens, prenegation=prenegation,
                    terminate_on_negation=True)
 
 
@@ -169,25 +186,14 @@ def get_adenoma_count(specimens, bins=(3,), many=7):
         None -> raw count
     :return:
     """
-    lkp = {str(x): x for x in range(1, 10)}
-    lkp.update({
-        'one': 1,
-        'two': 2,
-        'three': 3,
-        'four': 4,
-        'five': 5
-    })
     count = 0
-    names = '|'.join(lkp.keys())
-    patterns = [
-        re.compile(fr'polyps?\W*x\W*({names})', re.IGNORECASE),
-    ]
+    patterns = [ADENOMA_COUNT_PATTERN]
     for specimen in specimens:
         if get_adenoma_status([specimen]):
             spec_count = 1
             for pat in patterns:
                 for m in pat.finditer(specimen):
-                    spec_count = lkp[m.group(1)]
+                    spec_count = ADENOMA_COUNT_LOOKUP[m.group(1)]
                     break
                 if spec_count > 1:
                     break
@@ -1,5 +1,3 @@
-import re
-
 from loguru import logger
 
 from precise_nlp.const import patterns
@@ -7,6 +5,7 @@ from precise_nlp.extract.utils import depth_to_location, StandardTerminology, Nu
 
 
 class BaseFinding:
+    __slots__ = ('_locations', '_count', 'removal', 'size', 'source')
 
     def __init__(self, location=None, count=1, removal=None,
                  size=None, source=None):
@@ -51,57 +50,54 @@ class BaseFinding:
         self._locations.append(loc)
 
     def extract_depth(self, pat, value):
-        new_value = []
-        end = 0
-        for m in pat.finditer(value):
+        """Add locations from depths found in value, returning value with these removed"""
+
+        def repl(m):
             if 'size' in value[m.end():m.end() + 15]:
-                continue
+                return m.group()
             self._locations += depth_to_location(float(m.group(1)))
-            new_value.append(value[end:m.start()])
-            end = m.end()
-        new_value.append(value[end:])
-        return ' '.join(new_value)
+            return ' '
+        return pat.sub(repl, value)
+
+    @staticmethod
+    def _get_size(s):
+        if not s:
+            return 0
+        if s[0] == '<':
+            return float(s[1:]) - 0.1
+        elif s[0] == '>':
+            return float(s[1:]) + 0.1
+        else:
+            return float(s)
 
     def extract_size(self, pat, value):
-        new_value = []
-        end = 0
-
-        def get_size(s):
-            if not s:
-                return 0
-            if s[0] == '<':
-                return float(s[1:]) - 0.1
-            elif s[0] == '>':
-                return float(s[1:]) + 0.1
-            else:
-                return float(s)
-
-        for m in pat.finditer(value):
-            size = max(get_size(m.group(n)) for n in ('n1', 'n2'))
+        """Retain largest size found in value, returning value with sizes removed"""
+
+        def repl(m):
+            size = max(self._get_size(m.group(n)) for n in ('n1', 'n2'))
             if m.group('m')[-2] == 'c':  # mm
                 size *= 10  # convert to mm
             if size > 100:
-                continue
+                return m.group()
             if not self.size or size > self.size:  # get largest size only
                 self.size = size
-            new_value.append(value[end:m.start()])
-            end = m.end()
-        new_value.append(value[end:])
-        return ' '.join(new_value)
+            return ' '
+        return pat.sub(repl, value)
 
     @classmethod
     def parse_finding(cls, s, prev_locations=None, source=None):
         key = None
         value = None
+        s_lower = s.lower()
         if '-' in s:
-            key, value = s.lower().split('-', maxsplit=1)
+            key, value = s_lower.split('-', maxsplit=1)
         if '—' in s:
-            key, value = s.lower().split('—', maxsplit=1)
+            key, value = s_lower.split('—', maxsplit=1)
         elif ':' in s:
-            key, value = s.lower().split(':', maxsplit=1)
+            key, value = s_lower.split(':', maxsplit=1)
         if not key or len(key) > 40:
             key = None
-            value = s.lower()
+            value = s_lower
         f = cls(source=source)
         # in size pattern
         value = f.extract_size(patterns.IN_SIZE_PATTERN, value)
@@ -114,14 +110,14 @@ class BaseFinding:
         if not f.locations:
             # without at, require 2 digits and "CM"
             value = f.extract_depth(patterns.CM_DEPTH_PATTERN, value)
-        # spelled-out locations
+        # spelled-out locations (look in key if present)
+        location_terms = StandardTerminology.find_location_terms(key or value)
         for location in StandardTerminology.LOCATIONS:
-            loc_pat = re.compile(fr'\b{location}\b', re.IGNORECASE)
-            if key and loc_pat.search(key):
-                f._locations.append(location)
-            elif not key and loc_pat.search(value):
+            if location not in location_terms:
+                continue
+            if not key:
                 logger.warning(f'Possible unrecognized finding separator in "{s}"')
-                f._locations.append(location)
+            f._locations.append(location)
         # update locations if none found
         if prev_locations and not f._locations:
             f._locations = prev_locations
@@ -1,5 +1,6 @@
 import collections
 import enum
+from functools import cached_property
 from loguru import logger
 import re
 from typing import Iterable
@@ -8,12 +9,13 @@ from precise_nlp.const import patterns
 from precise_nlp.const.patterns import INDICATION_DIAGNOSTIC, INDICATION_SURVEILLANCE, INDICATION_SCREENING, \
     PROCEDURE_EXTENT_COMPLETE, COLON_PREP_PRE, COLON_PREP_POST, PROCEDURE_EXTENT_INCOMPLETE, COLON_PREPARATION, \
     REMOVE_SCREENING, PROCEDURE_EXTENT_INCOMPLETE_PRE, PROCEDURE_EXTENT_ALL
-from precise_nlp.extract.cspy.finding_builder import FindingBuilder, Finding
+from precise_nlp.extract.cspy.finding_builder import FindingBuilder, Finding, FindingIndex
 from precise_nlp.extract.cspy.finding_patterns import apply_finding_patterns_to_location, apply_finding_patterns, \
     remove_finding_patterns
 from precise_nlp.extract.cspy.naive_finding import NaiveFinding
 from precise_nlp.extract.utils import Indication, Extent, \
     ColonPrep, Prep, IndicationPriority, StandardTerminology
+from precise_nlp.pattern_registry import lazy_compile
 
 
 class FindingVersion(enum.Enum):
@@ -22,16 +24,35 @@ class FindingVersion(enum.Enum):
 
 
 class CspyManager:
+    """
+    Parse a colonoscopy report into sections and findings.
+
+    Thread safety: an instance belongs to one document (and thread), as its outputs are computed
+        lazily on first access; class-level patterns and labels may be shared.
+    """
     _Wn = r'[^\w\n]'
-    TITLE_PATTERN = re.compile(
+    TITLE_PATTERN = lazy_compile(
         rf'('
         rf'EGD Indications'
         rf'|[A-Z][a-z]+{_Wn}?(?:[A-Z][a-z]+{_Wn}?|and\s|of\s)*:'
         rf'|[A-Z]+:'
         rf'|(?:Patient\W*)?(?:Active\W*)?\W*Problem List'
         rf')')
-    ENUMERATE_PATTERN = re.compile(r'\d[).]')
-    NOT_FINDING_PATTERN = re.compile(r'\b(exam|lesion)', re.I)
+    ENUMERATE_PATTERN = lazy_compile(r'\d[).]')
+    NOT_FINDING_PATTERN = lazy_compile(r'\b(exam|lesion)', re.I)
+    POLYP_COLON_PATTERN = lazy_compile(r'(polyps?)\W*?:', re.I)
+    SENTENCE_SPLIT_PATTERN = lazy_compile(r'[.*:]\s+')
+    DIVERTICULAR_PATTERN = lazy_compile(r'\bdiverti\w+', re.I)
+    END_OF_HEADER_PATTERN = lazy_compile(
+        '(asa grade'  # in text of procedure (frequent)
+        '|colonoscope'  # in text of procedure
+        '|propofol'  # common medication, usually listed after indications
+        '|ileum'  # text of procedure
+        ')', re.I)
+    LOCATION_SEPARATOR_PATTERN = lazy_compile(
+        rf'({StandardTerminology.LOCATION_PATTERN})\s*(colon|flexure)?\s*[-—:]',
+        re.I
+    )
     FINDINGS = 'FINDINGS'
     INDICATIONS = 'INDICATIONS'
     LOCATION_SPECIFIED = 'LOCATION_SPECIFIED'
@@ -44,6 +65,8 @@ class CspyManager:
 
     def __init__(self, text, *, version=FindingVersion.PRECISE, cspy_extent_search_all=False, test_skip_parse=False):
         """
+        Outputs (sections, findings, num_polyps, indication, prep, extent) are each computed
+            on first access and then cached.
 
         :param text:
         :param version:
@@ -51,18 +74,19 @@ class CspyManager:
         :param test_skip_parse: for testing: don't run all the algorithms (expected that one would be run manually)
         """
         self.text = text
-        self.title = ''
-        self.sections = {}
-        self._get_sections()
-        self._findings = None
-        self.num_polyps = None
-        self._indication = None
-        self._prep = None
-        self._extent = None
-        if not test_skip_parse:
-            self.parse_sections(version=version, cspy_extent_search_all=cspy_extent_search_all)
+        self.version = version
+        self.cspy_extent_search_all = cspy_extent_search_all
+        if test_skip_parse:  # outputs remain None unless `parse_sections` is called
+            self._findings = None
+            self.num_polyps = None
+            self._indication = None
+            self._prep = None
+            self._extent = None
 
     def parse_sections(self, *, version=FindingVersion.PRECISE, cspy_extent_search_all=False):
+        """Eagerly compute all outputs"""
+        self.version = version
+        self.cspy_extent_search_all = cspy_extent_search_all
         self._findings = list(self._get_findings(version=version))
         if self._findings:
             self.num_polyps = sum(f.count for f in self._findings)
@@ -72,6 +96,40 @@ class CspyManager:
         self._prep = self.get_prep()
         self._extent = self.get_extent(cspy_extent_search_all=cspy_extent_search_all)
 
+    @cached_property
+    def _findings(self):
+        return list(self._get_findings(version=self.version))
+
+    @cached_property
+    def num_polyps(self):
+        if self._findings:
+            return sum(f.count for f in self._findings)
+        return 0
+
+    @cached_property
+    def _indication(self):
+        return self.get_indication()
+
+    @cached_property
+    def _prep(self):
+        return self.get_prep()
+
+    @cached_property
+    def _extent(self):
+        return self.get_extent(cspy_extent_search_all=self.cspy_extent_search_all)
+
+    @cached_property
+    def _section_index(self):
+        return self._get_sections()
+
+    @property
+    def title(self):
+        return self._section_index[0]
+
+    @property
+    def sections(self):
+        return self._section_index[1]
+
     @property
     def indication(self):
         return self._indication.name if self._indication else self._indication
@@ -92,34 +150,37 @@ class CspyManager:
         Separate using Header: value
         Except:
             * header begins with enumeration (-,*) suggesting it is sublist
-        :return:
+        :return: title, sections
         """
+        title = ''
+        sections = {}
         curr = None
         prev_line_item = None
         # don't allow 'Polyp:' to create a new section
-        text = re.sub(r'(polyps?)\W*?:', r'\1 ', self.text, flags=re.I)
+        text = self.POLYP_COLON_PATTERN.sub(r'\1 ', self.text)
         for el in self.TITLE_PATTERN.split(text):
             if not el.strip():  # skip empty lines
                 continue
             elif (el.endswith(':') or 'Problem List' in el) and not prev_line_item:
                 curr = el[:-1]
-                if curr not in self.sections:
-                    self.sections[curr] = []
+                if curr not in sections:
+                    sections[curr] = []
             elif curr is None:
-                if not self.title:
-                    self.title = el.strip()
+                if not title:
+                    title = el.strip()
                 continue
             else:
                 if curr.lower() in StandardTerminology.LOCATIONS.values():
-                    self.sections[self.LOCATION_SPECIFIED] = self.sections.get(self.LOCATION_SPECIFIED, list())
-                    self.sections[self.LOCATION_SPECIFIED].append(f'{curr} - {el}')
+                    sections[self.LOCATION_SPECIFIED] = sections.get(self.LOCATION_SPECIFIED, list())
+                    sections[self.LOCATION_SPECIFIED].append(f'{curr} - {el}')
                 else:
-                    self.sections[curr].append(el)
+                    sections[curr].append(el)
             # TODO: only allow certain sections to contain these lists??
             prev_line_item = (
                     (el.strip()[-1] in ['·', '•', '-', '*'] and '----' not in el)
                     or self.ENUMERATE_PATTERN.match(el.strip()[-2:])
             )
+        return title, sections
 
     def _get_section(self, category):
         for label in self.LABELS[category]:
@@ -184,14 +245,10 @@ class CspyManager:
         :param text:
         :return:
         """
-        pat = re.compile(
-            rf'({StandardTerminology.LOCATION_PATTERN})\s*(colon|flexure)?\s*[-—:]',
-            re.I
-        )
         prev_location = None
         prev_end = None
         locations = {}
-        for m in pat.finditer(text):
+        for m in self.LOCATION_SEPARATOR_PATTERN.finditer(text):
             location = tuple(StandardTerminology.convert_location(m.group(1)))
             if prev_location:
                 locations[prev_location] = text[prev_end: m.start()].strip()
@@ -226,15 +283,15 @@ class CspyManager:
         # compare the first section against the other sections
         # sections are different groups of section headers
         # TODO: base section should be the most-documented (currently: first-appearing)
+        indexes = [FindingIndex(section) for section in findings_by_section[1:]]
         for finding in findings_by_section[0]:
-            for i, section in enumerate(findings_by_section[1:]):
-                new_finding = None
-                for j, curr_finding in enumerate(section):
-                    if FindingBuilder.can_merge_findings(finding, curr_finding):
-                        new_finding = FindingBuilder.merge_findings(finding, curr_finding)
-                        break
+            for index in indexes:
+                # merge with first matching finding in section
+                if (j := index.find(finding)) is None:
+                    continue
+                new_finding = FindingBuilder.merge_findings(finding, index.findings[j])
                 if new_finding:
-                    section.pop(j)
+                    index.pop(j)
                     finding = new_finding
             result_findings.append(finding)
         # TODO: handle remaining leftovers? or do comparison of total counts?
@@ -284,7 +341,7 @@ class CspyManager:
 
     def _get_indications(self, section):
         indications = []
-        for sect in re.split(r'[.*:]\s+', section):  # sentence split for negation scope
+        for sect in self.SENTENCE_SPLIT_PATTERN.split(section):  # sentence split for negation scope
             if m := REMOVE_SCREENING.matches(sect):
                 logger.debug(f'INDICATIONS: Removing Screening {m.group()}.')
                 # remove these terms from further consideration
@@ -314,7 +371,7 @@ class CspyManager:
             return Indication.SURVEILLANCE, m
         elif m := INDICATION_SCREENING.matches(text, ignore_negation=ignore_negation):
             return Indication.SCREENING, m
-        elif m := re.search(r'\bdiverti\w+', text, re.I):
+        elif m := self.DIVERTICULAR_PATTERN.search(text):
             return Indication.UNKNOWN, m
         return Indication.UNKNOWN, None
 
@@ -334,12 +391,7 @@ class CspyManager:
 
     def _get_indications_from_header(self):
         """Look at entire header section for indication language"""
-        m = re.compile(
-            '(asa grade'  # in text of procedure (frequent)
-            '|colonoscope'  # in text of procedure
-            '|propofol'  # common medication, usually listed after indications
-            '|ileum'  # text of procedure
-            ')', re.I).search(self.text)
+        m = self.END_OF_HEADER_PATTERN.search(self.text)
         if m:
             return self._get_indications_from([self.text[:m.start()]])
 
@@ -430,10 +482,9 @@ class CspyManager:
         :return: location, size
         """
         res = []
-        for findings in self._findings:
-            for f in findings:
-                if f.size and f.size >= min_size:
-                    res.append(f)
+        for f in self._findings:
+            if f.size and f.size >= min_size:
+                res.append(f)
         return res
 
     def get_findings(self) -> Iterable[Finding]:
@@ -11,6 +11,7 @@ from precise_nlp.const import patterns
 from precise_nlp.extract.cspy.base_finding import BaseFinding
 from precise_nlp.extract.cspy.single_finding import SingleFinding
 from precise_nlp.extract.utils import StandardTerminology, NumberConvert, depth_to_location
+from precise_nlp.pattern_registry import lazy_compile
 
 
 class FindingType(enum.Enum):
@@ -118,6 +119,9 @@ class Finding:
 
 
 class FindingBuilder:
+    EXCLUDE_PATTERN = lazy_compile(r'(diverticulosis|normal|wnl|not evaluated|ulcer)', re.I)
+    POLYPS_PATTERN = lazy_compile(r'\bpolyps\b')
+    POLYP_PATTERN = lazy_compile(r'\bpolyp\b')
 
     def __init__(self, version=FindingType.SINGLE_FINDING, split_findings=True):
         self._findings = []
@@ -232,8 +236,7 @@ class FindingBuilder:
         """Exclude common cases to shortcut the loop"""
         if 'polyp' in text:
             return True, text
-        excl = re.compile(r'(diverticulosis|normal|wnl|not evaluated|ulcer)', re.I)
-        if (key and excl.search(key)) or excl.search(text):
+        if (key and self.EXCLUDE_PATTERN.search(key)) or self.EXCLUDE_PATTERN.search(text):
             return False, text
         return True, text
 
@@ -294,9 +297,9 @@ class FindingBuilder:
     def get_count(self, finding, text, **kwargs):
         # there should only be one
         lst = [0]
-        if re.search(r'\bpolyps\b', text):
+        if self.POLYPS_PATTERN.search(text):
             lst.append(2)
-        elif re.search(r'\bpolyp\b', text):
+        elif self.POLYP_PATTERN.search(text):
             lst.append(1)
         elif finding.removal:
             lst.append(1)
@@ -348,3 +351,73 @@ class FindingBuilder:
 
     def get_findings(self) -> Iterable[BaseFinding]:
         yield from self._findings
+
+
+class FindingIndex:
+    """
+    Index the findings of a section by location to quickly identify merge candidates.
+
+    Finding locations may be a mixture of `str` and `Location` (which are equal when the
+        str is the label or one of the standardized locations), so each finding is indexed
+        under every term its first location might be equal to. Candidates are confirmed
+        with `FindingBuilder.can_merge_findings`.
+    """
+    ALL = 'all'
+    UNLOCATED = 'unlocated'  # findings without locations are candidates for all findings
+    UNHASHABLE = 'unhashable'  # unexpected location types: always considered
+
+    def __init__(self, findings):
+        self.findings = list(findings)
+        self.merged = [False] * len(self.findings)
+        self._index = {  # key -> positions of findings (in order)
+            self.ALL: list(range(len(self.findings))),
+            self.UNLOCATED: [],
+            self.UNHASHABLE: [],
+        }
+        self._heads = {}  # key -> first position in index which might not be merged
+        for i, finding in enumerate(self.findings):
+            if not finding.locations:
+                self._index[self.UNLOCATED].append(i)
+            elif (terms := self._location_terms(finding.locations[0])) is None:
+                self._index[self.UNHASHABLE].append(i)
+            else:
+                for term in terms:  # keyed by (number of locations, term)
+                    self._index.setdefault((len(finding.locations), term), []).append(i)
+
+    @staticmethod
+    def _location_terms(location):
+        """All terms which the location might be equal to or None if they cannot be determined"""
+        if isinstance(location, Location):
+            return {location.label, *location.location}
+        try:
+            return {location}
+        except TypeError:
+            return None
+
+    def _candidate_keys(self, finding):
+        if not finding.locations:
+            return [self.ALL]
+        if (terms := self._location_terms(finding.locations[0])) is None:
+            return [self.ALL]
+        return [self.UNLOCATED, self.UNHASHABLE] + [(len(finding.locations), term) for term in terms]
+
+    def find(self, finding):
+        """Position of the first unmerged finding which can be merged with `finding` or None"""
+        first = None
+        for key in self._candidate_keys(finding):
+            positions = self._index.get(key, ())
+            head = self._heads.get(key, 0)
+            while head < len(positions) and self.merged[positions[head]]:
+                head += 1  # skip over merged prefix
+            self._heads[key] = head
+            for i in positions[head:]:
+                if first is not None and i >= first:
+                    break
+                if not self.merged[i] and FindingBuilder.can_merge_findings(finding, self.findings[i]):
+                    first = i
+                    break
+        return first
+
+    def pop(self, i):
+        self.merged[i] = True
+        return self.findings[i]
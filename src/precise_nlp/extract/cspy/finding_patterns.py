@@ -1,16 +1,16 @@
 import re
 
-from regexify.pattern import Pattern
 from loguru import logger
 
 from precise_nlp.extract.cspy.finding_builder import Finding, FindingSource
 from precise_nlp.extract.cspy.polyps import POLYP_IDENTIFIERS, POLYP_IDENTIFIERS_PATTERN
 from precise_nlp.extract.utils import NumberConvert, StandardTerminology
+from precise_nlp.pattern_registry import lazy_pattern
 
 colon = r'(colon|flexure)'
 _to = r'(?:to|-|and)'
 _kind = r'(?:(?:sessile|pedunc\w+|flat) )'
-_size = lambda x='': r'(?P<size{}>\d+\.?\d*|\d*\.\d+)'.format(x)
+_size = lambda x='': r'(?P<size{}>\d+(?:\.\d*)?|\d*\.\d+)'.format(x)  # unambiguous split of digits
 _measure = lambda x='': r'(?P<measure{}>[cm]m)'.format(x)
 _polyp_qual = lambda x='': r'(?P<polyp_qual{}>{})(?:ly)? (?:sized?)?'.format(x, POLYP_IDENTIFIERS_PATTERN)
 _size_qual = lambda x='': f'(?:{_size(x)} {_measure(x)}?|{_polyp_qual(x)})'
@@ -25,67 +25,67 @@ _word_space = lambda x='3': r'(\w+[\s\.]+){{0,{}}}'.format(x)
 _count = lambda x='': r'(?P<count{}>{})'.format(x, NumberConvert.NUMBER_PATTERN)
 
 IN_LOCATION_FINDING_PATTERNS = {  # patterns that assume we are in a location section (i.e., we know location)
-    f'NUM_SIZES_POLYP': Pattern(
+    f'NUM_SIZES_POLYP': lazy_pattern(
         rf'{_count()} {_size_to_size_qual()} {_kind}?polyp'
     ),
-    f'NUM_SIZE_POLYP': Pattern(
+    f'NUM_SIZE_POLYP': lazy_pattern(
         rf'{_count()} {_size_qual()} {_kind}?polyp'
     ),
-    f'SIZES_POLYP': Pattern(
+    f'SIZES_POLYP': lazy_pattern(
         rf'{_polyp_qual(9)} {_size_to_size_qual()} polyp'
     ),
-    f'SIZE_POLYP': Pattern(
+    f'SIZE_POLYP': lazy_pattern(
         rf'{_polyp_qual(9)} {_size_qual()} polyp'
     ),
-    f'NUM_POLYP_SIZE': Pattern(
+    f'NUM_POLYP_SIZE': lazy_pattern(
         rf'{_count()} {_kind}? polyps? the polyps? (was|were) {_size_qual()}'
     )
 }
 
 FINDING_PATTERNS = {  # for any findings, but particularly for 'Findings:' section
-    'POLYP_SIZE_IN_LOCATION': Pattern(
+    'POLYP_SIZE_IN_LOCATION': lazy_pattern(
         rf'polyp {_size_qual()} in the {_location_or_rectum()}'
     ),
-    'POLYP_SIZE_3W_LOCATION': Pattern(
+    'POLYP_SIZE_3W_LOCATION': lazy_pattern(
         rf'polyp {_size_qual()} {_word(3)}{_location_or_rectum()}'
     ),
-    'POLYPS_SIZE_3W_LOCATIONS': Pattern(
+    'POLYPS_SIZE_3W_LOCATIONS': lazy_pattern(
         rf'polyps {_size_to_size_qual()} {_word(3)}'
         rf'{_location_or_rectum(1)} {_word(3)}{_location_or_rectum(2)}'
     ),
-    'POLYPS_SIZE_3W_LOCATION': Pattern(
+    'POLYPS_SIZE_3W_LOCATION': lazy_pattern(
         rf'polyps {_size_qual(1)} {_to}'
         rf' {_size_qual(2)} {_word(3)}{_location_or_rectum()}'
     ),
-    f'NUM_SIZE_LOCATION': Pattern(
+    f'NUM_SIZE_LOCATION': lazy_pattern(
         rf'{_count()} {_size_qual()} polyps? {_word(3)}{_location_or_rectum()}'
     ),
-    f'NUM_SIZES_LOCATION': Pattern(
+    f'NUM_SIZES_LOCATION': lazy_pattern(
         rf'{_count()} {_size_qual(1)} {_to} {_size_qual(2)} polyps? {_word(3)}{_location_or_rectum()}'
     ),
-    f'POLYP_LOCATION_SIZE': Pattern(
+    f'POLYP_LOCATION_SIZE': lazy_pattern(
         rf'polyp location {_location_all()} size {_size_qual()}'
     ),
-    f'LOCATION_NUM_SIZE_POLYP': Pattern(
+    f'LOCATION_NUM_SIZE_POLYP': lazy_pattern(
         rf'{_location_all()} {_count()} {_size_qual()} {_kind}?polyp'
     ),
-    f'LOCATION_NUM_SIZES_POLYP': Pattern(
+    f'LOCATION_NUM_SIZES_POLYP': lazy_pattern(
         rf'{_location_all()} {_count()} {_size_to_size_qual()} {_kind}?polyp'
     ),
-    f'LOCATION_SIZE_POLYP': Pattern(
+    f'LOCATION_SIZE_POLYP': lazy_pattern(
         rf'{_location_all()} {_polyp_qual(9)} {_size_qual()} polyp'
     ),
-    f'LOCATION_SIZES_POLYP': Pattern(
+    f'LOCATION_SIZES_POLYP': lazy_pattern(
         rf'{_location_all()} {_polyp_qual(9)} {_size_to_size_qual()} polyp'
     ),
-    f'LOCATION_NUM_POLYP_SIZE': Pattern(
+    f'LOCATION_NUM_POLYP_SIZE': lazy_pattern(
         rf'{_location_all()} {_word_space(3)} {_count()} {_kind}? polyps? '
         rf'the polyps? (was|were) {_size_qual()}'
     )
 }
 
 MISSING_PATTERNS = {  # these patterns might suggest something is missing in the above set
-    f'LOCATION_NUM_SIZE_POLYP_without_ending': Pattern(
+    f'LOCATION_NUM_SIZE_POLYP_without_ending': lazy_pattern(
         rf'{_location_all()} {_count()} {_size_qual()}'
     )
 }
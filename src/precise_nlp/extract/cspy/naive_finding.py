@@ -4,6 +4,7 @@ from precise_nlp.extract.cspy.base_finding import BaseFinding
 
 
 class NaiveFinding(BaseFinding):
+    __slots__ = ()
 
     def __init__(self, location=None, count=1, removal=None, size=None, source=None):
         super().__init__(location, count, removal, size, source)
@@ -5,6 +5,7 @@ class SingleFinding(BaseFinding):
     """
     Only allows a single location, and a single count
     """
+    __slots__ = ()
 
     def __init__(self, location=None, removal=None, size=None, source=None):
         count = 1
@@ -11,32 +11,38 @@ from precise_nlp.extract.utils import StandardTerminology
 
 
 class JarManager:
-    POLYPS = ['polyps', 'biopsies', 'polyp']
-    POLYP = ['polyp']
-    ADENOMAS = ['adenomas']
-    ADENOMA = ['adenoma', 'adenomatoid', 'adenomatous',
+    """
+    Jars (specimens) of a single pathology report.
+
+    Thread safety: an instance belongs to one document (and thread); the class-level term
+        lists are immutable and the dicts are never modified after import, so may be shared.
+    """
+    POLYPS = ('polyps', 'biopsies', 'polyp')
+    POLYP = ('polyp',)
+    ADENOMAS = ('adenomas',)
+    ADENOMA = ('adenoma', 'adenomatoid', 'adenomatous',
                'adenomat',
                'adenom'  # abbreviation in early path reports
-               ]
-    COLON = ['colon', 'rectum', 'rectal', 'cecal',
+               )
+    COLON = ('colon', 'rectum', 'rectal', 'cecal',
              'cecum', 'colonic'
-             ]
-    FRAGMENTS = ['segments', 'fragments', 'pieces']
-    FRAGMENT = ['segment', 'fragment', 'piece']
-    ADENOMA_NEGATION = {'no', 'history', 'hx', 'sessile', 'without', 'r/o', 'negative'}
+             )
+    FRAGMENTS = ('segments', 'fragments', 'pieces')
+    FRAGMENT = ('segment', 'fragment', 'piece')
+    ADENOMA_NEGATION = frozenset({'no', 'history', 'hx', 'sessile', 'without', 'r/o', 'negative'})
     ADENOMA_NEGATION_WITHOUT_SESSILE = ADENOMA_NEGATION - {'sessile'}
-    HISTOLOGY_NEGATION = {'no', 'or'}
-    HISTOLOGY_NEGATION_MOD = {'evidence', 'residual'}
-    NUMBER = {'one', 'two', 'three', 'four', 'five', 'six',
-              'seven', 'eight', 'nine'} | {str(i) for i in range(10)}
+    HISTOLOGY_NEGATION = frozenset({'no', 'or'})
+    HISTOLOGY_NEGATION_MOD = frozenset({'evidence', 'residual'})
+    NUMBER = frozenset({'one', 'two', 'three', 'four', 'five', 'six',
+                        'seven', 'eight', 'nine'} | {str(i) for i in range(10)})
     NUMBER_CONVERT = {
         'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
         'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
     }
     NUMBER_CONVERT.update({str(i): i for i in range(10)})
 
-    DYSPLASIA = {'dysplasia', 'dysplastic'}
-    HIGHGRADE_DYS = {'highgrade', 'grade', 'severe'}
+    DYSPLASIA = frozenset({'dysplasia', 'dysplastic'})
+    HIGHGRADE_DYS = frozenset({'highgrade', 'grade', 'severe'})
 
     def __init__(self):
         self.jars = []
@@ -1,9 +1,8 @@
-import re
-
 from collections import defaultdict
 
 from precise_nlp.const.enums import AdenomaCountMethod
 from precise_nlp.extract.path.jar_manager import JarManager
+from precise_nlp.pattern_registry import lazy_compile
 
 
 def jarreader(f):
@@ -16,6 +15,21 @@ def jarreader(f):
 
 
 class PathManager:
+    """
+    Parse a pathology report into jars.
+
+    Thread safety: an instance belongs to one document (and thread); class-level patterns may be shared.
+    """
+    COMMENT_PATTERN = lazy_compile(r'comment(?:\W*\([A-Za-z]\))?:')
+    SPECIMEN_SPLIT_PATTERN = lazy_compile(r'(?<!\()\W[A-Z]\)')
+    JAR_PARENTHESIS_SPLIT_PATTERN = lazy_compile(
+        r'(?:^|[^a-zA-Z0-9_(])'
+        r'([A-Z](?:\D?(?:and|-|,|&)\D?[A-Z])*)(?:\d(?:-\d)?)?\)'
+    )
+    JAR_PERIOD_SPLIT_PATTERN = lazy_compile(
+        r'(?:^|[^a-zA-Z0-9_(])'
+        r'([A-Z](?:\D?(?:and|-|,|&)\D?[A-Z])*)(?:\d(?:-\d)?)?\.'
+    )
 
     def __init__(self, text):
         self.text = text
@@ -96,20 +110,11 @@ class PathManager:
 
     @staticmethod
     def parse_jars(text):
-        comment_pat = re.compile(r'comment(?:\W*\([A-Za-z]\))?:')
-        specimens = [x.lower() for x in re.split(r'(?<!\()\W[A-Z]\)', text)]
+        specimens = [x.lower() for x in PathManager.SPECIMEN_SPLIT_PATTERN.split(text)]
         specimens_dict = defaultdict(list)
-        str_split = re.split(  # split on parenthesis separator: 'A)'
-            r'(?:^|[^a-zA-Z0-9_(])'
-            r'([A-Z](?:\D?(?:and|-|,|&)\D?[A-Z])*)(?:\d(?:-\d)?)?\)',
-            text
-        )
+        str_split = PathManager.JAR_PARENTHESIS_SPLIT_PATTERN.split(text)  # split on parenthesis separator: 'A)'
         if len(str_split) == 1:  # split on period separator: 'A.'
-            str_split = re.split(
-                r'(?:^|[^a-zA-Z0-9_(])'
-                r'([A-Z](?:\D?(?:and|-|,|&)\D?[A-Z])*)(?:\d(?:-\d)?)?\.',
-                text
-            )
+            str_split = PathManager.JAR_PERIOD_SPLIT_PATTERN.split(text)
         it = iter(['A'] + str_split)
         for x in it:
             comment = None
@@ -117,7 +122,7 @@ class PathManager:
             text = next(it).lower()
             if not text.strip():  # first round 'A' might include empty string
                 continue
-            m = comment_pat.search(text)
+            m = PathManager.COMMENT_PATTERN.search(text)
             if m:
                 text = text[:m.start()]
                 comment = text[m.end():]
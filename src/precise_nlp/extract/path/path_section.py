@@ -1,10 +1,21 @@
 import re
+from contextvars import ContextVar
 
 from precise_nlp.extract.path.path_word import PathWord
+from precise_nlp.pattern_registry import lazy_compile
+
+# if set (for the current document), callable returning the words of a section (see `precise_nlp.token_cache`)
+CACHED_WORDS = ContextVar('cached_words', default=None)
 
 
 class PathSection:
-    WORD_SPLIT_PATTERN = re.compile(r'([a-z]+|[0-9]+(?:\.[0-9]+)?)', re.I)
+    """
+    Words of a section with lookups relative to the current word (`curr`).
+
+    Not thread-safe: iterating sets `curr`, so an instance must be iterated by a single caller
+        (e.g., a local variable in `JarManager`).
+    """
+    WORD_SPLIT_PATTERN = lazy_compile(r'([a-z]+|[0-9]+(?:\.[0-9]+)?)', re.I)
     PREPROCESS = {re.escape(k) if esc else k: v for k, v, esc in (
         # 1 to use regex escape, 0 if you want to use a regex
         ('tubularadenoma', 'tubular adenoma', 1),
@@ -13,26 +24,34 @@ class PathSection:
         ('noevidence', 'no evidence', 1),
         ('polyppathologist', 'polyp pathologist', 1),
     )}
-    PREPROCESS_RX = re.compile("|".join(PREPROCESS.keys()))
+    PREPROCESS_RX = lazy_compile("|".join(PREPROCESS.keys()))
 
     def __init__(self, section):
+        cached_words = CACHED_WORDS.get()
+        if cached_words:
+            self.section = cached_words(section)
+        else:
+            self.section = [PathWord(word, i, spl) for i, (word, spl, _) in enumerate(self.split(section))]
+        self.curr = None
+
+    @classmethod
+    def split(cls, section):
+        """Yield (word, intervening punctuation, offset) in preprocessed section"""
         pword = None
         pindex = 0
-        section = self._preprocess(section)
-        self.section = []
-        word_index = 0
-        for m in self.WORD_SPLIT_PATTERN.finditer(section):
+        section = cls._preprocess(section)
+        for m in cls.WORD_SPLIT_PATTERN.finditer(section):
             if pword:  # get intervening punctuation
-                self.section.append(PathWord(pword, word_index, section[pindex:m.start()]))
-                word_index += 1
+                yield pword, section[pindex:m.start()], pstart
             pword = section[m.start(): m.end()]
+            pstart = m.start()
             pindex = m.end()
         if pword:
-            self.section.append(PathWord(pword, word_index, section[pindex:]))
-        self.curr = None
+            yield pword, section[pindex:], pstart
 
-    def _preprocess(self, text):
-        return self.PREPROCESS_RX.sub(lambda m: self.PREPROCESS[re.escape(m.group(0))], text, re.IGNORECASE)
+    @classmethod
+    def _preprocess(cls, text):
+        return cls.PREPROCESS_RX.sub(lambda m: cls.PREPROCESS[re.escape(m.group(0))], text, re.IGNORECASE)
 
     def __iter__(self):
         for i, section in enumerate(self.section):
@@ -1,8 +1,8 @@
-import re
+from precise_nlp.pattern_registry import lazy_compile
 
 
 class PathWord:
-    STOP = re.compile(r'.*([:.]).*')
+    STOP = lazy_compile(r'.*([:.]).*')
 
     def __init__(self, word, index, spl=''):
         self.word = word
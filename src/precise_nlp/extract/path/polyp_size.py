@@ -1,4 +1,4 @@
-import re
+from precise_nlp.pattern_registry import lazy_compile
 
 
 class PolypSize:
@@ -11,7 +11,7 @@ class PolypSize:
     _COUNT = r'a|an|one|two|three|four|five|six|seven|eight|nine|\d'
     _TYPE = r'(cm|mm)?'
     _MEASURE = r'\d{1,2}\.?\d{,2}'
-    PATTERN = re.compile(fr'(?P<count>{_COUNT})?\W*'  # number
+    PATTERN = lazy_compile(fr'(?P<count>{_COUNT})?\W*'  # number
                          fr'(?:(?P<min1>{_MEASURE})\W*{_TYPE}'  # min size (or only size)
                          fr'(?:\W*x\W*(?P<min2>{_MEASURE})\W*{_TYPE}'
                          fr'(?:\W*x\W*(?P<min3>{_MEASURE})\W*{_TYPE})?)?)'
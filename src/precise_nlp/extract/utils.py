@@ -2,6 +2,7 @@ import re
 from enum import Enum
 
 from precise_nlp.const.enums import Histology
+from precise_nlp.pattern_registry import lazy_compile
 
 
 def append_str(lst, el):
@@ -38,23 +39,28 @@ def depth_to_location(depth: float):
 
 
 class StandardTerminology:
-    SPECIFYING_LOCATIONS = [  # locations which can just be adjectives
+    """
+    Lookup tables shared by all extractors.
+
+    Thread-safe: tables are immutable (tuples, frozensets) or, for dicts, never modified after import.
+    """
+    SPECIFYING_LOCATIONS = (  # locations which can just be adjectives
         'right', 'left',
         'distal', 'proximal'
-    ]
+    )
     # https://www.cancer.gov/publications/dictionaries/cancer-terms/def/distal-colon
     # technically, does not include rectum, though I've included it
-    RECTAL_LOCATIONS = ['rectum']
+    RECTAL_LOCATIONS = ('rectum',)
     # TODO: remove 'rectum' from DISTAL_LOCATIONS
     # https://www.ncbi.nlm.nih.gov/pubmedhealth/PMHT0022241/
-    DISTAL_LOCATIONS = [
+    DISTAL_LOCATIONS = (
         'descending', 'sigmoid', 'distal',
         'splenic', 'left', 'rectum'
-    ]
-    PROXIMAL_LOCATIONS = [
+    )
+    PROXIMAL_LOCATIONS = (
         'proximal', 'ascending',
         'transverse', 'cecum', 'hepatic', 'right'
-    ]
+    )
 
     LOCATIONS = {
         'anus': 'anus',
@@ -108,10 +114,15 @@ class StandardTerminology:
         'random': 'random'
     }
 
-    LOCATION_REGEX = [(term, loc, re.compile(rf'\b{loc}\b', re.I)) for loc, term in LOCATIONS.items()]
+    LOCATION_REGEX = tuple((term, loc, lazy_compile(rf'\b{loc}\b', re.I)) for loc, term in LOCATIONS.items())
     LOCATION_PATTERN = rf'\b(?:{"|".join(LOCATIONS.keys())})\b'
+    # single-word locations can be found by word lookup; others require a regex
+    WORD_PATTERN = lazy_compile(r'\w+')
+    MULTIWORD_LOCATION_REGEX = tuple(
+        (loc, loc_pat) for _, loc, loc_pat in LOCATION_REGEX if not re.fullmatch(r'\w+', loc)
+    )
 
-    COLON = {
+    COLON = frozenset({
         'anus',
         'rectum',
         'sigmoid',
@@ -124,7 +135,7 @@ class StandardTerminology:
         'proximal',
         'distal',
         'ileocecum',
-    }
+    })
 
     HISTOLOGY = {
         'tubular': Histology.TUBULAR,
@@ -153,6 +164,20 @@ class StandardTerminology:
                 else:
                     yield from depth_to_location(el)
 
+    @classmethod
+    def find_location_terms(cls, text):
+        """
+        Location terms (keys of `LOCATIONS`) which appear as whole words in text;
+            equivalent to searching for each of `LOCATION_REGEX` but requires only a single scan
+        :param text:
+        :return: set of location terms
+        """
+        found = cls.LOCATIONS.keys() & set(cls.WORD_PATTERN.findall(text.lower()))
+        for loc, loc_pat in cls.MULTIWORD_LOCATION_REGEX:
+            if loc_pat.search(text):
+                found.add(loc)
+        return found
+
     @classmethod
     def standardize_location(cls, el, colon_only=False):
         try:
@@ -188,12 +213,13 @@ class NumberConvert:
     }
     VALUES.update({str(i): i for i in range(10)})
     NUMBER_PATTERN = f"(?:{'|'.join(VALUES.keys())})"
+    NON_WORD_PATTERN = lazy_compile(r'\W+')
 
     @staticmethod
     def contains(text, followed_by=None, distance=0, split_on_non_word=False):
         results = []
         if split_on_non_word:
-            text = re.split(r'\W+', text)
+            text = NumberConvert.NON_WORD_PATTERN.split(text)
         else:
             text = text.split()
         dtext = {x: i for i, x in enumerate(text)}
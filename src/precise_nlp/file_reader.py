@@ -0,0 +1,171 @@
+"""
+Reading reports from a directory of text files (or a `lookup_table` of them), optionally compressed
+    (.gz, .bz2, .xz).
+
+On a network filesystem, the latency of opening each file dominates. With `prefetch`, files are read
+    by a pool of threads ahead of the consumer (e.g., while earlier records are being extracted),
+    and records are still yielded in order.
+
+    data:  # in config
+      filetype: txt
+      path: notes/
+      include: ['*.txt', '*.txt.gz']  # glob patterns of files to read (default: all)
+      prefetch: {workers: 8, max_pending: 64}  # or true
+"""
+import bz2
+import fnmatch
+import gzip
+import lzma
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from precise_nlp.worker import map_ordered
+
+COMPRESSION = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+PREFETCH_WORKERS = 8
+
+
+def strip_compression(filename):
+    """:return: filename without compression extension (e.g., note.txt.gz -> note.txt)"""
+    root, ext = os.path.splitext(filename)
+    return root if ext in COMPRESSION else filename
+
+
+def read_text(fp, encoding='utf8'):
+    """
+    :param fp: file, or file with a compression extension
+    :return: (text, bytes read from disk); text is empty if neither fp nor a compressed version exists
+    """
+    fp = os.fspath(fp)
+    if not os.path.isfile(fp):
+        for ext in COMPRESSION:
+            if os.path.isfile(fp + ext):
+                fp += ext
+                break
+        else:
+            return '', 0
+    opener = COMPRESSION.get(os.path.splitext(fp)[1], open)
+    with opener(fp, 'rt', encoding=encoding) as fh:
+        return fh.read(), os.path.getsize(fp)
+
+
+def read_files(fps, encoding='utf8'):
+    """:return: (texts, bytes read) or the exception raised reading a file"""
+    texts = []
+    size = 0
+    try:
+        for fp in fps:
+            text, file_size = read_text(fp, encoding)
+            texts.append(text)
+            size += file_size
+    except (ValueError, OSError) as e:  # includes UnicodeDecodeError
+        return e
+    return texts, size
+
+
+def lookup_entries(lookup_table, limit=None):
+    """
+    Yield (identifier, (cspy_file, path_file)) for each line of a lookup table, or (identifier, exception)
+    :param limit: only identifiers in limit
+    """
+    with open(lookup_table) as fh:
+        for line in fh:
+            try:
+                identifier, cspy_file, path_file = line.strip().split(',')
+            except ValueError as e:
+                error = ValueError(f'Expected identifier,cspy_file,path_file: {line.strip()!r}')
+                error.__cause__ = e
+                yield None, error
+                continue
+            if limit and identifier not in limit:
+                continue
+            yield identifier, (cspy_file, path_file)
+
+
+def scan_directory(path, include=None):
+    """
+    :param include: glob patterns of filenames to include (default: all)
+    :return: sorted names of files in directory
+    """
+    if isinstance(include, str):
+        include = [include]
+    with os.scandir(path) as it:
+        return sorted(entry.name for entry in it if entry.is_file()
+                      and (not include or any(fnmatch.fnmatch(entry.name, pattern) for pattern in include)))
+
+
+class PrefetchReader:
+    """
+    Read files on a pool of threads ahead of the consumer, yielding them in order
+    :param workers: threads reading files
+    :param max_pending: files read ahead of the consumer (default: 4 per worker)
+    """
+
+    def __init__(self, workers=PREFETCH_WORKERS, max_pending=None, encoding='utf8'):
+        self.workers = workers
+        self.max_pending = max_pending or 4 * workers
+        self.encoding = encoding
+        self.files = 0
+        self.bytes = 0
+        self.read_seconds = 0.0  # total time spent reading (across threads)
+        self.wait_seconds = 0.0  # time consumer waited on a read
+
+    def _read(self, fps):
+        """:return: (texts, bytes, seconds) or the exception raised reading a file"""
+        start = time.perf_counter()
+        result = read_files(fps, self.encoding)
+        return result if isinstance(result, Exception) else (*result, time.perf_counter() - start)
+
+    def read(self, items, files):
+        """
+        Yield (item, list of texts or exception) for each item, in order
+        :param files: function returning the files to read for an item
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix='prefetch') as executor:
+            results = map_ordered(self._read, items, key=lambda item: (files(item),), executor=executor,
+                                  max_pending=self.max_pending)
+            try:
+                while True:
+                    wait_start = time.perf_counter()
+                    result = next(results, None)
+                    self.wait_seconds += time.perf_counter() - wait_start
+                    if result is None:
+                        break
+                    item, result = result
+                    if isinstance(result, Exception):
+                        yield item, result
+                        continue
+                    texts, size, seconds = result
+                    self.files += len(texts)
+                    self.bytes += size
+                    self.read_seconds += seconds
+                    yield item, texts
+            finally:  # e.g., consumer stopped early: cancel pending reads
+                results.close()
+        self.report(time.perf_counter() - start)
+
+    def report(self, seconds):
+        logger.info(f'Read {self.files} files ({self.bytes / 2 ** 20:.1f} MB) in {seconds:.2f}s:'
+                    f' {self.files / seconds if seconds else 0:.0f} files/s,'
+                    f' {self.bytes / 2 ** 20 / seconds if seconds else 0:.1f} MB/s'
+                    f' ({self.workers} threads; waited on reads for {self.wait_seconds:.2f}s).')
+
+
+def read_serially(items, files, encoding='utf8'):
+    """As `PrefetchReader.read`, reading each item's files when it is used"""
+    for item in items:
+        result = read_files(files(item), encoding)
+        yield item, result if isinstance(result, Exception) else result[0]
+
+
+def prefetch_reader(prefetch, encoding='utf8'):
+    """:param prefetch: true, number of workers, or dict of workers and max_pending"""
+    if isinstance(prefetch, dict):
+        return PrefetchReader(encoding=encoding, **prefetch)
+    if prefetch is True:
+        return PrefetchReader(encoding=encoding)
+    return PrefetchReader(workers=prefetch, encoding=encoding)
@@ -0,0 +1,385 @@
+"""
+Incremental re-extraction after changes to lexicons (e.g., `terms.OTHER_CANCER_TERMS`,
+    `StandardTerminology.LOCATIONS`) or patterns (e.g., in `const/patterns.py`).
+
+A normal run with `incremental: <index file>` also builds an inverted index from the tokens of each
+    (preprocessed) document to its identifier, and records a snapshot of every term and pattern in
+    `LEXICON_MODULES`. Later runs with the same index only re-run documents which could be affected by
+    the terms and patterns which have since been added or removed, and patch them into the SQLite `outfile`.
+    The snapshot is only written once every document has been indexed: an index left incomplete (e.g., by an
+    interrupted run) is rebuilt by the next run.
+
+A document can only be affected by a term if it contains each of the term's words, and by a pattern if
+    it contains each literal word fragment the pattern requires (for at least one alternative). Fragments
+    are matched within tokens (e.g., 'adenom' in 'adenomatous'). If no fragments are required (e.g.,
+    `\\d+\\s*mm`), every document is re-run.
+
+    python -m precise_nlp.incremental corpus_index.sqlite  # list changes and number of affected documents
+"""
+import argparse
+import array
+import importlib
+import inspect
+import json
+import re
+import sqlite3
+import sys
+import zlib
+from enum import Enum
+
+from loguru import logger
+from regexify import Pattern
+
+from precise_nlp.myio import json_value
+from precise_nlp.pattern_profiler import PROFILED_MODULES
+from precise_nlp.pattern_registry import LazyPattern
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+LEXICON_MODULES = PROFILED_MODULES + ('precise_nlp.extract.path.terms',)
+TOKEN_PATTERN = re.compile(r'\w+')
+INDEX_VERSION = 2
+MAX_ALTERNATIVES = 64  # beyond this, alternatives of a pattern are not distinguished
+
+
+def tokenize(*texts):
+    """Normalized tokens of document (as indexed)"""
+    return set(TOKEN_PATTERN.findall('\n'.join(text or '' for text in texts).lower()))
+
+
+class IncompleteIndex(ValueError):
+    """Index was not closed after indexing every document (e.g., the run building it was interrupted)"""
+
+
+# lexicon snapshot
+
+def _entries(value, entries, seen):
+    """Add term ('term:...') and pattern ('re:<flags>:...') entries found in value"""
+    if isinstance(value, str):
+        entries.add(f'term:{value}')
+    elif isinstance(value, re.Pattern):
+        entries.add(f're:{value.flags}:{value.pattern}')
+    elif isinstance(value, LazyPattern):
+        _entries(value.compile(), entries, seen)
+    elif isinstance(value, Pattern):  # regexify
+        _entries(value.pattern, entries, seen)
+        for rx in value.negates + value.requires:
+            _entries(rx[0], entries, seen)
+        for rx in value.requires_all:
+            _entries(rx, entries, seen)
+    elif isinstance(value, (Enum, bool, int, float, type(None))):
+        return
+    elif isinstance(value, (list, tuple, set, frozenset, dict)):
+        if id(value) in seen:
+            return
+        seen.add(id(value))
+        for item in (value if not isinstance(value, dict) else (x for kv in value.items() for x in kv)):
+            _entries(item, entries, seen)
+
+
+def lexicon_snapshot(modules=LEXICON_MODULES):
+    """
+    :return: dict of name (e.g., precise_nlp.extract.path.terms.OTHER_CANCER_TERMS) -> sorted entries
+        for module and class attributes holding terms or patterns
+    """
+    snapshot = {}
+    for module_name in modules:
+        module = importlib.import_module(module_name)
+        namespaces = [(module_name, module)] + [
+            (f'{module_name}.{name}', cls) for name, cls in vars(module).items()
+            if inspect.isclass(cls) and cls.__module__ == module_name
+        ]
+        for prefix, namespace in namespaces:
+            for key, value in vars(namespace).items():
+                if key.startswith('__') or inspect.isroutine(value) or inspect.isclass(value) \
+                        or inspect.ismodule(value) or isinstance(value, (property, staticmethod, classmethod)):
+                    continue
+                entries = set()
+                _entries(value, entries, set())
+                if entries:
+                    snapshot.setdefault(f'{prefix}.{key}', set()).update(entries)
+    return {name: sorted(entries) for name, entries in snapshot.items()}
+
+
+def diff_lexicon(old, new):
+    """
+    :return: dict of name -> (added entries, removed entries) for each changed name
+    """
+    changes = {}
+    for name in sorted(set(old) | set(new)):
+        before, after = set(old.get(name, ())), set(new.get(name, ()))
+        if before != after:
+            changes[name] = (sorted(after - before), sorted(before - after))
+    return changes
+
+
+# requirements of terms and patterns
+
+def _literals(parsed):
+    """
+    Alternatives of a parsed regular expression, each a list of literal strings which must all
+        occur in a match (conservative: anything not understood adds no requirement)
+    """
+    alternatives = [[]]
+    buffer = []
+
+    def flush():
+        if buffer:
+            for alternative in alternatives:
+                alternative.append(''.join(buffer))
+            buffer.clear()
+
+    def combine(options):
+        nonlocal alternatives
+        if len(alternatives) * len(options) > MAX_ALTERNATIVES:  # keep only requirements common to all
+            common = set.intersection(*(set(option) for option in options))
+            options = [sorted(common)]
+        alternatives = [alternative + option for alternative in alternatives for option in options]
+
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            buffer.append(chr(av))
+            continue
+        flush()
+        if op is sre_parse.SUBPATTERN:
+            combine(_literals(av[-1]))
+        elif op is sre_parse.BRANCH:
+            combine([option for branch in av[1] for option in _literals(branch)])
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)):
+            if av[0] >= 1:
+                combine(_literals(av[2]))
+        elif op is getattr(sre_parse, 'ATOMIC_GROUP', None):
+            combine(_literals(av))
+    flush()
+    return alternatives
+
+
+def requirements(entry):
+    """
+    :param entry: from `lexicon_snapshot`
+    :return: list of alternatives, each a list of word fragments which must all occur in a document
+        for it to be affected; None if any document might be affected
+    """
+    kind, _, value = entry.partition(':')
+    if kind == 'term':
+        alternatives = [[value]]
+    else:
+        flags, _, pattern = value.partition(':')
+        try:
+            alternatives = _literals(sre_parse.parse(pattern, int(flags)))
+        except (re.error, RecursionError) as e:
+            logger.warning(f'Unable to parse {pattern!r} ({e}): all documents may be affected.')
+            return None
+    result = []
+    for alternative in alternatives:
+        fragments = sorted({fragment for literal in alternative for fragment in tokenize(literal)})
+        if not fragments:
+            return None
+        result.append(fragments)
+    return result
+
+
+# inverted index
+
+class TokenIndexWriter:
+    """
+    Build an inverted index (token -> documents) in a SQLite database during a run
+    :param flush_size: postings held in memory before writing
+    """
+
+    def __init__(self, path, flush_size=5_000_000):
+        self.path = path
+        self.flush_size = flush_size
+        self.count = 0
+        self._postings = {}  # token -> array of document numbers
+        self._size = 0
+        self._documents = []
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        for table in ('meta', 'documents', 'postings'):
+            self._conn.execute(f'DROP TABLE IF EXISTS {table}')
+        self._conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._conn.execute('CREATE TABLE documents (doc INTEGER PRIMARY KEY, identifier TEXT, row INTEGER)')
+        self._conn.execute('CREATE TABLE postings (token TEXT, docs BLOB)')
+        self.snapshot = lexicon_snapshot()  # lexicon documents are extracted with (written on `close`)
+
+    def add(self, identifier, tokens, row=None):
+        """
+        :param tokens: from `tokenize`
+        :param row: of record in output (kept when its results are patched)
+        """
+        doc = self.count
+        self.count += 1
+        self._documents.append((doc, json.dumps(json_value(identifier)), row))
+        for token in tokens:
+            if (docs := self._postings.get(token)) is None:
+                docs = self._postings[token] = array.array('q')
+            docs.append(doc)
+        self._size += len(tokens)
+        if self._size >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        self._conn.execute('BEGIN')
+        self._conn.executemany('INSERT INTO documents VALUES (?, ?, ?)', self._documents)
+        self._conn.executemany('INSERT INTO postings VALUES (?, ?)',
+                               ((token, zlib.compress(docs.tobytes())) for token, docs in self._postings.items()))
+        self._conn.execute('COMMIT')
+        self._postings = {}
+        self._documents = []
+        self._size = 0
+
+    def close(self, complete=True):
+        """
+        :param complete: every document has been added: write lexicon snapshot (otherwise, the index is rebuilt
+            by the next run)
+        """
+        self.flush()
+        self._conn.execute('CREATE INDEX IF NOT EXISTS postings__token ON postings (token)')
+        if complete:
+            with self._conn:
+                write_lexicon(self._conn, self.snapshot)
+            logger.info(f'Indexed {self.count} documents in {self.path}.')
+        else:
+            logger.warning(f'Index {self.path} is incomplete ({self.count} documents): it will be rebuilt.')
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(complete=exc_type is None)
+
+
+def write_lexicon(conn, snapshot):
+    conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('version', str(INDEX_VERSION)))
+    conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('lexicon', json.dumps(snapshot)))
+    conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('complete', '1'))
+
+
+class TokenIndex:
+    """Look up documents in an index built by `TokenIndexWriter`"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        try:
+            meta = dict(self._conn.execute('SELECT key, value FROM meta'))
+        except sqlite3.DatabaseError:  # e.g., run building it was interrupted before creating tables
+            meta = {}
+        if 'version' in meta and meta['version'] != str(INDEX_VERSION):
+            self._conn.close()
+            raise ValueError(f'Index {path} has version {meta["version"]}; expected {INDEX_VERSION}.'
+                             f' Rebuild it with a full run.')
+        if meta.get('complete') != '1':
+            self._conn.close()
+            raise IncompleteIndex(f'Index {path} is incomplete: rebuild it with a full run.')
+        self.lexicon = json.loads(meta['lexicon'])
+        self._vocabulary = None
+        self._fragments = {}  # fragment -> documents
+
+    def __len__(self):
+        return self._conn.execute('SELECT count(*) FROM documents').fetchone()[0]
+
+    @property
+    def vocabulary(self):
+        if self._vocabulary is None:
+            self._vocabulary = [token for (token,) in self._conn.execute('SELECT DISTINCT token FROM postings')]
+        return self._vocabulary
+
+    def documents(self, fragment):
+        """Documents with a token containing fragment"""
+        if fragment not in self._fragments:
+            docs = set()
+            tokens = [token for token in self.vocabulary if fragment in token]
+            for i in range(0, len(tokens), 500):  # sqlite limit on variables
+                chunk = tokens[i:i + 500]
+                for (blob,) in self._conn.execute(
+                        f'SELECT docs FROM postings WHERE token IN ({", ".join("?" * len(chunk))})', chunk):
+                    docs.update(array.array('q', zlib.decompress(blob)))
+            self._fragments[fragment] = docs
+        return self._fragments[fragment]
+
+    def all_documents(self):
+        return {doc for (doc,) in self._conn.execute('SELECT doc FROM documents')}
+
+    def affected(self, entries):
+        """
+        :param entries: added/removed terms and patterns (see `lexicon_snapshot`)
+        :return: set of documents which might be affected
+        """
+        docs = set()
+        for entry in entries:
+            alternatives = requirements(entry)
+            if alternatives is None:
+                logger.info(f'All documents might be affected by {entry!r}.')
+                return self.all_documents()
+            for fragments in alternatives:
+                docs |= set.intersection(*(self.documents(fragment) for fragment in fragments))
+        return docs
+
+    def rows(self, docs):
+        """:return: dict of identifier -> row in output for each document"""
+        docs = sorted(docs)
+        rows = {}
+        for i in range(0, len(docs), 500):
+            chunk = docs[i:i + 500]
+            for identifier, row in self._conn.execute(
+                    f'SELECT identifier, row FROM documents WHERE doc IN ({", ".join("?" * len(chunk))})'
+                    f' ORDER BY doc', chunk):
+                rows[json.loads(identifier)] = row
+        return rows
+
+    def identifiers(self, docs):
+        return list(self.rows(docs))
+
+    def update_lexicon(self, snapshot):
+        """After re-running affected documents"""
+        with self._conn:
+            write_lexicon(self._conn, snapshot)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def affected_rows(index, snapshot=None):
+    """
+    :param index: `TokenIndex`
+    :param snapshot: current lexicon (default: `lexicon_snapshot()`)
+    :return: (dict of identifier -> output row of documents which might be affected, changes from `diff_lexicon`)
+    """
+    changes = diff_lexicon(index.lexicon, snapshot or lexicon_snapshot())
+    entries = {entry for added, removed in changes.values() for entry in added + removed}
+    return index.rows(index.affected(entries)), changes
+
+
+def affected_identifiers(index, snapshot=None):
+    """As `affected_rows`: :return: (identifiers of documents which might be affected, changes)"""
+    rows, changes = affected_rows(index, snapshot)
+    return list(rows), changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('index', help='index built by `process` with `incremental`')
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    with TokenIndex(args.index) as index:
+        identifiers, changes = affected_identifiers(index)
+        for name, (added, removed) in changes.items():
+            print(f'{name}\t+{len(added)}\t-{len(removed)}')
+        print(f'{len(identifiers)} of {len(index)} documents might be affected.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Join separate pathology and colonoscopy datasets (e.g., from different source systems) by a linkage
+    key while reading them, rather than merging them in memory first.
+
+    data:  # in config
+      filetype: join
+      path_source: {filetype: csv, path: path.csv, key: ENCOUNTER_ID, text: NOTE_TEXT}
+      cspy_source: {filetype: sas, path: cspy.sas7bdat, key: ENC_ID, text: REPORT}
+      max_join_rows: 100000  # rows of one dataset held in memory
+
+As with an outer merge, each pair of reports with the same key is a record (identified by the key),
+    as is each report without a match (path-only or colonoscopy-only). If several reports share a key,
+    only the first record with the key is identified by it: each other record is identified by
+    `<key>:<pathology report>:<colonoscopy report>`, numbering the reports with that key in each dataset
+    from 1 (e.g., `1001:1:2` for the first pathology and second colonoscopy report of key 1001).
+
+If either dataset has at most `max_join_rows` rows, it is held in memory and the other is streamed
+    past it (hash join): records are in the order of the streamed dataset, followed by unmatched rows
+    of the one in memory. Otherwise, both are sorted in runs of `max_join_rows` rows on disk and
+    merged (sort-merge join): records are in order of key.
+"""
+import heapq
+import itertools
+import pickle
+import tempfile
+
+from loguru import logger
+
+MAX_JOIN_ROWS = 100_000
+CHUNK_SIZE = 10_000  # rows read at a time
+RUN_BLOCK_SIZE = 1_000  # rows of a sorted run written/read at a time
+
+
+def _normalize(key):
+    """Keys equal across datasets: integral floats (e.g., from a column of ids with nan) to int"""
+    if isinstance(key, float) and key.is_integer():
+        key = int(key)
+    return key
+
+
+def _sort_key(row):
+    return isinstance(row[0], str), row[0]  # numbers before strings
+
+
+def read_rows(filetype, path=None, key=None, text=None, columns=(), encoding='utf8', chunk_size=CHUNK_SIZE):
+    """
+    Yield (key, text, dict of `columns` present) for each row of a dataset, reading `chunk_size` rows at a time
+    :param filetype: csv, tab/tsv, or sas (read in chunks); h5 or a DataFrame
+    :param key: column linking the pathology and colonoscopy datasets
+    :param text: column of report
+    """
+    import pandas as pd
+
+    if 'DataFrame' in str(type(filetype)):
+        chunks = (filetype.iloc[i:i + chunk_size] for i in range(0, len(filetype), chunk_size))
+    elif filetype == 'csv':
+        chunks = pd.read_csv(path, encoding=encoding, chunksize=chunk_size)
+    elif filetype == 'tab' or filetype == 'tsv':
+        chunks = pd.read_csv(path, sep='\t', encoding=encoding, chunksize=chunk_size)
+    elif filetype == 'sas':
+        chunks = pd.read_sas(path, encoding=encoding, chunksize=chunk_size)
+    elif filetype == 'h5':
+        chunks = [pd.read_hdf(path, 'data')]
+    else:
+        raise ValueError(f'Unrecognized filetype for join: {filetype}')
+    missing_keys = 0
+    for chunk in chunks:
+        present = [column for column in columns if column in chunk.columns]
+        has_key = chunk[key].notna()
+        missing_keys += len(chunk) - int(has_key.sum())
+        chunk = chunk[has_key]
+        for row_key, row_text, *values in zip(chunk[key].tolist(), chunk[text].fillna('').tolist(),
+                                              *(chunk[column].tolist() for column in present)):
+            yield _normalize(row_key), row_text, dict(zip(present, values))
+    if missing_keys:
+        logger.warning(f'Skipped {missing_keys} rows of {path} without a value for {key}.')
+
+
+def _buffer(rows, max_rows):
+    """:return: (rows read, whether all rows were read) reading at most `max_rows` + 1 rows"""
+    buffered = list(itertools.islice(rows, max_rows + 1))
+    return buffered, len(buffered) <= max_rows
+
+
+def _hash_join(streamed, in_memory, streamed_first=True):
+    """
+    Yield (key, streamed row, row in memory, ordinals) for each match, and unmatched rows with None for the
+        other side, where ordinals are of each row among rows of its dataset with the key
+    :param streamed_first: order of each pair in output; if False: (key, row in memory, streamed row, ordinals)
+    """
+    table = {}
+    for row in in_memory:
+        table.setdefault(row[0], []).append(row)
+    streamed_counts = {}  # key -> rows streamed (only keys are kept)
+    for row in streamed:
+        ordinal = streamed_counts[row[0]] = streamed_counts.get(row[0], -1) + 1
+        for match_ordinal, match in enumerate(table.get(row[0]) or [None]):
+            yield (row[0], row, match, (ordinal, match_ordinal)) if streamed_first \
+                else (row[0], match, row, (match_ordinal, ordinal))
+    for key, rows in table.items():
+        if key not in streamed_counts:
+            for ordinal, row in enumerate(rows):
+                yield (key, None, row, (0, ordinal)) if streamed_first else (key, row, None, (ordinal, 0))
+
+
+def _sorted_runs(rows, max_rows, directory):
+    """Sort rows in runs of `max_rows` written to `directory`: :return: iterator over all rows in order of key"""
+    runs = []
+    while run := list(itertools.islice(rows, max_rows)):
+        run.sort(key=_sort_key)
+        fh = tempfile.TemporaryFile(dir=directory)
+        for i in range(0, len(run), RUN_BLOCK_SIZE):
+            pickle.dump(run[i:i + RUN_BLOCK_SIZE], fh, protocol=pickle.HIGHEST_PROTOCOL)
+        fh.seek(0)
+        runs.append(_read_run(fh))
+    return heapq.merge(*runs, key=_sort_key)
+
+
+def _read_run(fh):
+    with fh:
+        while True:
+            try:
+                yield from pickle.load(fh)
+            except EOFError:
+                return
+
+
+def _merge_join(path_rows, cspy_rows):
+    """Yield (key, path row, cspy row, ordinals) from rows sorted by key (see `_hash_join`)"""
+    path_groups = itertools.groupby(path_rows, key=_sort_key)
+    cspy_groups = itertools.groupby(cspy_rows, key=_sort_key)
+    path_group = next(path_groups, None)
+    cspy_group = next(cspy_groups, None)
+    while path_group or cspy_group:
+        if cspy_group is None or path_group and path_group[0] < cspy_group[0]:
+            for ordinal, row in enumerate(path_group[1]):
+                yield row[0], row, None, (ordinal, 0)
+            path_group = next(path_groups, None)
+        elif path_group is None or cspy_group[0] < path_group[0]:
+            for ordinal, row in enumerate(cspy_group[1]):
+                yield row[0], None, row, (0, ordinal)
+            cspy_group = next(cspy_groups, None)
+        else:
+            cspy_matches = list(cspy_group[1])
+            for ordinal, row in enumerate(path_group[1]):
+                for match_ordinal, match in enumerate(cspy_matches):
+                    yield row[0], row, match, (ordinal, match_ordinal)
+            path_group = next(path_groups, None)
+            cspy_group = next(cspy_groups, None)
+
+
+def join_rows(path_rows, cspy_rows, max_rows=MAX_JOIN_ROWS, directory=None):
+    """
+    Yield (key, path row, cspy row, ordinals), with None for a missing side, from rows of (key, text, values);
+        ordinals are of the path and cspy rows among rows of their dataset with the key (0 for a missing side)
+    :param max_rows: rows of one dataset which may be held in memory (and size of each sorted run)
+    :param directory: for sorted runs (default: system temporary directory)
+    """
+    cspy_buffered, fits = _buffer(cspy_rows, max_rows)
+    if fits:
+        yield from _hash_join(path_rows, cspy_buffered)
+        return
+    path_buffered, fits = _buffer(path_rows, max_rows)
+    cspy_rows = itertools.chain(cspy_buffered, cspy_rows)
+    if fits:
+        yield from _hash_join(cspy_rows, path_buffered, streamed_first=False)
+        return
+    logger.info(f'Neither dataset fits in memory ({max_rows} rows): joining by sorting on disk.')
+    yield from _merge_join(_sorted_runs(itertools.chain(path_buffered, path_rows), max_rows, directory),
+                           _sorted_runs(cspy_rows, max_rows, directory))
+
+
+def join_sources(path_source, cspy_source, columns=(), max_rows=MAX_JOIN_ROWS, directory=None):
+    """
+    Yield (identifier, path_text, cspy_text, dict of `columns`) for each record of two datasets
+    :param path_source: dict of filetype, path, key, text, and encoding (see `read_rows`) of pathology reports
+    :param cspy_source: as `path_source`, for colonoscopy reports
+    :param columns: values to read from either dataset (e.g., truth): from pathology dataset if in both
+    """
+    rows = join_rows(read_rows(**path_source, columns=columns), read_rows(**cspy_source, columns=columns),
+                     max_rows=max_rows, directory=directory)
+    shared = 0
+    for key, path_row, cspy_row, (path_ordinal, cspy_ordinal) in rows:
+        identifier = key
+        if path_ordinal or cspy_ordinal:  # key is shared with another record
+            identifier = f'{key}:{path_ordinal + 1}:{cspy_ordinal + 1}'
+            shared += 1
+        values = {**(cspy_row[2] if cspy_row else {}), **(path_row[2] if path_row else {})}
+        yield identifier, path_row[1] if path_row else '', cspy_row[1] if cspy_row else '', values
+    if shared:
+        logger.warning(f'{shared} records share a key with an earlier record: identified as'
+                       f' <key>:<pathology report>:<colonoscopy report>.')
@@ -5,3 +5,14 @@ def fill_template(filename):
     """jinja2-like template filling"""
     filename = filename.replace('{datetime}', datetime.datetime.now().strftime('%Y%m%d_%H%M%S'))
     return filename
+
+
+def json_value(value):
+    """numpy/pandas scalars (e.g., identifiers read by pandas) to builtin types, as stored in json"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def identifier_key(identifier):
+    """Key of identifier as stored in json (so 1 and '1' are distinct)"""
+    identifier = json_value(identifier)
+    return type(identifier).__name__, identifier
@@ -0,0 +1,270 @@
+"""
+Store of parsed reports: the state of each `PathManager` (preprocessed text, specimens, and jars) and
+    `CspyManager` (sections, findings, indication, prep, and extent) after extraction, so that new
+    variables can be derived without parsing the reports again.
+
+    process(data, outfile='results.csv', store='parsed.pnlp')  # or `store: parsed.pnlp` in config
+
+    with ParsedStoreReader('parsed.pnlp') as reader:
+        for identifier, pm, cm in reader:
+            jar_locations = [jar.locations for jar in pm.manager.jars]
+            large = cm.get_findings_of_size(10)
+
+File format (version `FORMAT_VERSION`):
+    header: MAGIC, format version (2 bytes)
+    records: length (4 bytes), identifier length (2 bytes), identifier (json), payload (see `dump_parsed`)
+    footer (written on close): zlib-compressed json list of [identifier, offset], offset of footer (8 bytes), END
+Objects are stored as their attributes (classes and enums by code/name, see `CLASSES`/`ENUMS`) rather
+    than pickled, so the store does not depend on module paths and can only contain these types.
+    If the footer is missing (e.g., run stopped early), records are found by reading the file through.
+"""
+import enum
+import io
+import json
+import pickle
+import struct
+import zlib
+from collections import defaultdict
+
+from precise_nlp.const.enums import AdenomaCountMethod, Histology, Location as LocationEnum, AssertionStatus
+from precise_nlp.extract.cspy.cspy import CspyManager, FindingVersion
+from precise_nlp.extract.cspy.finding_builder import Finding, Location, FindingSource
+from precise_nlp.extract.cspy.naive_finding import NaiveFinding
+from precise_nlp.extract.cspy.single_finding import SingleFinding
+from precise_nlp.extract.maybe_counter import MaybeCounter
+from precise_nlp.extract.path.jar import Jar
+from precise_nlp.extract.path.jar_manager import JarManager
+from precise_nlp.extract.path.path_manager import PathManager
+from precise_nlp.extract.path.polyp_size import PolypSize
+from precise_nlp.extract.polarity_counter import PolarityCounter
+from precise_nlp.extract.utils import Prep, Indication, Extent
+from precise_nlp.myio import json_value, identifier_key
+
+MAGIC = b'PNLPSTORE'
+END = b'PNLPEND'
+FORMAT_VERSION = 1
+_VERSION = struct.Struct('>H')
+_LENGTH = struct.Struct('>I')
+_IDENTIFIER_LENGTH = struct.Struct('>H')
+_OFFSET = struct.Struct('>Q')
+
+# codes are the position in each tuple: only append (and increment FORMAT_VERSION if attributes change meaning)
+CLASSES = (PathManager, JarManager, Jar, PolypSize, MaybeCounter, PolarityCounter,
+           CspyManager, Finding, Location, NaiveFinding, SingleFinding)
+ENUMS = (AdenomaCountMethod, Histology, LocationEnum, AssertionStatus, FindingVersion, FindingSource,
+         Prep, Indication, Extent)
+_CLASS_CODES = {cls: i for i, cls in enumerate(CLASSES)}
+_ENUM_CODES = {cls: i for i, cls in enumerate(ENUMS)}
+_LIST, _TUPLE, _DICT, _DEFAULTDICT_LIST, _SET, _OBJECT, _ENUM = range(7)
+_PRIMITIVES = (type(None), bool, int, float, str, bytes)
+
+
+class StoreFormatError(ValueError):
+    pass
+
+
+def _attributes(obj):
+    if hasattr(obj, '__dict__'):
+        return obj.__dict__
+    return {name: getattr(obj, name) for cls in type(obj).__mro__ for name in getattr(cls, '__slots__', ())
+            if hasattr(obj, name)}
+
+
+def _encode(value):
+    """Convert to nested tuples of builtin types (containers and objects are tagged tuples)"""
+    if type(value) in _PRIMITIVES:
+        return value
+    if type(value) is list:
+        return _LIST, [_encode(v) for v in value]
+    if type(value) is tuple:
+        return _TUPLE, [_encode(v) for v in value]
+    if type(value) is defaultdict and value.default_factory is list:
+        return _DEFAULTDICT_LIST, [(_encode(k), _encode(v)) for k, v in value.items()]
+    if type(value) is dict:
+        return _DICT, [(_encode(k), _encode(v)) for k, v in value.items()]
+    if isinstance(value, (set, frozenset)):
+        return _SET, [_encode(v) for v in value]
+    if isinstance(value, enum.Enum) and type(value) in _ENUM_CODES:
+        return _ENUM, _ENUM_CODES[type(value)], value.name
+    if type(value) in _CLASS_CODES:
+        return _OBJECT, _CLASS_CODES[type(value)], {k: _encode(v) for k, v in _attributes(value).items()}
+    raise TypeError(f'Unable to store {type(value).__name__}: add to `CLASSES` or `ENUMS` in {__name__}.')
+
+
+def _decode(value):
+    if type(value) is not tuple:
+        return value
+    tag = value[0]
+    if tag == _LIST:
+        return [_decode(v) for v in value[1]]
+    if tag == _TUPLE:
+        return tuple(_decode(v) for v in value[1])
+    if tag == _DICT:
+        return {_decode(k): _decode(v) for k, v in value[1]}
+    if tag == _DEFAULTDICT_LIST:
+        return defaultdict(list, ((_decode(k), _decode(v)) for k, v in value[1]))
+    if tag == _SET:
+        return {_decode(v) for v in value[1]}
+    if tag == _ENUM:
+        return ENUMS[value[1]][value[2]]
+    if tag == _OBJECT:
+        cls = CLASSES[value[1]]
+        obj = cls.__new__(cls)
+        for name, attribute in value[2].items():  # includes cached properties (e.g., `CspyManager._findings`)
+            object.__setattr__(obj, name, _decode(attribute))
+        return obj
+    raise StoreFormatError(f'Unrecognized tag: {tag}')
+
+
+class _BuiltinsUnpickler(pickle.Unpickler):
+    """Payloads only contain builtin types: refuse to load anything else"""
+
+    def find_class(self, module, name):
+        raise StoreFormatError(f'Unexpected object in store: {module}.{name}')
+
+
+def dump_parsed(pm: PathManager = None, cm: CspyManager = None):
+    """
+    Serialize the parsed state of a document (computing any outputs not yet accessed)
+    :return: compressed bytes (run in worker, if parallel)
+    """
+    if pm and not pm._jars_read:
+        pm._read_jars()
+    if cm:
+        for name in ('_section_index', '_findings', 'num_polyps', '_indication', '_prep', '_extent'):
+            getattr(cm, name)
+    return zlib.compress(pickle.dumps((_encode(pm), _encode(cm)), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def load_parsed(payload):
+    """
+    :return: (PathManager, CspyManager) as when stored, without reparsing
+    """
+    pm, cm = _BuiltinsUnpickler(io.BytesIO(zlib.decompress(payload))).load()
+    return _decode(pm), _decode(cm)
+
+
+class ParsedStoreWriter:
+    """Append parsed documents to a new store (not thread-safe: write from the thread running `process`)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._index = []  # (identifier, offset)
+        self._fh = open(path, 'wb')
+        self._fh.write(MAGIC + _VERSION.pack(FORMAT_VERSION))
+
+    def write(self, identifier, payload):
+        """
+        :param payload: output of `dump_parsed`
+        """
+        identifier = json.dumps(json_value(identifier)).encode('utf8')
+        self._index.append((identifier, self._fh.tell()))
+        self._fh.write(_LENGTH.pack(_IDENTIFIER_LENGTH.size + len(identifier) + len(payload))
+                       + _IDENTIFIER_LENGTH.pack(len(identifier)) + identifier + payload)
+        self.count += 1
+
+    def add(self, identifier, pm=None, cm=None):
+        self.write(identifier, dump_parsed(pm, cm))
+
+    def close(self):
+        if self._fh.closed:
+            return
+        offset = self._fh.tell()
+        index = b'[' + b','.join(b'[%s,%d]' % (identifier, position) for identifier, position in self._index) + b']'
+        self._fh.write(zlib.compress(index) + _OFFSET.pack(offset) + END)
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ParsedStoreReader:
+    """
+    Iterate over (identifier, PathManager, CspyManager), or look up a record by identifier
+    :raises StoreFormatError: if not a store or written with a different `FORMAT_VERSION`
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, 'rb')
+        header = self._fh.read(len(MAGIC) + _VERSION.size)
+        if not header.startswith(MAGIC) or len(header) < len(MAGIC) + _VERSION.size:
+            self._fh.close()
+            raise StoreFormatError(f'Not a parsed store: {path}')
+        (version,) = _VERSION.unpack(header[len(MAGIC):])
+        if version != FORMAT_VERSION:
+            self._fh.close()
+            raise StoreFormatError(f'Store {path} has format version {version}; expected {FORMAT_VERSION}.'
+                                   f' Re-run `process` with this version to rebuild it.')
+        self._end = None  # end of records
+        self._index = self._read_footer()
+
+    def _read_footer(self):
+        """identifier -> offset (by reading through the records if there is no footer)"""
+        self._fh.seek(0, io.SEEK_END)
+        size = self._fh.tell()
+        if size >= len(MAGIC) + _VERSION.size + _OFFSET.size + len(END):
+            self._fh.seek(size - _OFFSET.size - len(END))
+            tail = self._fh.read()
+            if tail.endswith(END):
+                (self._end,) = _OFFSET.unpack(tail[:_OFFSET.size])
+                self._fh.seek(self._end)
+                index = json.loads(zlib.decompress(self._fh.read(size - _OFFSET.size - len(END) - self._end)))
+                return {identifier_key(identifier): offset for identifier, offset in index}
+        self._end = size
+        return {identifier_key(identifier): offset for identifier, offset, _ in self._records()}
+
+    def _records(self):
+        """Yield (identifier, offset, payload) in order written (stopping at any incomplete final record)"""
+        offset = len(MAGIC) + _VERSION.size
+        while offset + _LENGTH.size <= self._end:
+            self._fh.seek(offset)
+            (length,) = _LENGTH.unpack(self._fh.read(_LENGTH.size))
+            data = self._fh.read(length)
+            if len(data) < length or offset + _LENGTH.size + length > self._end:
+                break
+            yield self._split(data, offset)
+            offset += _LENGTH.size + length
+
+    @staticmethod
+    def _split(data, offset):
+        (length,) = _IDENTIFIER_LENGTH.unpack(data[:_IDENTIFIER_LENGTH.size])
+        start = _IDENTIFIER_LENGTH.size
+        return json.loads(data[start:start + length]), offset, data[start + length:]
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, identifier):
+        return identifier_key(identifier) in self._index
+
+    def __iter__(self):
+        for identifier, _, payload in self._records():
+            pm, cm = load_parsed(payload)
+            yield identifier, pm, cm
+
+    def identifiers(self):
+        return [identifier for _, identifier in self._index]
+
+    def get(self, identifier):
+        """
+        :return: (PathManager, CspyManager)
+        :raises KeyError: if identifier not in store
+        """
+        offset = self._index[identifier_key(identifier)]
+        self._fh.seek(offset)
+        (length,) = _LENGTH.unpack(self._fh.read(_LENGTH.size))
+        return load_parsed(self._split(self._fh.read(length), offset)[2])
+
+    def close(self):
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
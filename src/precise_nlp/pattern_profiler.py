@@ -0,0 +1,304 @@
+"""
+Opt-in profiling of the regular expressions used by the extractors.
+
+While enabled, every compiled pattern reachable from `PROFILED_MODULES` (module globals,
+    class attributes, containers like `FINDING_PATTERNS`, and the compiled expressions
+    inside `regexify.Pattern`) is swapped for a proxy recording calls, matches, and time.
+
+    with PatternProfiler() as profiler:
+        process_text(path_text, cspy_text)
+    profiler.write_report('patterns.csv')
+"""
+import csv
+import importlib
+import inspect
+import re
+import time
+
+from loguru import logger
+from regexify import Pattern
+
+from precise_nlp.pattern_registry import LazyPattern
+
+# modules which define (or re-bind) patterns: defining modules first so they name the pattern
+PROFILED_MODULES = (
+    'precise_nlp.const.patterns',
+    'precise_nlp.extract.utils',
+    'precise_nlp.extract.cspy.polyps',
+    'precise_nlp.extract.cspy.finding_builder',
+    'precise_nlp.extract.cspy.finding_patterns',
+    'precise_nlp.extract.cspy.base_finding',
+    'precise_nlp.extract.cspy.cspy',
+    'precise_nlp.extract.path.path_word',
+    'precise_nlp.extract.path.path_section',
+    'precise_nlp.extract.path.polyp_size',
+    'precise_nlp.extract.path.jar',
+    'precise_nlp.extract.path.jar_manager',
+    'precise_nlp.extract.path.path_manager',
+    'precise_nlp.extract.algorithm',
+    'precise_nlp.doc_parser',
+    'precise_nlp.preprocess.cspy_ocr',
+)
+
+REPORT_FIELDS = ['name', 'calls', 'matches', 'total_time', 'mean_time', 'worst_time', 'worst_sample', 'pattern']
+
+
+class PatternStats:
+    SAMPLE_LENGTH = 100  # characters of input retained for the slowest call
+
+    def __init__(self, name, pattern):
+        self.name = name
+        self.pattern = pattern
+        self.calls = 0
+        self.matches = 0
+        self.total_time = 0.0
+        self.worst_time = 0.0
+        self.worst_sample = ''
+
+    def record(self, elapsed, matches, text):
+        self.calls += 1
+        self.matches += matches
+        self.total_time += elapsed
+        if elapsed > self.worst_time:
+            self.worst_time = elapsed
+            self.worst_sample = str(text)[:self.SAMPLE_LENGTH]
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.calls if self.calls else 0.0
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in REPORT_FIELDS}
+
+
+class ProfiledRegex:
+    """Stand-in for a compiled `re.Pattern` which records the cost of each call"""
+
+    def __init__(self, regex: re.Pattern, stats: PatternStats):
+        self.regex = regex
+        self.stats = stats
+
+    def __getattr__(self, name):  # e.g., pattern, flags, groupindex
+        return getattr(self.regex, name)
+
+    def __repr__(self):
+        return f'ProfiledRegex({self.regex!r})'
+
+    def _timed(self, func, string, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(string, *args, **kwargs)
+        self.stats.record(time.perf_counter() - start, 1 if result else 0, string)
+        return result
+
+    def search(self, string, *args, **kwargs):
+        return self._timed(self.regex.search, string, *args, **kwargs)
+
+    def match(self, string, *args, **kwargs):
+        return self._timed(self.regex.match, string, *args, **kwargs)
+
+    def fullmatch(self, string, *args, **kwargs):
+        return self._timed(self.regex.fullmatch, string, *args, **kwargs)
+
+    def findall(self, string, *args, **kwargs):
+        start = time.perf_counter()
+        result = self.regex.findall(string, *args, **kwargs)
+        self.stats.record(time.perf_counter() - start, len(result), string)
+        return result
+
+    def split(self, string, maxsplit=0):
+        start = time.perf_counter()
+        result = self.regex.split(string, maxsplit)
+        self.stats.record(time.perf_counter() - start, (len(result) - 1) // (self.regex.groups + 1), string)
+        return result
+
+    def subn(self, repl, string, count=0):
+        start = time.perf_counter()
+        result = self.regex.subn(repl, string, count)
+        self.stats.record(time.perf_counter() - start, result[1], string)
+        return result
+
+    def sub(self, repl, string, count=0):
+        return self.subn(repl, string, count)[0]
+
+    def finditer(self, string, *args, **kwargs):
+        """Time spent producing matches is recorded as a single call once iteration stops"""
+        elapsed = 0.0
+        matches = 0
+        it = self.regex.finditer(string, *args, **kwargs)
+        try:
+            while True:
+                start = time.perf_counter()
+                m = next(it, None)
+                elapsed += time.perf_counter() - start
+                if m is None:
+                    return
+                matches += 1
+                yield m
+        finally:
+            self.stats.record(elapsed, matches, string)
+
+
+class PatternProfiler:
+    """
+    Registry of profiled patterns. Patterns are only wrapped between `enable` and `disable`,
+        so there is no overhead unless profiling was requested.
+
+    Not thread-safe: enable/disable outside of any worker threads; stats are updated without
+        a lock, so are approximate when threads share the profiled patterns.
+    """
+
+    def __init__(self, modules=PROFILED_MODULES):
+        self.modules = modules
+        self.stats = {}  # name -> PatternStats
+        self._proxies = {}  # id(re.Pattern) -> ProfiledRegex
+        self._wrapped = set()  # id(regexify.Pattern)
+        self._undo = []  # callables reverting each replacement
+        self.enabled = False
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disable()
+
+    def enable(self):
+        if self.enabled:
+            return
+        for module_name in self.modules:
+            module = importlib.import_module(module_name)
+            self._wrap_namespace(module, module_name)
+            for name, cls in vars(module).items():
+                if inspect.isclass(cls) and cls.__module__ == module_name:
+                    self._wrap_namespace(cls, f'{module_name}.{name}')
+        self.enabled = True
+        logger.info(f'Profiling {len(self.stats)} patterns.')
+
+    def disable(self):
+        while self._undo:
+            self._undo.pop()()
+        self._proxies.clear()
+        self._wrapped.clear()
+        self.enabled = False
+
+    def patterns(self):
+        """
+        :return: dict of name -> compiled pattern for each wrapped pattern (must be enabled)
+        """
+        return {proxy.stats.name: proxy.regex for proxy in self._proxies.values()}
+
+    def _replace(self, setter, original, proxy):
+        setter(proxy)
+        self._undo.append(lambda: setter(original))
+
+    def _proxy(self, regex, name):
+        if id(regex) not in self._proxies:
+            if name not in self.stats:
+                self.stats[name] = PatternStats(name, regex.pattern)
+            self._proxies[id(regex)] = ProfiledRegex(regex, self.stats[name])
+        return self._proxies[id(regex)]
+
+    def _wrap_namespace(self, owner, prefix):
+        for key, value in list(vars(owner).items()):
+            name = f'{prefix}.{key}'
+            if inspect.isfunction(value):
+                if value.__defaults__:
+                    self._wrap_defaults(value, name)
+            elif key.startswith('__'):  # e.g., __builtins__
+                continue
+            elif isinstance(value, re.Pattern):
+                self._replace(lambda v, k=key: setattr(owner, k, v), value, self._proxy(value, name))
+            else:
+                self._wrap_value(value, name)
+
+    def _wrap_defaults(self, func, name):
+        """Patterns bound as default arguments (e.g., `IndicationCueIndex(fallback=...)`)"""
+        defaults = func.__defaults__
+        wrapped = tuple(self._proxy(x, f'{name}.defaults[{i}]') if isinstance(x, re.Pattern) else x
+                        for i, x in enumerate(defaults))
+        for i, x in enumerate(defaults):
+            self._wrap_value(x, f'{name}.defaults[{i}]')
+        if wrapped != defaults:
+            self._replace(lambda v: setattr(func, '__defaults__', v), defaults, wrapped)
+
+    def _wrap_value(self, value, name):
+        """Wrap patterns held by a container, `LazyPattern`, or `regexify.Pattern` in place"""
+        if isinstance(value, LazyPattern):
+            self._wrap_lazy(value, name)
+        elif isinstance(value, Pattern):
+            self._wrap_regexify(value, name)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                self._wrap_item(value, key, item, f'{name}[{key}]')
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                self._wrap_item(value, i, item, f'{name}[{self._label(item, i)}]')
+        elif isinstance(value, tuple):  # immutable: only patterns wrapped in place (lazy, regexify)
+            for i, item in enumerate(value):
+                for x in (item if isinstance(item, tuple) else (item,)):
+                    if isinstance(x, (LazyPattern, Pattern)):
+                        self._wrap_value(x, f'{name}[{self._label(item, i)}]')
+
+    @staticmethod
+    def _label(item, index):
+        if isinstance(item, tuple):  # e.g., StandardTerminology.LOCATION_REGEX: (term, location, pattern)
+            return next((x for x in item if isinstance(x, str)), index)
+        return index
+
+    def _wrap_item(self, container, key, item, name):
+        def setter(v):
+            container[key] = v
+
+        if isinstance(item, re.Pattern):
+            self._replace(setter, item, self._proxy(item, name))
+        elif isinstance(item, (LazyPattern, Pattern)):
+            self._wrap_value(item, name)
+        elif isinstance(item, tuple):
+            for x in item:
+                if isinstance(x, LazyPattern):  # wrapped in place
+                    self._wrap_lazy(x, name)
+            if any(isinstance(x, re.Pattern) for x in item):
+                wrapped = tuple(self._proxy(x, name) if isinstance(x, re.Pattern) else x for x in item)
+                self._replace(setter, item, wrapped)
+
+    def _wrap_lazy(self, lazy: LazyPattern, name):
+        """Compile (if needed) and wrap in place, so every reference to `lazy` is profiled"""
+        compiled = lazy.compile()
+        if isinstance(compiled, Pattern):
+            self._wrap_regexify(compiled, name)
+        elif isinstance(compiled, re.Pattern):  # otherwise, already wrapped under another name
+            self._replace(lazy.set, compiled, self._proxy(compiled, name))
+
+    def _wrap_regexify(self, pattern: Pattern, name):
+        if id(pattern) in self._wrapped:
+            return
+        self._wrapped.add(id(pattern))
+        self._replace(lambda v: setattr(pattern, 'pattern', v), pattern.pattern, self._proxy(pattern.pattern, name))
+        for attr in ('negates', 'requires'):
+            original = getattr(pattern, attr)
+            wrapped = [(self._proxy(rx, f'{name}.{attr}[{i}]'), direction)
+                       for i, (rx, direction) in enumerate(original)]
+            self._replace(lambda v, a=attr: setattr(pattern, a, v), original, wrapped)
+        original = pattern.requires_all
+        wrapped = [self._proxy(rx, f'{name}.requires_all[{i}]') for i, rx in enumerate(original)]
+        self._replace(lambda v: setattr(pattern, 'requires_all', v), original, wrapped)
+
+    def report(self, sort_by='total_time', include_unused=True):
+        """
+        :param sort_by: field from `REPORT_FIELDS` to sort by (descending)
+        :param include_unused: include patterns which were never called
+        :return: list of dicts, one per pattern
+        """
+        rows = [s.to_dict() for s in self.stats.values() if include_unused or s.calls]
+        return sorted(rows, key=lambda row: row[sort_by], reverse=sort_by not in {'name', 'pattern'})
+
+    def write_report(self, outfile, sort_by='total_time', include_unused=True):
+        rows = self.report(sort_by=sort_by, include_unused=include_unused)
+        with open(outfile, 'w', newline='', encoding='utf8') as fh:
+            writer = csv.DictWriter(fh, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        for row in rows[:10]:
+            logger.info(f'Pattern {row["name"]}: {row["calls"]} calls, {row["total_time"]:.4f}s'
+                        f' (worst: {row["worst_time"]:.4f}s)')
+        logger.info(f'Wrote pattern profile to {outfile}')
@@ -0,0 +1,87 @@
+"""
+Registry of patterns which are declared at import time, but only compiled on first use.
+
+    TITLE_PATTERN = lazy_compile(r'[A-Z]+:')  # re.compile
+    INDICATION = lazy_pattern(r'screening', negates=[r'history'])  # regexify.Pattern
+
+To pay the cost up front instead (e.g., before forking workers), call `compile_all`.
+"""
+import re
+import threading
+
+from regexify import Pattern
+
+_REGISTRY = []
+_COMPILE_LOCK = threading.Lock()
+
+
+class LazyPattern:
+    """
+    Stand-in for a compiled pattern (`re.Pattern` or `regexify.Pattern`), compiled on first use.
+
+    Thread-safe: compilation is locked, so all threads share one compiled pattern.
+        (`regexify.Pattern.match_count` is incremented without a lock, so is approximate under threads.)
+    """
+
+    def __init__(self, factory, *args, **kwargs):
+        self._factory = factory
+        self._args = args
+        self._kwargs = kwargs
+        self._compiled = None
+        _REGISTRY.append(self)
+
+    @property
+    def compiled(self):
+        return self._compiled is not None
+
+    def compile(self):
+        if self._compiled is None:
+            with _COMPILE_LOCK:
+                if self._compiled is None:
+                    self._compiled = self._factory(*self._args, **self._kwargs)
+        return self._compiled
+
+    def set(self, compiled):
+        """Replace compiled pattern (e.g., with a profiling proxy)"""
+        for name in [name for name in vars(self) if not name.startswith('_')]:
+            del self.__dict__[name]  # remove cached methods
+        self._compiled = compiled
+
+    def __getattr__(self, name):
+        if name.startswith('_'):  # avoid recursion while unpickling
+            raise AttributeError(name)
+        value = getattr(self.compile(), name)
+        if callable(value):
+            self.__dict__[name] = value  # cache bound methods: later lookups skip `__getattr__`
+        return value
+
+    def __str__(self):
+        return str(self.compile())
+
+    def __repr__(self):
+        return f'LazyPattern({self.compile()!r})'
+
+
+def lazy_compile(pattern, flags=0):
+    return LazyPattern(re.compile, pattern, flags)
+
+
+def lazy_pattern(pattern, **kwargs):
+    return LazyPattern(Pattern, pattern, **kwargs)
+
+
+def compile_all():
+    """
+    Compile all registered patterns
+    :return: number of patterns compiled
+    """
+    count = 0
+    for lazy in _REGISTRY:
+        if not lazy.compiled:
+            lazy.compile()
+            count += 1
+    return count
+
+
+def registered_patterns():
+    return list(_REGISTRY)
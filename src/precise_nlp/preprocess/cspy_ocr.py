@@ -1,12 +1,22 @@
+import bisect
 import re
 
 from loguru import logger
 
+from precise_nlp.const.patterns import INDICATION_DIAGNOSTIC, INDICATION_SURVEILLANCE, INDICATION_SCREENING
 from precise_nlp.extract.cspy import CspyManager
 from precise_nlp.extract.utils import Indication
+from precise_nlp.pattern_registry import lazy_compile
+
+INDICATION_HEADER_PATTERN = lazy_compile(r'indications?:', re.I)
+END_OF_INDICATION_PATTERN = lazy_compile('(limitations|complications)', re.I)
+DIVERTICULAR_PATTERN = CspyManager.DIVERTICULAR_PATTERN
+# same order as `CspyManager.get_indications_from_text_debug`
+INDICATION_CUES = (INDICATION_DIAGNOSTIC, INDICATION_SURVEILLANCE, INDICATION_SCREENING)
 
 
 def fix_ocr_problems(cspy_text):
+    # outputs are lazy: only the section index and indication are computed
     cspy = CspyManager(cspy_text)
     try:
         if new_text := column_separated_indications(cspy, cspy_text):
@@ -17,6 +27,62 @@ def fix_ocr_problems(cspy_text):
     return cspy_text
 
 
+class IndicationCueIndex:
+    """
+    Spans of all indication cues (and their negations) in a text, found in a single scan.
+
+    Stands in for repeatedly calling `CspyManager.get_indications_from_text_debug` on
+        a sliding window: a window only needs to look up the first span beginning inside it.
+    """
+
+    def __init__(self, text, cues=INDICATION_CUES, fallback=DIVERTICULAR_PATTERN):
+        self.text = text
+        self.cues = []  # (cue, negations) for each cue in priority order
+        for cue in cues:
+            self.cues.append((
+                self._index(cue.pattern),
+                [self._index(negate) for negate, _ in cue.negates],
+            ))
+        self.fallback = self._index(fallback)
+
+    def _index(self, pat):
+        return pat, [(m.start(), m.end()) for m in pat.finditer(self.text)]
+
+    def _first_in_window(self, index, start, end):
+        """End offset of first match of indexed pattern in [start, end) or None"""
+        pat, spans = index
+        i = bisect.bisect_left(spans, (start,))
+        if i == len(spans) or spans[i][0] >= end:
+            return None
+        if spans[i][1] <= end:
+            return spans[i][1]
+        # match crosses window boundary: check if truncated text still matches
+        if m := pat.search(self.text, spans[i][0], end):
+            return m.end()
+        return None
+
+    def search(self, start, end):
+        """
+        Return the end offset of the first non-negated cue within the window [start, end)
+            or None if no cue was found.
+        """
+        for cue, negations in self.cues:
+            if (match_end := self._first_in_window(cue, start, end)) is not None:
+                if any(self._first_in_window(negation, start, end) is not None for negation in negations):
+                    continue  # negation anywhere in window
+                return match_end
+        return self._first_in_window(self.fallback, start, end)
+
+    def indication_end(self, window=50):
+        """Follow consecutive cues (each within `window` characters) to find end of indication text"""
+        curr_index = 0
+        while (end := self.search(curr_index, curr_index + window)) is not None:
+            if end == curr_index:  # zero-width match: avoid looping forever
+                break
+            curr_index = end
+        return curr_index
+
+
 def column_separated_indications(cspy: CspyManager, cspy_text: str):
     """
     OCR software occasionally reads top-down before left-to-right.
@@ -32,20 +98,14 @@ def column_separated_indications(cspy: CspyManager, cspy_text: str):
     ind = cspy.get_indication()
     if ind != Indication.UNKNOWN or ''.join(cspy._get_section(cspy.INDICATIONS)).strip():
         return None
-    indication_match = re.search(r'indications?:', cspy_text, re.I)
+    indication_match = INDICATION_HEADER_PATTERN.search(cspy_text)
     if not indication_match:
         raise ValueError(f'Missing indication section!')
-    pat = re.compile('(limitations|complications)', re.I)
-    for findings in list(cspy._get_section(cspy.FINDINGS)):
-        if m := pat.search(findings[:100]):
+    for findings in cspy._get_section(cspy.FINDINGS):
+        if m := END_OF_INDICATION_PATTERN.search(findings, 0, 100):
             curr_index = m.start()
-        else:  # use a moving 50 character window to guess where indication section is based on regexes
-            curr_index = 0
-            while m := cspy.get_indications_from_text_debug(findings[curr_index:curr_index + 50]):
-                ind, m = m
-                if not m:
-                    break
-                curr_index += m.end()
+        else:  # follow indication cues (each within 50 characters) to guess end of indication section
+            curr_index = IndicationCueIndex(findings).indication_end(window=50)
         if curr_index > 0:
             new_text = ' '.join((
                 cspy_text[:indication_match.end()],
@@ -1,29 +1,33 @@
+import contextlib
 import csv
+import functools
+import gc
+import importlib.util
 import json
 import random
 import sys
+import traceback
 import warnings
 
+from precise_nlp.corpus import Corpus, read_slice
+from precise_nlp.file_reader import read_text, read_serially, lookup_entries, scan_directory, strip_compression, \
+    prefetch_reader
 from precise_nlp.myio import fill_template
+from precise_nlp.pattern_profiler import PatternProfiler
+from precise_nlp.quarantine import Quarantine, read_quarantine, text_hash, ERROR
+from precise_nlp.sqlite_writer import SqliteWriter, is_sqlite
+from precise_nlp.time_budget import time_limit, TimeBudgetExceeded
+from precise_nlp.triage import document_cues, frame_cues, extract_triaged, triaged, sampled, differences
+from precise_nlp.worker import worker_executor, map_ordered, WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
 from precise_nlp.preprocess.cspy_ocr import fix_ocr_problems
 
-try:
-    import pandas as pd
-
-    PANDAS = True
-except ModuleNotFoundError:
-    PANDAS = False
-
 import os
 
-try:
-    import yaml
-
-    YAML = True
-except ModuleNotFoundError:
-    YAML = False
 from collections import defaultdict, Counter
-from jsonschema import validate
+
+# slow to import: only loaded when reading data (`get_data`) or a config file (`process_config`)
+PANDAS = importlib.util.find_spec('pandas') is not None
+YAML = importlib.util.find_spec('yaml') is not None
 
 from precise_nlp.const.cspy import INDICATION, BOWEL_PREP, EXTENT, NUM_POLYPS
 from precise_nlp.const.path import HIGHGRADE_DYSPLASIA, ANY_VILLOUS, VILLOUS, TUBULAR, TUBULOVILLOUS, \
@@ -40,12 +44,14 @@ from precise_nlp.extract.algorithm import get_adenoma_status, get_adenoma_histol
     get_adenoma_count, has_large_adenoma, get_adenoma_count_advanced, get_adenoma_distal, get_adenoma_proximal, \
     get_adenoma_rectal, get_adenoma_unknown, get_villous_histology, get_dysplasia, get_sessile_serrated_adenoma, \
     get_carcinomas, get_carcinomas_maybe, get_carcinomas_in_situ, get_carcinomas_in_situ_maybe, \
-    get_carcinomas_in_situ_possible, get_carcinomas_possible
+    get_carcinomas_in_situ_possible, get_carcinomas_possible, get_adenoma_histology_simple
 from precise_nlp.extract.cspy.cspy import CspyManager, FindingVersion
 from precise_nlp.extract.path.path_manager import PathManager
 from precise_nlp.extract.maybe_counter import MaybeCounter
 from loguru import logger
 
+MAX_SECTION_LENGTH = 1000  # characters per section when document exceeds time budget
+
 ITEMS = [
     ADENOMA_STATUS,
     TUBULAR,
@@ -104,42 +110,121 @@ def split_maybe_counters(data):
 
 
 def process_text(path_text='', cspy_text='',
-                 cspy_finding_version=FindingVersion.PRECISE, cspy_extent_search_all=False):
+                 cspy_finding_version=FindingVersion.PRECISE, cspy_extent_search_all=False,
+                 time_budget=None, max_section_length=MAX_SECTION_LENGTH, overruns=None, parsed=None, cues=None):
+    """
+    :param time_budget: seconds allowed per document; on overrun, retry with `process_text_degraded`
+    :param max_section_length: length of each section when retrying with `process_text_degraded`
+    :param overruns: if list supplied, a record of each overrun (strategy, pattern, location) is appended
+    :param parsed: if list supplied, the (PathManager, CspyManager) are appended (not if degraded)
+    :param cues: (pathology, colonoscopy) report contains triage cues: skip parsing reports without them
+        (see `precise_nlp.triage`)
+    """
+    if not time_budget:
+        return _process_text(path_text, cspy_text, cspy_finding_version, cspy_extent_search_all, parsed=parsed,
+                             cues=cues)
+    for strategy, func, kwargs in [
+        ('full', _process_text, {'cspy_finding_version': cspy_finding_version, 'parsed': parsed, 'cues': cues}),
+        ('degraded', process_text_degraded, {'max_section_length': max_section_length}),
+    ]:
+        try:
+            with time_limit(time_budget):
+                return func(path_text, cspy_text, cspy_extent_search_all=cspy_extent_search_all, **kwargs)
+        except TimeBudgetExceeded as e:
+            logger.warning(f'{e} (strategy: {strategy})')
+            if overruns is not None:
+                overruns.append({'strategy': strategy, 'pattern': e.pattern, 'location': e.location})
+    return {}
+
+
+def cap_sections(text, max_length=MAX_SECTION_LENGTH):
+    """Truncate each line (section) to `max_length` characters"""
+    return '\n'.join(line[:max_length] for line in text.split('\n'))
+
+
+def process_text_degraded(path_text='', cspy_text='', cspy_extent_search_all=False,
+                          max_section_length=MAX_SECTION_LENGTH):
+    """
+    Fallback for documents exceeding their time budget: only the simple algorithms are run
+        on length-capped sections. Colonoscopy findings (e.g., number of polyps) are omitted.
+    """
+    data = {}
+    if path_text:
+        specs, _, _ = PathManager.parse_jars(cap_sections(path_text, max_section_length))
+        tb, tbv, vl = get_adenoma_histology_simple(specs)
+        data.update({
+            ADENOMA_STATUS: get_adenoma_status(specs),
+            TUBULAR: tb,
+            TUBULOVILLOUS: bool(tbv),
+            VILLOUS: bool(vl),
+            SIMPLE_HIGHGRADE_DYSPLASIA: get_highgrade_dysplasia(specs),
+            ADENOMA_COUNT: get_adenoma_count(specs),
+        })
+    cm = CspyManager(cap_sections(cspy_text, max_section_length), cspy_extent_search_all=cspy_extent_search_all)
+    if cm:
+        data.update({
+            INDICATION: cm.indication,
+            BOWEL_PREP: cm.prep,
+            EXTENT: cm.extent,
+        })
+    return data
+
+
+def _process_text(path_text='', cspy_text='',
+                  cspy_finding_version=FindingVersion.PRECISE, cspy_extent_search_all=False, parsed=None, cues=None):
+    if cues and parsed is None:  # stored documents are fully parsed
+        if (data := extract_triaged(path_text, cspy_text, cues, cspy_finding_version,
+                                    cspy_extent_search_all)) is not None:
+            return data
     pm = PathManager(path_text)
     cm = CspyManager(cspy_text, version=cspy_finding_version, cspy_extent_search_all=cspy_extent_search_all)
+    if parsed is not None:
+        parsed.append((pm, cm))
+    return extract_variables(pm, cm, cspy_finding_version=cspy_finding_version)
+
+
+def extract_variables(pm: PathManager, cm: CspyManager, cspy_finding_version=FindingVersion.PRECISE,
+                      greater_than=2, min_size=10, allow_maybe=False, bins=(3,)):
+    """
+    Variables from parsed documents (see `precise_nlp.sweep` to vary the parameters)
+    :param greater_than: cutoff for adenoma counts (e.g., `get_adenoma_count_advanced`)
+    :param min_size: size of large adenoma (`has_large_adenoma`)
+    :param allow_maybe: include villous histology without certain location (`get_villous_histology`)
+    :param bins: bins of `get_adenoma_count`
+    """
     data = {}
     if pm:
-        specs, specs_combined, specs_dict = PathManager.parse_jars(path_text)
+        specs = pm.specs
         tb, tbv, vl = get_adenoma_histology(pm)
         # count
-        adenoma_cutoff, adenoma_status, adenoma_count = get_adenoma_count_advanced(pm)
-        _, _, jar_adenoma_count = get_adenoma_count_advanced(pm, jar_count=True)
+        adenoma_cutoff, adenoma_status, adenoma_count = get_adenoma_count_advanced(pm, greater_than)
+        _, _, jar_adenoma_count = get_adenoma_count_advanced(pm, greater_than, jar_count=True)
         # distal
-        aden_dist_cutoff, aden_dist_status, aden_dist_count = get_adenoma_distal(pm)
-        _, _, jar_ad_cnt_dist = get_adenoma_distal(pm, jar_count=True)
+        aden_dist_cutoff, aden_dist_status, aden_dist_count = get_adenoma_distal(pm, greater_than)
+        _, _, jar_ad_cnt_dist = get_adenoma_distal(pm, greater_than, jar_count=True)
         # proximal
-        aden_prox_cutoff, aden_prox_status, aden_prox_count = get_adenoma_proximal(pm)
-        _, _, jar_ad_cnt_prox = get_adenoma_proximal(pm, jar_count=True)
+        aden_prox_cutoff, aden_prox_status, aden_prox_count = get_adenoma_proximal(pm, greater_than)
+        _, _, jar_ad_cnt_prox = get_adenoma_proximal(pm, greater_than, jar_count=True)
         # rectal
-        aden_rect_cutoff, aden_rect_status, aden_rect_count = get_adenoma_rectal(pm)
-        _, _, jar_ad_cnt_rect = get_adenoma_rectal(pm, jar_count=True)
+        aden_rect_cutoff, aden_rect_status, aden_rect_count = get_adenoma_rectal(pm, greater_than)
+        _, _, jar_ad_cnt_rect = get_adenoma_rectal(pm, greater_than, jar_count=True)
         # unk
-        aden_unk_cutoff, aden_unk_status, aden_unk_count = get_adenoma_unknown(pm)
-        _, _, jar_ad_cnt_unk = get_adenoma_unknown(pm, jar_count=True)
+        aden_unk_cutoff, aden_unk_status, aden_unk_count = get_adenoma_unknown(pm, greater_than)
+        _, _, jar_ad_cnt_unk = get_adenoma_unknown(pm, greater_than, jar_count=True)
         data.update({
             ADENOMA_STATUS: get_adenoma_status(specs),
             TUBULAR: tb,
             TUBULOVILLOUS: bool(tbv),
             VILLOUS: bool(vl),
-            ANY_VILLOUS: get_villous_histology(pm),
-            PROXIMAL_VILLOUS: get_villous_histology(pm, Location.PROXIMAL),
-            DISTAL_VILLOUS: get_villous_histology(pm, Location.DISTAL),
-            RECTAL_VILLOUS: get_villous_histology(pm, Location.RECTAL),
-            UNKNOWN_VILLOUS: get_villous_histology(pm, Location.UNKNOWN),
+            ANY_VILLOUS: get_villous_histology(pm, allow_maybe=allow_maybe),
+            PROXIMAL_VILLOUS: get_villous_histology(pm, Location.PROXIMAL, allow_maybe=allow_maybe),
+            DISTAL_VILLOUS: get_villous_histology(pm, Location.DISTAL, allow_maybe=allow_maybe),
+            RECTAL_VILLOUS: get_villous_histology(pm, Location.RECTAL, allow_maybe=allow_maybe),
+            UNKNOWN_VILLOUS: get_villous_histology(pm, Location.UNKNOWN, allow_maybe=allow_maybe),
             SIMPLE_HIGHGRADE_DYSPLASIA: get_highgrade_dysplasia(specs),
             HIGHGRADE_DYSPLASIA: get_dysplasia(pm),
-            ADENOMA_COUNT: get_adenoma_count(specs),
-            LARGE_ADENOMA: has_large_adenoma(pm, cm, version=cspy_finding_version),
+            ADENOMA_COUNT: get_adenoma_count(specs, bins=bins),
+            LARGE_ADENOMA: has_large_adenoma(pm, cm, min_size=min_size, version=cspy_finding_version),
             ADENOMA_COUNT_ADV: adenoma_count,
             JAR_ADENOMA_COUNT_ADV: jar_adenoma_count,
             ADENOMA_STATUS_ADV: adenoma_status,
@@ -175,19 +260,38 @@ def process_text(path_text='', cspy_text='',
     return data
 
 
+def output_columns():
+    """All variables: output by a document with both pathology and colonoscopy"""
+    return list(extract_variables(PathManager(WARMUP_PATH_TEXT), CspyManager(WARMUP_CSPY_TEXT)))
+
+
 def get_file_or_empty_string(path, filename, encoding='utf8'):
-    fp = os.path.join(path, filename)
-    if not os.path.isfile(fp):
-        return ''
-    with open(fp, encoding=encoding) as fh:
-        return fh.read()
+    return read_text(os.path.join(path, filename), encoding)[0]
 
 
-def get_data(filetype, path, identifier=None, path_text=None, cspy_text=None, encoding='utf8',
+def get_data(filetype, path=None, identifier=None, path_text=None, cspy_text=None, encoding='utf8',
              limit=None, count=None, truth=None, text=None, filenames=None, lookup_table=None,
-             requires_cspy_text=False):
+             requires_cspy_text=False, on_error=None, cues=False, lazy_text=False, path_source=None, cspy_source=None,
+             max_join_rows=None, include=None, prefetch=None):
     """
 
+    :param filetype: csv, tab/tsv, sas, h5, txt, or corpus (packed by `precise_nlp.corpus`); or a DataFrame;
+        or join (of `path_source` and `cspy_source`)
+    :param path_source: with filetype join, dict of filetype, path, key (linking the datasets), text, and
+        encoding of the pathology dataset (see `precise_nlp.join`)
+    :param cspy_source: as `path_source`, for the colonoscopy dataset
+    :param max_join_rows: rows of either dataset which may be held in memory while joining
+    :param include: for a directory, glob patterns of files to read (e.g., *.txt)
+    :param prefetch: for a directory of txt files or a `lookup_table`, read files on a pool of threads ahead
+        of the records being used: true, number of threads, or dict of workers and max_pending
+        (see `precise_nlp.file_reader`); files may be compressed (.gz, .bz2, .xz) in any case
+    :param lazy_text: for a packed corpus, yield the location of each text (`TextSlice`) rather than the
+        text, to be read by the worker
+
+    :param cues: also yield whether the pathology and colonoscopy reports contain triage cues (see
+        `precise_nlp.triage`): found over chunks of rows of a DataFrame at once
+    :param on_error: if specified, called with (identifier, exception) for records which cannot be read;
+        otherwise, the exception is raised
     :param encoding:
     :param count:
     :param filenames:
@@ -209,32 +313,83 @@ def get_data(filetype, path, identifier=None, path_text=None, cspy_text=None, en
                       )
         path_text = text
 
-    if path and os.path.isdir(path):
+    if isinstance(filetype, str) and filetype == 'corpus':
+        corpus = Corpus(path)  # memory map is kept open for workers reading `TextSlice`s
+        for i, (name, path_text, cspy_text, values) in enumerate(corpus.records(lazy=lazy_text)):
+            if count and i >= count:
+                break
+            if limit and name not in limit:
+                continue
+            if requires_cspy_text and not cspy_text:
+                continue  # skip missing records
+            record = name, path_text, cspy_text, {x: values[truth[x]] for x in truth} if truth else None
+            yield (*record, document_cues(read_slice(path_text), read_slice(cspy_text))) if cues else record
+    elif isinstance(filetype, str) and filetype == 'join':
+        from precise_nlp.join import join_sources, MAX_JOIN_ROWS
+
+        records = join_sources(path_source, cspy_source, columns=list(truth.values()) if truth else (),
+                               max_rows=max_join_rows or MAX_JOIN_ROWS)
+        for i, (name, path_text, cspy_text, values) in enumerate(records):
+            if count and i >= count:
+                break
+            if limit and name not in limit:
+                continue
+            if requires_cspy_text and not cspy_text:
+                continue  # skip missing records
+            record = name, path_text, cspy_text, {x: values.get(truth[x]) for x in truth} if truth else None
+            yield (*record, document_cues(path_text, cspy_text)) if cues else record
+    elif path and os.path.isdir(path):
         if lookup_table:
-            with open(lookup_table) as fh:
-                for line in fh:
-                    identifier, cspy_file, path_file = line.strip().split(',')
-                    if limit and identifier not in limit:
-                        continue
-                    cspy_text = get_file_or_empty_string(path, cspy_file, encoding=encoding)
-                    path_text = get_file_or_empty_string(path, path_file, encoding=encoding)
-                    yield identifier, path_text, cspy_text, None
+            def files(entry):  # none if line could not be parsed
+                return [os.path.join(path, fn) for fn in entry[1]] if isinstance(entry[1], tuple) else []
+
+            entries = lookup_entries(lookup_table, limit)
+            if prefetch:
+                results = prefetch_reader(prefetch, encoding).read(entries, files)
+            else:
+                results = read_serially(entries, files, encoding)
+            for (identifier, entry), result in results:
+                error = entry if isinstance(entry, Exception) else result
+                if isinstance(error, Exception):
+                    if on_error is None:
+                        raise error
+                    on_error(identifier, error)
+                    continue
+                cspy_text, path_text = result
+                record = identifier, path_text, cspy_text, None
+                yield (*record, document_cues(path_text, cspy_text)) if cues else record
         elif filenames:
             for fn in filenames:
                 fp = os.path.join(path, fn)
                 if not os.path.exists(fp):
                     fp = f'{fp}.{filetype}'
-                yield from get_data(filetype, fp, identifier, path_text, cspy_text, truth)
+                yield from get_data(filetype, fp, identifier, path_text, cspy_text, truth, on_error=on_error,
+                                    cues=cues)
+        elif prefetch and filetype == 'txt':
+            names = [name for name in scan_directory(path, include)[:count or None]
+                     if not limit or strip_compression(name) in limit]
+            results = prefetch_reader(prefetch, encoding).read(names, lambda name: [os.path.join(path, name)])
+            for name, result in results:
+                if isinstance(result, Exception):
+                    if on_error is None:
+                        raise result
+                    on_error(strip_compression(name), result)
+                    continue
+                [text] = result
+                record = strip_compression(name), '', text, None
+                yield (*record, document_cues('', text)) if cues else record
         else:
-            for i, fn in enumerate(os.listdir(path)):
+            for i, fn in enumerate(scan_directory(path, include) if include else os.listdir(path)):
                 if count and i >= count:
                     break
                 yield from get_data(filetype, os.path.join(path, fn), identifier, path_text,
-                                    cspy_text, encoding, count=count, truth=truth)
+                                    cspy_text, encoding, count=count, truth=truth, on_error=on_error, cues=cues)
     elif path and filetype == 'txt' and os.path.isfile(path):
-        with open(path, encoding=encoding) as fh:
-            yield os.path.basename(path), '', fh.read(), None
+        record = strip_compression(os.path.basename(path)), '', read_text(path, encoding)[0], None
+        yield (*record, document_cues('', record[2])) if cues else record
     elif PANDAS:
+        import pandas as pd
+
         if 'DataFrame' in str(type(filetype)):
             df = filetype
         elif filetype == 'csv':
@@ -254,20 +409,30 @@ def get_data(filetype, path, identifier=None, path_text=None, cspy_text=None, en
             df[cspy_text].fillna('', inplace=True)
         if path_text:
             df[path_text].fillna('', inplace=True)
+        row_cues = frame_cues(df, path_text, cspy_text) if cues else None
         for row in df.itertuples():
+            row_cue = next(row_cues) if cues else None
             name = getattr(row, identifier)
             if limit and name not in limit:
                 continue
             if cspy_text and requires_cspy_text and not getattr(row, cspy_text):
                 continue  # skip missing records
-            yield (name,
-                   getattr(row, path_text) if path_text else '',
-                   getattr(row, cspy_text) if cspy_text else '',
-                   {x: getattr(row, truth[x]) for x in truth} if truth else None)
+            record = (name,
+                      getattr(row, path_text) if path_text else '',
+                      getattr(row, cspy_text) if cspy_text else '',
+                      {x: getattr(row, truth[x]) for x in truth} if truth else None)
+            yield (*record, row_cue) if cues else record
     else:
         raise ValueError(f'Unclear how to handle {filetype} with {path}; pandas installed: {PANDAS}')
 
 
+def is_missing(text):
+    if text is None:
+        return True
+    pd = sys.modules.get('pandas')  # if pandas has not been imported, text cannot be a pandas null
+    return pd is not None and pd.isnull(text)
+
+
 def clean_truth(x):
     if isinstance(x, str):
         if x[0].lower() == 'y':
@@ -277,28 +442,6 @@ def clean_truth(x):
     return x
 
 
-def add_identifier(identifier, d, label, errors, value='fp'):
-    """
-    Exlude errors in the gold standard
-    :param value: 'fp' or 'fn'
-    :param identifier:
-    :param d:
-    :param label:
-    :param errors:
-    :return:
-    """
-    try:
-        if identifier in errors[label][value.lower()]:
-            return 0
-    except KeyError:
-        pass
-    except TypeError:
-        pass
-    logger.info(f'{identifier}: {value.upper()}')
-    d[label].append(identifier)
-    return 1
-
-
 def preprocess(text, requires_cleaning=None, spell_correction=None):
     if requires_cleaning:
         text = parse_file(text)
@@ -308,6 +451,74 @@ def preprocess(text, requires_cleaning=None, spell_correction=None):
     return text
 
 
+def preprocess_texts(path_text, cspy_text, preprocessing=None):
+    """
+    :param preprocessing: dict of 'all', 'path', and/or 'cspy' options for `preprocess`
+    """
+    if not preprocessing:
+        return path_text, cspy_text
+    path_text = preprocess(path_text, **dict(preprocessing.get('all', dict()), **preprocessing.get('path', dict())))
+    cspy_text = preprocess(cspy_text, **dict(preprocessing.get('all', dict()), **preprocessing.get('cspy', dict())))
+    return path_text, cspy_text
+
+
+def extract_record(identifier, path_text, cspy_text, cues=None, preprocessing=None, store=False, index=False,
+                   validate_triage=0, token_cache=None, **kwargs):
+    """
+    Preprocess and extract variables from a single record (in a worker, if running in parallel)
+    :param cues: if supplied, triage the record (see `precise_nlp.triage`)
+    :param validate_triage: fraction of triaged records to also run through the full pipeline
+    :param store: also serialize the parsed documents (see `precise_nlp.parsed_store`)
+    :param index: also tokenize the preprocessed text (see `precise_nlp.incremental`)
+    :param token_cache: read words of pathology sections from this cache (see `precise_nlp.token_cache`)
+    :param kwargs: passed to `process_text`
+    :return: (result, overruns, failure, extras) where failure is (stage, exception, formatted traceback) or None
+        and extras is a dict which may contain 'parsed' (serialized documents), 'tokens', 'triage' (parts
+        of pipeline skipped), 'triage_mismatch' (variables which differ from the full pipeline), and
+        'sections' (hits, sections missing from `token_cache`, and timings: see `TokenSession.stats`)
+    """
+    path_text, cspy_text = read_slice(path_text), read_slice(cspy_text)  # packed corpus: read in worker
+    if is_missing(path_text):
+        return None, [], ('read', ValueError('Text cannot be missing/none'), None), {}
+    logger.info(f'Starting: {identifier}')
+    overruns = []
+    extras = {}
+    parsed = [] if store else None
+    stage = 'preprocess'
+    try:
+        path_text, cspy_text = preprocess_texts(path_text, cspy_text, preprocessing)
+        if cues and preprocessing:  # cues were found before preprocessing
+            cues = document_cues(path_text, cspy_text)
+        if index:
+            from precise_nlp.incremental import tokenize
+
+            extras['tokens'] = tokenize(path_text, cspy_text)
+        stage = 'extract'
+        if token_cache:
+            from precise_nlp.token_cache import cached_tokens
+        with cached_tokens(token_cache) if token_cache else contextlib.nullcontext() as session:
+            res = process_text(path_text, cspy_text, overruns=overruns, parsed=parsed, cues=cues, **kwargs)
+        if session:
+            extras['sections'] = session.stats()
+        version = kwargs.get('cspy_finding_version', FindingVersion.PRECISE)
+        if cues and parsed is None and (skipped := triaged(cues, version)):
+            extras['triage'] = skipped
+            if validate_triage and sampled(identifier, validate_triage):
+                stage = 'validate'
+                expected = process_text(path_text, cspy_text, **kwargs)
+                if mismatch := differences(res, expected):
+                    extras['triage_mismatch'] = mismatch
+                    res = expected
+        if parsed:
+            stage = 'store'
+            from precise_nlp.parsed_store import dump_parsed
+
+            extras['parsed'] = dump_parsed(*parsed[0])
+        return res, overruns, None, extras
+    except Exception as e:
+        return None, overruns, (stage, e, traceback.format_exc()), extras
+
+
 class DataCounter:
 
     def __init__(self, data=None):
@@ -346,105 +557,381 @@ class DataCounter:
             yield k, cnt
 
 
+def _open_token_index(stack, index_path, outfile, limit=None):
+    """
+    Open index built by a previous run (closed with stack) to only re-run records affected by changes to
+        terms/patterns since, patching them into its `outfile`
+    :return: (`TokenIndex`, current lexicon snapshot, dict of identifier -> output row of records to re-run),
+        or Nones if the index is incomplete (e.g., the run building it was interrupted) and must be rebuilt
+    """
+    from precise_nlp.incremental import TokenIndex, IncompleteIndex, affected_rows, lexicon_snapshot
+
+    try:
+        token_index = stack.enter_context(TokenIndex(index_path))
+    except IncompleteIndex:
+        logger.warning(f'Index {index_path} is incomplete (e.g., the run building it was interrupted): rebuilding.')
+        return None, None, None
+    outpath = fill_template(outfile) if outfile else None
+    if not outpath or not is_sqlite(outpath) or not os.path.exists(outpath):
+        raise ValueError(f'Incremental runs patch the results of the run which built {index_path}:'
+                         f' `outfile` must be that SQLite database (not {outpath}).')
+    snapshot = lexicon_snapshot()
+    rows, changes = affected_rows(token_index, snapshot)
+    if limit:
+        rows = {identifier: row for identifier, row in rows.items() if identifier in limit}
+    logger.info(f'Lexicon changes in {len(changes)} terms/patterns: re-running {len(rows)}'
+                f' of {len(token_index)} records.')
+    return token_index, snapshot, rows
+
+
+def _open_token_cache(stack, token_cache):
+    """:return: (directory, `TokenCache` shared with threads and forked workers, saved when stack closes)"""
+    from precise_nlp.token_cache import open_cache, close_cache
+
+    path = fill_template(token_cache)
+    stack.callback(close_cache, path)
+    return path, open_cache(path)
+
+
+def _extract_arguments(record):
+    """Arguments of `extract_record` from (row, record from `get_data`): all but truth"""
+    return *record[1][:3], *record[1][4:]
+
+
+def _record_mapper(stack, parallel=None, profiled=False):
+    """
+    :param parallel: see `process`; workers are shut down when stack closes
+    :return: function of (extract, records) yielding (record, result) for each record, in order
+    """
+    parallel = parallel or {}
+    workers = parallel.get('workers')
+    mode = parallel.get('mode', 'process')
+    if workers and profiled and mode == 'process':
+        logger.warning('Patterns are not profiled in worker processes: use thread mode to profile.')
+    if parallel.get('schedule'):
+        from precise_nlp.scheduler import Scheduler
+
+        scheduler = Scheduler(workers, mode, **parallel['schedule'])
+        stack.callback(_close_scheduler, scheduler)
+        return functools.partial(scheduler.map, key=_extract_arguments)
+    executor = None
+    if workers:
+        workers = os.cpu_count() if workers == 'auto' else workers
+        executor = worker_executor(workers, mode)
+        stack.callback(gc.unfreeze)  # release objects frozen by preloading before forking workers
+        stack.callback(executor.shutdown)
+    return functools.partial(map_ordered, key=_extract_arguments, executor=executor,
+                             max_pending=parallel.get('max_pending', 2 * (workers or 1)))
+
+
+def _close_scheduler(scheduler):
+    scheduler.close()  # report makespan, update cost model, and shut down workers
+    if scheduler.executor:
+        gc.unfreeze()  # release objects frozen by preloading before forking workers
+
+
 def process(data, truth=None, errors=None, output=None, outfile=None, preprocessing=None,
-            cspy_precise_finding_version=True, cspy_extent_search_all=False):
+            cspy_precise_finding_version=True, cspy_extent_search_all=False, profile_patterns=None,
+            time_budget=None, quarantine=None, replay_quarantine=None, parallel=None, sqlite=None, sweep=None,
+            store=None, incremental=None, triage=None, token_cache=None):
+    """
+    :param outfile: csv (or, if ending in .sqlite, SQLite database) of results
+    :param profile_patterns: if specified, write report of time spent in each regular expression to this file
+    :param time_budget: dict of seconds (per document), max_section_length (for retry), and
+        outfile (csv of identifiers and patterns exceeding the budget)
+    :param quarantine: if specified, run in fault-tolerant mode: failed records are written to
+        this jsonl file and output with an error code rather than ending the run
+    :param replay_quarantine: only re-run records in this quarantine file (e.g., after a fix)
+    :param parallel: dict of workers (number or 'auto'), mode ('process' or 'thread'), max_pending (records
+        submitted ahead of output), and schedule (dispatch costly records first: see `precise_nlp.scheduler`);
+        records are still output in order
+    :param sqlite: dict of table, batch_size (rows per transaction), and indexes (additional columns)
+        if `outfile` is a SQLite database
+    :param output: dict of options for evaluating against `truth` (see `output_results`), including
+        group_by: column(s) by which to also report metrics (e.g., site, year)
+    :param sweep: dict of grid (parameter -> values) to extract each document under every configuration
+        (see `precise_nlp.sweep`)
+    :param store: if specified, write the parsed documents to this file to derive new variables without
+        reparsing (see `precise_nlp.parsed_store`)
+    :param incremental: index of tokens in each record: built if missing, otherwise only records affected by
+        changes to terms/patterns since it was built are re-run into `outfile` (see `precise_nlp.incremental`)
+    :param triage: if true (or dict of validate: fraction of triaged records to check against the full pipeline),
+        output records without any relevant terms without parsing them (see `precise_nlp.triage`)
+    :param token_cache: directory caching the words of each pathology section, so reruns skip tokenization;
+        built/extended if missing (see `precise_nlp.token_cache`)
+    """
+    if sweep:
+        from precise_nlp.sweep import process_sweep
+
+        for name, option in (('profile_patterns', profile_patterns), ('time_budget', time_budget),
+                             ('quarantine', quarantine), ('replay_quarantine', replay_quarantine),
+                             ('parallel', parallel), ('store', store), ('incremental', incremental),
+                             ('triage', triage), ('token_cache', token_cache)):
+            if option:
+                logger.warning(f'Option {name} is not supported when running a sweep: ignoring.')
+        return process_sweep(data, sweep, truth=truth, errors=errors, output=output, outfile=outfile,
+                             preprocessing=preprocessing, cspy_precise_finding_version=cspy_precise_finding_version,
+                             cspy_extent_search_all=cspy_extent_search_all, sqlite=sqlite)
     # how to parse cspy document
     cspy_finding_version = FindingVersion.PRECISE if cspy_precise_finding_version else FindingVersion.BROAD
-    score = defaultdict(lambda: [0, 0, 0, 0])  # TP, FP, FN, TN
-    fps = defaultdict(list)
-    fns = defaultdict(list)
+    output = output or {}
+    group_by = output.get('group_by') or []
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    evaluator = None
+    if truth:
+        from precise_nlp.evaluation import Evaluator  # numpy is slow to import
+
+        evaluator = Evaluator(truth, errors, group_by)
+    if truth and group_by:  # read group columns along with truth
+        truth = {**truth, **{('group_by', column): column for column in group_by}}
     c = DataCounter()
-    if outfile:
-        fh = open(fill_template(outfile), 'w', newline='')
-    for i, (identifier, path_text, cspy_text, truth_values) in enumerate(get_data(**data, truth=truth)):
-        if PANDAS and pd.isnull(path_text) or path_text is None:
-            ve = ValueError('Text cannot be missing/none')
-            print(ve)
-            continue
-        logger.info(f'Starting: {identifier}')
-        if preprocessing:
-            path_text = preprocess(path_text,
-                                   **dict(preprocessing.get('all', dict()), **preprocessing.get('path', dict())))
-            cspy_text = preprocess(cspy_text,
-                                   **dict(preprocessing.get('all', dict()), **preprocessing.get('cspy', dict())))
-        res = process_text(path_text, cspy_text,
-                           cspy_finding_version=cspy_finding_version,
-                           cspy_extent_search_all=cspy_extent_search_all,
-                           )
-
-        if outfile and i == 0:
-            header = ['row', 'identifier']  # header
-            if truth_values:
-                # noinspection PyUnboundLocalVariable
-                outfile = csv.writer(fh)
-                for label in truth_values:
-                    header.append(f'{label}_true')
-                    header.append(f'{label}_pred')
-                outfile.writerow(header)
+    with contextlib.ExitStack() as stack:  # close each resource (in reverse order) even if the run fails
+        index_writer = None
+        token_index = None
+        if incremental:
+            index_path = fill_template(incremental)
+            if os.path.exists(index_path):  # only re-run records affected by changes to terms/patterns
+                token_index, snapshot, rows = _open_token_index(stack, index_path, outfile, data.get('limit'))
+            if token_index is None:  # build index with a full run
+                from precise_nlp.incremental import TokenIndexWriter
+
+                index_writer = stack.enter_context(TokenIndexWriter(index_path))
+            elif not rows:
+                token_index.update_lexicon(snapshot)
+                return
             else:
-                header += list(res.keys())
-                outfile = csv.DictWriter(fh, fieldnames=header + [item for item in ITEMS if item not in set(header)])
-                outfile.writeheader()
-        row = [i, identifier]
-        # collect counts
-        c.update(res)
-        if not res:
-            c.update('failed', f'{identifier}')
-        # output truth
-        if truth_values:
-            for label in truth_values or list():
-                truth_item = clean_truth(truth_values[label])
-                row.append(res[label])
-                row.append(truth_item)
-                if res[label] == truth_item == 0:
-                    logger.info(f'{identifier}: TN')
-                    score[label][3] += 1
-                elif res[label] == truth_item:
-                    logger.info(f'{identifier}: TP')
-                    score[label][0] += 1
-                elif truth_item == 1:
-                    score[label][2] += add_identifier(identifier, fns, label, errors, 'fn')
-                else:
-                    score[label][1] += add_identifier(identifier, fps, label, errors, 'fp')
-            if outfile:
-                outfile.writerow(row)
-        elif outfile:
-            res['row'] = i
-            res['identifier'] = identifier
-            try:
-                outfile.writerow(res)
-            except ValueError as e:
-                logger.error(f'If missing fields in fieldnames, '
-                             f'ensure that the first record contains both PATH and CSPY.')
-                raise e
-    output_results(score, truth, fps, fns, **output if output else dict())
-    logger.info(c)
-    for k, cnt in c:
-        logger.info(f'{k}\t{len(cnt)}')
-        for v, count in cnt.most_common(10):
-            logger.info(f'\t{v}\t{count}')
-    if outfile:
-        fh.close()
+                data = dict(data, limit=set(rows))
+        if outfile:
+            outpath = fill_template(outfile)
+            fh = stack.enter_context(SqliteWriter(outpath, **sqlite or {}) if is_sqlite(outpath)
+                                     else open(outpath, 'w', newline=''))
+        time_budget = time_budget or {}
+        if time_budget.get('outfile'):
+            overrun_fh = stack.enter_context(open(fill_template(time_budget['outfile']), 'w', newline=''))
+            overrun_writer = csv.DictWriter(overrun_fh, fieldnames=['identifier', 'strategy', 'pattern', 'location'])
+            overrun_writer.writeheader()
+        replayed = None
+        if replay_quarantine:
+            replayed = read_quarantine(replay_quarantine)
+            limit = set(replayed) & set(data['limit']) if data.get('limit') else set(replayed)
+            data = dict(data, limit=limit)
+            logger.info(f'Replaying {len(limit)} quarantined records from {replay_quarantine}.')
+        failed_reads = []  # (identifier, error code) for records which could not be read
+        if quarantine:
+            quarantine = stack.enter_context(Quarantine(fill_template(quarantine)))
+            data = dict(data, on_error=lambda ident, e: failed_reads.append((ident, quarantine.add(ident, 'read', e))))
+        if isinstance(triage, bool):
+            triage = {} if triage else None
+        if triage is not None and store:
+            logger.warning('Stored documents must be fully parsed: not triaging records.')
+            triage = None
+        cache = None
+        if token_cache:
+            token_cache, cache = _open_token_cache(stack, token_cache)
+        store_writer = None
+        if store:
+            from precise_nlp.parsed_store import ParsedStoreWriter
+
+            store_writer = stack.enter_context(ParsedStoreWriter(fill_template(store)))
+        writer = None
+        pending_rows = []  # failed records waiting on first successful record to determine output columns
+        profiler = None
+        if profile_patterns:
+            profiler = PatternProfiler()
+            stack.callback(profiler.write_report, fill_template(profile_patterns))  # once disabled
+            stack.enter_context(profiler)
+        map_records = _record_mapper(stack, parallel, profiled=profiler is not None)
+        extract = functools.partial(
+            extract_record,
+            preprocessing=preprocessing,
+            cspy_finding_version=cspy_finding_version,
+            cspy_extent_search_all=cspy_extent_search_all,
+            time_budget=time_budget.get('seconds'),
+            max_section_length=time_budget.get('max_section_length', MAX_SECTION_LENGTH),
+            store=bool(store),
+            index=index_writer is not None,
+            validate_triage=triage.get('validate', 0) if triage else 0,
+            token_cache=token_cache,
+        )
+        records = map_records(extract, enumerate(get_data(**data, truth=truth, cues=triage is not None,
+                                                          lazy_text=True)))
+        stack.callback(records.close)  # if the run fails, cancel records pending on workers
+        for (i, (identifier, path_text, cspy_text, truth_values, *_)), (res, overruns, failure, extras) in records:
+            if token_index:  # patched record keeps its row
+                i = rows.get(identifier, i)
+            group = tuple(truth_values.pop(('group_by', column)) for column in group_by) if truth_values else ()
+            failed_reads, previous_failed_reads = [], failed_reads
+            for failed_identifier, error_code in previous_failed_reads:
+                c.update('failed', f'{failed_identifier}')
+                pending_rows.append({'row': None, 'identifier': failed_identifier, ERROR: error_code})
+            if isinstance(writer, (csv.DictWriter, SqliteWriter)):
+                writer.writerows(pending_rows)
+                pending_rows = []
+            source_texts = path_text, cspy_text  # quarantine records hash of text prior to preprocessing
+            if replayed and (record := replayed.get(identifier)):
+                if (record['path_hash'], record['cspy_hash']) != tuple(text_hash(read_slice(text))
+                                                                       for text in source_texts):
+                    logger.warning(f'Text for {identifier} has changed since it was quarantined.')
+            if failure:
+                stage, e, tb = failure
+                if stage == 'read':  # missing text
+                    print(e)
+                    if not quarantine:
+                        continue
+                elif not quarantine:
+                    raise e
+                res = {ERROR: quarantine.add(identifier, stage, e, *map(read_slice, source_texts), tb=tb)}
+            if 'parsed' in extras:
+                store_writer.write(identifier, extras['parsed'])
+            if 'tokens' in extras:
+                index_writer.add(identifier, extras['tokens'], i)
+            if 'sections' in extras:
+                cache.update(extras['sections'])
+            if 'triage' in extras:
+                c.update('triaged', extras['triage'])
+            if 'triage_mismatch' in extras:
+                c.update('triage_mismatch', f'{identifier}')
+                logger.warning(f'Triaged record {identifier} differs from the full pipeline in:'
+                               f' {", ".join(extras["triage_mismatch"])}.')
+            for overrun in overruns:
+                c.update('time_budget_exceeded', f'{identifier}')
+                c.update('time_budget_pattern', overrun['pattern'])
+                if time_budget.get('outfile'):
+                    overrun_writer.writerow(dict(overrun, identifier=identifier))
+
+            if outfile and writer is None and (truth_values or ERROR not in res):
+                header = ['row', 'identifier']  # header
+                if truth_values:
+                    for label in truth_values:
+                        header.append(f'{label}_true')
+                        header.append(f'{label}_pred')
+                    if quarantine:
+                        header.append(ERROR)
+                    if isinstance(fh, SqliteWriter):
+                        writer = fh.writer(header)
+                    else:
+                        writer = csv.writer(fh)
+                        writer.writerow(header)
+                else:  # all variables, as the first record may be missing a report or degraded
+                    header += output_columns()
+                    if quarantine:
+                        header.append(ERROR)
+                    writer = dict_writer(fh, header + [item for item in ITEMS if item not in set(header)])
+                    writer.writerows(pending_rows)
+                    pending_rows = []
+            row = [i, identifier]
+            # collect counts
+            c.update({k: v for k, v in res.items() if k != ERROR})
+            if not res or ERROR in res:
+                c.update('failed', f'{identifier}')
+            # output truth
+            if truth_values:
+                truth_items = {label: clean_truth(value) for label, value in truth_values.items()}
+                for label, truth_item in truth_items.items():
+                    row.append(res.get(label))
+                    row.append(truth_item)
+                evaluator.add(identifier, truth_items, res, group)
+                if quarantine:
+                    row.append(res.get(ERROR))
+                if outfile:
+                    writer.writerow(row)
+            elif outfile:
+                res['row'] = i
+                res['identifier'] = identifier
+                if writer is None:  # no successful record yet
+                    pending_rows.append(res)
+                    continue
+                try:
+                    writer.writerow(res)
+                except ValueError as e:
+                    logger.error(f'Record {identifier} has variables not in the output columns.')
+                    if not quarantine:
+                        raise e
+                    error_code = quarantine.add(identifier, 'output', e, *map(read_slice, source_texts))
+                    writer.writerow({'row': i, 'identifier': identifier, ERROR: error_code})
+        for failed_identifier, error_code in failed_reads:
+            c.update('failed', f'{failed_identifier}')
+            pending_rows.append({'row': None, 'identifier': failed_identifier, ERROR: error_code})
+        if outfile and pending_rows:
+            if writer is None:  # no successful records
+                writer = dict_writer(fh, ['row', 'identifier'] + ITEMS + [ERROR])
+            if isinstance(writer, (csv.DictWriter, SqliteWriter)):
+                writer.writerows(pending_rows)
+            else:  # truth: error code is final column
+                writer.writerows([row['row'], row['identifier']] + [None] * (len(header) - 3) + [row[ERROR]]
+                                 for row in pending_rows)
+        if evaluator:
+            output_results(evaluator, **output)
+        logger.info(c)
+        for k, cnt in c:
+            logger.info(f'{k}\t{len(cnt)}')
+            for v, count in cnt.most_common(10):
+                logger.info(f'\t{v}\t{count}')
+        if token_index:
+            token_index.update_lexicon(snapshot)  # only once affected records have been re-run
+        if cache:
+            cache.report()
+        if store_writer:
+            logger.info(f'Stored {store_writer.count} parsed records in {store_writer.path}.')
 
 
-def output_results(score, truth, fps, fns, max_false=5):
-    for label in truth or list():
+def dict_writer(fh, fieldnames):
+    """Writer of dicts to `outfile` (csv or SQLite), with header written"""
+    if isinstance(fh, SqliteWriter):
+        return fh.writer(fieldnames)
+    writer = csv.DictWriter(fh, fieldnames=fieldnames)
+    writer.writeheader()
+    return writer
+
+
+def output_results(evaluator, max_false=5, bootstrap=1000, confidence=0.95, seed=None, group_by=None,
+                   outfile=None):
+    """
+    Print metrics for each label (and group), with bootstrap confidence intervals
+    :param evaluator: `Evaluator` with each record added
+    :param max_false: number of false positive/negative identifiers to display
+    :param bootstrap: bootstrap iterations (0: no confidence intervals)
+    :param group_by: see `process`
+    :param outfile: if specified, also write metrics to this csv file
+    """
+    from precise_nlp.evaluation import OUTCOMES
+
+    outcomes = evaluator.outcomes()
+    results = evaluator.results(bootstrap, confidence, seed, outcomes=outcomes)
+    errors = evaluator.errors_found(outcomes)
+    for result in results:
+        label = result['label']
+        if result['group'] is not None:
+            print(f'  {result["group"]}: ' + '\t'.join(str(result[x]) for x in OUTCOMES)
+                  + f'\tPPV {format_score(result, "ppv")}\tRec {format_score(result, "recall")}'
+                  + f'\tSpc {format_score(result, "specificity")}')
+            continue
         print(f'Label: {label}')
         print('TP \tFP \tFN \t TN')
-        print('\t'.join(str(x) for x in score[label]))
-        print(f'PPV {calculate_score(score[label][0], score[label][1])}')
-        print(f'Rec {calculate_score(score[label][0], score[label][2])}')
-        print(f'Spc {calculate_score(score[label][3], score[label][1])}')
+        print('\t'.join(str(result[x]) for x in OUTCOMES))
+        print(f'PPV {format_score(result, "ppv")}')
+        print(f'Rec {format_score(result, "recall")}')
+        print(f'Spc {format_score(result, "specificity")}')
 
         if max_false:
-            print(f'FPs: {random.sample(fps[label], min(max_false, len(fps[label])))}')
-            print(f'FNs: {random.sample(fns[label], min(max_false, len(fns[label])))}')
+            fps, fns = errors[label]
+            print(f'FPs: {random.sample(fps, min(max_false, len(fps)))}')
+            print(f'FNs: {random.sample(fns, min(max_false, len(fns)))}')
+        if group_by:
+            print(f'By {", ".join([group_by] if isinstance(group_by, str) else group_by)}:')
+    if outfile:
+        with open(fill_template(outfile), 'w', newline='') as fh:
+            writer = csv.DictWriter(fh, fieldnames=list(results[0]) if results else ['label', 'group'])
+            writer.writeheader()
+            writer.writerows(results)
 
 
-def calculate_score(num, denom):
-    if not num + denom:
-        return 'nan'
-    return num / (num + denom)
+def format_score(result, metric):
+    """Metric with confidence interval (if bootstrapped)"""
+    if f'{metric}_low' not in result:
+        return result[metric]
+    return f'{result[metric]} ({result[f"{metric}_low"]:.3f}-{result[f"{metric}_high"]:.3f})'
 
 
 def process_config():
@@ -455,6 +942,17 @@ def process_config():
             'spell_correction': {'type': 'string'}  # filepath
         }
     }
+    join_source = {
+        'type': 'object',
+        'properties': {
+            'filetype': {'type': 'string'},  # csv, tab, sas, or h5
+            'path': {'type': 'string'},
+            'key': {'type': 'string'},  # column linking pathology and colonoscopy datasets
+            'text': {'type': 'string'},  # column of report
+            'encoding': {'type': 'string'},
+        },
+        'required': ['filetype', 'path', 'key', 'text'],
+    }
     schema = {
         'type': 'object',
         'properties': {
@@ -473,6 +971,17 @@ def process_config():
                     'count': {'type': 'number'},
                     'encoding': {'type': 'string'},
                     'lookup_table': {'type': 'string'},  # identifier,cspy_file,path_file
+                    'path_source': join_source,  # with filetype join: pathology dataset
+                    'cspy_source': join_source,  # with filetype join: colonoscopy dataset
+                    'max_join_rows': {'type': 'integer'},  # rows of either dataset held in memory while joining
+                    'include': {'type': ['string', 'array'], 'items': {'type': 'string'}},  # glob patterns in path
+                    'prefetch': {  # read files on a pool of threads (directory of txt files or lookup_table)
+                        'type': ['boolean', 'integer', 'object'],
+                        'properties': {
+                            'workers': {'type': 'integer'},
+                            'max_pending': {'type': 'integer'},
+                        },
+                    },
                 }
             },
             'preprocessing': {
@@ -504,14 +1013,82 @@ def process_config():
             'output': {
                 'type': 'object',
                 'properties': {
-                    'max_false': {'type': 'number'}
+                    'max_false': {'type': 'number'},
+                    'group_by': {'type': ['string', 'array'], 'items': {'type': 'string'}},  # e.g., site, year
+                    'bootstrap': {'type': 'integer'},  # iterations for confidence intervals (0: none)
+                    'confidence': {'type': 'number'},
+                    'seed': {'type': 'integer'},
+                    'outfile': {'type': 'string'},  # csv of metrics for each label (and group)
                 }
             },
             'outfile': {
                 'type': 'string'
             },
+            'sqlite': {  # options if outfile is SQLite database (e.g., results.sqlite)
+                'type': 'object',
+                'properties': {
+                    'table': {'type': 'string'},
+                    'batch_size': {'type': 'integer'},  # rows per transaction
+                    'indexes': {'type': 'array', 'items': {'type': 'string'}},  # in addition to identifier
+                }
+            },
             'cspy_precise_finding_version': {'type': 'boolean'},  # defaults to true
-            'cspy_extent_search_all': {'type': 'boolean'}
+            'cspy_extent_search_all': {'type': 'boolean'},
+            'profile_patterns': {'type': 'string'},  # csv report of time spent in each regular expression
+            'quarantine': {'type': 'string'},  # jsonl file of failed records; enables fault-tolerant mode
+            'replay_quarantine': {'type': 'string'},  # only re-run records from this quarantine file
+            'time_budget': {
+                'type': 'object',
+                'properties': {
+                    'seconds': {'type': 'number'},  # per document
+                    'max_section_length': {'type': 'number'},  # section length when retrying
+                    'outfile': {'type': 'string'},  # csv of identifiers/patterns exceeding budget
+                }
+            },
+            'parallel': {
+                'type': 'object',
+                'properties': {
+                    'workers': {'type': ['integer', 'string']},  # or auto
+                    'mode': {'type': 'string', 'enum': ['process', 'thread']},
+                    'max_pending': {'type': 'integer'},  # records submitted ahead of output
+                    'schedule': {  # dispatch records in order of estimated cost
+                        'type': 'object',
+                        'properties': {
+                            'model': {'type': 'string'},  # json file of cost model (updated with timings)
+                            'window': {'type': 'integer'},  # records read ahead
+                            'chunk_size': {'type': ['integer', 'string']},  # records per task, or auto
+                        },
+                    },
+                }
+            },
+            'incremental': {'type': 'string'},  # token index: built on first run, then only re-run affected records
+            'store': {'type': 'string'},  # file of parsed documents (to derive new variables without reparsing)
+            'token_cache': {'type': 'string'},  # directory of words of each pathology section (skip tokenization)
+            'triage': {  # skip parsing records without relevant terms
+                'type': ['boolean', 'object'],
+                'properties': {
+                    'validate': {'type': 'number'},  # fraction of triaged records to check against full pipeline
+                },
+            },
+            'sweep': {  # extract under every combination of parameter values (each document parsed once)
+                'type': 'object',
+                'properties': {
+                    'grid': {
+                        'type': 'object',
+                        'properties': {
+                            'cspy_precise_finding_version': {'type': 'array', 'items': {'type': 'boolean'}},
+                            'cspy_extent_search_all': {'type': 'array', 'items': {'type': 'boolean'}},
+                            'greater_than': {'type': 'array', 'items': {'type': 'integer'}},
+                            'min_size': {'type': 'array', 'items': {'type': 'number'}},
+                            'allow_maybe': {'type': 'array', 'items': {'type': 'boolean'}},
+                            'bins': {'type': 'array', 'items': {'type': 'array', 'items': {'type': 'integer'}}},
+                        },
+                        'additionalProperties': False,
+                    },
+                    'outfile': {'type': 'string'},  # results for each configuration ({config}: its name)
+                    'summary': {'type': 'string'},  # csv of metrics for each configuration
+                }
+            },
         }
     }
     conf_fp = sys.argv[1]
@@ -521,11 +1098,15 @@ def process_config():
         elif conf_fp.endswith('yaml'):
             if not YAML:
                 raise ValueError('Yaml package not available. Please install.')
+            import yaml
+
             config = yaml.safe_load(conf)
         else:
             raise ValueError(
                 f'Unrecognized config file type "{os.path.splitext(conf_fp)[-1]}". Expected "yaml" or "json".'
             )
+    from jsonschema import validate
+
     validate(config, schema)
     process(**config)
 
@@ -0,0 +1,80 @@
+"""
+Quarantine of records which failed during `process`.
+
+Each failure is written as one line of JSON (identifier, stage, exception, and a hash of each text),
+    so the run can continue and, after a fix, only the failed records need to be re-run
+    with `process(..., replay_quarantine=<quarantine file>)`.
+"""
+import hashlib
+import json
+import traceback
+
+from loguru import logger
+
+from precise_nlp.myio import json_value
+
+ERROR = 'error'  # output column holding error code for failed records
+
+
+def text_hash(text):
+    if not isinstance(text, str):  # e.g., None, nan
+        text = str(text)
+    return hashlib.sha256(text.encode('utf8')).hexdigest()
+
+
+class Quarantine:
+    """Not thread-safe: only add records from the thread running `process` (not from workers)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._fh = open(path, 'w', encoding='utf8')
+
+    def add(self, identifier, stage, exc, path_text=None, cspy_text=None, tb=None):
+        """
+        :param stage: read, preprocess, extract, output
+        :param tb: formatted traceback, if `exc` has lost its own (e.g., raised in a worker process)
+        :return: error code for output row
+        """
+        error_code = f'{stage}:{type(exc).__name__}'
+        logger.error(f'Quarantining {identifier} ({error_code}): {exc}')
+        self._fh.write(json.dumps({
+            'identifier': json_value(identifier),
+            'stage': stage,
+            'error_code': error_code,
+            'exception': type(exc).__name__,
+            'message': str(exc),
+            'traceback': tb or ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__)),
+            'path_hash': text_hash(path_text),
+            'cspy_hash': text_hash(cspy_text),
+        }, default=str) + '\n')
+        self._fh.flush()  # keep record of failures if run is killed
+        self.count += 1
+        return error_code
+
+    def close(self):
+        self._fh.close()
+        if self.count:
+            logger.warning(f'Quarantined {self.count} records to {self.path}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_quarantine(path):
+    """
+    :return: dict of identifier -> quarantine record (last record for each identifier)
+    """
+    records = {}
+    with open(path, encoding='utf8') as fh:
+        for line in fh:
+            if line.strip():
+                record = json.loads(line)
+                records[record['identifier']] = record
+    if None in records:
+        logger.warning(f'Unable to replay records without an identifier; see {path}')
+        del records[None]
+    return records
@@ -0,0 +1,289 @@
+"""
+Scheduling records across parallel workers by their estimated cost, so that long documents (e.g., a
+    report of 100 jars) are started first rather than holding up the end of the run.
+
+    parallel:  # in config
+      workers: auto  # or number of workers
+      mode: process
+      schedule:
+        model: cost_model.json  # learned from the timings of each run (created if missing)
+        window: 1000  # records read ahead and dispatched in order of cost
+        chunk_size: auto  # or number of records sent to a worker at once
+
+The cost of each record is estimated from the length of each report, the number of specimens, and
+    the length of the colonoscopy findings section, by a linear model fit to the time taken by
+    records in previous runs.
+
+Within the window, the most costly records are dispatched first (longest processing time first).
+    Cheaper records are sent to workers in chunks of about `MIN_CHUNK_SECONDS` of work, so long
+    documents are sent alone. Idle workers take the next chunk from a queue shared by all workers
+    (rather than each worker being assigned records up front), and chunks become smaller once no
+    records remain to be read. Results are still yielded in order.
+
+At the end of the run, the makespan and tail (time some workers were idle at the end) are reported
+    alongside those of dispatching records in order (simulated from the timings).
+"""
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from loguru import logger
+
+from precise_nlp.corpus import read_slice
+from precise_nlp.pattern_registry import lazy_compile
+from precise_nlp.worker import worker_executor
+
+FEATURES = ('path_length', 'specimens', 'cspy_length', 'findings_length')
+# seconds per unit of each feature (after an intercept) before any timings have been recorded
+DEFAULT_COEFFICIENTS = (2e-3, 1e-6, 1e-3, 1e-6, 5e-6)
+MODEL_VERSION = 1
+DISPATCH_SECONDS = {'process': 5e-4, 'thread': 5e-5}  # overhead of sending a task to a worker
+MIN_CHUNK_SECONDS = 20  # chunks of cheap records: at least this many times the dispatch overhead
+WINDOW = 1000
+_END = object()
+
+SPECIMEN_PATTERN = lazy_compile(r'(?:^|\W)[A-Z](?:\d)?\)')  # e.g., 'A)'
+FINDINGS_PATTERN = lazy_compile(r'findings?\s*:', re.I)
+SECTION_PATTERN = lazy_compile(r'\n\s*[A-Za-z][A-Za-z ]{2,30}:')  # heading of next section
+
+
+def document_features(path_text, cspy_text):
+    """:return: values of `FEATURES` for a record"""
+    path_text = path_text if isinstance(path_text, str) else ''
+    cspy_text = cspy_text if isinstance(cspy_text, str) else ''
+    findings_length = 0
+    if m := FINDINGS_PATTERN.search(cspy_text):
+        end = SECTION_PATTERN.search(cspy_text, m.end())
+        findings_length = (end.start() if end else len(cspy_text)) - m.end()
+    return len(path_text), len(SPECIMEN_PATTERN.findall(path_text)), len(cspy_text), findings_length
+
+
+class CostModel:
+    """
+    Linear model of seconds to extract a record from its `FEATURES`, updated with the timings of each run
+        (by accumulating the sums of least squares, so timings themselves are not retained)
+    :param path: json file of model (if missing, `DEFAULT_COEFFICIENTS` are used until fit)
+    """
+    RIDGE = 1e-6  # relative regularization: features which never vary keep a coefficient near 0
+
+    def __init__(self, path=None):
+        self.path = path
+        self.coefficients = list(DEFAULT_COEFFICIENTS)
+        size = len(FEATURES) + 1
+        self.xtx = [[0.0] * size for _ in range(size)]
+        self.xty = [0.0] * size
+        self.count = 0
+        if path and os.path.exists(path):
+            with open(path) as fh:
+                model = json.load(fh)
+            if model.get('version') == MODEL_VERSION and model.get('features') == list(FEATURES):
+                self.coefficients = model['coefficients']
+                self.xtx, self.xty, self.count = model['xtx'], model['xty'], model['count']
+            else:
+                logger.warning(f'Cost model {path} has different features: starting a new model.')
+
+    def estimate(self, features):
+        """:return: estimated seconds to extract a record"""
+        return self.coefficients[0] + sum(c * x for c, x in zip(self.coefficients[1:], features))
+
+    def add(self, features, seconds):
+        x = (1.0, *features)
+        for i, xi in enumerate(x):
+            self.xty[i] += xi * seconds
+            row = self.xtx[i]
+            for j, xj in enumerate(x):
+                row[j] += xi * xj
+        self.count += 1
+
+    def fit(self):
+        """Refit coefficients to all timings added (in this and previous runs); negative coefficients are 0"""
+        if self.count < len(self.coefficients):
+            return
+        import numpy as np  # slow to import
+
+        xtx = np.array(self.xtx)
+        xtx += np.diag(self.RIDGE * np.diag(xtx) + 1e-12)
+        coefficients = np.linalg.solve(xtx, np.array(self.xty))
+        self.coefficients = [max(float(c), 0.0) for c in coefficients]
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, 'w') as fh:
+            json.dump({'version': MODEL_VERSION, 'features': list(FEATURES), 'coefficients': self.coefficients,
+                       'count': self.count, 'xtx': self.xtx, 'xty': self.xty}, fh)
+
+
+def _run_chunk(func, chunk):
+    """In worker: :return: list of (result, seconds) for each set of arguments in chunk"""
+    results = []
+    for args in chunk:
+        start = time.perf_counter()
+        result = func(*args)
+        results.append((result, time.perf_counter() - start))
+    return results
+
+
+def simulate(durations, workers):
+    """
+    Dispatch each duration in turn to the first idle worker
+    :return: (makespan, tail) where tail is the time from the first worker finishing to the last
+    """
+    if not durations:
+        return 0.0, 0.0
+    finish = [0.0] * min(workers, len(durations))
+    for duration in durations:
+        heapq.heappush(finish, heapq.heappop(finish) + duration)
+    return max(finish), max(finish) - min(finish)
+
+
+class Scheduler:
+    """
+    Run records on workers in order of estimated cost (see module), yielding results in order
+    :param workers: number of workers, 'auto' (see `auto_workers`), or None to run in this process
+        (timings are still recorded to fit the cost model)
+    :param model: json file of `CostModel`
+    :param window: records read ahead of the earliest record not yet yielded
+    :param chunk_size: 'auto' or maximum records per chunk
+    """
+
+    def __init__(self, workers=None, mode='process', model=None, window=WINDOW, chunk_size='auto'):
+        self.workers = workers
+        self.mode = mode
+        self.model = CostModel(model)
+        self.window = window
+        self.chunk_size = chunk_size
+        self.min_chunk_cost = MIN_CHUNK_SECONDS * DISPATCH_SECONDS.get(mode, DISPATCH_SECONDS['process'])
+        self.executor = None
+        self.durations = []  # seconds of each record, in order
+        self.dispatched = []  # order in which records were sent to workers
+        self.makespan = 0.0
+        self.tail = 0.0
+
+    def auto_workers(self, costs, exhausted):
+        """
+        Workers for estimated costs of the first window: all cpus unless every record was read, in which case
+            no more than would keep the most costly record from bounding the makespan
+        """
+        cpus = os.cpu_count() or 1
+        if not exhausted or not costs:
+            return cpus
+        return max(1, min(cpus, math.ceil(sum(costs) / max(max(costs), self.min_chunk_cost))))
+
+    def _chunk(self, waiting, remaining_cost, exhausted, workers):
+        """Pop most costly record, with further records while the chunk is cheaper than the target"""
+        cost, seq, args = heapq.heappop(waiting)
+        chunk, cost = [(seq, args)], -cost
+        if self.chunk_size == 'auto':
+            target = self.min_chunk_cost
+            if exhausted:  # smaller chunks for the last records, so workers finish together
+                target = min(target, remaining_cost / (2 * workers))
+            while waiting and cost - waiting[0][0] <= target:
+                next_cost, seq, args = heapq.heappop(waiting)
+                chunk.append((seq, args))
+                cost -= next_cost
+        else:
+            while waiting and len(chunk) < self.chunk_size:
+                next_cost, seq, args = heapq.heappop(waiting)
+                chunk.append((seq, args))
+                cost -= next_cost
+        return chunk, cost
+
+    def map(self, func, items, key=None):
+        """
+        Yield (item, func(*key(item))) for each item, in order
+        :param key: arguments for func from an item (default: item); arguments 1 and 2 are the texts
+        """
+        key = key or (lambda item: item)
+        items = iter(items)
+        if not self.workers:
+            for item in items:
+                args = key(item)
+                [(result, seconds)] = _run_chunk(func, [args])
+                self.model.add(document_features(read_slice(args[1]), read_slice(args[2])), seconds)
+                self.durations.append(seconds)
+                yield item, result
+            return
+        pending = {}  # seq -> (item, features) read but not yet yielded
+        waiting = []  # heap of (-cost, seq, args) not yet dispatched
+        done = {}  # seq -> (result, seconds)
+        running = {}  # future -> (seqs, cost)
+        remaining_cost = 0.0  # cost of records waiting
+        exhausted = False
+        next_seq = 0
+        counter = itertools.count()
+        idle_start = None  # first time a worker had nothing left to do
+
+        def read():
+            nonlocal exhausted, remaining_cost
+            while not exhausted and len(pending) < self.window:
+                item = next(items, _END)
+                if item is _END:
+                    exhausted = True
+                    break
+                seq = next(counter)
+                args = key(item)
+                features = document_features(read_slice(args[1]), read_slice(args[2]))
+                cost = self.model.estimate(features)
+                pending[seq] = item, features
+                heapq.heappush(waiting, (-cost, seq, args))
+                remaining_cost += cost
+
+        read()
+        workers = self.workers
+        if workers == 'auto':
+            workers = self.auto_workers([-cost for cost, _, _ in waiting], exhausted)
+            logger.info(f'Scheduling on {workers} workers.')
+        self.workers = workers
+        self.executor = worker_executor(workers, self.mode)
+        max_running = workers + 1  # keep remaining records in order of cost until a worker is ready
+        start = time.perf_counter()
+        try:
+            while pending:
+                while waiting and len(running) < max_running:
+                    chunk, cost = self._chunk(waiting, remaining_cost, exhausted, workers)
+                    remaining_cost -= cost
+                    future = self.executor.submit(_run_chunk, func, [args for _, args in chunk])
+                    running[future] = [seq for seq, _ in chunk]
+                    self.dispatched.extend(running[future])
+                if next_seq in done:
+                    item, features = pending.pop(next_seq)
+                    result, seconds = done.pop(next_seq)
+                    self.model.add(features, seconds)
+                    self.durations.append(seconds)
+                    next_seq += 1
+                    yield item, result
+                    read()
+                    continue
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    for seq, result in zip(running.pop(future), future.result()):
+                        done[seq] = result
+                if idle_start is None and exhausted and not waiting and len(running) < workers:
+                    idle_start = time.perf_counter()
+        finally:  # e.g., caller stopped early
+            for future in running:
+                future.cancel()
+        end = time.perf_counter()
+        self.makespan = end - start
+        self.tail = end - (idle_start or end)
+
+    def close(self):
+        """Report makespan and tail (compared with dispatch in order), and update cost model"""
+        if self.workers and self.durations:
+            scheduled = simulate([self.durations[seq] for seq in self.dispatched if seq < len(self.durations)],
+                                 self.workers)
+            in_order = simulate(self.durations, self.workers)
+            logger.info(f'Makespan {self.makespan:.2f}s with tail of {self.tail:.2f}s on {self.workers} workers.'
+                        f' From timings of each record: {scheduled[0]:.2f}s with tail of {scheduled[1]:.2f}s'
+                        f' as scheduled; {in_order[0]:.2f}s with tail of {in_order[1]:.2f}s if dispatched in order'
+                        f' ({1 - scheduled[1] / in_order[1] if in_order[1] else 0:.0%} shorter tail).')
+        self.model.fit()
+        self.model.save()
+        if self.executor:
+            self.executor.shutdown()
@@ -0,0 +1,236 @@
+"""
+Resident extraction server: load and warm the extractors once, then answer single-note requests
+    over a Unix socket (or localhost TCP) using the protocol in `precise_nlp.client`.
+
+    python -m precise_nlp.server --socket /tmp/precise_nlp.sock --workers 2
+    python -m precise_nlp.server --port 8765
+
+Each connection is handled on its own thread, which hands extraction to a pool of preloaded workers.
+"""
+import argparse
+import bisect
+import gc
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+
+from loguru import logger
+
+from precise_nlp.client import read_message, write_message
+from precise_nlp.extract.cspy.cspy import FindingVersion
+from precise_nlp.process import process_text
+from precise_nlp.worker import worker_executor, WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+LOCALHOST = {'localhost', '127.0.0.1', '::1'}
+OPTIONS = {'cspy_precise_finding_version', 'cspy_extent_search_all', 'time_budget', 'max_section_length'}
+
+
+def extract(path_text, cspy_text, options=None, variables=None):
+    """Run in worker: `process_text` with options named as in the configuration file"""
+    kwargs = dict(options or {})
+    if unknown := set(kwargs) - OPTIONS:
+        raise ValueError(f'Unrecognized options: {sorted(unknown)}; expected: {sorted(OPTIONS)}')
+    if 'cspy_precise_finding_version' in kwargs:
+        precise = kwargs.pop('cspy_precise_finding_version')
+        kwargs['cspy_finding_version'] = FindingVersion.PRECISE if precise else FindingVersion.BROAD
+    result = process_text(path_text or '', cspy_text or '', **kwargs)
+    if variables:
+        result = {variable: result.get(variable) for variable in variables}
+    return {k: v if v is None or isinstance(v, (bool, int, float, str)) else str(v)  # e.g., MaybeCounter
+            for k, v in result.items()}
+
+
+class LatencyHistogram:
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)  # final bucket: over largest bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, q):
+        """Upper bound (ms) of bucket containing the q-th percentile"""
+        if not self.count:
+            return None
+        target = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.BOUNDS_MS, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def to_dict(self):
+        labels = [f'<={bound}ms' for bound in self.BOUNDS_MS] + [f'>{self.BOUNDS_MS[-1]}ms']
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else None,
+            'max_ms': self.max,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:  # connection may send any number of requests
+            try:
+                request = read_message(self.rfile)
+            except EOFError:
+                return
+            except (ValueError, ConnectionError) as e:  # unable to recover framing
+                logger.warning(f'Closing connection: {e}')
+                return
+            write_message(self.wfile, self.server.daemon.handle(request))
+
+
+class ExtractionServer:
+    """
+    :param address: path to Unix socket or (host, port) on localhost (port 0: choose a free port)
+    :param workers: number of worker processes (or threads, if `mode='thread'`)
+    """
+
+    def __init__(self, address, workers=2, mode='process'):
+        self.workers = workers
+        self.executor = worker_executor(workers, mode=mode)
+        self._warm_workers()
+        self._lock = threading.Lock()
+        self._requests = {'extract': 0, 'stats': 0}
+        self._errors = 0
+        self._in_flight = 0
+        self._latency = LatencyHistogram()
+        self._started = time.time()
+        self._socket_path = None
+        if isinstance(address, (str, os.PathLike)):
+            self._socket_path = os.fspath(address)
+            self._remove_stale_socket()
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            if address[0] not in LOCALHOST:  # no authentication: only serve local clients
+                raise ValueError(f'Only localhost is supported, not {address[0]}.')
+            server_class = socketserver.ThreadingTCPServer
+            if ':' in address[0]:
+                server_class = type('ThreadingTCPServerV6', (server_class,), {'address_family': socket.AF_INET6})
+        server_class.daemon_threads = True
+        server_class.allow_reuse_address = True
+        self.server = server_class(address, _RequestHandler)
+        self.server.daemon = self
+        self.address = self.server.server_address
+        logger.info(f'Serving on {self.address} with {workers} workers ({mode}).')
+
+    def _warm_workers(self):
+        """Start each worker and run warm-up document so first requests are not slow"""
+        futures = [self.executor.submit(extract, WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def _remove_stale_socket(self):
+        try:
+            if stat.S_ISSOCK(os.stat(self._socket_path).st_mode):
+                os.unlink(self._socket_path)
+        except FileNotFoundError:
+            pass
+
+    def handle(self, request):
+        if not isinstance(request, dict):
+            with self._lock:
+                self._errors += 1
+            return {'error': f'Request must be an object, not {type(request).__name__}.'}
+        command = request.get('command', 'extract')
+        if command == 'stats':
+            with self._lock:
+                self._requests['stats'] += 1
+            return self.stats()
+        if command != 'extract':
+            with self._lock:
+                self._errors += 1
+            return {'error': f'Unrecognized command: {command}'}
+        start = time.perf_counter()
+        with self._lock:
+            self._requests['extract'] += 1
+            self._in_flight += 1
+        try:
+            return self.executor.submit(
+                extract, request.get('path_text'), request.get('cspy_text'),
+                request.get('options'), request.get('variables'),
+            ).result()
+        except Exception as e:
+            logger.exception(e)
+            with self._lock:
+                self._errors += 1
+            return {'error': f'{type(e).__name__}: {e}'}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._latency.add(time.perf_counter() - start)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'uptime_s': time.time() - self._started,
+                'workers': self.workers,
+                'requests': dict(self._requests),
+                'errors': self._errors,
+                'in_flight': self._in_flight,
+                'latency': self._latency.to_dict(),
+            }
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        """Stop serving (call from another thread than `serve_forever`)"""
+        self.server.shutdown()
+
+    def close(self):
+        self.server.server_close()
+        self.executor.shutdown()
+        gc.unfreeze()  # frozen by `worker_executor` before forking
+        if self._socket_path:
+            self._remove_stale_socket()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', help='path to Unix domain socket')
+    parser.add_argument('--host', default='127.0.0.1', help='localhost address (if using --port)')
+    parser.add_argument('--port', type=int, help='localhost TCP port')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--mode', choices=['process', 'thread'], default='process')
+    parser.add_argument('--log-level', default='INFO', help='per-request DEBUG logging adds latency')
+    args = parser.parse_args()
+    if bool(args.socket) == (args.port is not None):
+        parser.error('Specify one of --socket or --port.')
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    address = args.socket or (args.host, args.port)
+    with ExtractionServer(address, workers=args.workers, mode=args.mode) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
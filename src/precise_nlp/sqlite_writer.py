@@ -0,0 +1,167 @@
+"""
+SQLite output for `process` (selected by `outfile: <name>.sqlite`).
+
+Rows are appended in large batches (one transaction each) to an unindexed table. Indexes,
+    including the unique index on identifier, are only built on `close`: if a record was output
+    more than once, only the most recent row is kept. If the table already has its unique index (e.g.,
+    re-running part of a corpus into the same file), rows are instead inserted or replaced by identifier
+    against the existing indexes, so only the rows written are updated.
+"""
+import sqlite3
+
+from loguru import logger
+
+from precise_nlp.const.cspy import INDICATION, BOWEL_PREP, EXTENT
+from precise_nlp.extract.maybe_counter import MaybeCounter
+from precise_nlp.myio import json_value
+from precise_nlp.quarantine import ERROR
+
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+TEXT_COLUMNS = {INDICATION, BOWEL_PREP, EXTENT, ERROR}
+
+sqlite3.register_adapter(MaybeCounter, str)  # e.g., '>=2' (also split into `__ge`/`__num` columns)
+SQL_TYPES = frozenset({type(None), int, float, str, bytes, bool, MaybeCounter})
+
+
+def is_sqlite(path):
+    return path.lower().endswith(SQLITE_EXTENSIONS)
+
+
+def _quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _sql_value(value):
+    if value is None or isinstance(value, (int, float, str, bytes)):  # includes bool
+        return value
+    if hasattr(value, 'item'):  # numpy/pandas scalars
+        return json_value(value)
+    return str(value)  # e.g., MaybeCounter
+
+
+def column_type(name, fieldnames):
+    """
+    Declared type of output column: text variables, counts which might be inexact (e.g., MaybeCounter
+        '>=2', which are also split into integer `__ge`/`__num` columns), and otherwise integers
+    """
+    for suffix in ('_true', '_pred'):  # with truth, each label has both
+        if name.endswith(suffix) and name[:-len(suffix)] in TEXT_COLUMNS:
+            return 'TEXT'
+    if name in TEXT_COLUMNS or f'{name}__num' in fieldnames:
+        return 'TEXT'
+    return 'INTEGER'
+
+
+class SqliteWriter:
+    """
+    Replacement for the file handle and `csv.DictWriter` used by `process`.
+
+    :param table: name of results table (created if missing; new columns are added)
+    :param batch_size: rows per insert transaction
+    :param indexes: additional columns to index (built on `close`)
+    """
+
+    def __init__(self, path, table='results', batch_size=10000, indexes=None):
+        self.path = path
+        self.table = table
+        self.batch_size = batch_size
+        self.indexes = list(indexes or [])
+        self.fieldnames = None
+        self._fieldset = frozenset()
+        self.count = 0
+        self._batch = []
+        self._insert = None
+        self.patching = False  # table already indexed: insert or replace rows by identifier
+        self._conn = sqlite3.connect(path, isolation_level=None)  # transactions are managed explicitly
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+
+    def writer(self, fieldnames):
+        """Create table with these columns (and, unless patching an indexed table, drop indexes until `close`)"""
+        self.fieldnames = list(fieldnames)
+        self._fieldset = frozenset(self.fieldnames)
+        columns = ', '.join(f'{_quote(name)} {column_type(name, self.fieldnames)}'
+                            if name != 'identifier' else _quote(name)  # keep type of identifiers
+                            for name in self.fieldnames)
+        table = _quote(self.table)
+        self._conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({columns})')
+        existing = {row[1] for row in self._conn.execute(f'PRAGMA table_info({table})')}
+        for name in self.fieldnames:
+            if name not in existing:
+                self._conn.execute(f'ALTER TABLE {table} ADD COLUMN {_quote(name)} '
+                                   f'{column_type(name, self.fieldnames)}')
+        indexes = [index for (index,) in self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (self.table,))]
+        self.patching = f'{self.table}__identifier' in indexes
+        if not self.patching:
+            for index in indexes:
+                self._conn.execute(f'DROP INDEX {_quote(index)}')
+        self._insert = (f'INSERT {"OR REPLACE " if self.patching else ""}INTO {table}'
+                        f' ({", ".join(_quote(name) for name in self.fieldnames)})'
+                        f' VALUES ({", ".join("?" * len(self.fieldnames))})')
+        return self
+
+    def writerow(self, row):
+        """
+        :param row: dict (as for `csv.DictWriter`) or sequence of values in order of `fieldnames`
+        """
+        if isinstance(row, dict):
+            if extra := row.keys() - self._fieldset:
+                raise ValueError(f'dict contains fields not in fieldnames: {", ".join(map(repr, extra))}')
+            row = list(map(row.get, self.fieldnames))
+        if not SQL_TYPES.issuperset(map(type, row)):  # e.g., numpy scalars (otherwise stored as bytes)
+            row = [_sql_value(value) for value in row]
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        if not self._batch:
+            return
+        self._conn.execute('BEGIN')
+        self._conn.executemany(self._insert, self._batch)
+        self._conn.execute('COMMIT')
+        self.count += len(self._batch)
+        self._batch = []
+
+    def _build_indexes(self):
+        table = _quote(self.table)
+        if self.patching:  # unique index was kept: only add new indexes
+            self._conn.execute('BEGIN')
+            for column in self.indexes:
+                self._conn.execute(f'CREATE INDEX IF NOT EXISTS {_quote(f"{self.table}__{column}")}'
+                                   f' ON {table} ({_quote(column)})')
+            self._conn.execute('COMMIT')
+            return
+        unique = f'CREATE UNIQUE INDEX {_quote(f"{self.table}__identifier")} ON {table} (identifier)'
+        self._conn.execute('BEGIN')
+        try:
+            self._conn.execute(unique)
+        except sqlite3.IntegrityError:  # records output more than once: keep most recent
+            deleted = self._conn.execute(
+                f'DELETE FROM {table} WHERE identifier IS NOT NULL AND rowid NOT IN '
+                f'(SELECT max(rowid) FROM {table} GROUP BY identifier)'
+            ).rowcount
+            logger.info(f'Replaced {deleted} earlier rows with the same identifier.')
+            self._conn.execute(unique)
+        for column in self.indexes:
+            self._conn.execute(f'CREATE INDEX {_quote(f"{self.table}__{column}")} ON {table} ({_quote(column)})')
+        self._conn.execute('COMMIT')
+
+    def close(self):
+        self.flush()
+        if self.fieldnames is not None:
+            self._build_indexes()
+            logger.info(f'Wrote {self.count} rows to {self.path} (table {self.table}).')
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
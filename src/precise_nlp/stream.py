@@ -0,0 +1,77 @@
+"""
+Asyncio interface: extract variables from an asynchronous stream of records (e.g., a message consumer)
+    without blocking the event loop.
+
+    async for res in process_stream(consumer(), executor=worker_executor(4), max_in_flight=16):
+        if res.error:
+            ...
+        await publish(res.identifier, res.result)
+"""
+import asyncio
+import functools
+from typing import AsyncIterable, NamedTuple, Optional
+
+from precise_nlp.process import process_text
+
+
+class StreamResult(NamedTuple):
+    identifier: object
+    result: Optional[dict]  # output of `process_text` or None if failed
+    error: Optional[BaseException] = None
+
+
+async def process_stream(records: AsyncIterable, *, executor=None, max_in_flight=8, ordered=False, **kwargs):
+    """
+    Yield a `StreamResult` for each record as it completes.
+
+    Backpressure: no further records are read from `records` while `max_in_flight` records are
+        running (or, if `ordered`, waiting on an earlier record to complete).
+    :param records: async iterable of (identifier, path_text, cspy_text)
+    :param executor: process or thread executor (e.g., `worker_executor`); default: event loop's executor
+    :param ordered: yield results in the order records were read
+    :param kwargs: passed to `process_text`
+    """
+    if max_in_flight < 1:
+        raise ValueError(f'max_in_flight must be at least 1: {max_in_flight}')
+    loop = asyncio.get_running_loop()
+    records = aiter(records)
+    running = set()
+    completed = {}  # index -> result waiting on earlier results (if ordered)
+    next_index = 0  # next index to yield (if ordered)
+    count = 0
+    exhausted = False
+
+    async def run(index, identifier, path_text, cspy_text):
+        try:
+            result = await loop.run_in_executor(
+                executor, functools.partial(process_text, path_text, cspy_text, **kwargs)
+            )
+        except Exception as e:  # includes failure of executor (e.g., worker process died)
+            return index, StreamResult(identifier, None, e)
+        return index, StreamResult(identifier, result)
+
+    try:
+        while True:
+            while not exhausted and len(running) + len(completed) < max_in_flight:
+                try:
+                    identifier, path_text, cspy_text = await anext(records)
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                running.add(asyncio.ensure_future(run(count, identifier, path_text, cspy_text)))
+                count += 1
+            if not running:
+                break
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: t.result()[0]):
+                index, result = task.result()
+                if not ordered:
+                    yield result
+                    continue
+                completed[index] = result
+                while next_index in completed:
+                    yield completed.pop(next_index)
+                    next_index += 1
+    finally:  # e.g., consumer stopped early
+        for task in running:
+            task.cancel()
@@ -0,0 +1,186 @@
+"""
+Parameter sweep: parse each document once, then extract variables under every configuration in a grid.
+
+    sweep:
+      grid:
+        cspy_precise_finding_version: [true, false]
+        greater_than: [1, 2, 3]
+        min_size: [8, 10]
+      outfile: results_{config}_{datetime}.csv
+      summary: sweep_{datetime}.csv
+
+Pathology is parsed (`PathManager`) once per document. Colonoscopy parsing only depends on
+    `cspy_precise_finding_version` (findings) and `cspy_extent_search_all` (extent): each variant of
+    a `CspyManager` shares the sections, indication, and prep of the first. Each configuration is
+    scored against the same truth values, and metrics for all configurations written to `summary`.
+"""
+import copy
+import csv
+import itertools
+import os
+
+from loguru import logger
+
+from precise_nlp.extract.cspy.cspy import CspyManager, FindingVersion
+from precise_nlp.extract.path.path_manager import PathManager
+from precise_nlp.myio import fill_template
+from precise_nlp.process import extract_variables, get_data, is_missing, preprocess_texts, clean_truth, \
+    dict_writer, format_score, output_columns
+from precise_nlp.sqlite_writer import SqliteWriter, is_sqlite
+
+PARAMETERS = {  # default values (as in `process`)
+    'cspy_precise_finding_version': True,
+    'cspy_extent_search_all': False,
+    'greater_than': 2,
+    'min_size': 10,
+    'allow_maybe': False,
+    'bins': (3,),
+}
+
+
+def configurations(grid, **defaults):
+    """
+    :param grid: dict of parameter -> list of values
+    :param defaults: values of parameters not in grid (e.g., from the configuration file)
+    :return: list of configurations (dict of every parameter)
+    """
+    if unknown := set(grid) - set(PARAMETERS):
+        raise ValueError(f'Unrecognized sweep parameters: {sorted(unknown)}; expected: {sorted(PARAMETERS)}')
+    base = dict(PARAMETERS, **{k: v for k, v in defaults.items() if k in PARAMETERS})
+    configs = []
+    for values in itertools.product(*grid.values()):
+        config = dict(base, **dict(zip(grid, values)))
+        config['bins'] = tuple(config['bins'])  # lists from config file
+        configs.append(config)
+    return configs
+
+
+def config_name(config, grid):
+    """Short name for outfile, e.g., greater_than=1_min_size=8"""
+    return '_'.join(f'{k}={"-".join(map(str, v)) if k == "bins" else v}' for k, v in config.items()
+                    if k in grid) or 'default'
+
+
+class ParsedDocument:
+    """Parsed pathology and colonoscopy text, extracted under any configuration"""
+
+    def __init__(self, path_text='', cspy_text=''):
+        self.pm = PathManager(path_text)
+        self.cspy_text = cspy_text
+        self._cms = {}  # (version, extent_search_all) -> CspyManager
+
+    def cspy_manager(self, version, extent_search_all):
+        key = (version, extent_search_all)
+        if key in self._cms:
+            return self._cms[key]
+        if not self._cms:
+            cm = CspyManager(self.cspy_text, version=version, cspy_extent_search_all=extent_search_all)
+        else:  # copy cached outputs which don't depend on the changed parameters
+            same_version = [cm for (v, _), cm in self._cms.items() if v == version]
+            cm = copy.copy(same_version[0] if same_version else next(iter(self._cms.values())))
+            if not same_version:
+                cm.__dict__.pop('_findings', None)
+                cm.__dict__.pop('num_polyps', None)
+            if cm.cspy_extent_search_all != extent_search_all:
+                cm.__dict__.pop('_extent', None)
+            cm.version = version
+            cm.cspy_extent_search_all = extent_search_all
+        self._cms[key] = cm
+        return cm
+
+    def extract(self, config):
+        """
+        :param config: dict of each parameter (see `configurations`)
+        """
+        version = FindingVersion.PRECISE if config['cspy_precise_finding_version'] else FindingVersion.BROAD
+        cm = self.cspy_manager(version, config['cspy_extent_search_all'])
+        return extract_variables(self.pm, cm, cspy_finding_version=version, greater_than=config['greater_than'],
+                                 min_size=config['min_size'], allow_maybe=config['allow_maybe'], bins=config['bins'])
+
+
+def _open_output(outfile, name, index, sqlite=None):
+    """One csv per configuration or, for SQLite, one table per configuration"""
+    outpath = fill_template(outfile)
+    if is_sqlite(outpath):
+        sqlite = dict(sqlite or {})
+        return SqliteWriter(outpath, **dict(sqlite, table=f'{sqlite.get("table", "results")}_{index}'))
+    if '{config}' in outfile:
+        outpath = fill_template(outfile.replace('{config}', name))
+    else:
+        root, ext = os.path.splitext(outpath)
+        outpath = f'{root}_{name}{ext}'
+    return open(outpath, 'w', newline='')
+
+
+def process_sweep(data, sweep, truth=None, errors=None, output=None, outfile=None, preprocessing=None,
+                  cspy_precise_finding_version=True, cspy_extent_search_all=False, sqlite=None):
+    """
+    :param sweep: dict of grid (parameter -> values), outfile (results of each configuration;
+        `{config}` is replaced with the configuration's name), and summary (csv of metrics of each configuration)
+    :return: list of configurations
+    """
+    grid = sweep.get('grid') or {}
+    configs = configurations(grid, cspy_precise_finding_version=cspy_precise_finding_version,
+                             cspy_extent_search_all=cspy_extent_search_all)
+    names = [config_name(config, grid) for config in configs]
+    logger.info(f'Sweeping {len(configs)} configurations: {", ".join(names)}')
+    output = output or {}
+    group_by = output.get('group_by') or []
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    evaluators = []
+    if truth:
+        from precise_nlp.evaluation import Evaluator  # numpy is slow to import
+
+        evaluators = [Evaluator(truth, errors, group_by) for _ in configs]
+        if group_by:
+            truth = {**truth, **{('group_by', column): column for column in group_by}}
+    outfile = sweep.get('outfile') or outfile
+    handles, writers = [], []
+    if outfile:
+        fieldnames = ['row', 'identifier'] + output_columns()
+        handles = [_open_output(outfile, name, i, sqlite) for i, name in enumerate(names)]
+        writers = [dict_writer(fh, fieldnames) for fh in handles]
+    try:
+        for i, (identifier, path_text, cspy_text, truth_values) in enumerate(get_data(**data, truth=truth)):
+            if is_missing(path_text):  # as in `process`
+                print(f'Text cannot be missing/none: {identifier}')
+                continue
+            group = tuple(truth_values.pop(('group_by', column)) for column in group_by) if truth_values else ()
+            truth_items = {label: clean_truth(value) for label, value in truth_values.items()} if truth else None
+            doc = ParsedDocument(*preprocess_texts(path_text, cspy_text, preprocessing))
+            for j, config in enumerate(configs):
+                res = doc.extract(config)
+                if evaluators:
+                    evaluators[j].add(identifier, truth_items, res, group)
+                if writers:
+                    writers[j].writerow(dict(res, row=i, identifier=identifier))
+    finally:
+        for fh in handles:
+            fh.close()
+    if evaluators:
+        output_sweep_results(evaluators, configs, names, sweep.get('summary'), **output)
+    return configs
+
+
+def output_sweep_results(evaluators, configs, names, summary=None, bootstrap=1000, confidence=0.95, seed=None,
+                         **kwargs):
+    """
+    Print metrics for each configuration and label
+    :param summary: if specified, write metrics of all configurations to this csv file
+    :param kwargs: other `output` options (e.g., max_false) are ignored
+    """
+    rows = []
+    for name, config, evaluator in zip(names, configs, evaluators):
+        print(f'Configuration: {name}')
+        for result in evaluator.results(bootstrap, confidence, seed):
+            if result['group'] is None:
+                print(f'  {result["label"]}\tPPV {format_score(result, "ppv")}'
+                      f'\tRec {format_score(result, "recall")}\tSpc {format_score(result, "specificity")}')
+            rows.append({'config': name, **{k: v if k != 'bins' else '-'.join(map(str, v))
+                                            for k, v in config.items()}, **result})
+    if summary and rows:
+        with open(fill_template(summary), 'w', newline='') as fh:
+            writer = csv.DictWriter(fh, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
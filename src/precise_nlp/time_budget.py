@@ -0,0 +1,79 @@
+"""
+Per-document time budget, guarding against catastrophic backtracking in regular expressions.
+
+The `re` engine checks for signals while matching, so a `SIGALRM` timer is able to interrupt
+    a runaway pattern. Where timers are unavailable (Windows, or outside the main thread),
+    the budget is only checked once the block completes.
+"""
+import re
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from loguru import logger
+from regexify import Pattern
+
+from precise_nlp.pattern_registry import LazyPattern
+
+
+class TimeBudgetExceeded(Exception):
+
+    def __init__(self, budget, pattern=None, location=None):
+        self.budget = budget
+        self.pattern = pattern  # text of regular expression running when interrupted (if any)
+        self.location = location  # innermost precise_nlp function running when interrupted
+        super().__init__(f'Exceeded time budget of {budget}s in {location}: {pattern}')
+
+
+def _find_pattern(frame):
+    """Search outwards from interrupted frame for the regular expression being run"""
+    pattern = None
+    location = None
+    while frame and not (pattern and location):
+        if not location and frame.f_globals.get('__name__', '').startswith('precise_nlp'):
+            location = f'{frame.f_globals["__name__"]}.{frame.f_code.co_name}:{frame.f_lineno}'
+        if not pattern:
+            for value in frame.f_locals.values():
+                if isinstance(value, LazyPattern) and value.compiled:
+                    value = value.compile()
+                if isinstance(value, Pattern):
+                    pattern = value.text
+                    break
+                elif isinstance(value, re.Pattern):
+                    pattern = value.pattern
+                    break
+        frame = frame.f_back
+    return pattern, location
+
+
+def can_interrupt():
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+
+@contextmanager
+def time_limit(seconds):
+    """
+    Raise `TimeBudgetExceeded` if block takes longer than `seconds`
+    :param seconds: if falsy, no limit
+    """
+    if not seconds:
+        yield
+        return
+    if not can_interrupt():
+        start = time.perf_counter()
+        yield
+        if (elapsed := time.perf_counter() - start) > seconds:
+            logger.warning(f'Exceeded time budget of {seconds}s ({elapsed:.2f}s), but unable to interrupt.')
+        return
+
+    def handler(signum, frame):
+        raise TimeBudgetExceeded(seconds, *_find_pattern(frame))
+
+    previous = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
@@ -0,0 +1,273 @@
+"""
+Cache of the words of each pathology section (`PathSection`), so reruns over the same reports
+    skip tokenization (the `PREPROCESS_RX` substitutions and `WORD_SPLIT_PATTERN`).
+
+    process(data, outfile='out.csv', token_cache='tokens/')  # or `token_cache` in config
+
+The cache is a directory of:
+    tokens.npy: int32 rows of (word id, punctuation id, offset, flags) for each word, memory-mapped
+    index.json: format and tokenizer version, vocabulary (interned words and punctuation), and the
+        rows of each section (and seconds taken to tokenize it) keyed by a hash of its text
+
+Ids are only appended to the vocabulary. If the tokenizer (patterns, substitutions, or stop
+    punctuation) changes, the tokenizer version no longer matches and the cache is rebuilt.
+
+Sections missing from the cache are tokenized by the worker and returned with the record; they are
+    added when the run finishes (appending their rows to tokens.npy), so are only read from the cache in
+    later runs. The fraction of tokenization time saved is logged: the time taken to read cached sections
+    is compared with the time they took to tokenize when added.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from loguru import logger
+
+from precise_nlp.extract.path.path_section import PathSection, CACHED_WORDS
+from precise_nlp.extract.path.path_word import PathWord
+
+FORMAT_VERSION = 2
+TOKENS_FILE = 'tokens.npy'
+INDEX_FILE = 'index.json'
+PUNCTUATION = 1  # flag: word is followed by punctuation (not only whitespace)
+STOP = 2  # flag: punctuation ends a phrase (`PathWord.stop`)
+_CACHES = {}  # path -> TokenCache (of this process)
+
+
+def tokenizer_version():
+    """:return: hash of the tokenizer's definition: a cache built with another version is rebuilt"""
+    definition = [FORMAT_VERSION, PathSection.WORD_SPLIT_PATTERN.pattern, PathSection.WORD_SPLIT_PATTERN.flags,
+                  sorted(PathSection.PREPROCESS.items()), PathWord.STOP.pattern]
+    return hashlib.sha256(json.dumps(definition).encode('utf8')).hexdigest()[:16]
+
+
+def section_key(section):
+    return hashlib.blake2b(section.encode('utf8'), digest_size=16).hexdigest()
+
+
+def flags(spl):
+    return (PUNCTUATION if spl.strip() else 0) | (STOP if PathWord.STOP.match(spl) else 0)
+
+
+class TokenCache:
+    """
+    Words of each section from previous runs (read-only until `save`)
+    :param path: directory (created on `save`)
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.vocabulary = []
+        self._ids = {}
+        self._sections = {}  # key -> (first row, number of words, seconds to tokenize)
+        self._tokens = np.empty((0, 4), dtype=np.int32)
+        self._added = {}  # key -> ([(word, punctuation, offset)], seconds) since loaded
+        self.changed = False
+        self.rebuild = False  # rewrite tokens.npy rather than appending
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0  # reading words of cached sections
+        self.cached_seconds = 0.0  # tokenizing cached sections (when added)
+        self.miss_seconds = 0.0  # tokenizing other sections
+        if os.path.exists(os.path.join(self.path, INDEX_FILE)):
+            self._load()
+
+    def _load(self):
+        with open(os.path.join(self.path, INDEX_FILE), encoding='utf8') as fh:
+            index = json.load(fh)
+        if index.get('format') != FORMAT_VERSION or index.get('tokenizer') != tokenizer_version():
+            logger.warning(f'Token cache {self.path} was built with a different tokenizer: rebuilding.')
+            self.changed = self.rebuild = True
+            return
+        tokens = np.load(os.path.join(self.path, TOKENS_FILE), mmap_mode='r') if index['rows'] else self._tokens
+        if tokens.ndim != 2 or tokens.shape[1] != 4 or len(tokens) < index['rows']:
+            logger.warning(f'Token cache {self.path} is incomplete: rebuilding.')
+            self.changed = self.rebuild = True
+            return
+        self.vocabulary = index['vocabulary']
+        self._ids = {value: i for i, value in enumerate(self.vocabulary)}
+        self._sections = index['sections']
+        self._tokens = tokens[:index['rows']]  # rows beyond were appended by a save which did not finish
+
+    def __len__(self):
+        return len(self._sections)
+
+    def __contains__(self, key):
+        return key in self._sections
+
+    def tokens(self, key):
+        """:return: int32 array of (word id, punctuation id, offset, flags) rows, or None if not cached"""
+        if (span := self._sections.get(key)) is None:
+            return None
+        start, count, _ = span
+        return self._tokens[start:start + count]
+
+    def seconds(self, key):
+        """:return: seconds taken to tokenize section when it was added"""
+        return self._sections[key][2]
+
+    def words(self, key):
+        """:return: list of `PathWord`s, or None if not cached"""
+        if (span := self._sections.get(key)) is None:
+            return None
+        start, count, _ = span
+        vocabulary = self.vocabulary
+        return [PathWord(vocabulary[word], i, vocabulary[spl])
+                for i, (word, spl) in enumerate(self._tokens[start:start + count, :2].tolist())]
+
+    def add(self, key, words, seconds=0.0):
+        """
+        :param words: list of (word, punctuation, offset) as from `PathSection.split`
+        :param seconds: taken to tokenize section
+        """
+        if key not in self._sections and key not in self._added:
+            self._added[key] = words, seconds
+            self.changed = True
+
+    def update(self, stats):
+        """
+        :param stats: from `TokenSession.stats` (e.g., in a worker): add sections tokenized by the session
+        """
+        self.hits += stats['hits']
+        self.misses += len(stats['added'])
+        self.hit_seconds += stats['hit_seconds']
+        self.cached_seconds += stats['cached_seconds']
+        self.miss_seconds += stats['miss_seconds']
+        for key, (words, seconds) in stats['added'].items():
+            self.add(key, words, seconds)
+
+    def report(self):
+        total = self.cached_seconds + self.miss_seconds  # had no sections been cached
+        logger.info(f'Token cache: {self.hits} of {self.hits + self.misses} pathology sections cached, saving'
+                    f' {1 - (self.hit_seconds + self.miss_seconds) / total if total else 0:.0%} of tokenization'
+                    f' time ({self.hit_seconds:.2f}s reading cached words rather than {self.cached_seconds:.2f}s'
+                    f' tokenizing them; {self.miss_seconds:.2f}s tokenizing other sections).')
+
+    def _intern(self, value):
+        if (i := self._ids.get(value)) is None:
+            i = self._ids[value] = len(self.vocabulary)
+            self.vocabulary.append(value)
+        return i
+
+    def save(self):
+        """Append rows of sections added since loading to tokens.npy (or rewrite it, if invalidated)"""
+        if not self.changed:
+            return
+        rows = np.array([(self._intern(word), self._intern(spl), offset, flags(spl))
+                         for words, _ in self._added.values() for word, spl, offset in words],
+                        dtype=np.int32).reshape(-1, 4)
+        start = len(self._tokens)
+        for key, (words, seconds) in self._added.items():
+            self._sections[key] = (start, len(words), seconds)
+            start += len(words)
+        os.makedirs(self.path, exist_ok=True)
+        self._tokens = self._append(rows)  # rows are written before the index referencing them
+        tmp = os.path.join(self.path, f'{INDEX_FILE}.tmp')
+        with open(tmp, 'w', encoding='utf8') as fh:
+            json.dump({'format': FORMAT_VERSION, 'tokenizer': tokenizer_version(), 'rows': len(self._tokens),
+                       'vocabulary': self.vocabulary, 'sections': self._sections}, fh)
+        os.replace(tmp, os.path.join(self.path, INDEX_FILE))
+        logger.info(f'Added {len(self._added)} sections to token cache {self.path}'
+                    f' ({len(self)} sections, {len(self.vocabulary)} vocabulary).')
+        self._added = {}
+        self.changed = self.rebuild = False
+
+    def _append(self, rows):
+        """Write rows after those loaded, growing tokens.npy in place: :return: memory map of all rows"""
+        path = os.path.join(self.path, TOKENS_FILE)
+        start = len(self._tokens)
+        shape = (start + len(rows), 4)
+        self._tokens = None  # release memory map before resizing or replacing file
+        if not shape[0]:  # (cannot map an empty file)
+            np.save(path, rows)
+            return rows
+        if self.rebuild or not start or not self._grow(path, shape):
+            tokens = np.lib.format.open_memmap(path, mode='w+', dtype=np.int32, shape=shape)
+        else:
+            tokens = np.lib.format.open_memmap(path, mode='r+')
+        tokens[start:] = rows
+        tokens.flush()
+        del tokens
+        return np.load(path, mmap_mode='r')
+
+    @staticmethod
+    def _grow(path, shape):
+        """Rewrite shape in header of .npy file and extend it: :return: False if the new header would not fit"""
+        with open(path, 'r+b') as fh:
+            if np.lib.format.read_magic(fh) != (1, 0):
+                return False
+            _, fortran_order, dtype = np.lib.format.read_array_header_1_0(fh)
+            header_length = fh.tell()
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(header, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                          'fortran_order': fortran_order, 'shape': shape})
+            if header.tell() != header_length:
+                return False
+            fh.truncate(header_length + shape[0] * shape[1] * dtype.itemsize)  # existing rows are kept
+            fh.seek(0)
+            fh.write(header.getvalue())
+        return True
+
+
+def open_cache(path):
+    """:return: `TokenCache` for path, shared within this process (e.g., by threads or forked workers)"""
+    if (cache := _CACHES.get(str(path))) is None:
+        cache = _CACHES[str(path)] = TokenCache(path)
+    return cache
+
+
+def close_cache(path):
+    """Save and forget cache opened with `open_cache`"""
+    if (cache := _CACHES.pop(str(path), None)) is not None:
+        cache.save()
+    return cache
+
+
+class TokenSession:
+    """Words of each section of one document: from the cache, or tokenized (and collected in `added`)"""
+
+    def __init__(self, cache: TokenCache):
+        self.cache = cache
+        self.hits = 0
+        self.added = {}  # key -> [(word, punctuation, offset)]
+        self.seconds = {}  # key -> seconds to tokenize added section
+        self.hit_seconds = 0.0
+        self.cached_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def __call__(self, section):
+        start = time.perf_counter()
+        key = section_key(section)
+        if (words := self.cache.words(key)) is not None:
+            self.hits += 1
+            self.cached_seconds += self.cache.seconds(key)
+            self.hit_seconds += time.perf_counter() - start
+            return words
+        if (split := self.added.get(key)) is None:
+            split = self.added[key] = list(PathSection.split(section))
+        words = [PathWord(word, i, spl) for i, (word, spl, _) in enumerate(split)]
+        seconds = time.perf_counter() - start
+        self.seconds.setdefault(key, seconds)
+        self.miss_seconds += seconds
+        return words
+
+    def stats(self):
+        """:return: hits, added sections (with seconds to tokenize), and timings for `TokenCache.update`"""
+        return {'hits': self.hits, 'added': {key: (words, self.seconds[key]) for key, words in self.added.items()},
+                'hit_seconds': self.hit_seconds, 'cached_seconds': self.cached_seconds,
+                'miss_seconds': self.miss_seconds}
+
+
+@contextmanager
+def cached_tokens(path):
+    """Read words of `PathSection`s created within block from the cache at path"""
+    session = TokenSession(open_cache(path))
+    token = CACHED_WORDS.set(session)
+    try:
+        yield session
+    finally:
+        CACHED_WORDS.reset(token)
@@ -0,0 +1,131 @@
+"""
+Triage: output reports which contain none of the words the extractors respond to (e.g., gastric or skin
+    pathology specimens, colonoscopies without polyps) without running the full pipeline.
+
+    process(data, outfile='results.csv', triage=True)  # or `triage: {validate: 0.01}` in config
+
+A pathology report without `PATH_CUES` outputs the default pathology variables (i.e., those output by the
+    full pipeline for such a report: no adenomas, carcinomas, etc.) without being split into jars. For a
+    colonoscopy report without `CSPY_CUES`, finding extraction is skipped (the precise version only counts
+    findings which mention a polyp or its removal); indication, prep, and extent are still extracted.
+    The broad finding version counts any finding, so colonoscopy reports are only triaged with the precise one.
+
+Cues are found with a single combined pattern for each report type: over whole DataFrame chunks (`frame_cues`)
+    or, for other sources, each record (`document_cues`). Set `validate` to also run the full pipeline on
+    this fraction of triaged records, reporting (and outputting the full result for) any differences.
+"""
+import copy
+import functools
+import re
+import zlib
+
+from precise_nlp.extract.cspy.cspy import CspyManager, FindingVersion
+from precise_nlp.extract.path.path_manager import PathManager
+
+# word fragments (case-insensitive) which the pathology extractors (`JarManager`, `algorithm`) respond to
+PATH_CUES = (
+    'adenom', 'adenoca',  # adenoma, adenomatous, adenomatoid
+    'polyp',  # polyp count, 'polyps x 3'
+    'carc', 'melanoma', 'sarcoma', 'fibroma', 'neoplasm', 'epithelioma', 'tumor',  # see `JarManager.is_cancer`
+    'tubul', 'vill', 'serrat', 'sessile', r'(?<![a-z])ss[ap]s?(?![a-z])',  # histology
+    'dysplas',
+)
+# colonoscopy findings are only counted (`FindingBuilder.get_count`) with a polyp or its removal
+CSPY_CUES = (
+    'polyp',
+    'remov', 'retriev', 'biopsi',  # `FindingBuilder.was_removed`
+)
+PATH_CUE_PATTERN = re.compile('|'.join(PATH_CUES), re.I)
+CSPY_CUE_PATTERN = re.compile('|'.join(CSPY_CUES), re.I)
+DEFAULT_PATH_TEXT = 'A) Stomach, antrum, biopsy: Chronic gastritis.'  # report without cues
+CHUNK_SIZE = 10_000  # rows of DataFrame in which cues are found at once
+
+
+def document_cues(path_text, cspy_text):
+    """
+    :return: (pathology report has cues, colonoscopy report has cues)
+    """
+    return (not isinstance(path_text, str) or bool(PATH_CUE_PATTERN.search(path_text)),
+            not isinstance(cspy_text, str) or bool(CSPY_CUE_PATTERN.search(cspy_text)))
+
+
+def _column_cues(df, column, pattern):
+    if not column:  # no text
+        return [False] * len(df)
+    return df[column].str.contains(pattern, na=True).to_numpy(dtype=bool).tolist()  # missing: run full pipeline
+
+
+def frame_cues(df, path_text=None, cspy_text=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield (pathology report has cues, colonoscopy report has cues) for each row, searching chunks of rows at once
+    :param path_text: column of pathology report
+    :param cspy_text: column of colonoscopy report
+    """
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        yield from zip(_column_cues(chunk, path_text, PATH_CUE_PATTERN),
+                       _column_cues(chunk, cspy_text, CSPY_CUE_PATTERN))
+
+
+@functools.lru_cache(maxsize=None)
+def default_path_variables(cspy_finding_version=FindingVersion.PRECISE):
+    """Pathology variables from the full pipeline for a report without cues"""
+    from precise_nlp.process import extract_variables, split_maybe_counters
+
+    data = extract_variables(PathManager(DEFAULT_PATH_TEXT), CspyManager(''),
+                             cspy_finding_version=cspy_finding_version)
+    split = split_maybe_counters(data)
+    return {key: value for key, value in data.items() if key not in split}
+
+
+def triaged(cues, cspy_finding_version=FindingVersion.PRECISE):
+    """
+    :param cues: output of `document_cues`
+    :return: label of the parts of the pipeline which can be skipped: 'path', 'cspy_findings', or
+        'path+cspy_findings' (or None)
+    """
+    path_cues, cspy_cues = cues
+    skipped = [] if path_cues else ['path']
+    if not cspy_cues and cspy_finding_version == FindingVersion.PRECISE:
+        skipped.append('cspy_findings')
+    return '+'.join(skipped) or None
+
+
+def extract_triaged(path_text, cspy_text, cues, cspy_finding_version=FindingVersion.PRECISE,
+                    cspy_extent_search_all=False):
+    """
+    :param cues: output of `document_cues`
+    :return: variables (as `process_text`), or None if neither report can be triaged
+    """
+    from precise_nlp.process import extract_variables, split_maybe_counters
+
+    if not (skipped := triaged(cues, cspy_finding_version)):
+        return None
+    cm = CspyManager(cspy_text, version=cspy_finding_version, cspy_extent_search_all=cspy_extent_search_all)
+    if 'cspy_findings' in skipped:
+        cm.__dict__.update(_findings=[], num_polyps=0)  # set cached properties
+    if not skipped.startswith('path'):
+        return extract_variables(PathManager(path_text), cm, cspy_finding_version=cspy_finding_version)
+    data = {}
+    if path_text.strip():  # new counters for each record (`MaybeCounter` compares by identity)
+        data = {key: copy.copy(value) for key, value in default_path_variables(cspy_finding_version).items()}
+    data.update(extract_variables(None, cm, cspy_finding_version=cspy_finding_version))  # colonoscopy only
+    data.update(split_maybe_counters(data))
+    return data
+
+
+def sampled(identifier, fraction):
+    """Select the same records in every run (and worker)"""
+    return zlib.crc32(str(identifier).encode('utf8')) < fraction * 2 ** 32
+
+
+def differences(result, expected):
+    """
+    :return: variables which differ between triaged and full results (compared as text: `MaybeCounter`
+        compares by identity), including ordering of variables
+    """
+    names = [key for key in expected if key not in result or str(result[key]) != str(expected[key])]
+    names += [key for key in result if key not in expected]
+    if not names and list(result) != list(expected):
+        names.append('(order)')
+    return names
@@ -0,0 +1,146 @@
+"""
+Bootstrap for worker processes.
+
+Without preloading, each worker compiles patterns and warms up the extractors on its first
+    documents (so early records are slow) and holds its own copy of the results. Instead,
+    `preload` in the parent before forking: every pattern is compiled, a warm-up document
+    is run through the extractors, and the garbage collector is frozen so that a child's
+    collections don't write to (and so copy) the pages it shares with the parent.
+
+    with worker_pool(64) as pool:
+        results = pool.starmap(process_text, texts)
+
+Threads are also supported (`worker_executor(8, mode='thread')`): the extractors share only
+    immutable or lock-protected state, though throughput is limited by the GIL on standard builds.
+"""
+import collections
+import gc
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from loguru import logger
+
+from precise_nlp.pattern_profiler import PROFILED_MODULES
+from precise_nlp.pattern_registry import compile_all
+
+WARMUP_CSPY_TEXT = (
+    'Indications: Screening for colon cancer. Family history of colon polyps.\n'
+    'Procedure: The colonoscope was advanced to the cecum, identified by the appendiceal orifice'
+    ' and ileocecal valve. The terminal ileum was intubated.\n'
+    'Findings: Two 4 to 6 mm sessile polyps were found in the ascending colon and transverse colon.'
+    ' The polyps were removed with a cold snare. A 12 mm pedunculated polyp was found in the sigmoid colon'
+    ' at 25 cm. Diverticulosis in the descending colon.\n'
+    '1. Cecum - one 3 mm flat polyp.\n'
+    'Colon preparation: The quality of the bowel preparation was good.\n'
+    'Impression: Polyps removed.'
+)
+WARMUP_PATH_TEXT = (
+    'A) Colon, ascending, polypectomy: Tubular adenoma.\n'
+    'B) Colon, sigmoid, polypectomy: Tubulovillous adenoma with focal high-grade dysplasia, 1.2 cm.\n'
+    'C) Colon, transverse, biopsy: Sessile serrated adenoma. Negative for carcinoma.\n'
+    'D) Rectum, polyp: Hyperplastic polyp. No evidence of adenoma.\n'
+    'Comment: Fragments of adenomatous polyp, 3 pieces.'
+)
+
+
+def preload(warmup=True, freeze=True):
+    """
+    Prepare shared state before forking worker processes (or in each worker, when unable to fork)
+    :param warmup: run warm-up documents through each extractor
+    :param freeze: move all tracked objects into the garbage collector's permanent generation
+    :return: number of patterns compiled
+    """
+    for module in PROFILED_MODULES:  # modules defining patterns
+        importlib.import_module(module)
+    from precise_nlp.extract.cspy.cspy import FindingVersion
+    from precise_nlp.preprocess.cspy_ocr import fix_ocr_problems
+    from precise_nlp.process import process_text, process_text_degraded
+
+    start = time.perf_counter()
+    count = compile_all()
+    if warmup:
+        cspy_text = fix_ocr_problems(WARMUP_CSPY_TEXT)
+        for version in FindingVersion:
+            process_text(WARMUP_PATH_TEXT, cspy_text, cspy_finding_version=version)
+        process_text_degraded(WARMUP_PATH_TEXT, cspy_text)
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    logger.info(f'Preloaded {count} patterns in {time.perf_counter() - start:.3f}s.')
+    return count
+
+
+def can_fork():
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+@contextmanager
+def worker_pool(processes=None, warmup=True, maxtasksperchild=None):
+    """
+    Process pool of preloaded workers: forked from a preloaded parent where possible,
+        otherwise (e.g., Windows) each worker preloads itself. On exit, the pool is terminated
+        and the parent's garbage collector unfrozen.
+    :param processes: number of workers (default: cpu count)
+    """
+    if not can_fork():
+        with multiprocessing.get_context('spawn').Pool(
+                processes, initializer=preload, initargs=(warmup, False), maxtasksperchild=maxtasksperchild,
+        ) as pool:
+            yield pool
+        return
+    preload(warmup=warmup, freeze=True)
+    try:
+        with multiprocessing.get_context('fork').Pool(processes, maxtasksperchild=maxtasksperchild) as pool:
+            yield pool
+    finally:
+        gc.unfreeze()
+
+
+def worker_executor(workers=None, mode='process', warmup=True):
+    """
+    Executor with preloaded workers (see `worker_pool`). When forking, the parent's garbage collector
+        is left frozen: call `gc.unfreeze()` once the executor is shut down.
+    :param mode: 'process' or 'thread'
+    """
+    if mode == 'thread':
+        preload(warmup=warmup, freeze=False)
+        return ThreadPoolExecutor(workers)
+    if mode != 'process':
+        raise ValueError(f'Unrecognized worker mode: {mode}; expected "process" or "thread".')
+    if can_fork():
+        preload(warmup=warmup, freeze=True)
+        return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=preload, initargs=(warmup, False))
+
+
+def map_ordered(func, items, key=None, executor=None, max_pending=None):
+    """
+    Yield (item, func(*key(item))) for each item, in order.
+    :param key: arguments for func from an item (default: item)
+    :param executor: if supplied, run func on executor with at most `max_pending` calls
+        submitted ahead of the result being yielded (rather than consuming all items up front)
+    """
+    key = key or (lambda item: item)
+    if executor is None:
+        for item in items:
+            yield item, func(*key(item))
+        return
+    max_pending = max_pending or 2 * (os.cpu_count() or 1)
+    pending = collections.deque()
+    try:
+        for item in items:
+            pending.append((item, executor.submit(func, *key(item))))
+            if len(pending) >= max_pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+    finally:  # e.g., caller stopped early
+        for _, future in pending:
+            future.cancel()
@@ -0,0 +1,108 @@
+import csv
+import importlib.util
+import pathlib
+from collections import Counter
+
+import pytest
+
+from precise_nlp.sqlite_writer import SqliteWriter
+
+spec = importlib.util.spec_from_file_location(
+    'compare_output', pathlib.Path(__file__).parents[1] / 'scripts' / 'compare_output.py')
+compare_output = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(compare_output)
+
+FIELDNAMES = ['row', 'identifier', 'jar_count', 'has_adenoma']
+RECORDS = [(i, str(i % 3 + 1), str(i % 2 == 0)) for i in range(1, 13)]  # identifier, jar_count, has_adenoma
+
+
+def _write_csv(path, records):
+    with open(path, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(FIELDNAMES)
+        for row, record in enumerate(records):
+            writer.writerow((row,) + tuple(record))
+    return str(path)
+
+
+def _changed(records, identifiers):
+    """Flip has_adenoma of these identifiers"""
+    return [(i, jars, str(i in identifiers) if adenoma == 'False' else str(i not in identifiers))
+            for i, jars, adenoma in records]
+
+
+def _strip_alias(result):
+    return {key: value for key, value in result.items() if key != 'alias'}
+
+
+@pytest.mark.parametrize('chunk_size', [100, 5])  # records sorted in memory, or in runs on disk
+def test_unsorted(tmp_path, chunk_size):
+    other = _write_csv(tmp_path / 'other.csv', _changed(RECORDS, {2, 7}))
+    ordered = compare_output.compare([_write_csv(tmp_path / 'sorted.csv', RECORDS), other])
+    shuffled = RECORDS[7:] + RECORDS[::-1][5:]
+    unsorted = compare_output.compare([_write_csv(tmp_path / 'unsorted.csv', shuffled), other],
+                                      chunk_size=chunk_size)
+    assert _strip_alias(unsorted) == _strip_alias(ordered)
+    assert ordered['report']['has_adenoma']['disagree'] == 2
+    assert [sample['identifier'] for sample in ordered['report']['has_adenoma']['disagreements']] == ['2', '7']
+
+
+def test_unsorted_identifiers_order():
+    rows = [('10', {}), ('9', {}), ('a', {}), ('2', {})]
+    with pytest.raises(compare_output.NotSorted):
+        list(compare_output.check_sorted(iter(rows), 'out.csv'))
+    assert [identifier for _, identifier, _ in compare_output.external_sort(iter(rows), 3)] == ['2', '9', '10', 'a']
+
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_duplicates(tmp_path, shuffle):
+    """Last row for an identifier is kept (as when output is overwritten)"""
+    records = RECORDS + [(3, '9', 'True'), (3, '8', 'False')]
+    if shuffle:
+        records = records[::-1]  # last row is first in file
+        records[0], records[-1] = records[-1], records[0]
+    result = compare_output.compare([_write_csv(tmp_path / 'duplicates.csv', records),
+                                     _write_csv(tmp_path / 'other.csv', RECORDS)], chunk_size=4)
+    assert result['duplicates'] == {'0': 2, '1': 0}
+    assert result['report']['jar_count']['agree'] == 11
+    assert result['report']['jar_count']['disagreements'] == [{'0': '8', '1': '1', 'identifier': '3'}]
+    assert result['report']['has_adenoma']['disagree'] == 0
+
+
+def test_missing(tmp_path):
+    result = compare_output.compare([_write_csv(tmp_path / 'first.csv', RECORDS[:-2]),
+                                     _write_csv(tmp_path / 'second.csv', RECORDS[1:]),
+                                     _write_csv(tmp_path / 'third.csv', RECORDS[:5] + RECORDS[6:])])
+    assert result['missing'] == {'0': 2, '1': 1, '2': 1}
+    assert result['report']['jar_count'] == {
+        'agree': 8, 'disagree': 0, 'kappa': {'1': 1.0, '2': 1.0}, 'disagreements': []}  # records in every output
+
+
+def test_cohen_kappa():
+    pairs = Counter({('yes', 'yes'): 20, ('yes', 'no'): 5, ('no', 'yes'): 10, ('no', 'no'): 15})
+    assert compare_output.cohen_kappa(pairs) == pytest.approx(0.4)
+    assert compare_output.cohen_kappa(Counter({('a', 'a'): 3})) == 1.0
+    assert compare_output.cohen_kappa(Counter()) is None
+
+
+def test_compare_kappa(tmp_path):
+    records = [(i, '1', str(i <= 25)) for i in range(1, 51)]
+    other = [(i, '1', str(i <= 20 or 26 <= i <= 35)) for i in range(1, 51)]  # 20 yes/yes, 5 yes/no, 10 no/yes
+    result = compare_output.compare([_write_csv(tmp_path / 'first.csv', records),
+                                     _write_csv(tmp_path / 'second.csv', other)], sample_size=3)
+    assert result['report']['has_adenoma']['kappa'] == {'1': pytest.approx(0.4)}
+    assert result['report']['has_adenoma']['disagree'] == 15
+    assert len(result['report']['has_adenoma']['disagreements']) == 3
+
+
+def test_csv_sqlite_booleans(tmp_path):
+    sqlite_path = str(tmp_path / 'out.sqlite')
+    with SqliteWriter(sqlite_path) as writer:
+        writer.writer(FIELDNAMES)
+        for row, (identifier, jars, adenoma) in enumerate(RECORDS):
+            writer.writerow([row, identifier, int(jars), adenoma == 'True'])
+    csv_path = _write_csv(tmp_path / 'out.csv', RECORDS)
+    for files in ([csv_path, sqlite_path], [sqlite_path, csv_path]):
+        result = compare_output.compare(files)
+        assert result['report']['has_adenoma']['agree'] == len(RECORDS)
+        assert result['report']['jar_count']['agree'] == len(RECORDS)
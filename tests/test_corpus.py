@@ -0,0 +1,95 @@
+import gc
+import pathlib
+import pickle
+
+import pytest
+
+from precise_nlp.corpus import CorpusWriter, Corpus, CorpusFormatError, TextSlice, convert, read_slice, MAGIC
+from precise_nlp.process import get_data, process
+from precise_nlp.worker import can_fork
+
+EXAMPLE_DATA = pathlib.Path(__file__).parent.parent / 'example' / 'example_data.csv'
+RECORDS = [
+    (1, 'A) Colon, cecum: Tubular adenoma.', 'Findings: A 5 mm polyp in the cecum was removed.', {'truth': 1}),
+    ('b', 'A) Rectum: Hyperplastic polyp — ½ cm, “quoted”.', '', {'truth': 0}),
+    (3, None, 'Findings: normal', {'truth': None}),  # missing pathology report
+]
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    path = tmp_path / 'corpus.pnlpc'
+    with CorpusWriter(path, columns=['truth']) as writer:
+        for identifier, path_text, cspy_text, values in RECORDS:
+            writer.add(identifier, path_text, cspy_text, values)
+    return path
+
+
+def test_round_trip(corpus_path):
+    with Corpus(corpus_path) as corpus:
+        assert len(corpus) == 3 and corpus.columns == ['truth']
+        assert list(corpus) == RECORDS
+        assert corpus.get('b') == RECORDS[1]
+        with pytest.raises(KeyError):
+            corpus.get('1')
+
+
+def test_lazy(corpus_path):
+    with Corpus(corpus_path) as corpus:
+        identifier, path_text, cspy_text, _ = next(corpus.records(lazy=True))
+        assert isinstance(path_text, TextSlice)
+        assert (read_slice(path_text), read_slice(cspy_text)) == RECORDS[0][1:3]
+        assert [cspy_text for _, _, cspy_text, _ in corpus.records(lazy=True)][1] == ''  # empty remains falsy
+    assert pickle.loads(pickle.dumps(path_text)).read() == RECORDS[0][1]  # reopened (e.g., in worker)
+
+
+def test_format_errors(tmp_path, corpus_path):
+    path = tmp_path / 'bad.pnlpc'
+    path.write_bytes(MAGIC + b'\x00\x63' + b'...')
+    with pytest.raises(CorpusFormatError, match='format version 99'):
+        Corpus(path)
+    path.write_bytes(corpus_path.read_bytes()[:-3])
+    with pytest.raises(CorpusFormatError, match='incomplete'):
+        Corpus(path)
+    path.write_bytes(b'ID,PATH,CSPY\n')
+    with pytest.raises(CorpusFormatError, match='Not a packed corpus'):
+        Corpus(path)
+
+
+def test_get_data(corpus_path):
+    data = {'filetype': 'corpus', 'path': str(corpus_path)}
+    assert [record[:3] for record in get_data(**data)] == [record[:3] for record in RECORDS]
+    assert [record[3] for record in get_data(**data, truth={'adenoma_status': 'truth'})] == [
+        {'adenoma_status': 1}, {'adenoma_status': 0}, {'adenoma_status': None},
+    ]
+    assert [record[0] for record in get_data(**data, limit={'b', 3})] == ['b', 3]
+    assert [record[0] for record in get_data(**data, count=2, requires_cspy_text=True)] == [1]
+    records = list(get_data(**data, lazy_text=True, cues=True))
+    assert isinstance(records[0][1], TextSlice) and records[0][4] == (True, True)
+
+
+def test_convert_lookup_table(tmp_path):
+    notes = tmp_path / 'notes'
+    notes.mkdir()
+    (notes / 'lookup.csv').write_text('1,cspy1.txt,path1.txt\n2,cspy2.txt,path2.txt\n')
+    (notes / 'cspy1.txt').write_text(RECORDS[0][2], encoding='utf8')
+    (notes / 'path1.txt').write_text(RECORDS[0][1], encoding='utf8')
+    (notes / 'path2.txt').write_text(RECORDS[1][1], encoding='utf8')  # no colonoscopy report
+    data = {'filetype': 'txt', 'path': str(notes), 'lookup_table': str(notes / 'lookup.csv')}
+    assert convert(tmp_path / 'corpus.pnlpc', **data) == 2
+    with Corpus(tmp_path / 'corpus.pnlpc') as corpus:
+        assert [record[:3] for record in corpus] == [('1', *RECORDS[0][1:3]), ('2', RECORDS[1][1], '')]
+
+
+@pytest.mark.parametrize('parallel', [None, {'workers': 2, 'mode': 'thread'}, pytest.param(
+    {'workers': 2, 'mode': 'process'}, marks=pytest.mark.skipif(not can_fork(), reason='Requires fork.'))])
+def test_process_matches_csv(tmp_path, parallel):
+    pytest.importorskip('pandas')
+    data = {'filetype': 'csv', 'path': str(EXAMPLE_DATA), 'identifier': 'ID', 'path_text': 'PATH',
+            'cspy_text': 'COLONOSCOPY', 'encoding': 'utf-8-sig'}
+    convert(tmp_path / 'corpus.pnlpc', columns=['ID'], **data)
+    process(data, outfile=str(tmp_path / 'csv.csv'))
+    process({'filetype': 'corpus', 'path': str(tmp_path / 'corpus.pnlpc')}, outfile=str(tmp_path / 'corpus.csv'),
+            parallel=parallel)
+    gc.unfreeze()  # frozen before forking workers
+    assert (tmp_path / 'corpus.csv').read_text() == (tmp_path / 'csv.csv').read_text()
@@ -1,6 +1,7 @@
 import pytest
 
 from precise_nlp.extract.cspy import CspyManager
+from precise_nlp.extract.cspy.finding_builder import Finding, FindingBuilder, Location
 from precise_nlp.extract.utils import Extent, Prep, Indication
 
 
@@ -39,3 +40,75 @@ def test_indication(text, exp):
 ])
 def test_indication_section(text, exp):
     assert CspyManager(text)._get_indications_from([text]) == exp
+
+
+def test_merge_sections_first_match():
+    findings = [
+        [Finding(count=1, sizes=(5,), locations=('cecum',)), Finding(count=1, sizes=(3,), locations=('rectum',))],
+        [Finding(count=1, sizes=(4,), locations=('rectum',)), Finding(count=1, sizes=(6,)),
+         Finding(count=1, sizes=(7,), locations=(Location('cecal'),))],
+    ]
+    merged = CspyManager('', test_skip_parse=True)._merge_sections(findings)
+    assert [f.sizes for f in merged] == [(5, 6), (3, 4)]
+
+
+def test_merge_sections_scaling(monkeypatch):
+    n = 150
+    locations = ['cecum', 'ascending', 'transverse', 'descending', 'sigmoid', 'rectum']
+    findings = [
+        [Finding(count=1, sizes=(i,), locations=(locations[i % len(locations)],)) for i in range(n)],
+        [Finding(count=1, sizes=(i,), locations=(Location(locations[i % len(locations)]),)) for i in range(n)],
+        [Finding(count=1, sizes=(i,)) for i in range(n)],
+    ]
+    calls = 0
+    can_merge_findings = FindingBuilder.can_merge_findings
+
+    def counting_can_merge(f1, f2):
+        nonlocal calls
+        calls += 1
+        return can_merge_findings(f1, f2)
+
+    monkeypatch.setattr(FindingBuilder, 'can_merge_findings', counting_can_merge)
+    merged = CspyManager('', test_skip_parse=True)._merge_sections(findings)
+    assert len(merged) == n
+    for i, finding in enumerate(merged):
+        assert finding.sizes == (i, i, i)
+    assert calls <= 2 * 2 * n  # at most a couple of comparisons per finding per section
+
+
+def test_lazy_outputs(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('Findings should not be computed.')
+
+    monkeypatch.setattr(CspyManager, '_get_findings', fail)
+    cm = CspyManager('Colon preparation: good. The cecum was visualized.')
+    assert cm.prep == Prep.ADEQUATE.name
+    assert cm.extent == Extent.COMPLETE.name
+    assert '_findings' not in vars(cm)
+
+
+def test_lazy_findings_computed_once(monkeypatch):
+    calls = 0
+    get_findings = CspyManager._get_findings
+
+    def counting_get_findings(self, *args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return get_findings(self, *args, **kwargs)
+
+    monkeypatch.setattr(CspyManager, '_get_findings', counting_get_findings)
+    cm = CspyManager('Findings: A 5 mm polyp was found in the cecum. The polyp was removed.')
+    assert cm.num_polyps == 1
+    assert len(list(cm.get_findings())) == 1
+    assert calls == 1
+
+
+def test_skip_parse_outputs():
+    cm = CspyManager('Indications: screening. Colon preparation: good.', test_skip_parse=True)
+    assert cm.indication is None
+    assert cm.prep is None
+    assert cm.num_polyps is None
+    cm.parse_sections()
+    assert cm.indication == Indication.SCREENING.name
+    assert cm.prep == Prep.ADEQUATE.name
+    assert cm.num_polyps == 0
@@ -0,0 +1,29 @@
+import pytest
+
+from precise_nlp.preprocess.cspy_ocr import fix_ocr_problems, IndicationCueIndex
+
+
+@pytest.mark.parametrize(('text', 'exp'), [
+    ('Indications:\nProcedure: Colonoscope inserted. Findings: positive fit test screening for colon cancer '
+     'A 5 mm polyp was found in the cecum.',
+     'Indications:  positive fit test screening \nProcedure: Colonoscope inserted. Findings: '
+     'positive fit test screening for colon cancer A 5 mm polyp was found in the cecum.'),
+    ('Indications:\nProcedure: Colonoscope inserted. Findings: Screening for colon cancer, '
+     'limitations none. A 5 mm polyp was found in the cecum.',
+     'Indications:  Screening for colon cancer,  \nProcedure: Colonoscope inserted. Findings: '
+     'Screening for colon cancer, limitations none. A 5 mm polyp was found in the cecum.'),
+    ('Indications: positive fit test Findings: A 5 mm polyp was found in the cecum.',
+     'Indications: positive fit test Findings: A 5 mm polyp was found in the cecum.'),
+])
+def test_column_separated_indications(text, exp):
+    assert fix_ocr_problems(text) == exp
+
+
+@pytest.mark.parametrize(('text', 'window', 'exp'), [
+    ('positive fit test screening for colon cancer the colon was normal', 50, len('positive fit test screening')),
+    ('the colon was normal with no abdominal pain', 50, 0),  # negated
+    ('screening' + ' ' * 60 + 'abdominal pain', 50, len('screening')),  # next cue out of window
+    ('a polyp was found in a diverticulum', 32, len('a polyp was found in a diverticu')),  # truncated by window
+])
+def test_indication_end(text, window, exp):
+    assert IndicationCueIndex(text).indication_end(window=window) == exp
@@ -0,0 +1,31 @@
+import pytest
+
+from precise_nlp.doc_parser import remove_ocr_junk, parse_file, parse_files, parse_column
+
+
+@pytest.mark.parametrize(('line', 'exp'), [
+    ('A polyp was found in the cecum', 'A polyp was found in the cecum'),
+    ('A polyp was found in the cecum l| xq', 'A polyp was found in the cecum'),
+    ('Findings: The Colon was normal', 'Findings:  was normal'),
+])
+def test_remove_ocr_junk(line, exp):
+    assert remove_ocr_junk(line) == exp
+
+
+def test_parse_file_joins_lines():
+    text = ('Findings: A 5 mm polyp was found\n'
+            'in the cecum and removed\n'
+            'MRN: 12345\n'
+            'Page 2\n'
+            'Impression: normal colon')
+    assert parse_file(text) == 'Findings: A 5 mm polyp was found in the cecum and removed\nImpression: normal colon'
+
+
+def test_parse_column():
+    pd = pytest.importorskip('pandas')
+    texts = ['Findings: A 5 mm polyp was found\nin the cecum and removed', None, 'Impression: normal']
+    df = pd.DataFrame({'text': texts}, index=[3, 4, 5])
+    result = parse_column(df, 'text')
+    assert list(result.index) == [3, 4, 5]
+    assert list(result) == list(parse_files(texts))
+    assert list(result) == ['Findings: A 5 mm polyp was found in the cecum and removed', '', 'Impression: normal']
@@ -0,0 +1,120 @@
+import csv
+import math
+import random
+
+import numpy as np
+import pytest
+
+from precise_nlp.evaluation import Evaluator, bootstrap, metrics, FP, FN, EXCLUDED, MISSING
+from precise_nlp.extract.maybe_counter import MaybeCounter
+from precise_nlp.process import process
+
+LABELS = ['adenoma_status', 'adenoma_count', 'indication']
+
+
+def score(records, errors):
+    """Per-record scoring previously done in `process`"""
+    result = {label: [0, 0, 0, 0] for label in LABELS}
+    for identifier, truth_values, res in records:
+        for label in LABELS:
+            truth_item = truth_values[label]
+            if label not in res:
+                continue
+            if res[label] == truth_item == 0:
+                result[label][3] += 1
+            elif res[label] == truth_item:
+                result[label][0] += 1
+            elif identifier in errors.get(label, {}).get('fn' if truth_item == 1 else 'fp', []):
+                continue
+            elif truth_item == 1:
+                result[label][2] += 1
+            else:
+                result[label][1] += 1
+    return result
+
+
+def random_records(n, seed=0):
+    rng = random.Random(seed)
+    values = [0, 1, 2, 'SCREENING', 'DIAGNOSTIC', MaybeCounter(1), True, False, 1.0]
+    for i in range(n):
+        res = {label: rng.choice(values) for label in LABELS if rng.random() > 0.05}
+        yield i, {label: rng.choice(values) for label in LABELS}, res
+
+
+def test_matches_previous_scoring():
+    records = list(random_records(2000))
+    errors = {'adenoma_status': {'fp': [1, 2, 3, 4, 5, 6, 7, 8], 'fn': list(range(100))}}
+    evaluator = Evaluator(LABELS, errors=errors)
+    for record in records:
+        evaluator.add(*record)
+    counts = evaluator.confusion()[:, 0, :]
+    expected = score(records, errors)
+    assert counts.tolist() == [expected[label] for label in LABELS]
+    outcomes = evaluator.outcomes()
+    assert (outcomes == EXCLUDED).sum() > 0
+    assert (outcomes == MISSING).sum() == sum(len(LABELS) - len(res) for _, _, res in records)
+
+
+def test_errors_found():
+    evaluator = Evaluator(['label'], errors={'label': {'FP': ['b']}})
+    for identifier, truth, pred in [('a', 0, 1), ('b', 0, 1), ('c', 1, 0), ('d', 1, 1)]:
+        evaluator.add(identifier, {'label': truth}, {'label': pred})
+    assert evaluator.errors_found() == {'label': (['a'], ['c'])}
+    assert evaluator.outcomes().tolist() == [[FP, EXCLUDED, FN, 0]]
+
+
+def test_group_by():
+    evaluator = Evaluator(LABELS, group_by=['site', 'year'])
+    for identifier, truth_values, res in random_records(500):
+        evaluator.add(identifier, truth_values, res, group=(identifier % 3, 2020 + identifier % 2))
+    results = evaluator.results(iterations=0)
+    assert len(results) == len(LABELS) * 7  # all records + 6 groups
+    for label in LABELS:
+        overall, *groups = [r for r in results if r['label'] == label]
+        assert overall['group'] is None
+        assert {r['group'] for r in groups} == {f'site={s}, year={y}' for s in range(3) for y in (2020, 2021)}
+        for outcome in ('tp', 'fp', 'fn', 'tn'):
+            assert overall[outcome] == sum(r[outcome] for r in groups)
+
+
+def test_metrics():
+    result = metrics(np.array([[8, 2, 1, 9], [0, 0, 0, 5]]))
+    assert result['ppv'][0] == 0.8
+    assert result['recall'][0] == 8 / 9
+    assert result['specificity'][0] == 9 / 11
+    assert math.isnan(result['ppv'][1])
+
+
+def test_bootstrap():
+    counts = np.array([[80, 20, 10, 90], [0, 0, 0, 0]])
+    intervals = bootstrap(counts, iterations=2000, rng=np.random.default_rng(1))
+    low, high = intervals['ppv']
+    assert low[0] < 0.8 < high[0]
+    assert 0.7 < low[0] and high[0] < 0.9
+    assert math.isnan(low[1]) and math.isnan(high[1])
+    again = bootstrap(counts, iterations=2000, rng=np.random.default_rng(1))
+    assert again['ppv'][0][0] == low[0]
+
+
+def test_process_group_by(tmp_path, capsys):
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame([
+        {'ID': 1, 'PATH': 'A) Colon, cecum, polypectomy: Tubular adenoma.', 'CSPY': '', 'STATUS': 'Y', 'SITE': 'a'},
+        {'ID': 2, 'PATH': 'A) Rectum: Hyperplastic polyp.', 'CSPY': '', 'STATUS': 'N', 'SITE': 'a'},
+        {'ID': 3, 'PATH': 'A) Rectum: Hyperplastic polyp.', 'CSPY': '', 'STATUS': 'Y', 'SITE': 'b'},
+    ])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    metrics_file = tmp_path / 'metrics.csv'
+    process(data, truth={'adenoma_status': 'STATUS'}, outfile=str(tmp_path / 'out.csv'),
+            output={'group_by': 'SITE', 'seed': 0, 'outfile': str(metrics_file)})
+    with open(metrics_file, newline='') as fh:
+        rows = list(csv.DictReader(fh))
+    assert [(r['group'], r['tp'], r['fp'], r['fn'], r['tn']) for r in rows] == [
+        ('', '1', '0', '1', '1'), ('SITE=a', '1', '0', '0', '1'), ('SITE=b', '0', '0', '1', '0'),
+    ]
+    assert 'ppv_low' in rows[0]
+    printed = capsys.readouterr().out
+    assert 'Label: adenoma_status' in printed
+    assert 'SITE=b' in printed
+    with open(tmp_path / 'out.csv', newline='') as fh:
+        assert next(csv.reader(fh)) == ['row', 'identifier', 'adenoma_status_true', 'adenoma_status_pred']
@@ -0,0 +1,75 @@
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from precise_nlp.file_reader import read_text, scan_directory, PrefetchReader, lookup_entries
+from precise_nlp.process import get_data
+
+
+@pytest.mark.parametrize('filename, opener', [
+    ('note.txt', open), ('note.txt.gz', gzip.open), ('note.txt.bz2', bz2.open), ('note.txt.xz', lzma.open),
+])
+def test_read_text(tmp_path, filename, opener):
+    with opener(tmp_path / filename, 'wt', encoding='utf8') as fh:
+        fh.write('Findings: a 5 mm polyp — removed.')
+    assert read_text(str(tmp_path / filename))[0] == 'Findings: a 5 mm polyp — removed.'
+    assert read_text(str(tmp_path / 'note.txt'))[0] == 'Findings: a 5 mm polyp — removed.'  # finds compressed
+    assert read_text(str(tmp_path / 'missing.txt')) == ('', 0)
+
+
+@pytest.fixture
+def notes(tmp_path):
+    for i in range(12):
+        (tmp_path / f'cspy{i:02}.txt').write_text(f'Findings: {i} polyps.')
+        with gzip.open(tmp_path / f'path{i:02}.txt.gz', 'wt') as fh:
+            fh.write(f'A) Colon: tubular adenoma {i}.')
+    (tmp_path / 'bad.txt').write_bytes(b'\xff\xfe\xfa')
+    (tmp_path / 'lookup.csv').write_text(''.join(f'{i},cspy{i:02}.txt,path{i:02}.txt\n' for i in range(12))
+                                         + 'malformed\n12,bad.txt,path00.txt\n13,missing.txt,path01.txt\n')
+    return tmp_path
+
+
+def test_scan_directory(notes):
+    assert scan_directory(notes, ['cspy*', '*.csv'])[:2] == ['cspy00.txt', 'cspy01.txt']
+    assert scan_directory(notes, 'path*.gz')[-1] == 'path11.txt.gz'
+    assert len(scan_directory(notes)) == 26
+
+
+def test_lookup_entries(notes):
+    entries = list(lookup_entries(notes / 'lookup.csv', limit={'1', '12'}))
+    assert [entry for entry in entries if not isinstance(entry[1], Exception)] == [
+        ('1', ('cspy01.txt', 'path01.txt')), ('12', ('bad.txt', 'path00.txt'))]
+    assert entries[1][0] is None and 'malformed' in str(entries[1][1])
+
+
+@pytest.mark.parametrize('prefetch', [True, 3, {'workers': 2, 'max_pending': 1}])
+def test_lookup_table(notes, prefetch):
+    data = {'filetype': 'txt', 'path': str(notes), 'lookup_table': str(notes / 'lookup.csv')}
+    expected_errors, errors = [], []
+    expected = list(get_data(**data, on_error=lambda i, e: expected_errors.append((i, type(e)))))
+    assert list(get_data(**data, prefetch=prefetch, on_error=lambda i, e: errors.append((i, type(e))))) == expected
+    assert len(expected) == 13 and expected[0] == ('0', 'A) Colon: tubular adenoma 0.', 'Findings: 0 polyps.', None)
+    assert expected[-1] == ('13', 'A) Colon: tubular adenoma 1.', '', None)
+    assert errors == expected_errors == [(None, ValueError), ('12', UnicodeDecodeError)]
+    with pytest.raises(ValueError, match='malformed'):
+        list(get_data(**data, prefetch=prefetch))
+
+
+def test_directory(notes):
+    data = {'filetype': 'txt', 'path': str(notes), 'include': ['path*'], 'prefetch': 4}
+    records = list(get_data(**data))
+    assert [record[0] for record in records] == [f'path{i:02}.txt' for i in range(12)]  # in order
+    assert records[3] == ('path03.txt', '', 'A) Colon: tubular adenoma 3.', None)
+    assert [record[0] for record in get_data(**data, count=2)] == ['path00.txt', 'path01.txt']
+    assert [record[0] for record in get_data(**data, limit={'path05.txt'})] == ['path05.txt']
+    assert sorted(records) == sorted(get_data(**dict(data, prefetch=None)))
+
+
+def test_prefetch_reader(notes):
+    reader = PrefetchReader(workers=2, max_pending=2)
+    results = reader.read(range(12), lambda i: [notes / f'cspy{i:02}.txt', notes / f'path{i:02}.txt'])
+    assert next(results) == (0, ['Findings: 0 polyps.', 'A) Colon: tubular adenoma 0.'])
+    results.close()  # stopped early: pending reads cancelled
+    assert reader.files == 2 and reader.bytes > 0
@@ -0,0 +1,138 @@
+import sqlite3
+
+import pytest
+
+from precise_nlp import process as process_module
+from precise_nlp.extract.path import terms
+from precise_nlp.incremental import requirements, tokenize, lexicon_snapshot, diff_lexicon, TokenIndexWriter, \
+    TokenIndex, affected_identifiers, IncompleteIndex
+from precise_nlp.process import process
+
+TERMS = 'precise_nlp.extract.path.terms.CANCER_NEGATION_TERMS'
+TEXTS = {
+    1: 'A) Colon, cecum, polypectomy: Tubular adenoma.',
+    2: 'A) Rectum, biopsy: Zzdubious adenocarcinoma.',
+    3: 'A) Rectum, biopsy: Adenocarcinoma.',
+    4: 'A) Colon, sigmoid: Hyperplastic polyp. B) Rectum: zzdubious polyp.',
+}
+
+
+@pytest.mark.parametrize('entry, expected', [
+    ('term:tubular adenoma', [['adenoma', 'tubular']]),
+    ('term:r/o', [['o', 'r']]),
+    ('re:32:\\bcarcinoma\\b', [['carcinoma']]),
+    ('re:34:polyp|mass', [['polyp'], ['mass']]),
+    ('re:34:colon(?:ic)?\\W+(\\d+) mm', [['colon', 'mm']]),
+    ('re:34:(?:ascending|descending) colon', [['ascending', 'colon'], ['colon', 'descending']]),
+    ('re:34:\\d+\\s*', None),
+    ('re:34:(polyp)?s', [['s']]),
+    ('term:·', None),
+])
+def test_requirements(entry, expected):
+    assert requirements(entry) == expected
+
+
+def test_snapshot(monkeypatch):
+    snapshot = lexicon_snapshot()
+    assert 'term:unlikely' in snapshot[TERMS]
+    assert any(entry.startswith('re:') for entry in snapshot['precise_nlp.const.patterns.SIZE_PATTERN'])
+    monkeypatch.setattr(terms, 'CANCER_NEGATION_TERMS', terms.CANCER_NEGATION_TERMS[1:] + ['zzdubious'])
+    assert diff_lexicon(snapshot, lexicon_snapshot()) == {TERMS: (['term:zzdubious'], ['term:no'])}
+
+
+def test_index(tmp_path):
+    path = tmp_path / 'index.sqlite'
+    with TokenIndexWriter(path, flush_size=5) as writer:  # several flushes
+        for identifier, text in TEXTS.items():
+            writer.add(identifier, tokenize(text, ''))
+    with TokenIndex(path) as index:
+        assert len(index) == 4
+        assert index.identifiers(index.affected(['term:zzdubious'])) == [2, 4]
+        assert index.identifiers(index.affected(['term:rectum zzdubious'])) == [2, 4]
+        assert index.identifiers(index.affected(['term:sigmoid zzdubious'])) == [4]
+        assert index.identifiers(index.affected(['re:34:adeno'])) == [1, 2, 3]  # within tokens
+        assert index.identifiers(index.affected(['re:34:\\d+'])) == [1, 2, 3, 4]
+        assert index.identifiers(index.affected([])) == []
+        assert index.rows(index.affected(['term:zzdubious'])) == {2: None, 4: None}
+        assert affected_identifiers(index) == ([], {})
+
+
+def test_incomplete_index(tmp_path):
+    path = tmp_path / 'index.sqlite'
+    with pytest.raises(KeyError):
+        with TokenIndexWriter(path) as writer:  # e.g., run interrupted after first record
+            writer.add(1, tokenize(TEXTS[1], ''))
+            raise KeyError('interrupted')
+    with pytest.raises(IncompleteIndex):
+        TokenIndex(path)
+
+
+@pytest.fixture
+def counted_process_text(monkeypatch):
+    calls = []
+    process_text = process_module.process_text
+
+    def _process_text(path_text, cspy_text, **kwargs):
+        calls.append(path_text)
+        return process_text(path_text, cspy_text, **kwargs)
+
+    monkeypatch.setattr(process_module, 'process_text', _process_text)
+    return calls
+
+
+def test_process_incremental(tmp_path, monkeypatch, counted_process_text):
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame([{'ID': identifier, 'PATH': text, 'CSPY': ''} for identifier, text in TEXTS.items()])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    outfile, index = str(tmp_path / 'results.sqlite'), str(tmp_path / 'index.sqlite')
+
+    def carcinoma_counts():
+        with sqlite3.connect(outfile) as conn:
+            return dict(conn.execute('SELECT identifier, jar_carcinoma_count FROM results'))
+
+    def rows():
+        with sqlite3.connect(outfile) as conn:
+            return dict(conn.execute('SELECT identifier, row FROM results'))
+
+    process(data, outfile=outfile, incremental=index)  # full run: build index
+    assert len(counted_process_text) == 4
+    assert carcinoma_counts() == {1: 0, 2: 1, 3: 1, 4: 0}
+    assert rows() == {1: 0, 2: 1, 3: 2, 4: 3}
+    with pytest.raises(ValueError, match='SQLite'):
+        process(data, outfile=str(tmp_path / 'results.csv'), incremental=index)
+
+    counted_process_text.clear()
+    process(data, outfile=outfile, incremental=index)  # no changes
+    assert counted_process_text == []
+
+    monkeypatch.setattr(terms, 'CANCER_NEGATION_TERMS', terms.CANCER_NEGATION_TERMS + ['zzdubious'])
+    process(data, outfile=outfile, incremental=index)
+    assert counted_process_text == [TEXTS[2], TEXTS[4]]
+    assert carcinoma_counts() == {1: 0, 2: 0, 3: 1, 4: 0}
+    assert rows() == {1: 0, 2: 1, 3: 2, 4: 3}  # patched records keep their rows
+    with TokenIndex(index) as token_index:  # lexicon updated
+        assert affected_identifiers(token_index) == ([], {})
+
+
+def test_process_interrupted(tmp_path, monkeypatch):
+    """Index of a run which failed is rebuilt (rather than patching none of the records)"""
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame([{'ID': identifier, 'PATH': text, 'CSPY': ''} for identifier, text in TEXTS.items()])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    outfile, index = str(tmp_path / 'results.sqlite'), str(tmp_path / 'index.sqlite')
+    process_text = process_module.process_text
+
+    def failing_process_text(path_text, cspy_text, **kwargs):
+        if path_text == TEXTS[2]:
+            raise KeyError('interrupted')
+        return process_text(path_text, cspy_text, **kwargs)
+
+    monkeypatch.setattr(process_module, 'process_text', failing_process_text)
+    with pytest.raises(KeyError):
+        process(data, outfile=outfile, incremental=index)
+    monkeypatch.undo()
+    process(data, outfile=outfile, incremental=index)
+    with sqlite3.connect(outfile) as conn:
+        assert dict(conn.execute('SELECT identifier, jar_carcinoma_count FROM results')) == {1: 0, 2: 1, 3: 1, 4: 0}
+    with TokenIndex(index) as token_index:
+        assert len(token_index) == 4
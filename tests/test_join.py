@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from precise_nlp.join import join_rows, read_rows
+from precise_nlp.process import get_data, process
+from precise_nlp.worker import WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+def outer_join(path_rows, cspy_rows):
+    """Expected: every matching pair, and unmatched rows of each dataset"""
+    expected = [(p[0], p, c) for p in path_rows for c in cspy_rows if p[0] == c[0]]
+    expected += [(p[0], p, None) for p in path_rows if all(p[0] != c[0] for c in cspy_rows)]
+    expected += [(c[0], None, c) for c in cspy_rows if all(p[0] != c[0] for p in path_rows)]
+    return expected
+
+
+def rows(keys, prefix):
+    return [(key, f'{prefix}{i}', {}) for i, key in enumerate(keys)]
+
+
+@pytest.mark.parametrize('max_rows', [
+    100,  # hash join: colonoscopy in memory
+    6,  # hash join: pathology in memory
+    2,  # sort-merge join
+])
+@pytest.mark.parametrize('seed', range(5))
+def test_join_rows(tmp_path, max_rows, seed):
+    rng = random.Random(seed)
+    path_rows = rows([rng.choice([1, 2, 3, 5, 'a', 'b']) for _ in range(6)], 'path')
+    cspy_rows = rows([rng.choice([1, 2, 4, 'a', 'c']) for _ in range(8)], 'cspy')
+    result = list(join_rows(iter(path_rows), iter(cspy_rows), max_rows=max_rows, directory=tmp_path))
+    assert sorted((row[:3] for row in result), key=repr) == sorted(outer_join(path_rows, cspy_rows), key=repr)
+    for key, path_row, cspy_row, (path_ordinal, cspy_ordinal) in result:  # of row among rows with the key
+        assert path_ordinal == ([p for p in path_rows if p[0] == key].index(path_row) if path_row else 0)
+        assert cspy_ordinal == ([c for c in cspy_rows if c[0] == key].index(cspy_row) if cspy_row else 0)
+    assert len({(key, ordinals) for key, _, _, ordinals in result}) == len(result)
+
+def test_join_rows_streams_path():
+    path_rows = rows([3, 1, 2], 'path')
+    result = join_rows(iter(path_rows), iter(rows([2, 4], 'cspy')))
+    assert [(key, p and p[1], c and c[1]) for key, p, c, _ in result] == [
+        (3, 'path0', None), (1, 'path1', None), (2, 'path2', 'cspy0'), (4, None, 'cspy1'),
+    ]
+
+
+def test_join_rows_sorted():
+    result = join_rows(iter(rows([3, 'b', 1], 'path')), iter(rows(['a', 2, 3], 'cspy')), max_rows=1)
+    assert [key for key, *_ in result] == [1, 2, 3, 'a', 'b']
+
+
+def test_read_rows(tmp_path):
+    pytest.importorskip('pandas')
+    (tmp_path / 'path.csv').write_text('ENC,NOTE,TRUTH\n1,first,y\n,no key,n\n3,,n\n')
+    assert list(read_rows('csv', str(tmp_path / 'path.csv'), key='ENC', text='NOTE', columns=['TRUTH', 'OTHER'],
+                          chunk_size=2)) == [(1, 'first', {'TRUTH': 'y'}), (3, '', {'TRUTH': 'n'})]
+
+
+@pytest.fixture
+def sources(tmp_path):
+    pd = pytest.importorskip('pandas')
+    pd.DataFrame({'ENC': [1, 2, 3], 'PATH_NOTE': [WARMUP_PATH_TEXT, 'A) Colon: normal.', 'A) Rectum: polyp.'],
+                  'ADENOMA': ['y', 'n', 'n']}).to_csv(tmp_path / 'path.csv', index=False)
+    pd.DataFrame({'ENC_ID': [4, 1, 2], 'REPORT': ['Findings: normal', WARMUP_CSPY_TEXT, 'Findings: polyp'],
+                  'ADENOMA': ['n', 'n', 'n']}).to_csv(tmp_path / 'cspy.tsv', index=False, sep='\t')
+    return {
+        'filetype': 'join',
+        'path_source': {'filetype': 'csv', 'path': str(tmp_path / 'path.csv'), 'key': 'ENC', 'text': 'PATH_NOTE'},
+        'cspy_source': {'filetype': 'tab', 'path': str(tmp_path / 'cspy.tsv'), 'key': 'ENC_ID', 'text': 'REPORT'},
+    }
+
+
+@pytest.mark.parametrize('max_join_rows', [None, 1])
+def test_get_data(sources, max_join_rows):
+    records = list(get_data(**sources, truth={'adenoma_status': 'ADENOMA'}, max_join_rows=max_join_rows))
+    assert sorted((record[0], bool(record[1]), bool(record[2]), record[3]['adenoma_status'])
+                  for record in records) == [
+        (1, True, True, 'y'), (2, True, True, 'n'), (3, True, False, 'n'), (4, False, True, 'n'),
+    ]
+    assert sorted(record[0] for record in get_data(**sources, requires_cspy_text=True)) == [1, 2, 4]
+    assert [record[0] for record in get_data(**sources, limit={2})] == [2]
+
+
+@pytest.mark.parametrize('max_join_rows', [None, 1])
+def test_get_data_shared_keys(tmp_path, max_join_rows):
+    pd = pytest.importorskip('pandas')
+    pd.DataFrame({'ENC': [1, 2, 1, 3, 3], 'NOTE': ['p1', 'p2', 'p3', 'p4', 'p5']}).to_csv(
+        tmp_path / 'path.csv', index=False)
+    pd.DataFrame({'ENC': [1, 1, 2], 'NOTE': ['c1', 'c2', 'c3']}).to_csv(tmp_path / 'cspy.csv', index=False)
+    sources = {'filetype': 'join', 'max_join_rows': max_join_rows,
+               'path_source': {'filetype': 'csv', 'path': str(tmp_path / 'path.csv'), 'key': 'ENC', 'text': 'NOTE'},
+               'cspy_source': {'filetype': 'csv', 'path': str(tmp_path / 'cspy.csv'), 'key': 'ENC', 'text': 'NOTE'}}
+    records = {record[0]: record[1:3] for record in get_data(**sources)}
+    assert records == {
+        1: ('p1', 'c1'), '1:1:2': ('p1', 'c2'), '1:2:1': ('p3', 'c1'), '1:2:2': ('p3', 'c2'),
+        2: ('p2', 'c3'), 3: ('p4', ''), '3:2:1': ('p5', ''),
+    }
+
+
+def test_process_matches_merged(tmp_path, sources):
+    pd = pytest.importorskip('pandas')
+    path_df = pd.read_csv(sources['path_source']['path'])
+    cspy_df = pd.read_csv(sources['cspy_source']['path'], sep='\t').rename(columns={'ENC_ID': 'ENC'})
+    df = path_df.merge(cspy_df, on='ENC', how='outer', sort=True).fillna({'PATH_NOTE': '', 'REPORT': ''})
+    merged = {'filetype': df, 'path': None, 'identifier': 'ENC', 'path_text': 'PATH_NOTE', 'cspy_text': 'REPORT'}
+    process(merged, outfile=str(tmp_path / 'merged.csv'))
+    process(dict(sources, max_join_rows=1), outfile=str(tmp_path / 'joined.csv'))  # sort-merge: in order of key
+    assert (tmp_path / 'joined.csv').read_text() == (tmp_path / 'merged.csv').read_text()
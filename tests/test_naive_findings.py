@@ -2,8 +2,9 @@ import collections
 
 import pytest
 
-from precise_nlp.extract.cspy.cspy import CspyManager
+from precise_nlp.extract.cspy.cspy import CspyManager, FindingVersion
 from precise_nlp.extract.cspy.naive_finding import NaiveFinding
+from precise_nlp.extract.utils import StandardTerminology
 
 
 @pytest.mark.parametrize(('sections', 'expected_count'), [
@@ -31,3 +32,20 @@ def test_parse_finding_location():
     sentence = 'polyps found in rectum'
     f = NaiveFinding.parse_finding(sentence)
     assert f.locations == ('rectum',)
+
+
+@pytest.mark.parametrize(('text', 'exp'), [
+    ('polyp in the ileo cecal valve', {'ileo cecal', 'cecal'}),
+    ('Sig. and rectosigmoid', {'sig', 'rectosigmoid'}),
+    ('sigmoid-descending junction', {'sigmoid', 'descending'}),
+    ('ascendingcolon', set()),
+])
+def test_find_location_terms(text, exp):
+    assert StandardTerminology.find_location_terms(text) == exp
+
+
+def test_broad_findings_of_size():
+    text = 'Findings: - A 12 mm polyp in the cecum was removed. - A 3 mm polyp in the rectum was removed.'
+    cm = CspyManager(text, version=FindingVersion.BROAD)
+    assert cm.num_polyps == 2
+    assert [f.locations for f in cm.get_findings_of_size(10)] == [('cecum',)]
@@ -0,0 +1,102 @@
+import pytest
+
+from precise_nlp.extract.cspy.cspy import FindingVersion
+from precise_nlp.parsed_store import ParsedStoreWriter, ParsedStoreReader, StoreFormatError, dump_parsed, \
+    load_parsed, MAGIC
+from precise_nlp.process import process, process_text, extract_variables
+from precise_nlp.worker import WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+CSPY_TEXT = 'Indications: Screening for colon cancer\nFindings: A 12 mm polyp was found in the cecum and removed.'
+PATH_TEXT = 'A) Colon, cecum, polypectomy: Tubular adenoma, 1.2 cm.\nB) Rectum: Adenocarcinoma.'
+TEXTS = [(PATH_TEXT, CSPY_TEXT), (WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT), ('', CSPY_TEXT), (PATH_TEXT, '')]
+
+
+def as_strings(result):
+    return {k: str(v) for k, v in result.items()}  # MaybeCounter compares by identity
+
+
+def parse(path_text, cspy_text, version=FindingVersion.PRECISE):
+    parsed = []
+    result = process_text(path_text, cspy_text, cspy_finding_version=version, parsed=parsed)
+    return result, parsed[0]
+
+
+@pytest.mark.parametrize('version', list(FindingVersion))
+@pytest.mark.parametrize('path_text, cspy_text', TEXTS)
+def test_round_trip(path_text, cspy_text, version):
+    expected, (pm, cm) = parse(path_text, cspy_text, version)
+    pm2, cm2 = load_parsed(dump_parsed(pm, cm))
+    assert pm2.text == pm.text and cm2.text == cm.text
+    assert pm2.specs == pm.specs
+    assert [jar.locations for jar in pm2.manager.jars] == [jar.locations for jar in pm.manager.jars]
+    assert [str(finding) for finding in cm2.get_findings()] == [str(finding) for finding in cm.get_findings()]
+    assert as_strings(extract_variables(pm2, cm2, cspy_finding_version=version)) == as_strings(expected)
+
+
+def test_loaded_without_parsing(monkeypatch):
+    _, (pm, cm) = parse(WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT)
+    payload = dump_parsed(pm, cm)
+    for cls, method in [(type(pm), 'parse_jars'), (type(pm), '_read_jars'),
+                        (type(cm), '_get_sections'), (type(cm), 'get_findings_precise')]:
+        monkeypatch.setattr(cls, method, lambda *args, **kwargs: pytest.fail('reparsed'))
+    pm2, cm2 = load_parsed(payload)
+    assert pm2.manager.jars and cm2.num_polyps == cm.num_polyps and cm2.sections == cm.sections
+    extract_variables(pm2, cm2)
+
+
+def test_store(tmp_path):
+    path = tmp_path / 'parsed.pnlp'
+    with ParsedStoreWriter(path) as writer:
+        for identifier, (path_text, cspy_text) in zip([1, '1', 'b', 4], TEXTS):
+            writer.add(identifier, *parse(path_text, cspy_text)[1])
+    with ParsedStoreReader(path) as reader:
+        assert len(reader) == 4
+        assert reader.identifiers() == [1, '1', 'b', 4]
+        assert 1 in reader and '1' in reader and 2 not in reader
+        assert [(identifier, pm.text) for identifier, pm, _ in reader] == [
+            (1, PATH_TEXT), ('1', WARMUP_PATH_TEXT), ('b', ''), (4, PATH_TEXT),
+        ]
+        pm, cm = reader.get('b')
+        assert not pm and cm.text == CSPY_TEXT
+        with pytest.raises(KeyError):
+            reader.get(2)
+
+
+def test_store_without_footer(tmp_path):
+    """e.g., run stopped before closing store"""
+    path = tmp_path / 'parsed.pnlp'
+    writer = ParsedStoreWriter(path)
+    for i, (path_text, cspy_text) in enumerate(TEXTS):
+        writer.add(i, *parse(path_text, cspy_text)[1])
+    writer._fh.flush()
+    data = path.read_bytes()
+    (tmp_path / 'truncated.pnlp').write_bytes(data[:-5])  # final record incomplete
+    with ParsedStoreReader(path) as reader:
+        assert reader.identifiers() == [0, 1, 2, 3]
+    with ParsedStoreReader(tmp_path / 'truncated.pnlp') as reader:
+        assert reader.identifiers() == [0, 1, 2]
+        assert reader.get(2)[1].text == CSPY_TEXT
+    writer.close()
+
+
+def test_format_version(tmp_path):
+    path = tmp_path / 'parsed.pnlp'
+    path.write_bytes(MAGIC + b'\x00\x63')
+    with pytest.raises(StoreFormatError, match='format version 99'):
+        ParsedStoreReader(path)
+    path.write_bytes(b'identifier,adenoma_count\n')
+    with pytest.raises(StoreFormatError, match='Not a parsed store'):
+        ParsedStoreReader(path)
+
+
+def test_process_store(tmp_path):
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame([{'ID': i, 'PATH': path_text, 'CSPY': cspy_text}
+                       for i, (path_text, cspy_text) in enumerate(TEXTS)])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    store = tmp_path / 'parsed.pnlp'
+    process(data, outfile=str(tmp_path / 'out.csv'), store=str(store))
+    with ParsedStoreReader(store) as reader:
+        assert reader.identifiers() == [0, 1, 2, 3]
+        for (identifier, pm, cm), (path_text, cspy_text) in zip(reader, TEXTS):
+            assert as_strings(extract_variables(pm, cm)) == as_strings(process_text(path_text, cspy_text))
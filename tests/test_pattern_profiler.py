@@ -0,0 +1,81 @@
+import csv
+import re
+
+import pytest
+
+from precise_nlp.const.patterns import INDICATION_DIAGNOSTIC
+from precise_nlp.extract.algorithm import get_adenoma_status
+from precise_nlp.extract.cspy.cspy import CspyManager
+from precise_nlp.extract.utils import StandardTerminology
+from precise_nlp.pattern_profiler import PatternProfiler, ProfiledRegex
+from precise_nlp.process import process_text
+
+CSPY_TEXT = ('Indications: Screening for colon cancer\n'
+             'Findings: A 5 mm polyp was found in the cecum. The polyp was removed.')
+PATH_TEXT = 'A) Colon, cecum, polypectomy: Tubular adenoma.'
+
+
+def test_patterns_restored():
+    originals = (CspyManager.TITLE_PATTERN.compile(), INDICATION_DIAGNOSTIC.pattern,
+                 StandardTerminology.LOCATION_REGEX[0][2].compile())
+    with PatternProfiler():
+        assert isinstance(CspyManager.TITLE_PATTERN.compile(), ProfiledRegex)
+        assert isinstance(INDICATION_DIAGNOSTIC.pattern, ProfiledRegex)
+        assert isinstance(StandardTerminology.LOCATION_REGEX[0][2].compile(), ProfiledRegex)
+    assert (CspyManager.TITLE_PATTERN.compile(), INDICATION_DIAGNOSTIC.pattern,
+            StandardTerminology.LOCATION_REGEX[0][2].compile()) == originals
+    assert isinstance(CspyManager.TITLE_PATTERN.compile(), re.Pattern)
+
+
+def _process_text(path_text, cspy_text):
+    return {k: str(v) for k, v in process_text(path_text, cspy_text).items()}  # MaybeCounter lacks __eq__
+
+
+def test_profiled_results_unchanged():
+    expected = _process_text(PATH_TEXT, CSPY_TEXT)
+    with PatternProfiler() as profiler:
+        assert _process_text(PATH_TEXT, CSPY_TEXT) == expected
+    stats = profiler.stats['precise_nlp.extract.cspy.cspy.CspyManager.TITLE_PATTERN']
+    assert stats.calls >= 1
+    assert stats.total_time > 0
+    assert stats.worst_sample == CSPY_TEXT[:stats.SAMPLE_LENGTH]
+
+
+def test_match_counts():
+    with PatternProfiler() as profiler:
+        for specimen in ['tubular adenoma', 'hyperplastic polyp', 'no tubular adenoma']:
+            get_adenoma_status([specimen])
+    stats = profiler.stats['precise_nlp.extract.algorithm.TUBULAR_ADENOMA_PATTERN']
+    assert stats.calls == 3
+    assert stats.matches == 2
+
+
+def test_write_report(tmp_path):
+    outfile = tmp_path / 'patterns.csv'
+    with PatternProfiler() as profiler:
+        process_text(PATH_TEXT, CSPY_TEXT)
+    profiler.write_report(outfile, include_unused=False)
+    with open(outfile, newline='') as fh:
+        rows = list(csv.DictReader(fh))
+    assert rows
+    assert all(int(row['calls']) > 0 for row in rows)
+    times = [float(row['total_time']) for row in rows]
+    assert times == sorted(times, reverse=True)
+
+
+def test_failed_run_restores_patterns(tmp_path, monkeypatch):
+    pd = pytest.importorskip('pandas')
+    from precise_nlp import process as process_module
+
+    def failing_process_text(path_text, cspy_text, **kwargs):
+        raise KeyError('bad')
+
+    monkeypatch.setattr(process_module, 'process_text', failing_process_text)
+    data = {'filetype': pd.DataFrame([{'ID': 1, 'PATH': PATH_TEXT, 'CSPY': CSPY_TEXT}]), 'path': None,
+            'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    with pytest.raises(KeyError):
+        process_module.process(data, outfile=str(tmp_path / 'out.csv'),
+                               profile_patterns=str(tmp_path / 'patterns.csv'))
+    assert isinstance(CspyManager.TITLE_PATTERN.compile(), re.Pattern)
+    assert isinstance(INDICATION_DIAGNOSTIC.pattern, re.Pattern)
+    assert (tmp_path / 'patterns.csv').exists()  # report still written
@@ -0,0 +1,54 @@
+import re
+import subprocess
+import sys
+
+from regexify import Pattern
+
+from precise_nlp.pattern_registry import LazyPattern, lazy_compile, lazy_pattern, compile_all, registered_patterns
+
+IMPORT_CHECK = '''
+import sys
+import precise_nlp.process
+from precise_nlp.pattern_registry import registered_patterns
+print(','.join(m for m in ('pandas', 'jsonschema', 'yaml') if m in sys.modules))
+print(sum(p.compiled for p in registered_patterns()))
+'''
+
+
+def test_import_is_lazy():
+    proc = subprocess.run([sys.executable, '-c', IMPORT_CHECK], capture_output=True, text=True, check=True,
+                          env={'PYTHONPATH': ':'.join(sys.path)})
+    heavy_modules, compiled = proc.stdout.splitlines()
+    assert heavy_modules == ''
+    assert compiled == '0'
+
+
+def test_compile_on_first_use():
+    lazy = lazy_compile(r'polyps?', re.I)
+    assert not lazy.compiled
+    assert lazy.search('A Polyp').group() == 'Polyp'
+    assert lazy.compiled
+    assert isinstance(lazy.compile(), re.Pattern)
+    assert lazy in registered_patterns()
+
+
+def test_lazy_regexify_pattern():
+    lazy = lazy_pattern(r'screening', negates=[r'history'])
+    assert lazy.matches('screening colonoscopy')
+    assert not lazy.matches('history of screening')
+    assert isinstance(lazy.compile(), Pattern)
+
+
+def test_compile_all():
+    lazy = lazy_compile(r'adenoma')
+    assert compile_all() >= 1
+    assert lazy.compiled
+    assert compile_all() == 0
+
+
+def test_set_replaces_cached_methods():
+    lazy = LazyPattern(re.compile, r'cecum')
+    assert lazy.search('cecum')
+    lazy.set(re.compile(r'rectum'))
+    assert not lazy.search('cecum')
+    assert lazy.search('rectum')
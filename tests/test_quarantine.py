@@ -0,0 +1,116 @@
+import csv
+import json
+
+import pytest
+
+from precise_nlp import process as process_module
+from precise_nlp.process import process
+from precise_nlp.quarantine import read_quarantine, text_hash, ERROR
+from precise_nlp.worker import can_fork
+
+pd = pytest.importorskip('pandas')
+
+CSPY_TEXT = 'Indications: Screening for colon cancer\nFindings: A 5 mm polyp was found in the cecum.'
+PATH_TEXT = 'A) Colon, cecum, polypectomy: Tubular adenoma.'
+
+
+@pytest.fixture
+def failing_process_text(monkeypatch):
+    """Fail on notes containing 'BAD'"""
+    process_text = process_module.process_text
+
+    def _process_text(path_text, cspy_text, **kwargs):
+        if 'BAD' in path_text:
+            raise KeyError('bad')
+        return process_text(path_text, cspy_text, **kwargs)
+
+    monkeypatch.setattr(process_module, 'process_text', _process_text)
+
+
+def _data(identifiers_texts):
+    df = pd.DataFrame([
+        {'ID': identifier, 'PATH': path_text, 'CSPY': CSPY_TEXT}
+        for identifier, path_text in identifiers_texts
+    ])
+    return {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+
+
+def _read_output(outfile):
+    with open(outfile, newline='') as fh:
+        return list(csv.DictReader(fh))
+
+
+@pytest.mark.parametrize('texts', [
+    [(1, PATH_TEXT), (2, f'BAD {PATH_TEXT}'), (3, PATH_TEXT)],
+    [(1, f'BAD {PATH_TEXT}'), (2, PATH_TEXT), (3, PATH_TEXT)],  # first record fails
+])
+def test_quarantine(tmp_path, failing_process_text, texts):
+    outfile = tmp_path / 'out.csv'
+    quarantine = tmp_path / 'quarantine.jsonl'
+    process(_data(texts), outfile=str(outfile), quarantine=str(quarantine))
+    rows = {int(row['identifier']): row for row in _read_output(outfile)}
+    assert len(rows) == 3
+    failed = next(identifier for identifier, text in texts if 'BAD' in text)
+    for identifier, row in rows.items():
+        if identifier == failed:
+            assert row[ERROR] == 'extract:KeyError'
+            assert row['adenoma_status'] == ''
+        else:
+            assert row[ERROR] == ''
+            assert row['adenoma_status'] == '1'
+            assert row['adenoma_count_adv__num'] == '1'  # column from MaybeCounter
+    records = read_quarantine(quarantine)
+    assert list(records) == [failed]
+    assert records[failed]['stage'] == 'extract'
+    assert records[failed]['exception'] == 'KeyError'
+    assert records[failed]['path_hash'] == text_hash(f'BAD {PATH_TEXT}')
+
+
+def test_no_quarantine_raises(tmp_path, failing_process_text):
+    with pytest.raises(KeyError):
+        process(_data([(1, PATH_TEXT), (2, f'BAD {PATH_TEXT}')]), outfile=str(tmp_path / 'out.csv'))
+
+
+def test_replay_quarantine(tmp_path, monkeypatch, failing_process_text):
+    quarantine = tmp_path / 'quarantine.jsonl'
+    texts = [(1, PATH_TEXT), (2, f'BAD {PATH_TEXT}'), (3, PATH_TEXT)]
+    process(_data(texts), outfile=str(tmp_path / 'out.csv'), quarantine=str(quarantine))
+    monkeypatch.undo()  # 'fix' the issue
+    outfile = tmp_path / 'replay.csv'
+    process(_data(texts), outfile=str(outfile), replay_quarantine=str(quarantine),
+            quarantine=str(tmp_path / 'replay.jsonl'))
+    rows = _read_output(outfile)
+    assert [row['identifier'] for row in rows] == ['2']
+    assert rows[0][ERROR] == ''
+    assert rows[0]['adenoma_status'] == '1'
+    assert not read_quarantine(tmp_path / 'replay.jsonl')
+
+
+def test_quarantine_unreadable_records(tmp_path):
+    (tmp_path / 'cspy1.txt').write_text(CSPY_TEXT)
+    (tmp_path / 'path1.txt').write_text(PATH_TEXT)
+    (tmp_path / 'path3.txt').write_bytes(b'\xff\xfe invalid')
+    lookup_table = tmp_path / 'lookup.csv'
+    lookup_table.write_text('1,cspy1.txt,path1.txt\nmissing comma\n3,cspy1.txt,path3.txt\n')
+    outfile = tmp_path / 'out.csv'
+    quarantine = tmp_path / 'quarantine.jsonl'
+    data = {'filetype': 'txt', 'path': str(tmp_path), 'lookup_table': str(lookup_table)}
+    process(data, outfile=str(outfile), quarantine=str(quarantine))
+    rows = {row['identifier']: row[ERROR] for row in _read_output(outfile)}
+    assert rows == {'1': '', '': 'read:ValueError', '3': 'read:UnicodeDecodeError'}
+    with open(quarantine) as fh:
+        records = [json.loads(line) for line in fh]
+    assert [(r['identifier'], r['stage']) for r in records] == [(None, 'read'), ('3', 'read')]
+
+
+@pytest.mark.parametrize('mode', ['thread', pytest.param('process', marks=pytest.mark.skipif(
+    not can_fork(), reason='Requires fork (to inherit failing_process_text).'))])
+def test_quarantine_parallel(tmp_path, failing_process_text, mode):
+    outfile = tmp_path / 'out.csv'
+    quarantine = tmp_path / 'quarantine.jsonl'
+    texts = [(1, PATH_TEXT), (2, f'BAD {PATH_TEXT}'), (3, PATH_TEXT)]
+    process(_data(texts), outfile=str(outfile), quarantine=str(quarantine), parallel={'workers': 2, 'mode': mode})
+    rows = _read_output(outfile)
+    assert [(row['identifier'], row[ERROR]) for row in rows] == [('1', ''), ('2', 'extract:KeyError'), ('3', '')]
+    record = read_quarantine(quarantine)[2]
+    assert 'KeyError' in record['traceback'] and '_process_text' in record['traceback']
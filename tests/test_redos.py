@@ -0,0 +1,38 @@
+"""
+Guard against catastrophic backtracking: run each shipped pattern against adversarial inputs
+    (long text with no punctuation, long runs of a single character class) within a time budget.
+"""
+import pytest
+
+from precise_nlp.pattern_profiler import PatternProfiler
+from precise_nlp.process import MAX_SECTION_LENGTH
+from precise_nlp.time_budget import time_limit, can_interrupt
+
+LENGTH = MAX_SECTION_LENGTH  # longest section when retrying after exceeding time budget
+BUDGET = 1  # seconds per pattern and input
+
+ADVERSARIAL_INPUTS = {
+    'sentence': 'polyp was found in the sigmoid colon ',
+    'sizes': 'polyp 5 mm 6 mm 7 ',
+    'polyps': 'polyps sessile polyp the polyps were ',
+    'centimeters': '5 cm ',
+    'jars': 'A) B) C ',
+    'letters': 'a',
+    'digits': '1',
+    'spaces': ' ',
+    'non_word': '- ',
+}
+
+with PatternProfiler() as _profiler:
+    PATTERNS = _profiler.patterns()
+
+
+@pytest.mark.skipif(not can_interrupt(), reason='Unable to interrupt regular expressions.')
+@pytest.mark.parametrize('name', sorted(PATTERNS))
+def test_pattern_within_budget(name):
+    pattern = PATTERNS[name]
+    for label, unit in ADVERSARIAL_INPUTS.items():
+        text = unit * (LENGTH // len(unit)) + '!'
+        with time_limit(BUDGET):
+            for _ in pattern.finditer(text):
+                pass
@@ -0,0 +1,84 @@
+import gc
+import json
+import random
+
+import pytest
+
+from precise_nlp.process import process
+from precise_nlp.scheduler import CostModel, Scheduler, document_features, simulate, FEATURES
+from precise_nlp.worker import can_fork, WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+def test_document_features():
+    path_length, specimens, cspy_length, findings_length = document_features(WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT)
+    assert (path_length, specimens, cspy_length) == (len(WARMUP_PATH_TEXT), 4, len(WARMUP_CSPY_TEXT))
+    assert 0 < findings_length < WARMUP_CSPY_TEXT.index('Colon preparation') - WARMUP_CSPY_TEXT.index('Findings')
+    assert document_features(None, float('nan')) == (0, 0, 0, 0)
+
+
+def test_cost_model(tmp_path):
+    pytest.importorskip('numpy')
+    rng = random.Random(0)
+    model = CostModel(str(tmp_path / 'model.json'))
+    for _ in range(200):
+        features = [rng.randint(0, 5000), rng.randint(0, 20), rng.randint(0, 5000), rng.randint(0, 2000)]
+        model.add(features, 0.001 + 2e-6 * features[0] + 0.002 * features[1] + 1e-5 * features[3])
+    model.fit()
+    assert model.coefficients == pytest.approx([0.001, 2e-6, 0.002, 0, 1e-5], rel=1e-3, abs=1e-8)
+    model.save()
+    loaded = CostModel(str(tmp_path / 'model.json'))
+    assert loaded.count == 200 and loaded.estimate([1000, 2, 0, 0]) == pytest.approx(0.007, rel=1e-3)
+    with open(tmp_path / 'model.json', 'w') as fh:
+        json.dump({'version': 1, 'features': list(FEATURES[:2])}, fh)
+    assert CostModel(str(tmp_path / 'model.json')).count == 0  # different features: new model
+
+
+def test_simulate():
+    assert simulate([1, 1, 1, 1, 4], 2) == (6, 4)  # costly record last
+    assert simulate([4, 1, 1, 1, 1], 2) == (4, 0)
+    assert simulate([], 2) == (0, 0)
+
+
+def slow_length(identifier, path_text, cspy_text):
+    return identifier, len(path_text)
+
+
+@pytest.mark.parametrize('chunk_size', ['auto', 2])
+def test_map(chunk_size):
+    texts = [WARMUP_PATH_TEXT * (20 if i in (5, 9) else 1) for i in range(12)]
+    scheduler = Scheduler(2, mode='thread', chunk_size=chunk_size, window=6)
+    results = list(scheduler.map(slow_length, [(i, text, '') for i, text in enumerate(texts)]))
+    scheduler.close()
+    assert results == [((i, text, ''), (i, len(text))) for i, text in enumerate(texts)]  # in order
+    assert scheduler.dispatched[0] == 5  # most costly record in first window
+    assert sorted(scheduler.dispatched) == list(range(12)) and len(scheduler.durations) == 12
+
+
+def test_map_stops_early():
+    scheduler = Scheduler(2, mode='thread')
+    results = scheduler.map(slow_length, [(i, 'A) Colon: polyp', '') for i in range(100)])
+    assert next(results)[1] == (0, 15)
+    results.close()
+    scheduler.close()
+
+
+def test_auto_workers():
+    scheduler = Scheduler('auto', mode='thread')
+    assert scheduler.auto_workers([1.0, 1.0, 1.0, 3.0], exhausted=True) <= 2
+    assert scheduler.auto_workers([1.0, 1.0], exhausted=False) >= 1
+
+
+@pytest.mark.parametrize('parallel', [{'workers': 2, 'mode': 'thread'}, pytest.param(
+    {'workers': 2, 'mode': 'process'}, marks=pytest.mark.skipif(not can_fork(), reason='Requires fork.'))])
+def test_process(tmp_path, parallel):
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame([{'ID': i, 'PATH': '\n'.join([WARMUP_PATH_TEXT] * (5 if i == 3 else 1)),
+                        'CSPY': WARMUP_CSPY_TEXT} for i in range(8)])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    process(data, outfile=str(tmp_path / 'expected.csv'))
+    schedule = {'model': str(tmp_path / 'model.json'), 'window': 4}
+    for _ in range(2):  # second run uses fit model
+        process(data, outfile=str(tmp_path / 'scheduled.csv'), parallel=dict(parallel, schedule=schedule))
+        gc.unfreeze()  # frozen before forking workers
+        assert (tmp_path / 'scheduled.csv').read_text() == (tmp_path / 'expected.csv').read_text()
+    assert CostModel(str(tmp_path / 'model.json')).count == 16
@@ -0,0 +1,122 @@
+import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from precise_nlp.client import Client, ServerError, HEADER
+from precise_nlp.extract.cspy.cspy import FindingVersion
+from precise_nlp.process import process_text
+from precise_nlp.server import ExtractionServer, LatencyHistogram
+from precise_nlp.worker import can_fork
+
+PATH_TEXT = 'A) Colon, cecum, polypectomy: Tubular adenoma.\nB) Rectum: Hyperplastic polyp.'
+CSPY_TEXT = 'Indications: Screening.\nFindings: A 5 mm polyp in the cecum. A 3 mm polyp in the rectum.'
+
+
+def _json(result):
+    return json.loads(json.dumps(result, default=str))
+
+
+@pytest.fixture(params=['thread', pytest.param('process', marks=pytest.mark.skipif(
+    not can_fork(), reason='Requires fork.'))])
+def server(request, tmp_path):
+    with ExtractionServer(str(tmp_path / 'precise.sock'), workers=2, mode=request.param) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        thread.join()
+
+
+def test_extract(server):
+    with Client(server.address) as client:
+        assert client.extract(PATH_TEXT, CSPY_TEXT) == _json(process_text(PATH_TEXT, CSPY_TEXT))
+        assert client.extract(PATH_TEXT, CSPY_TEXT, options={'cspy_precise_finding_version': False}) == _json(
+            process_text(PATH_TEXT, CSPY_TEXT, cspy_finding_version=FindingVersion.BROAD))
+
+
+def test_variables(server):
+    with Client(server.address) as client:
+        result = client.extract(PATH_TEXT, CSPY_TEXT, variables=['adenoma_status', 'missing'])
+    assert result == {'adenoma_status': 1, 'missing': None}
+
+
+def test_errors_keep_connection(server):
+    with Client(server.address) as client:
+        with pytest.raises(ServerError, match='Unrecognized options'):
+            client.extract(PATH_TEXT, options={'unknown': 1})
+        with pytest.raises(ServerError, match='Unrecognized command'):
+            client.request({'command': 'restart'})
+        for request in [[], 'stats']:
+            with pytest.raises(ServerError, match='must be an object'):
+                client.request(request)
+        assert client.extract(PATH_TEXT)['adenoma_status'] == 1
+        stats = client.stats()
+    assert stats['errors'] == 4
+    assert stats['requests'] == {'extract': 2, 'stats': 1}
+    assert stats['latency']['count'] == 2
+    assert stats['workers'] == 2
+
+
+def test_concurrent_clients(server):
+    def run(i):
+        with Client(server.address) as client:
+            return [client.extract(PATH_TEXT, CSPY_TEXT, variables=['adenoma_count'])['adenoma_count']
+                    for _ in range(3)]
+
+    expected = process_text(PATH_TEXT, CSPY_TEXT)['adenoma_count']
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(run, range(4)))
+    assert results == [[expected] * 3] * 4
+    with Client(server.address) as client:
+        assert client.stats()['requests']['extract'] == 12
+
+
+def test_oversized_message_closes_connection(server):
+    with Client(server.address) as client:
+        client._fh.write(HEADER.pack(2 ** 31))
+        client._fh.flush()
+        with pytest.raises(ConnectionError):
+            client.stats()
+
+
+def _has_ipv6_loopback():
+    try:
+        with socket.socket(socket.AF_INET6, socket.SOCK_STREAM) as sock:
+            sock.bind(('::1', 0))
+    except OSError:
+        return False
+    return True
+
+
+@pytest.mark.parametrize('host', ['127.0.0.1', pytest.param('::1', marks=pytest.mark.skipif(
+    not _has_ipv6_loopback(), reason='Requires IPv6 loopback.'))])
+def test_tcp(host):
+    with ExtractionServer((host, 0), workers=1, mode='thread') as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        with Client(server.address) as client:
+            assert client.extract(PATH_TEXT, variables=['adenoma_status']) == {'adenoma_status': 1}
+        server.shutdown()
+        thread.join()
+
+
+def test_rejects_remote_host():
+    with pytest.raises(ValueError, match='localhost'):
+        ExtractionServer(('0.0.0.0', 0), workers=1, mode='thread')
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.to_dict()['p50_ms'] is None
+    for seconds in [0.0005] * 90 + [0.015] * 9 + [10]:
+        histogram.add(seconds)
+    result = histogram.to_dict()
+    assert result['count'] == 100
+    assert result['p50_ms'] == 1
+    assert result['p95_ms'] == 20
+    assert result['p99_ms'] == 20
+    assert result['buckets']['>5000ms'] == 1
+    assert result['max_ms'] == 10000
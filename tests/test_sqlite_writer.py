@@ -0,0 +1,118 @@
+import csv
+import sqlite3
+
+import pytest
+
+from precise_nlp.extract.maybe_counter import MaybeCounter
+from precise_nlp.process import process
+from precise_nlp.sqlite_writer import SqliteWriter, column_type, is_sqlite
+
+pd = pytest.importorskip('pandas')
+
+CSPY_TEXT = 'Indications: Screening for colon cancer\nFindings: A 5 mm polyp was found in the cecum.'
+PATH_TEXT = 'A) Colon, cecum, polypectomy: Tubular adenoma.'
+
+
+def _data(identifiers_texts):
+    df = pd.DataFrame([
+        {'ID': identifier, 'PATH': path_text, 'CSPY': CSPY_TEXT}
+        for identifier, path_text in identifiers_texts
+    ])
+    return {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+
+
+def _query(path, sql):
+    with sqlite3.connect(path) as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute(sql)]
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('out.sqlite', True),
+    ('out.DB', True),
+    ('out.csv', False),
+])
+def test_is_sqlite(path, expected):
+    assert is_sqlite(path) is expected
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('indication', 'TEXT'),
+    ('indication_pred', 'TEXT'),
+    ('adenoma_count_adv', 'TEXT'),
+    ('adenoma_count_adv__num', 'INTEGER'),
+    ('adenoma_status', 'INTEGER'),
+])
+def test_column_type(name, expected):
+    assert column_type(name, ['adenoma_count_adv', 'adenoma_count_adv__num']) == expected
+
+
+def test_process_matches_csv(tmp_path):
+    data = _data([(1, PATH_TEXT), (2, 'A) Rectum: Hyperplastic polyp.'), (3, PATH_TEXT)])
+    process(data, outfile=str(tmp_path / 'out.csv'))
+    process(data, outfile=str(tmp_path / 'out.sqlite'))
+    booleans = {'False': '0', 'True': '1'}  # stored as integers
+    with open(tmp_path / 'out.csv', newline='') as fh:
+        expected = [{k: booleans.get(v, v) for k, v in row.items()} for row in csv.DictReader(fh)]
+    rows = _query(tmp_path / 'out.sqlite', 'SELECT * FROM results ORDER BY row')
+    assert list(rows[0]) == list(expected[0])
+    assert [{k: '' if v is None else str(v) for k, v in row.items()} for row in rows] == expected
+    assert isinstance(rows[0]['adenoma_status'], int)
+    assert isinstance(rows[0]['adenoma_count_adv__num'], int)
+
+
+def test_rerun_replaces_rows(tmp_path):
+    outfile = str(tmp_path / 'out.sqlite')
+    process(_data([(1, PATH_TEXT), (2, PATH_TEXT)]), outfile=outfile, sqlite={'indexes': ['adenoma_status']})
+    process(_data([(2, 'A) Rectum: Hyperplastic polyp.'), (3, PATH_TEXT)]), outfile=outfile,
+            sqlite={'indexes': ['adenoma_status']})
+    rows = _query(outfile, 'SELECT identifier, adenoma_status FROM results ORDER BY identifier')
+    assert rows == [
+        {'identifier': 1, 'adenoma_status': 1},
+        {'identifier': 2, 'adenoma_status': 0},  # from second run
+        {'identifier': 3, 'adenoma_status': 1},
+    ]
+    indexes = {row['name'] for row in _query(outfile, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert indexes == {'results__identifier', 'results__adenoma_status'}
+
+
+def test_patch_indexed_table(tmp_path):
+    outfile = str(tmp_path / 'out.sqlite')
+    with SqliteWriter(outfile) as fh:
+        fh.writer(['row', 'identifier', 'adenoma_status']).writerows([[0, 1, 1], [1, 2, 1], [2, 2, 0]])
+    assert not fh.patching
+    with SqliteWriter(outfile, indexes=['adenoma_status']) as fh:
+        fh.writer(['row', 'identifier', 'adenoma_status']).writerow({'row': 1, 'identifier': 2, 'adenoma_status': 1})
+        assert fh.patching  # unique index kept: rows replaced by identifier
+        assert _query(outfile, "SELECT name FROM sqlite_master WHERE type = 'index'") == [
+            {'name': 'results__identifier'}]
+    assert _query(outfile, 'SELECT * FROM results ORDER BY row') == [
+        {'row': 0, 'identifier': 1, 'adenoma_status': 1}, {'row': 1, 'identifier': 2, 'adenoma_status': 1}]
+    indexes = {row['name'] for row in _query(outfile, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert indexes == {'results__identifier', 'results__adenoma_status'}
+
+
+def test_truth(tmp_path):
+    outfile = str(tmp_path / 'out.sqlite')
+    process(_data([(1, PATH_TEXT)]), truth={'adenoma_status': 'PATH'}, outfile=outfile)  # truth column is unused
+    assert list(_query(outfile, 'SELECT * FROM results')[0]) == [
+        'row', 'identifier', 'adenoma_status_true', 'adenoma_status_pred'
+    ]
+
+
+def test_batches(tmp_path):
+    path = str(tmp_path / 'out.sqlite')
+    with SqliteWriter(path, table='counts', batch_size=3) as writer:
+        writer.writer(['identifier', 'adenoma_count_adv', 'adenoma_count_adv__num'])
+        writer.writerows({'identifier': f'id{i}', 'adenoma_count_adv': MaybeCounter(i, at_least=True),
+                          'adenoma_count_adv__num': i} for i in range(7))
+        assert writer.count == 6  # final batch not yet written
+        writer.writerow(['id7', MaybeCounter(7), pd.Series([7]).iloc[0]])  # numpy scalar
+        with pytest.raises(ValueError):
+            writer.writerow({'unknown': 1})
+    rows = _query(path, 'SELECT * FROM counts')
+    assert len(rows) == 8
+    assert rows[7]['adenoma_count_adv__num'] == 7
+    assert rows[2] == {'identifier': 'id2', 'adenoma_count_adv': str(MaybeCounter(2, at_least=True)),
+                       'adenoma_count_adv__num': 2}
+    assert _query(path, 'PRAGMA journal_mode') == [{'journal_mode': 'wal'}]
@@ -0,0 +1,118 @@
+import asyncio
+import gc
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from precise_nlp import stream
+from precise_nlp.process import process_text
+from precise_nlp.stream import process_stream
+from precise_nlp.worker import worker_executor, can_fork
+
+RECORDS = [
+    (1, 'A) Colon, cecum, polypectomy: Tubular adenoma.', 'Indications: Screening.\nFindings: A 5 mm polyp.'),
+    (2, 'A) Rectum: Hyperplastic polyp.', 'Indications: Surveillance. Personal history of polyps.'),
+    (3, 'A) Colon, sigmoid: Tubulovillous adenoma with high-grade dysplasia.', ''),
+    (4, '', 'Indications: Anemia.'),
+]
+
+
+async def source(records, pulled=None):
+    """In-memory stand-in for a message consumer"""
+    for record in records:
+        await asyncio.sleep(0)
+        if pulled is not None:
+            pulled.append(record[0])
+        yield record
+
+
+def collect(records, **kwargs):
+    async def _collect():
+        return [res async for res in process_stream(source(records), **kwargs)]
+
+    return asyncio.run(_collect())
+
+
+def _str(result):
+    return {k: str(v) for k, v in result.items()}  # MaybeCounter lacks __eq__
+
+
+@pytest.fixture
+def slow_process_text(monkeypatch):
+    """Earlier records take longer; 'BAD' raises"""
+
+    def _process_text(path_text, cspy_text, **kwargs):
+        if 'BAD' in path_text:
+            raise KeyError('bad')
+        time.sleep(float(cspy_text or 0))
+        return {'text': path_text}
+
+    monkeypatch.setattr(stream, 'process_text', _process_text)
+
+
+def test_process_stream():
+    with ThreadPoolExecutor(2) as executor:
+        results = collect(RECORDS, executor=executor, max_in_flight=3)
+    assert sorted(res.identifier for res in results) == [1, 2, 3, 4]
+    for res in results:
+        _, path_text, cspy_text = RECORDS[res.identifier - 1]
+        assert res.error is None
+        assert _str(res.result) == _str(process_text(path_text, cspy_text))
+
+
+@pytest.mark.skipif(not can_fork(), reason='Requires fork.')
+def test_process_stream_processes():
+    with worker_executor(2, warmup=False) as executor:
+        results = collect(RECORDS, executor=executor, max_in_flight=2, ordered=True)
+    gc.unfreeze()
+    assert [res.identifier for res in results] == [1, 2, 3, 4]
+    assert [_str(res.result) for res in results] == [_str(process_text(p, c)) for _, p, c in RECORDS]
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_ordering(slow_process_text, ordered):
+    records = [(i, f'text {i}', str(delay)) for i, delay in enumerate([0.2, 0.1, 0])]
+    with ThreadPoolExecutor(3) as executor:
+        results = collect(records, executor=executor, max_in_flight=3, ordered=ordered)
+    identifiers = [res.identifier for res in results]
+    assert identifiers == ([0, 1, 2] if ordered else [2, 1, 0])
+
+
+def test_errors_do_not_cancel_stream(slow_process_text):
+    records = [(1, 'ok', ''), (2, 'BAD', ''), (3, 'ok', '')]
+    results = collect(records, max_in_flight=2, ordered=True)
+    assert [res.identifier for res in results] == [1, 2, 3]
+    assert isinstance(results[1].error, KeyError)
+    assert results[1].result is None
+    assert results[0].result == results[2].result == {'text': 'ok'}
+
+
+def test_backpressure(slow_process_text):
+    pulled = []
+
+    async def endless():
+        i = 0
+        while True:
+            i += 1
+            await asyncio.sleep(0)
+            pulled.append(i)
+            yield i, 'ok', '0.01'
+
+    async def consume():
+        seen = []
+        async for res in process_stream(endless(), max_in_flight=4):
+            assert len(pulled) - len(seen) <= 4  # reads no further than max_in_flight ahead
+            seen.append(res.identifier)
+            await asyncio.sleep(0.01)  # slow consumer
+            if len(seen) == 10:
+                break
+        return seen
+
+    assert len(asyncio.run(consume())) == 10
+    assert len(pulled) <= 14
+
+
+def test_invalid_max_in_flight():
+    with pytest.raises(ValueError):
+        collect(RECORDS, max_in_flight=0)
@@ -0,0 +1,96 @@
+import csv
+import pathlib
+
+import pytest
+
+from precise_nlp.extract.cspy.cspy import CspyManager, FindingVersion
+from precise_nlp.extract.path.path_manager import PathManager
+from precise_nlp.process import process, process_text, extract_variables
+from precise_nlp.sweep import ParsedDocument, configurations, config_name, PARAMETERS
+from precise_nlp.worker import WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+EXAMPLE_DATA = pathlib.Path(__file__).parent.parent / 'example' / 'example_data.csv'
+
+
+def read_examples():
+    with open(EXAMPLE_DATA, encoding='utf-8-sig', newline='') as fh:
+        return [(row['ID'], row['PATH'], row['COLONOSCOPY']) for row in csv.DictReader(fh)]
+
+
+def as_strings(result):
+    return {k: str(v) for k, v in result.items()}  # MaybeCounter compares by identity
+
+
+def test_configurations():
+    configs = configurations({'greater_than': [1, 2], 'bins': [[1, 3]]}, cspy_extent_search_all=True)
+    assert [(c['greater_than'], c['bins'], c['cspy_extent_search_all']) for c in configs] == [
+        (1, (1, 3), True), (2, (1, 3), True),
+    ]
+    assert config_name(configs[0], {'greater_than': [1, 2], 'bins': [[1, 3]]}) == 'greater_than=1_bins=1-3'
+    assert configurations({}) == [dict(PARAMETERS)]
+    with pytest.raises(ValueError):
+        configurations({'greater_thn': [1]})
+
+
+@pytest.mark.parametrize('precise', [True, False])
+def test_default_matches_process_text(precise):
+    config = dict(PARAMETERS, cspy_precise_finding_version=precise)
+    version = FindingVersion.PRECISE if precise else FindingVersion.BROAD
+    for _, path_text, cspy_text in read_examples():
+        expected = process_text(path_text, cspy_text, cspy_finding_version=version)
+        assert as_strings(ParsedDocument(path_text, cspy_text).extract(config)) == as_strings(expected)
+
+
+def test_grid_matches_fresh_parse():
+    grid = {
+        'cspy_precise_finding_version': [True, False],
+        'cspy_extent_search_all': [False, True],
+        'greater_than': [1, 3],
+        'min_size': [5, 10],
+        'allow_maybe': [False, True],
+        'bins': [(3,), (1, 2)],
+    }
+    configs = configurations(grid)
+    for _, path_text, cspy_text in read_examples() + [(None, WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT)]:
+        doc = ParsedDocument(path_text, cspy_text)
+        for config in configs:  # reuse parsed document across configurations
+            version = FindingVersion.PRECISE if config['cspy_precise_finding_version'] else FindingVersion.BROAD
+            cm = CspyManager(cspy_text, version=version, cspy_extent_search_all=config['cspy_extent_search_all'])
+            expected = extract_variables(PathManager(path_text), cm, cspy_finding_version=version,
+                                         greater_than=config['greater_than'], min_size=config['min_size'],
+                                         allow_maybe=config['allow_maybe'], bins=config['bins'])
+            assert as_strings(doc.extract(config)) == as_strings(expected)
+
+
+def test_cspy_sections_shared():
+    _, path_text, cspy_text = read_examples()[0]
+    doc = ParsedDocument(path_text, cspy_text)
+    precise = doc.cspy_manager(FindingVersion.PRECISE, False)
+    assert precise.indication and precise.sections
+    broad = doc.cspy_manager(FindingVersion.BROAD, True)
+    assert broad is not precise
+    assert broad._section_index is precise._section_index
+    assert broad.__dict__['_indication'] is precise.__dict__['_indication']
+    assert '_findings' not in broad.__dict__ and '_extent' not in broad.__dict__
+    assert doc.cspy_manager(FindingVersion.BROAD, True) is broad
+
+
+def test_process_sweep(tmp_path, capsys):
+    pytest.importorskip('pandas')
+    outfile = tmp_path / 'out_{config}.csv'
+    summary = tmp_path / 'summary.csv'
+    data = {'filetype': 'csv', 'path': str(EXAMPLE_DATA), 'identifier': 'ID', 'path_text': 'PATH',
+            'cspy_text': 'COLONOSCOPY', 'encoding': 'utf-8-sig'}
+    configs = process(data, truth={'adenoma_status': 'ID'}, output={'bootstrap': 0},
+                      sweep={'grid': {'min_size': [5, 10]}, 'outfile': str(outfile), 'summary': str(summary)})
+    assert [config['min_size'] for config in configs] == [5, 10]
+    for name in ('min_size=5', 'min_size=10'):
+        with open(tmp_path / f'out_{name}.csv', newline='') as fh:
+            rows = list(csv.DictReader(fh))
+        assert len(rows) == len(read_examples())
+    with open(summary, newline='') as fh:
+        rows = list(csv.DictReader(fh))
+    assert [(row['config'], row['label']) for row in rows] == [
+        ('min_size=5', 'adenoma_status'), ('min_size=10', 'adenoma_status'),
+    ]
+    assert 'Configuration: min_size=10' in capsys.readouterr().out
@@ -0,0 +1,98 @@
+import re
+import sqlite3
+
+import pytest
+
+from precise_nlp import process
+from precise_nlp.const.path import ADENOMA_STATUS, TUBULAR, LARGE_ADENOMA
+from precise_nlp.const.cspy import INDICATION, NUM_POLYPS
+from precise_nlp.process import process_text, process_text_degraded, cap_sections
+from precise_nlp.time_budget import time_limit, TimeBudgetExceeded, can_interrupt
+
+pytestmark = pytest.mark.skipif(not can_interrupt(), reason='Unable to interrupt regular expressions.')
+
+CSPY_TEXT = ('Indications: Screening for colon cancer\n'
+             'Findings: A 5 mm polyp was found in the cecum. The polyp was removed.')
+PATH_TEXT = 'A) Colon, cecum, polypectomy: Tubular adenoma.'
+CATASTROPHIC_PATTERN = re.compile(r'(a+)+$')
+
+
+def _backtrack(*args, pattern=CATASTROPHIC_PATTERN, **kwargs):
+    pattern.search('a' * 40 + '!')
+
+
+def test_time_limit_records_pattern():
+    with pytest.raises(TimeBudgetExceeded) as e:
+        with time_limit(0.1):
+            _backtrack()
+    assert e.value.pattern == CATASTROPHIC_PATTERN.pattern
+
+
+def test_time_limit_not_exceeded():
+    with time_limit(1):
+        assert CATASTROPHIC_PATTERN.search('aaa')
+
+
+def test_process_text_degraded_on_overrun(monkeypatch):
+    monkeypatch.setattr(process, '_process_text', _backtrack)
+    overruns = []
+    data = process_text(PATH_TEXT, CSPY_TEXT, time_budget=0.1, overruns=overruns)
+    assert len(overruns) == 1
+    assert overruns[0]['strategy'] == 'full'
+    assert overruns[0]['pattern'] == CATASTROPHIC_PATTERN.pattern
+    assert overruns[0]['location'].startswith('precise_nlp.process.process_text:')
+    assert data == process_text_degraded(PATH_TEXT, CSPY_TEXT)
+
+
+def test_process_text_fails_on_second_overrun(monkeypatch):
+    monkeypatch.setattr(process, '_process_text', _backtrack)
+    monkeypatch.setattr(process, 'process_text_degraded', _backtrack)
+    overruns = []
+    assert process_text(PATH_TEXT, CSPY_TEXT, time_budget=0.1, overruns=overruns) == {}
+    assert [overrun['strategy'] for overrun in overruns] == ['full', 'degraded']
+
+
+def test_process_text_within_budget():
+    data = process_text(PATH_TEXT, CSPY_TEXT, time_budget=10)
+    assert data[LARGE_ADENOMA] == 0
+    assert data[NUM_POLYPS] == 1
+
+
+def test_process_text_degraded():
+    data = process_text_degraded(PATH_TEXT, CSPY_TEXT)
+    assert data[ADENOMA_STATUS] == 1
+    assert data[TUBULAR] == 1
+    assert data[INDICATION] == 'SCREENING'
+    assert NUM_POLYPS not in data
+
+
+def test_cap_sections():
+    assert cap_sections('abcdef\nab\nabcd', 3) == 'abc\nab\nabc'
+
+
+def _backtrack_long(path_text='', *args, **kwargs):
+    if len(path_text) > 1000:
+        _backtrack()
+    return _process_text(path_text, *args, **kwargs)
+
+
+_process_text = process._process_text
+
+
+@pytest.mark.parametrize('outfile', ['budget.csv', 'budget.sqlite'])
+def test_process_first_record_degraded(tmp_path, monkeypatch, outfile):
+    """Output columns include every variable, even if the first record only has those of `process_text_degraded`"""
+    pd = pytest.importorskip('pandas')
+    monkeypatch.setattr(process, '_process_text', _backtrack_long)
+    df = pd.DataFrame([{'ID': 1, 'PATH': PATH_TEXT * 400, 'CSPY': CSPY_TEXT},
+                       {'ID': 2, 'PATH': PATH_TEXT, 'CSPY': CSPY_TEXT}])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    process.process(data, outfile=str(tmp_path / outfile), time_budget={'seconds': 0.2})
+    if outfile.endswith('.csv'):
+        results = pd.read_csv(tmp_path / outfile)
+    else:
+        with sqlite3.connect(tmp_path / outfile) as conn:
+            results = pd.read_sql('SELECT * FROM results', conn)
+    assert results['identifier'].tolist() == [1, 2]
+    assert results[NUM_POLYPS].isna().tolist() == [True, False]  # omitted by `process_text_degraded`
+    assert results[f'{process.ADENOMA_COUNT_ADV}__num'].isna().tolist() == [True, False]
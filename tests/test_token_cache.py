@@ -0,0 +1,152 @@
+import gc
+import json
+
+import pytest
+from loguru import logger
+
+np = pytest.importorskip('numpy')
+
+from precise_nlp.extract.path.path_section import PathSection
+from precise_nlp.process import process
+from precise_nlp.token_cache import TokenCache, TokenSession, cached_tokens, section_key, close_cache, \
+    PUNCTUATION, STOP, INDEX_FILE, TOKENS_FILE
+from precise_nlp.worker import can_fork, WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+SECTIONS = [
+    'colon, cecum, polypectomy: tubularadenoma (0.5 cm). no high-grade dysplasia',
+    'rectum: hyperplastic polyp; noevidence of malignancy.',
+    '',
+]
+
+
+def words(section):
+    return [(word.word, word.index, word.spl) for word in section]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    cache = TokenCache(tmp_path / 'tokens')
+    session = TokenSession(cache)
+    for section in SECTIONS:
+        session(section)
+    for key, split in session.added.items():
+        cache.add(key, split)
+    cache.save()
+    return tmp_path / 'tokens'
+
+
+@pytest.mark.parametrize('section', SECTIONS)
+def test_cached_words(cache_path, section):
+    expected = words(PathSection(section))
+    with cached_tokens(cache_path) as session:
+        assert words(PathSection(section)) == expected
+    assert session.hits == 1 and not session.added
+    close_cache(cache_path)
+
+
+def test_tokens(cache_path):
+    cache = TokenCache(cache_path)
+    assert len(cache) == 3
+    tokens = cache.tokens(section_key(SECTIONS[1]))
+    assert tokens.dtype == np.int32
+    assert [cache.vocabulary[i] for i in tokens[:, 0]] == ['rectum', 'hyperplastic', 'polyp', 'no', 'evidence',
+                                                           'of', 'malignancy']
+    assert tokens[:, 2].tolist() == [0, 8, 21, 28, 31, 40, 43]  # offsets (after preprocessing)
+    assert tokens[:, 3].tolist() == [PUNCTUATION | STOP, 0, PUNCTUATION, 0, 0, 0, PUNCTUATION | STOP]
+    assert cache.tokens(section_key('not cached')) is None
+
+
+def test_extend(cache_path):
+    cache = TokenCache(cache_path)
+    vocabulary = list(cache.vocabulary)
+    cache.add(section_key('sigmoid colon: tubular adenoma'), list(PathSection.split('sigmoid colon: tubular adenoma')))
+    cache.save()
+    cache = TokenCache(cache_path)
+    assert len(cache) == 4 and cache.vocabulary[:len(vocabulary)] == vocabulary  # ids are stable
+    assert [str(word) for word in cache.words(section_key('sigmoid colon: tubular adenoma'))] == [
+        'sigmoid', 'colon', 'tubular', 'adenoma']
+
+
+def test_append_in_place(cache_path):
+    tokens_file = cache_path / TOKENS_FILE
+    inode, rows = tokens_file.stat().st_ino, len(np.load(tokens_file))
+    cache = TokenCache(cache_path)
+    session = TokenSession(cache)
+    session('sigmoid colon: tubular adenoma')
+    cache.update(session.stats())
+    cache.save()
+    assert tokens_file.stat().st_ino == inode  # grown rather than replaced
+    tokens = np.load(tokens_file)
+    assert len(tokens) == rows + 4
+    assert tokens[:rows].tolist() == TokenCache(cache_path)._tokens[:rows].tolist()
+    cache = TokenCache(cache_path)
+    assert [str(word) for word in cache.words(section_key('sigmoid colon: tubular adenoma'))] == [
+        'sigmoid', 'colon', 'tubular', 'adenoma']
+    assert cache.seconds(section_key('sigmoid colon: tubular adenoma')) > 0
+
+
+def test_unfinished_save(cache_path):
+    """Rows appended by a save which did not write the index are ignored"""
+    expected = words(PathSection(SECTIONS[0]))
+    tokens = np.load(cache_path / TOKENS_FILE)
+    np.save(cache_path / TOKENS_FILE, np.concatenate([tokens, np.ones((3, 4), dtype=np.int32)]))
+    cache = TokenCache(cache_path)
+    assert len(cache) == 3 and len(cache._tokens) == len(tokens)
+    cache.add(section_key('rectum: polyp'), list(PathSection.split('rectum: polyp')))
+    cache.save()
+    with cached_tokens(cache_path):
+        assert words(PathSection(SECTIONS[0])) == expected
+        assert [word.word for word in PathSection('rectum: polyp')] == ['rectum', 'polyp']
+    close_cache(cache_path)
+    assert len(np.load(cache_path / TOKENS_FILE)) == len(tokens) + 2
+
+
+def test_report(cache_path):
+    cache = TokenCache(cache_path)
+    session = TokenSession(cache)
+    for section in SECTIONS + ['sigmoid colon: tubular adenoma']:
+        session(section)
+    cache.update(session.stats())
+    assert cache.hits == 3 and cache.misses == 1 and cache.miss_seconds > 0 and cache.hit_seconds > 0
+    cache.cached_seconds, cache.hit_seconds, cache.miss_seconds = 3.0, 0.5, 1.0  # 4s had none been cached
+    messages = []
+    handler = logger.add(messages.append, format='{message}')
+    try:
+        cache.report()
+    finally:
+        logger.remove(handler)
+    assert '3 of 4 pathology sections cached, saving 62% of tokenization time' in messages[0]
+
+
+def test_invalidate(cache_path, monkeypatch):
+    monkeypatch.setattr(PathSection, 'PREPROCESS', dict(PathSection.PREPROCESS, polypcolon='polyp colon'))
+    cache = TokenCache(cache_path)
+    assert len(cache) == 0 and cache.changed
+    cache.save()
+    with open(cache_path / INDEX_FILE) as fh:
+        assert json.load(fh)['sections'] == {}
+
+
+def test_incomplete(cache_path):
+    with open(cache_path / INDEX_FILE) as fh:
+        index = json.load(fh)
+    with open(cache_path / INDEX_FILE, 'w') as fh:
+        json.dump(dict(index, rows=index['rows'] + 1), fh)
+    assert len(TokenCache(cache_path)) == 0
+
+
+@pytest.mark.parametrize('parallel', [None, {'workers': 2, 'mode': 'thread'}, pytest.param(
+    {'workers': 2, 'mode': 'process'}, marks=pytest.mark.skipif(not can_fork(), reason='Requires fork.'))])
+def test_process(tmp_path, parallel):
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame([{'ID': i, 'PATH': f'{WARMUP_PATH_TEXT}\nE) Colon: {i} polyps.', 'CSPY': WARMUP_CSPY_TEXT}
+                       for i in range(4)])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    process(data, outfile=str(tmp_path / 'expected.csv'))
+    sizes = []
+    for name in ('cold', 'warm'):
+        process(data, outfile=str(tmp_path / f'{name}.csv'), token_cache=str(tmp_path / 'tokens'), parallel=parallel)
+        gc.unfreeze()  # frozen before forking workers
+        assert (tmp_path / f'{name}.csv').read_text() == (tmp_path / 'expected.csv').read_text()
+        sizes.append(len(TokenCache(tmp_path / 'tokens')))
+    assert sizes[0] > 4 and sizes[1] == sizes[0]  # nothing tokenized on warm run
@@ -0,0 +1,98 @@
+import csv
+import pathlib
+import re
+
+import pytest
+
+from precise_nlp import triage
+from precise_nlp.extract.cspy.cspy import FindingVersion
+from precise_nlp.process import process, process_text, extract_record
+from precise_nlp.triage import document_cues, frame_cues, triaged, differences
+from precise_nlp.worker import WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+EXAMPLE_DATA = pathlib.Path(__file__).parent.parent / 'example' / 'example_data.csv'
+GASTRIC_PATH = 'A) Stomach, antrum, biopsy: Chronic inactive gastritis.\nB) Duodenum: No diagnostic abnormality.'
+NORMAL_CSPY = ('Indications: Screening for colon cancer\nPrep: good\n'
+               'Findings: The entire examined colon is normal. Retroflexion in the rectum was normal.')
+TEXTS = [
+    (GASTRIC_PATH, NORMAL_CSPY),
+    (GASTRIC_PATH, WARMUP_CSPY_TEXT),
+    (WARMUP_PATH_TEXT, NORMAL_CSPY),
+    ('Skin, left arm, shave: Seborrheic keratosis.', ''),
+    ('', NORMAL_CSPY),
+    ('  ', 'Findings: A mass in the rectum was biopsied.'),
+    ('A) Colon, sigmoid: Hyperplastic polyp.', 'Findings: A 5 mm sessile lesion in the cecum was removed.'),
+    ('A) Rectum: Adenocarcinoma.', 'Impression: normal colon'),
+    ('A) Colon: Sessile serrated lesion (SSA).', ''),
+]
+
+
+@pytest.mark.parametrize('path_text, cspy_text, expected', [
+    (GASTRIC_PATH, NORMAL_CSPY, (False, False)),
+    ('A) Cecum: TUBULAR ADENOMA', 'Findings: polyp', (True, True)),
+    ('A) Colon: neurofibroma', 'Findings: 5 mm lesion, removed.', (True, True)),
+    ('A) Colon: SSA', 'Findings: mass, biopsies taken', (True, True)),
+    ('A) Colon: classic lymphoma', '', (False, False)),
+    (None, float('nan'), (True, True)),  # missing: run full pipeline
+])
+def test_document_cues(path_text, cspy_text, expected):
+    assert document_cues(path_text, cspy_text) == expected
+
+
+def test_frame_cues():
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame({'PATH': [path_text for path_text, _ in TEXTS] + [None],
+                       'CSPY': [cspy_text for _, cspy_text in TEXTS] + [None]})
+    expected = [document_cues(path_text, cspy_text) for path_text, cspy_text in TEXTS] + [(True, True)]
+    assert list(frame_cues(df, 'PATH', 'CSPY', chunk_size=4)) == expected
+    assert list(frame_cues(df, 'PATH')) == [(path_cues, False) for path_cues, _ in expected]
+
+
+@pytest.mark.parametrize('cues, version, expected', [
+    ((False, False), FindingVersion.PRECISE, 'path+cspy_findings'),
+    ((False, False), FindingVersion.BROAD, 'path'),  # counts any finding
+    ((True, False), FindingVersion.PRECISE, 'cspy_findings'),
+    ((True, True), FindingVersion.PRECISE, None),
+])
+def test_triaged(cues, version, expected):
+    assert triaged(cues, version) == expected
+
+
+def read_examples():
+    with open(EXAMPLE_DATA, encoding='utf-8-sig', newline='') as fh:
+        return [(row['PATH'], row['COLONOSCOPY']) for row in csv.DictReader(fh)]
+
+
+@pytest.mark.parametrize('version', list(FindingVersion))
+@pytest.mark.parametrize('path_text, cspy_text', TEXTS + read_examples())
+def test_matches_full_pipeline(path_text, cspy_text, version):
+    expected = process_text(path_text, cspy_text, cspy_finding_version=version)
+    result = process_text(path_text, cspy_text, cspy_finding_version=version,
+                          cues=document_cues(path_text, cspy_text))
+    assert differences(result, expected) == []
+
+
+def test_differences():
+    assert differences({'a': 1, 'b': 2}, {'a': 1, 'b': 2}) == []
+    assert differences({'a': 1, 'b': 3, 'c': 0}, {'a': 1, 'b': 2}) == ['b', 'c']
+    assert differences({'b': 2, 'a': 1}, {'a': 1, 'b': 2}) == ['(order)']
+
+
+def test_validate(monkeypatch):
+    monkeypatch.setattr(triage, 'PATH_CUE_PATTERN', re.compile('zzz'))  # misses adenoma
+    path_text, cspy_text = WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+    cues = document_cues(path_text, cspy_text)
+    res, _, failure, extras = extract_record(1, path_text, cspy_text, cues=cues)
+    assert failure is None and extras['triage'] == 'path' and res['adenoma_status'] == 0
+    res, _, _, extras = extract_record(1, path_text, cspy_text, cues=cues, validate_triage=1)
+    assert extras['triage_mismatch'] and res['adenoma_status'] == 1  # output full result
+
+
+def test_process_triage(tmp_path):
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame([{'ID': i, 'PATH': path_text, 'CSPY': cspy_text} for i, (path_text, cspy_text) in
+                       enumerate(TEXTS + read_examples())])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    process(data, outfile=str(tmp_path / 'full.csv'))
+    process(data, outfile=str(tmp_path / 'triaged.csv'), triage={'validate': 0.5})
+    assert (tmp_path / 'triaged.csv').read_text() == (tmp_path / 'full.csv').read_text()
@@ -0,0 +1,128 @@
+import csv
+import gc
+import sqlite3
+import threading
+
+import pytest
+
+from precise_nlp.pattern_registry import registered_patterns
+from precise_nlp.process import process_text, process
+from precise_nlp.worker import preload, worker_pool, worker_executor, map_ordered, can_fork, \
+    WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT
+
+
+@pytest.fixture
+def unfreeze():
+    yield
+    gc.unfreeze()
+
+
+def _process_text(path_text, cspy_text):
+    return {k: str(v) for k, v in process_text(path_text, cspy_text).items()}  # MaybeCounter lacks __eq__
+
+
+def test_preload(unfreeze):
+    preload()
+    assert all(pattern.compiled for pattern in registered_patterns())
+    assert gc.get_freeze_count() > 0
+
+
+def test_preload_without_freeze():
+    preload(warmup=False, freeze=False)
+    assert all(pattern.compiled for pattern in registered_patterns())
+    assert gc.get_freeze_count() == 0
+
+
+@pytest.mark.skipif(not can_fork(), reason='Requires fork.')
+def test_worker_pool():
+    texts = [(WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT), ('A) Colon, cecum: Tubular adenoma.', '')]
+    with worker_pool(2) as pool:
+        assert gc.get_freeze_count() > 0
+        results = pool.starmap(_process_text, texts)
+    assert results == [_process_text(*text) for text in texts]
+    assert gc.get_freeze_count() == 0  # unfrozen on exit
+
+
+STRESS_TEXTS = [
+    (WARMUP_PATH_TEXT, WARMUP_CSPY_TEXT),
+    ('A) Colon, cecum, polypectomy: Tubular adenoma, 3 fragments.\nB) Rectum: Hyperplastic polyp.',
+     'Indications: Surveillance. Personal history of polyps.\nFindings: A 3 mm polyp in the rectum.'),
+    ('A. COLON, TRANSVERSE POLYPS, POLYPECTOMY:\n- Tubular adenoma, 1 of 5 fragments.\n'
+     'B. SIGMOID, BIOPSY: Negative for high-grade dysplasia or invasive carcinoma.',
+     'Indications: Positive FIT.\nFindings: · Cecum - one 5 mm flat polyp(s) · Sigmoid Colon - diverticulosis'),
+    ('A) Stomach, biopsy: Chronic gastritis.', 'Indications: Anemia. The colonoscope was advanced to the ileum.'),
+]
+
+
+@pytest.mark.parametrize('workers', [2, 8])
+def test_threads_match_sequential(workers):
+    expected = [_process_text(*text) for text in STRESS_TEXTS]
+    items = list(range(len(STRESS_TEXTS))) * 25
+    with worker_executor(workers, mode='thread', warmup=False) as executor:
+        results = list(map_ordered(_process_text, items, key=lambda i: STRESS_TEXTS[i],
+                                   executor=executor, max_pending=4 * workers))
+    assert len(results) == len(items)
+    for i, result in results:
+        assert result == expected[i]
+
+
+def test_map_ordered_bounded():
+    submitted = []
+
+    def func(x):
+        submitted.append(x)
+        return x * 2
+
+    with worker_executor(2, mode='thread', warmup=False) as executor:
+        results = map_ordered(func, range(100), key=lambda x: (x,), executor=executor, max_pending=4)
+        assert next(results) == (0, 0)
+        assert len(submitted) <= 4  # not all submitted up front
+        assert list(results) == [(x, x * 2) for x in range(1, 100)]
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        worker_executor(2, mode='fiber')
+
+
+def _read_output(outfile):
+    with open(outfile, newline='') as fh:
+        return list(csv.DictReader(fh))
+
+
+@pytest.mark.parametrize('mode', ['thread', pytest.param('process', marks=pytest.mark.skipif(
+    not can_fork(), reason='Requires fork.'))])
+def test_process_parallel(tmp_path, unfreeze, mode):
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame([{'ID': i, 'PATH': path_text, 'CSPY': cspy_text}
+                       for i, (path_text, cspy_text) in enumerate(STRESS_TEXTS * 5)])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    process(data, outfile=str(tmp_path / 'sequential.csv'))
+    process(data, outfile=str(tmp_path / 'parallel.csv'), parallel={'workers': 3, 'mode': mode})
+    assert _read_output(tmp_path / 'parallel.csv') == _read_output(tmp_path / 'sequential.csv')
+
+
+@pytest.mark.parametrize('mode', ['thread', pytest.param('process', marks=pytest.mark.skipif(
+    not can_fork(), reason='Requires fork.'))])
+def test_process_parallel_fails(tmp_path, monkeypatch, mode):
+    """Workers are shut down, and output so far is written, when a record fails"""
+    pd = pytest.importorskip('pandas')
+    from precise_nlp import process as process_module
+
+    def failing_process_text(path_text, cspy_text, **kwargs):
+        if 'BAD' in path_text:
+            raise KeyError('bad')
+        return process_text(path_text, cspy_text, **kwargs)
+
+    monkeypatch.setattr(process_module, 'process_text', failing_process_text)
+    df = pd.DataFrame([{'ID': i, 'PATH': f'BAD {path_text}' if i == 5 else path_text, 'CSPY': cspy_text}
+                       for i, (path_text, cspy_text) in enumerate(STRESS_TEXTS * 3)])
+    data = {'filetype': df, 'path': None, 'identifier': 'ID', 'path_text': 'PATH', 'cspy_text': 'CSPY'}
+    threads = threading.active_count()
+    with pytest.raises(KeyError):
+        process(data, outfile=str(tmp_path / 'out.sqlite'), parallel={'workers': 2, 'mode': mode})
+    assert gc.get_freeze_count() == 0
+    assert threading.active_count() == threads
+    with sqlite3.connect(tmp_path / 'out.sqlite') as conn:
+        assert [row[0] for row in conn.execute('SELECT identifier FROM results ORDER BY row')] == list(range(5))
+        assert conn.execute("SELECT count(*) FROM sqlite_master WHERE type = 'index'").fetchone()[0] == 1